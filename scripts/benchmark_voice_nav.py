@@ -0,0 +1,1677 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+语音导航性能基准测试工具（无需ROS Master，只依赖 nav_pkg 核心库）
+Voice navigation micro-benchmarks
+
+未通过catkin或 pip install -e . 安装时，自动使用源码目录 src/
+
+用法 / Usage:
+  python3 benchmark_voice_nav.py extract --aliases 10000
+  python3 benchmark_voice_nav.py vocab --waypoints 5000
+  python3 benchmark_voice_nav.py fuzzy --waypoints 2000
+  python3 benchmark_voice_nav.py bridge --hours 8
+  python3 benchmark_voice_nav.py catalog --maps 1000
+  python3 benchmark_voice_nav.py maplist --maps 500
+  python3 benchmark_voice_nav.py mapstore --versions 30 --size 2000
+  python3 benchmark_voice_nav.py tiles --size 6000
+  python3 benchmark_voice_nav.py waypoints --sizes 5000 50000
+  python3 benchmark_voice_nav.py switch --size 4000
+  python3 benchmark_voice_nav.py mapcache --maps 4 --size 2000
+  python3 benchmark_voice_nav.py lookup --waypoints 5000
+  python3 benchmark_voice_nav.py snap --size 2000
+  python3 benchmark_voice_nav.py costs --size 4000 --rooms 50
+  python3 benchmark_voice_nav.py rooms --sizes 1000 2000
+  python3 benchmark_voice_nav.py robots --robots 1 2 4 8 16 32
+  python3 benchmark_voice_nav.py route --stops 8
+  python3 benchmark_voice_nav.py stop --utterances 20000
+  python3 benchmark_voice_nav.py trace --utterances 5000
+  python3 benchmark_voice_nav.py engine --waypoints 500
+  python3 benchmark_voice_nav.py fused --commands 500
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+
+_SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+try:
+    import nav_pkg
+except ImportError:  # 未安装时直接使用源码目录
+    sys.path.insert(0, _SRC_DIR)
+
+from nav_pkg.room_matcher import RoomMatcher
+from nav_pkg.fuzzy_matcher import FuzzyRoomIndex, phonetic_keys, edit_distance, lazy_pinyin
+from nav_pkg.speech_filters import StopCommandMatcher, UtteranceFilter
+from nav_pkg.map_catalog import MapCatalog, CATALOG_FILENAME, map_summary
+
+
+# 常用汉字，用于生成合成别名与语句
+_CJK_CHARS = '客厅卧室厨房卫生间餐书阳台玄关门入口办公会议走廊仓库前后左右东西南北大小主次' \
+             '一二三四五六七八九十号楼层区域中心实验资料档案休息茶水打印机房电梯楼梯'
+_FILLERS = ['请去', '我要去', '带我去', '麻烦到', '去一下', '帮我导航到', '现在去']
+
+
+def _timeit(func, items, repeat=3):
+    """返回最佳一次的 (总耗时秒, 每秒处理条数)"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item in items:
+            func(item)
+        best = min(best, time.perf_counter() - start)
+    return best, len(items) / best if best > 0 else float('inf')
+
+
+# ============================================
+# extract: 别名匹配（逐个别名扫描 vs Aho-Corasick）
+# ============================================
+
+def _synthetic_mappings(alias_count, rng):
+    """生成包含alias_count个别名的房间表"""
+    mappings = {}
+    seen = set()
+    while len(seen) < alias_count:
+        alias = ''.join(rng.choice(_CJK_CHARS) for _ in range(rng.randint(2, 5)))
+        if alias in seen:
+            continue
+        seen.add(alias)
+        mappings.setdefault(f'room_{len(seen) % 500}', []).append(alias)
+    return mappings
+
+
+def _legacy_extract(mappings, text):
+    """原始实现：遍历所有房间和别名，逐个做子串判断"""
+    max_confidence = 0.0
+    detected_room = None
+    for room_type, aliases in mappings.items():
+        for alias in aliases:
+            if alias.lower() in text:
+                keyword_lower = alias.lower()
+                if keyword_lower == text:
+                    confidence = 1.0
+                else:
+                    confidence = min(0.9, len(keyword_lower) / len(text) * 0.8 + 0.3)
+                if confidence > max_confidence:
+                    max_confidence = confidence
+                    detected_room = room_type
+    return detected_room, max_confidence
+
+
+def _automaton_extract(matcher, text):
+    """新实现：单次扫描得到所有命中区间后打分"""
+    max_confidence = 0.0
+    detected_room = None
+    for match in matcher.find_all(text):
+        span = match.end - match.start
+        confidence = 1.0 if span == len(text) else min(0.9, span / len(text) * 0.8 + 0.3)
+        if confidence > max_confidence:
+            max_confidence = confidence
+            detected_room = match.room_id
+    return detected_room, max_confidence
+
+
+def bench_extract(args):
+    rng = random.Random(args.seed)
+    mappings = _synthetic_mappings(args.aliases, rng)
+    all_aliases = [alias for aliases in mappings.values() for alias in aliases]
+
+    utterances = []
+    for _ in range(args.utterances):
+        alias = rng.choice(all_aliases) if rng.random() < 0.8 else ''
+        utterances.append(rng.choice(_FILLERS) + alias)
+
+    start = time.perf_counter()
+    matcher = RoomMatcher(mappings)
+    build_time = time.perf_counter() - start
+
+    # 正确性：两种实现的房间结果一致（置信度相同时取法可能不同，只比较置信度）
+    mismatches = sum(
+        1 for text in utterances
+        if abs(_legacy_extract(mappings, text)[1] - _automaton_extract(matcher, text)[1]) > 1e-9
+    )
+
+    legacy_time, legacy_rate = _timeit(lambda t: _legacy_extract(mappings, t), utterances, args.repeat)
+    new_time, new_rate = _timeit(lambda t: _automaton_extract(matcher, t), utterances, args.repeat)
+
+    print(f"别名数量: {len(matcher)}  语句数量: {len(utterances)}")
+    print(f"自动机编译: {build_time * 1000:.1f} ms ({len(matcher._goto)} 个状态)")
+    print(f"逐别名扫描:    {legacy_rate:12.0f} 条/秒  ({legacy_time * 1000:.1f} ms)")
+    print(f"Aho-Corasick:  {new_rate:12.0f} 条/秒  ({new_time * 1000:.1f} ms)")
+    print(f"加速比: {new_rate / legacy_rate:.1f}x  置信度不一致: {mismatches}")
+
+
+# ============================================
+# vocab: 地图切换时的航点词表更新
+# ============================================
+
+def _synthetic_waypoint_names(count, rng, prefix=''):
+    names = set()
+    while len(names) < count:
+        base = ''.join(rng.choice(_CJK_CHARS) for _ in range(rng.randint(2, 6)))
+        names.add(f"{prefix}{base} {rng.randint(1, 20)}" if rng.random() < 0.3 else prefix + base)
+    return sorted(names)
+
+
+def _waypoint_mappings(names):
+    return {name: [name, name.replace(' ', '')] for name in names}
+
+
+def bench_vocab(args):
+    rng = random.Random(args.seed)
+    names = _synthetic_waypoint_names(args.waypoints, rng)
+    # 下一个地图版本：大部分航点不变，部分新增/删除
+    changed = int(len(names) * args.change)
+    next_names = names[changed:] + _synthetic_waypoint_names(changed, rng, prefix='新')
+
+    from nav_pkg.room_extraction import RoomExtractor, waypoint_aliases
+
+    def timed(func, *func_args):
+        start = time.perf_counter()
+        result = func(*func_args)
+        return time.perf_counter() - start, result
+
+    # 与提取节点收到航点列表时相同：精确匹配索引和模糊索引都在计时范围内；每项取repeat轮中最快的一次
+    cold = incremental = unchanged = fuzzy_rebuild = automaton = float('inf')
+    for _ in range(max(1, args.repeat)):
+        extractor = RoomExtractor()
+        cold = min(cold, timed(extractor.update_waypoints, names)[0])
+        elapsed, (added, removed) = timed(extractor.update_waypoints, next_names)
+        incremental = min(incremental, elapsed)
+        unchanged = min(unchanged, timed(extractor.update_waypoints, next_names)[0])
+        # 对照：整体重建（模糊索引 / 别名自动机）
+        fuzzy_rebuild = min(fuzzy_rebuild, timed(
+            FuzzyRoomIndex, {name: waypoint_aliases(name) for name in next_names})[0])
+        automaton = min(automaton, timed(RoomMatcher, _waypoint_mappings(next_names))[0])
+
+    utterances = [rng.choice(_FILLERS) + rng.choice(next_names) for _ in range(args.utterances)]
+    _, rate = _timeit(extractor.waypoint_index.find_all, utterances, args.repeat)
+
+    print(f"航点数量: {len(names)}  变化比例: {args.change:.0%} (+{added}/-{removed})")
+    print(f"首次构建:          {cold * 1000:8.2f} ms")
+    print(f"增量更新:          {incremental * 1000:8.2f} ms")
+    print(f"无变化更新:        {unchanged * 1000:8.2f} ms")
+    print(f"完整重建模糊索引:  {fuzzy_rebuild * 1000:8.2f} ms")
+    print(f"完整重建自动机:    {automaton * 1000:8.2f} ms")
+    print(f"航点匹配吞吐:      {rate:8.0f} 条/秒")
+
+
+# ============================================
+# fuzzy: 模糊匹配（音节倒排索引 vs 线性编辑距离扫描）
+# ============================================
+
+def _linear_fuzzy(entries, index, text):
+    """对照组：对每个窗口线性计算与所有别名的编辑距离"""
+    keys = phonetic_keys(text)
+    best = (0.0, None)
+    for alias_keys, room_id in entries:
+        radius = index.max_distance(len(alias_keys))
+        for window in range(max(1, len(alias_keys) - radius), len(alias_keys) + radius + 1):
+            for start in range(0, len(keys) - window + 1):
+                distance = edit_distance(keys[start:start + window], alias_keys, limit=radius)
+                if distance <= radius:
+                    confidence = 0.8 * (1.0 - distance / max(len(alias_keys), window))
+                    best = max(best, (confidence, room_id))
+    return best
+
+
+def _synthetic_site_names(count, rng):
+    """更接近真实站点的航点名：常用汉字区的专名 + 常见房间后缀"""
+    suffixes = ['办公室', '会议室', '仓库', '实验室', '休息区', '机房', '走廊', '']
+    names = set()
+    while len(names) < count:
+        proper = ''.join(chr(0x4E00 + rng.randrange(3500)) for _ in range(rng.randint(2, 3)))
+        names.add(proper + rng.choice(suffixes))
+    return sorted(names)
+
+
+def _misspell(alias, rng):
+    """模拟IAT误识别：随机替换一个字"""
+    if len(alias) < 3:
+        return alias
+    position = rng.randrange(len(alias))
+    return alias[:position] + rng.choice(_CJK_CHARS) + alias[position + 1:]
+
+
+def bench_fuzzy(args):
+    rng = random.Random(args.seed)
+    names = _synthetic_site_names(args.waypoints, rng)
+    mappings = _waypoint_mappings(names)
+
+    start = time.perf_counter()
+    index = FuzzyRoomIndex(mappings)
+    build_time = time.perf_counter() - start
+
+    entries = [(phonetic_keys(alias), room_id)
+               for room_id, aliases in mappings.items() for alias in aliases if len(alias) >= 2]
+    utterances = [rng.choice(_FILLERS) + _misspell(rng.choice(names), rng) for _ in range(args.utterances)]
+
+    index_time, index_rate = _timeit(index.search, utterances, args.repeat)
+    linear_items = utterances[:max(1, args.utterances // 20)]
+    linear_time, linear_rate = _timeit(lambda t: _linear_fuzzy(entries, index, t), linear_items, 1)
+    hits = sum(1 for text in utterances if index.search(text)[0] is not None)
+
+    print(f"拼音: {'pypinyin' if lazy_pinyin else '未安装, 按字符'}  别名数量: {len(index)}")
+    print(f"索引构建:      {build_time * 1000:10.1f} ms")
+    print(f"索引查询:      {index_time / len(utterances) * 1000:10.3f} ms/条")
+    print(f"线性扫描:      {linear_time / len(linear_items) * 1000:10.3f} ms/条")
+    print(f"加速比: {index_rate / linear_rate:.1f}x  命中率: {hits / len(utterances):.0%}")
+
+
+# ============================================
+# bridge: 语音桥接长时间运行的消息量与CPU
+# ============================================
+
+def bench_bridge(args):
+    """
+    模拟长时间运行：IAT每隔interval秒给出一条结果，其中一部分是重复上报。
+    旧实现每秒新增一个订阅，第t秒的结果会被转发t次；新实现单订阅+重复抑制。
+    """
+    rng = random.Random(args.seed)
+    clock = [0.0]
+    utterance_filter = UtteranceFilter(args.window, clock=lambda: clock[0])
+    phrases = [filler + room for filler in _FILLERS for room in ('厨房', '客厅', '卧室', '书房', '阳台')]
+
+    epoch_seconds = 3600.0 / args.epochs_per_hour
+    total_epochs = int(args.hours * args.epochs_per_hour)
+    print(f"窗口: {args.window}s  结果间隔: {args.interval}s  重复上报率: {args.duplicate_rate:.0%}")
+    print(" 时段 │ 旧实现转发/条 │ 新实现转发 │ 新实现抑制 │ 跟踪条目 │ CPU µs/条")
+    print("─" * 72)
+
+    last_text = None
+    for epoch in range(total_epochs):
+        forwarded_before = utterance_filter.forwarded
+        suppressed_before = utterance_filter.suppressed
+        results = 0
+        cpu_start = time.process_time()
+        epoch_end = (epoch + 1) * epoch_seconds
+        while clock[0] < epoch_end:
+            clock[0] += args.interval
+            if last_text is not None and rng.random() < args.duplicate_rate:
+                text = last_text
+            else:
+                text = rng.choice(phrases)
+            last_text = text
+            utterance_filter.accept(text)
+            results += 1
+        cpu = time.process_time() - cpu_start
+
+        # 旧实现：第t秒已有约t个订阅，每条结果被重复转发
+        legacy_fanout = epoch_end - epoch_seconds / 2
+        print(f"{epoch_end / 3600:4.1f}h │ {legacy_fanout:13.0f} │ "
+              f"{utterance_filter.forwarded - forwarded_before:10d} │ "
+              f"{utterance_filter.suppressed - suppressed_before:10d} │ "
+              f"{len(utterance_filter._last_seen):8d} │ {cpu / results * 1e6:9.2f}")
+
+
+# ============================================
+# catalog: 启动时扫描地图版本（全量解析 vs 持久化目录）
+# ============================================
+
+def write_waypoints_xml(path, rooms):
+    """写出waterplus格式的waypoints.xml，rooms为 [(name, x, y)]"""
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>', '<Waterplus>']
+    for name, x, y in rooms:
+        lines.append(f'  <Waypoint><Name>{name}</Name><Pos_x>{x:.3f}</Pos_x><Pos_y>{y:.3f}</Pos_y>'
+                     f'<Pos_z>0</Pos_z><Ori_x>0</Ori_x><Ori_y>0</Ori_y><Ori_z>0</Ori_z><Ori_w>1</Ori_w></Waypoint>')
+    lines.append('</Waterplus>')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines))
+
+
+def write_synthetic_map(folder, rng, rooms=20, width=64, height=64):
+    """生成一个包含waypoints.xml/map.yaml/map.pgm的地图文件夹"""
+    os.makedirs(folder, exist_ok=True)
+    write_waypoints_xml(os.path.join(folder, 'waypoints.xml'),
+                        [(f'room {i}', rng.uniform(-10, 10), rng.uniform(-10, 10)) for i in range(rooms)])
+    with open(os.path.join(folder, 'map.yaml'), 'w') as f:
+        f.write('image: map.pgm\nresolution: 0.05\norigin: [-10.0, -10.0, 0.0]\n'
+                'negate: 0\noccupied_thresh: 0.65\nfree_thresh: 0.196\n')
+    with open(os.path.join(folder, 'map.pgm'), 'wb') as f:
+        f.write(f'P5\n{width} {height}\n255\n'.encode() + bytes([254]) * (width * height))
+
+
+def _legacy_scan(base_path):
+    """原始实现：遍历所有文件夹，检查三个文件并完整解析每个waypoints.xml"""
+    maps = []
+    for folder in sorted(os.listdir(base_path), reverse=True):
+        path = os.path.join(base_path, folder)
+        if not (folder.startswith('map_') and os.path.isdir(path)):
+            continue
+        files = [os.path.join(path, name) for name in ('waypoints.xml', 'map.yaml', 'map.pgm')]
+        if not all(os.path.exists(f) for f in files):
+            continue
+        maps.append({'name': folder, 'rooms': _legacy_parse_waypoints(files[0])})
+    return maps
+
+
+def _legacy_parse_waypoints(path):
+    """原始实现：ET.parse构建整棵树后逐个find"""
+    root = ET.parse(path).getroot()
+    rooms = {}
+    for waypoint in root.findall('Waypoint'):
+        rooms[waypoint.find('Name').text.lower().strip()] = {
+            'x': float(waypoint.find('Pos_x').text), 'y': float(waypoint.find('Pos_y').text), 'z': 0.0}
+    return rooms
+
+
+def bench_catalog(args):
+    rng = random.Random(args.seed)
+    base = tempfile.mkdtemp(prefix='nav_catalog_bench_')
+    try:
+        for i in range(args.maps):
+            write_synthetic_map(os.path.join(base, f'map_20250101_{i:06d}'), rng, rooms=args.rooms)
+
+        def timed(func):
+            start = time.perf_counter()
+            result = func()
+            return time.perf_counter() - start, result
+
+        legacy, _ = timed(lambda: _legacy_scan(base))
+        cold, maps = timed(lambda: MapCatalog(base).scan())
+        warm, _ = timed(lambda: MapCatalog(base).scan())
+
+        # 修改部分文件夹 + 新增文件夹后重启
+        for i in range(args.changed):
+            write_synthetic_map(os.path.join(base, f'map_20250101_{i:06d}'), rng, rooms=args.rooms + 1)
+            write_synthetic_map(os.path.join(base, f'map_20250102_{i:06d}'), rng, rooms=args.rooms)
+        catalog = MapCatalog(base)
+        changed, _ = timed(catalog.scan)
+        changed_stats = catalog.last_scan
+
+        # 目录文件损坏后重启
+        with open(os.path.join(base, CATALOG_FILENAME), 'w') as f:
+            f.write('{"version": 1, "maps": [tru')
+        catalog = MapCatalog(base)
+        corrupt, _ = timed(catalog.scan)
+
+        print(f"地图版本: {len(maps)}  每个地图航点数: {args.rooms}")
+        print(f"全量解析 (原实现):   {legacy * 1000:9.1f} ms")
+        print(f"首次启动 (建目录):   {cold * 1000:9.1f} ms")
+        print(f"再次启动 (命中目录): {warm * 1000:9.1f} ms  ({legacy / warm:.1f}x)")
+        print(f"{args.changed}个修改+{args.changed}个新增: {changed * 1000:9.1f} ms  "
+              f"(解析 {changed_stats['parsed']}, 复用 {changed_stats['reused']})")
+        print(f"目录损坏后重建:      {corrupt * 1000:9.1f} ms  (rebuilt={catalog.last_scan['rebuilt']})")
+    finally:
+        shutil.rmtree(base, ignore_errors=True)
+
+
+# ============================================
+# maplist: switch_map.py --list（原实现 vs 离线目录缓存 vs 管理器服务）
+# ============================================
+
+def _legacy_list_maps(base_path, limit):
+    """原实现：列出文件夹后，对每个地图rglob累加文件大小并完整解析waypoints.xml"""
+    from pathlib import Path
+    maps = sorted([d for d in Path(base_path).iterdir() if d.is_dir() and d.name.startswith('map_')],
+                  key=lambda d: d.name, reverse=True)
+    rows = []
+    for map_dir in maps[:limit]:
+        rooms = len(ET.parse(map_dir / 'waypoints.xml').getroot().findall('Waypoint'))
+        size = sum(f.stat().st_size for f in map_dir.rglob('*') if f.is_file())
+        rows.append((map_dir.name, rooms, size))
+    return rows
+
+
+def bench_maplist(args):
+    rng = random.Random(args.seed)
+    base = tempfile.mkdtemp(prefix='nav_maplist_bench_')
+    try:
+        for i in range(args.maps):
+            write_synthetic_map(os.path.join(base, f'map_20250101_{i:06d}'), rng, rooms=args.rooms)
+
+        def timed(func):
+            start = time.perf_counter()
+            result = func()
+            return (time.perf_counter() - start) * 1000, result
+
+        legacy_10, _ = timed(lambda: _legacy_list_maps(base, 10))
+        legacy_all, _ = timed(lambda: _legacy_list_maps(base, args.maps))
+        cold, _ = timed(lambda: [map_summary(m) for m in MapCatalog(base).scan()])
+        warm, _ = timed(lambda: [map_summary(m) for m in MapCatalog(base).scan()])
+        # 管理器服务：直接从内存中的目录生成列表
+        maps = MapCatalog(base).scan()
+        service, rows = timed(lambda: [map_summary(m) for m in maps])
+
+        print(f"地图版本: {args.maps}  每个地图航点数: {args.rooms}")
+        print(f"原实现 (最新10个):          {legacy_10:9.1f} ms")
+        print(f"原实现 (全部{args.maps}个):         {legacy_all:9.1f} ms")
+        print(f"离线目录 首次 (建缓存):     {cold:9.1f} ms")
+        print(f"离线目录 再次 (命中缓存):   {warm:9.1f} ms")
+        print(f"管理器服务 (内存目录):      {service:9.3f} ms  ({len(rows)}行，不含ROS服务往返)")
+    finally:
+        shutil.rmtree(base, ignore_errors=True)
+
+
+# ============================================
+# waypoints: 航点文件解析（ET.parse整棵树 vs iterparse流式）
+# ============================================
+
+def bench_waypoints(args):
+    import gc
+    import tracemalloc
+    from nav_pkg.waypoints import parse_waypoints, count_waypoints
+
+    rng = random.Random(args.seed)
+    workdir = tempfile.mkdtemp(prefix='nav_waypoints_bench_')
+    # 模拟运行中的导航管理器进程：常驻对象越多，整树解析触发的分代GC越贵
+    resident = [[i] for i in range(args.resident)]
+
+    def best(func, path):
+        times = []
+        for _ in range(args.repeat):
+            gc.collect()
+            start = time.perf_counter()
+            func(path)
+            times.append(time.perf_counter() - start)
+        return min(times) * 1000
+
+    def peak(func, path):
+        gc.collect()
+        tracemalloc.start()
+        func(path)
+        peak_bytes = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return peak_bytes / 1e6
+
+    def legacy_count(path):
+        return len(ET.parse(path).getroot().findall('Waypoint'))
+
+    try:
+        print(f"常驻对象: {len(resident)}")
+        print("航点数  │ 解析 原实现 │ 解析 流式 │ 计数 原实现 │ 计数 流式 │ 峰值内存 解析 原/流式 │ 计数 原/流式")
+        print("─" * 104)
+        for count in args.sizes:
+            path = os.path.join(workdir, f'waypoints_{count}.xml')
+            write_waypoints_xml(path, [(f'room {i}', rng.uniform(-50, 50), rng.uniform(-50, 50))
+                                       for i in range(count)])
+            assert parse_waypoints(path).keys() == _legacy_parse_waypoints(path).keys()
+            print(f"{count:7d} │ {best(_legacy_parse_waypoints, path):8.1f} ms │ "
+                  f"{best(parse_waypoints, path):7.1f} ms │ "
+                  f"{best(legacy_count, path):8.1f} ms │ {best(count_waypoints, path):7.1f} ms │ "
+                  f"{peak(_legacy_parse_waypoints, path):10.1f} / {peak(parse_waypoints, path):5.1f} MB │ "
+                  f"{peak(legacy_count, path):5.1f} / {peak(count_waypoints, path):4.1f} MB")
+
+        # 校验：坐标非数值/非有限值的航点被跳过并报告
+        path = os.path.join(workdir, 'malformed.xml')
+        write_waypoints_xml(path, [('ok', 1.0, 2.0), ('nan', float('nan'), 0.0)])
+        with open(path, encoding='utf-8') as f:
+            text = f.read().replace('</Waterplus>', '  <Waypoint><Name>bad</Name><Pos_x>1,5</Pos_x><Pos_y>0</Pos_y></Waypoint>\n'
+                                            '  <Waypoint><Pos_x>0</Pos_x><Pos_y>0</Pos_y></Waypoint>\n</Waterplus>')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        errors = []
+        rooms = parse_waypoints(path, errors)
+        print(f"\n格式校验: 保留 {sorted(rooms)}，跳过 {len(errors)} 个")
+        for error in errors:
+            print(f"  {error}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+# ============================================
+# switch: 地图切换延迟（重启map_server vs 进程内发布）
+# ============================================
+
+def write_synthetic_pgm(path, width, height, rng):
+    """生成带墙体和随机障碍的P5格式PGM（254=空闲, 0=占用, 205=未知）"""
+    import numpy as np
+    image = np.full((height, width), 254, dtype=np.uint8)
+    image[:, :2] = image[:, -2:] = image[:2, :] = image[-2:, :] = 0
+    for _ in range(max(1, width * height // 40000)):
+        x, y = rng.randrange(width - 20), rng.randrange(height - 20)
+        image[y:y + rng.randint(2, 20), x:x + rng.randint(2, 20)] = 0
+    image[: height // 10, : width // 10] = 205
+    with open(path, 'wb') as f:
+        f.write(f'P5\n{width} {height}\n255\n'.encode())
+        f.write(image.tobytes())
+
+
+# 原实现的固定等待：rosnode kill 后 sleep(1)，rosrun 后 sleep(2)
+_LEGACY_SWITCH_SLEEP = 3.0
+
+
+def bench_switch(args):
+    from nav_pkg.map_loader import load_occupancy_map
+
+    rng = random.Random(args.seed)
+    base = tempfile.mkdtemp(prefix='nav_switch_bench_')
+    try:
+        maps = []
+        for i in range(2):
+            folder = os.path.join(base, f'map_{i}')
+            write_synthetic_map(folder, rng, width=1, height=1)
+            write_synthetic_pgm(os.path.join(folder, 'map.pgm'), args.size, args.size, rng)
+            maps.append(os.path.join(folder, 'map.yaml'))
+
+        samples = []
+        for i in range(args.switches):
+            start = time.perf_counter()
+            occupancy_map = load_occupancy_map(maps[i % 2])
+            payload = occupancy_map.data.tobytes()  # numpy_msg 序列化等价于一次内存拷贝
+            samples.append(time.perf_counter() - start)
+
+        samples.sort()
+        print(f"地图尺寸: {args.size}x{args.size}  ({len(payload) / 1e6:.1f} MB)  切换次数: {len(samples)}")
+        print(f"原实现 (kill + rosrun map_server): ≥ {_LEGACY_SWITCH_SLEEP * 1000:.0f} ms 固定等待 + map_server自身加载")
+        print(f"进程内解码并发布:  中位 {samples[len(samples) // 2] * 1000:.1f} ms, 最大 {samples[-1] * 1000:.1f} ms")
+    finally:
+        shutil.rmtree(base, ignore_errors=True)
+
+
+# ============================================
+# mapstore: 地图历史的磁盘占用和读取（每版完整PGM vs 关键帧+增量）
+# ============================================
+
+def _write_map_history(base, versions, size, change, rng):
+    """
+    生成一串逐步探索的地图版本：每版在未知区域中新探索约change比例的栅格，另有少量噪声
+
+    Returns:
+        [(文件夹名, 原PGM的字节)]
+    """
+    import numpy as np
+    image = np.full((size, size), 205, dtype=np.uint8)
+    history = []
+    for i in range(versions):
+        side = max(2, int(size * change ** 0.5))
+        x, y = rng.randrange(size - side), rng.randrange(size - side)
+        region = image[y:y + side, x:x + side]
+        region[...] = 254
+        region[::max(2, side // 4), :] = 0
+        noise = np.random.default_rng(rng.randrange(1 << 30)).integers(0, image.size, image.size // 1000)
+        image.reshape(-1)[noise] = 254
+        folder_name = f'map_20250101_{i:06d}'
+        folder = os.path.join(base, folder_name)
+        write_synthetic_map(folder, rng, rooms=5, width=1, height=1)
+        data = f'P5\n# CREATOR: map_saver.cpp 0.050 m/pix\n{size} {size}\n255\n'.encode() + image.tobytes()
+        with open(os.path.join(folder, 'map.pgm'), 'wb') as f:
+            f.write(data)
+        history.append((folder_name, data))
+    return history
+
+
+def bench_mapstore(args):
+    import numpy as np
+    from nav_pkg.map_loader import load_occupancy_map, read_map_image
+    from nav_pkg.map_store import MapStore, materialize
+
+    rng = random.Random(args.seed)
+    base = tempfile.mkdtemp(prefix='nav_mapstore_bench_')
+    try:
+        history = _write_map_history(base, args.versions, args.size, args.change, rng)
+        store = MapStore(base)
+
+        def read_times(loader):
+            samples = []
+            for folder_name, _ in history:
+                start = time.perf_counter()
+                loader(os.path.join(base, folder_name))
+                samples.append((time.perf_counter() - start) * 1000)
+            return sorted(samples)
+
+        def image(folder):
+            np.ascontiguousarray(read_map_image(os.path.join(folder, 'map.pgm'))[0]).sum()
+
+        def decoded(folder):
+            load_occupancy_map(os.path.join(folder, 'map.yaml'))
+
+        full_bytes = store.disk_usage()['total']
+        full_image, full_decoded = read_times(image), read_times(decoded)
+
+        start = time.perf_counter()
+        stats = store.compact(args.max_change, min_age=0)
+        compact_ms = (time.perf_counter() - start) * 1000
+        store_bytes = store.disk_usage()['total']
+        delta_image, delta_decoded = read_times(image), read_times(decoded)
+
+        # 逐字节核对还原结果
+        output = os.path.join(base, 'restored.pgm')
+        for folder_name, data in history:
+            materialize(os.path.join(base, folder_name, 'map.pgm'), output)
+            with open(output, 'rb') as f:
+                assert f.read() == data, folder_name
+
+        def fmt(samples):
+            return f"中位 {samples[len(samples) // 2]:7.1f} ms  最大 {samples[-1]:7.1f} ms"
+
+        print(f"地图版本: {args.versions}  尺寸: {args.size}x{args.size}  每版新探索: {args.change * 100:.1f}%")
+        print(f"磁盘占用  完整PGM: {full_bytes / 1e6:8.1f} MB")
+        print(f"磁盘占用  关键帧+增量: {store_bytes / 1e6:6.1f} MB  "
+              f"(关键帧 {stats['keyframes']} 个, 增量 {stats['deltas']} 个, 压缩耗时 {compact_ms:.0f} ms)")
+        print(f"读取图像  完整PGM:    {fmt(full_image)}")
+        print(f"读取图像  关键帧+增量: {fmt(delta_image)}")
+        print(f"解码地图  完整PGM:    {fmt(full_decoded)}")
+        print(f"解码地图  关键帧+增量: {fmt(delta_decoded)}")
+        print(f"✓ {len(history)} 个版本还原后与原文件逐字节一致")
+    finally:
+        shutil.rmtree(base, ignore_errors=True)
+
+
+# ============================================
+# tiles: 大地图切换的峰值内存（整张解码 vs 分块按需解码）
+# ============================================
+
+def write_warehouse_pgm(path, size, rng):
+    """仓库地图：中间已探索（货架成排，留有通道），四周大片未知"""
+    import numpy as np
+    image = np.full((size, size), 205, dtype=np.uint8)
+    low, high = size // 10, size - size // 10
+    image[low:high, low:high] = 254
+    image[low:low + 3, low:high] = image[high - 3:high, low:high] = 0
+    image[low:high, low:low + 3] = image[low:high, high - 3:high] = 0
+    for row in range(low + 60, high - 60, 60):
+        image[row:row + 20, low + 60:high - 60] = 0
+        for gap in range(low + 200, high - 60, 400):
+            image[row:row + 20, gap:gap + 40] = 254
+    for _ in range(size):
+        x, y = rng.randrange(low, high - 10), rng.randrange(low, high - 10)
+        image[y:y + rng.randint(2, 10), x:x + rng.randint(2, 10)] = 0
+    with open(path, 'wb') as f:
+        f.write(f'P5\n{size} {size}\n255\n'.encode())
+        f.write(image.tobytes())
+
+
+# 子进程的峰值RSS (kB)：ru_maxrss在exec后保留父进程的峰值，这里读新地址空间的VmHWM
+_REPORT_HWM = ("print(next(line.split()[1] for line in open('/proc/self/status') "
+               "if line.startswith('VmHWM')))\n")
+
+# 子进程中执行一次地图切换：吸附所有航点、计算代价矩阵，可选拼出完整栅格用于发布
+_SWITCH_CODE = '''
+import time
+from nav_pkg.map_clearance import ClearanceMap, TiledClearanceMap
+from nav_pkg.map_loader import load_occupancy_map
+from nav_pkg.map_tiles import open_tiled_map
+from nav_pkg.travel_costs import TravelCostMatrix
+yaml_file, tiled, publish, waypoints = {args!r}
+start = time.perf_counter()
+if tiled:
+    tiled_map = open_tiled_map(yaml_file)
+    clearance_map = TiledClearanceMap(tiled_map, 0.25, 0.1, 1.5)
+    if publish:
+        tiled_map.occupancy_data().tobytes()
+else:
+    occupancy_map = load_occupancy_map(yaml_file)
+    if publish:
+        occupancy_map.data.tobytes()
+    clearance_map = ClearanceMap(occupancy_map, 0.25, 0.1)
+snapped = sum(1 for coords in waypoints.values() if clearance_map.snap(coords['x'], coords['y']))
+ready = time.perf_counter() - start
+TravelCostMatrix(clearance_map, waypoints, 250000)
+print(ready, time.perf_counter() - start, snapped)
+''' + _REPORT_HWM
+
+# 子进程中只发布一次/map：按rospy的方式序列化 (numpy_msg: data.tostring() 写入BytesIO，再getvalue())
+_PUBLISH_CODE = '''
+import io
+from nav_pkg.map_loader import load_occupancy_map
+from nav_pkg.map_tiles import open_tiled_map
+yaml_file, tiled = {args!r}
+if tiled:
+    data = open_tiled_map(yaml_file).occupancy_data()
+else:
+    data = load_occupancy_map(yaml_file).data.reshape(-1)
+buff = io.BytesIO()
+buff.write(data.tobytes())
+print(len(buff.getvalue()))
+''' + _REPORT_HWM
+
+
+def bench_tiles(args):
+    from nav_pkg.map_tiles import convert_to_tiles
+
+    rng = random.Random(args.seed)
+    base = tempfile.mkdtemp(prefix='nav_tiles_bench_')
+    try:
+        folder = os.path.join(base, 'map_warehouse')
+        write_synthetic_map(folder, rng, width=1, height=1)
+        write_warehouse_pgm(os.path.join(folder, 'map.pgm'), args.size, rng)
+        yaml_file = os.path.join(folder, 'map.yaml')
+        extent = args.size * 0.05
+        waypoints = {f'bay {i}': {'x': -10.0 + rng.uniform(0.1, 0.9) * extent,
+                                  'y': -10.0 + rng.uniform(0.1, 0.9) * extent, 'z': 0.0}
+                     for i in range(args.waypoints)}
+
+        start = time.perf_counter()
+        _, stats = convert_to_tiles(yaml_file, args.tile_size)
+        convert_s = time.perf_counter() - start
+        pgm_bytes = os.path.getsize(os.path.join(folder, 'map.pgm'))
+
+        process = _start_process('import nav_pkg.map_tiles, nav_pkg.travel_costs\n' + _REPORT_HWM)
+        baseline_kb = int(process.communicate()[0])
+
+        def run(tiled, publish):
+            process = _start_process(_SWITCH_CODE.format(args=(yaml_file, tiled, publish, waypoints)))
+            output = process.communicate()[0].split()
+            return float(output[0]), float(output[1]), int(output[2]), int(output[3])
+
+        print(f"地图: {args.size}x{args.size} ({pgm_bytes / 1e6:.1f} MB PGM)  航点: {args.waypoints}")
+        print(f"分块文件: {stats['bytes'] / 1e6:.2f} MB, {stats['tiles']}个图块 (同色 {stats['uniform']}), "
+              f"生成耗时 {convert_s:.1f} s")
+        print(f"空进程 (导入numpy/scipy): {baseline_kb / 1024:.0f} MB")
+        for label, tiled, publish in (('整张解码', False, False), ('分块按需', True, False),
+                                      ('整张解码 + 发布/map', False, True), ('分块按需 + 发布/map', True, True)):
+            ready, elapsed, snapped, rss_kb = run(tiled, publish)
+            print(f"{label}: 峰值RSS {rss_kb / 1024:.0f} MB  吸附{snapped}个航点完成 {ready:.2f} s  "
+                  f"含代价矩阵 {elapsed:.2f} s")
+        for label, tiled in (('整张解码', False), ('分块解码到OccupancyGrid.data', True)):
+            process = _start_process(_PUBLISH_CODE.format(args=(yaml_file, tiled)))
+            rss_kb = int(process.communicate()[0].split()[1])
+            print(f"只发布/map ({label} + 序列化): 峰值RSS {rss_kb / 1024:.0f} MB "
+                  f"(比空进程多 {(rss_kb - baseline_kb) / 1024:.0f} MB)")
+    finally:
+        shutil.rmtree(base, ignore_errors=True)
+
+
+# ============================================
+# mapcache: 在多个地图之间来回切换（每次解码 vs LRU缓存）
+# ============================================
+
+def bench_mapcache(args):
+    from nav_pkg.map_loader import OccupancyMapCache, load_occupancy_map
+
+    rng = random.Random(args.seed)
+    base = tempfile.mkdtemp(prefix='nav_mapcache_bench_')
+    try:
+        maps = []
+        for i in range(args.maps):
+            folder = os.path.join(base, f'map_{i}')
+            write_synthetic_map(folder, rng, width=1, height=1)
+            write_synthetic_pgm(os.path.join(folder, 'map.pgm'), args.size, args.size, rng)
+            maps.append(os.path.join(folder, 'map.yaml'))
+
+        # 偏向最近使用地图的切换序列（巡检时常在两三张地图之间往返）
+        sequence = [maps[min(int(rng.expovariate(1.0)), len(maps) - 1)] for _ in range(args.switches)]
+        map_bytes = args.size * args.size
+        cache = OccupancyMapCache(int(args.budget * map_bytes))
+
+        def run(load):
+            samples = []
+            for yaml_file in sequence:
+                start = time.perf_counter()
+                load(yaml_file)
+                samples.append(time.perf_counter() - start)
+            samples.sort()
+            return samples
+
+        uncached = run(load_occupancy_map)
+        cached = run(cache.get)
+        stats = cache.stats()
+
+        print(f"地图: {args.maps} x {args.size}x{args.size} ({map_bytes / 1e6:.1f} MB)  "
+              f"切换次数: {args.switches}  缓存上限: {args.budget:g} 张地图")
+        for label, samples in (('每次解码', uncached), ('LRU缓存', cached)):
+            print(f"{label}:  中位 {samples[len(samples) // 2] * 1000:8.2f} ms, "
+                  f"p95 {samples[int(len(samples) * 0.95)] * 1000:8.2f} ms, 合计 {sum(samples) * 1000:9.1f} ms")
+        print(f"命中 {stats['hits']}, 未命中 {stats['misses']}, 淘汰 {stats['evictions']}, "
+              f"常驻 {stats['resident_bytes'] / 1e6:.1f} MB")
+    finally:
+        shutil.rmtree(base, ignore_errors=True)
+
+
+# ============================================
+# lookup: 房间ID -> 航点（逐个子串判断 vs 预建索引）
+# ============================================
+
+def _legacy_lookup(waypoints, room_id):
+    """原实现：遍历航点做双向子串判断，返回字典顺序中的第一个"""
+    for room_name, coords in waypoints.items():
+        room_id_formatted = room_id.replace('_', ' ')
+        if room_id_formatted in room_name or room_name in room_id_formatted:
+            return room_name
+    return None
+
+
+def bench_lookup(args):
+    from nav_pkg.room_lookup import RoomIndex
+
+    rng = random.Random(args.seed)
+    names = _synthetic_waypoint_names(args.waypoints, rng)
+    rng.shuffle(names)
+    waypoints = {name: {'x': 0.0, 'y': 0.0, 'z': 0.0} for name in names}
+
+    queries = []
+    for _ in range(args.queries):
+        name = rng.choice(names)
+        kind = rng.random()
+        if kind < 0.5:
+            queries.append(name.replace(' ', '_'))      # 精确
+        elif kind < 0.7:
+            queries.append(name[:2])                    # 前缀
+        elif kind < 0.9:
+            queries.append(name + '附近')                # 包含航点名
+        else:
+            queries.append('不存在的房间')                # 未命中
+
+    start = time.perf_counter()
+    index = RoomIndex(waypoints)
+    build = time.perf_counter() - start
+
+    legacy_time, legacy_rate = _timeit(lambda q: _legacy_lookup(waypoints, q), queries, 1)
+    # 首轮包含兜底查询的计算，之后的重复查询命中缓存
+    cold_time, cold_rate = _timeit(lambda q: index.lookup(q), queries, 1)
+    warm_time, warm_rate = _timeit(lambda q: index.lookup(q), queries, args.repeat)
+
+    stages = {}
+    for query in queries:
+        found = index.lookup(query)
+        stage = found.stage if found else 'miss'
+        stages[stage] = stages.get(stage, 0) + 1
+
+    # 航点顺序变化时原实现的结果会变，索引不会
+    shuffled = dict(sorted(waypoints.items(), key=lambda item: rng.random()))
+    legacy_unstable = sum(_legacy_lookup(waypoints, q) != _legacy_lookup(shuffled, q) for q in queries)
+    shuffled_index = RoomIndex(shuffled)
+    index_unstable = sum(index.lookup(q) != shuffled_index.lookup(q) for q in queries)
+
+    print(f"航点数: {len(waypoints)}  查询数: {len(queries)}  构建索引: {build * 1000:.1f} ms")
+    print(f"原实现:        {legacy_time / len(queries) * 1e6:10.1f} µs/次  ({legacy_rate:,.0f} 次/秒)")
+    print(f"索引 (首次):   {cold_time / len(queries) * 1e6:10.1f} µs/次  ({cold_rate:,.0f} 次/秒)")
+    print(f"索引 (重复):   {warm_time / len(queries) * 1e6:10.1f} µs/次  ({warm_rate:,.0f} 次/秒)")
+    print(f"命中阶段: {stages}")
+    print(f"打乱航点顺序后结果改变: 原实现 {legacy_unstable}/{len(queries)}, 索引 {index_unstable}/{len(queries)}")
+
+
+# ============================================
+# snap: 目标吸附（逐次搜索 vs 预计算距离变换）
+# ============================================
+
+def bench_snap(args):
+    import numpy as np
+    from scipy import ndimage
+    from nav_pkg.map_loader import load_occupancy_map
+    from nav_pkg.map_clearance import ClearanceMap
+
+    rng = random.Random(args.seed)
+    base = tempfile.mkdtemp(prefix='nav_snap_bench_')
+    try:
+        folder = os.path.join(base, 'map_0')
+        write_synthetic_map(folder, rng, width=1, height=1)
+        write_synthetic_pgm(os.path.join(folder, 'map.pgm'), args.size, args.size, rng)
+        occupancy_map = load_occupancy_map(os.path.join(folder, 'map.yaml'))
+
+        start = time.perf_counter()
+        clearance_map = ClearanceMap(occupancy_map, args.radius, args.margin)
+        build = time.perf_counter() - start
+
+        extent = args.size * occupancy_map.resolution
+        goals = [(occupancy_map.origin[0] + rng.uniform(0, extent), occupancy_map.origin[1] + rng.uniform(0, extent))
+                 for _ in range(args.goals)]
+
+        # 对照：每个目标现场计算安全区域，再在其中找最近的栅格
+        def naive_snap(goal):
+            row, col = clearance_map.world_to_cell(*goal)
+            free = occupancy_map.data == 0
+            clear = ndimage.distance_transform_edt(free) * occupancy_map.resolution >= clearance_map.clearance
+            rows, cols = np.nonzero(clear)
+            nearest = np.argmin((rows - row) ** 2 + (cols - col) ** 2)
+            return clearance_map.cell_to_world(rows[nearest], cols[nearest])
+
+        naive_goals = goals[:max(1, args.goals // 100)]
+        naive_time, _ = _timeit(naive_snap, naive_goals, 1)
+        snap_time, snap_rate = _timeit(lambda goal: clearance_map.snap(*goal), goals, args.repeat)
+        moved = [result[2] for result in map(lambda goal: clearance_map.snap(*goal), goals) if result]
+
+        print(f"地图尺寸: {args.size}x{args.size}  安全距离: {clearance_map.clearance:.2f} m  "
+              f"距离变换内存: {clearance_map.nbytes / 1e6:.1f} MB")
+        print(f"预计算 (加载地图时一次): {build * 1000:9.1f} ms")
+        print(f"逐次搜索:  {naive_time / len(naive_goals) * 1000:9.1f} ms/次")
+        print(f"查表吸附:  {snap_time / len(goals) * 1e6:9.2f} µs/次  ({snap_rate:,.0f} 次/秒)")
+        print(f"需要移动的目标: {sum(1 for m in moved if m > 0)}/{len(goals)}, 最大移动 {max(moved):.2f} m")
+    finally:
+        shutil.rmtree(base, ignore_errors=True)
+
+
+# ============================================
+# costs: 房间间行走代价矩阵的预计算
+# ============================================
+
+def bench_costs(args):
+    from nav_pkg.map_loader import load_occupancy_map
+    from nav_pkg.map_clearance import ClearanceMap
+    from nav_pkg.travel_costs import TravelCostMatrix
+
+    rng = random.Random(args.seed)
+    base = tempfile.mkdtemp(prefix='nav_costs_bench_')
+    try:
+        folder = os.path.join(base, 'map_0')
+        write_synthetic_map(folder, rng, width=1, height=1)
+        write_synthetic_pgm(os.path.join(folder, 'map.pgm'), args.size, args.size, rng)
+        occupancy_map = load_occupancy_map(os.path.join(folder, 'map.yaml'))
+
+        start = time.perf_counter()
+        clearance_map = ClearanceMap(occupancy_map, args.radius, args.margin)
+        clearance_time = time.perf_counter() - start
+
+        extent = args.size * occupancy_map.resolution
+        waypoints = {f'room {i}': {'x': occupancy_map.origin[0] + rng.uniform(0, extent),
+                                   'y': occupancy_map.origin[1] + rng.uniform(0, extent), 'z': 0.0}
+                     for i in range(args.rooms)}
+
+        travel_costs = TravelCostMatrix(clearance_map, waypoints, args.max_nodes)
+        finite = travel_costs.costs[travel_costs.costs > 0]
+        finite = finite[finite != float('inf')]
+
+        position = next(iter(waypoints.values()))
+        lookups = [(position['x'], position['y'], name) for name in travel_costs.names] * 20
+        reach_time, _ = _timeit(lambda item: travel_costs.reachable_from(*item), lookups, args.repeat)
+        eta_time, _ = _timeit(lambda item: travel_costs.estimate_from(*item), lookups, args.repeat)
+
+        print(f"地图尺寸: {args.size}x{args.size}  房间数: {args.rooms}  "
+              f"代价栅格: {travel_costs.cell_size:.2f} m (降采样 {travel_costs.factor}x, {travel_costs.passable.size:,} 格)")
+        print(f"距离变换:     {clearance_time * 1000:9.1f} ms")
+        print(f"代价矩阵:     {travel_costs.elapsed * 1000:9.1f} ms  "
+              f"(连通区域 {travel_costs.component_count}, 可达房间对 {finite.size // 2})")
+        print(f"不可达判断:   {reach_time / len(lookups) * 1e6:9.2f} µs/次")
+        print(f"到达时间估计: {eta_time / len(lookups) * 1e6:9.2f} µs/次")
+    finally:
+        shutil.rmtree(base, ignore_errors=True)
+
+
+# ============================================
+# rooms: 房间分割（加载地图时一次计算，之后按位置O(1)查房间）
+# ============================================
+
+def write_floorplan_pgm(path, size, room, rng):
+    """
+    平面图：room x room 像素的房间排成网格，墙厚3像素，每面墙上随机位置开一个16像素（0.8m）的门
+
+    Returns:
+        每个房间的 (row0, row1, col0, col1) 内部范围（图像行序）
+    """
+    import numpy as np
+    image = np.full((size, size), 254, dtype=np.uint8)
+    count = size // room
+    for i in range(count + 1):
+        image[i * room:i * room + 3, :] = 0
+        image[:, i * room:i * room + 3] = 0
+    image[count * room:, :] = image[:, count * room:] = 205
+    for i in range(count):
+        for j in range(count):
+            if j + 1 < count:
+                door = i * room + rng.randrange(10, room - 26)
+                image[door:door + 16, (j + 1) * room:(j + 1) * room + 3] = 254
+            if i + 1 < count:
+                door = j * room + rng.randrange(10, room - 26)
+                image[(i + 1) * room:(i + 1) * room + 3, door:door + 16] = 254
+    with open(path, 'wb') as f:
+        f.write(f'P5\n{size} {size}\n255\n'.encode())
+        f.write(image.tobytes())
+    return [(i * room + 3, (i + 1) * room, j * room + 3, (j + 1) * room)
+            for i in range(count) for j in range(count)]
+
+
+def bench_rooms(args):
+    from nav_pkg.map_loader import OccupancyMapCache
+    from nav_pkg.room_segmentation import RoomSegmentation
+
+    rng = random.Random(args.seed)
+    base = tempfile.mkdtemp(prefix='nav_rooms_bench_')
+    try:
+        print(f"房间边长 {args.room * 0.05:.1f} m，每次查询随机取房间内的点")
+        print(f"{'地图':>11} │ {'房间数':>6} │ {'分割':>9} │ {'缓存命中':>9} │ {'标签内存':>8} │ {'正确率':>6} │ {'查询':>9}")
+        for size in args.sizes:
+            folder = os.path.join(base, f'map_{size}')
+            write_synthetic_map(folder, rng, rooms=0, width=1, height=1)
+            interiors = write_floorplan_pgm(os.path.join(folder, 'map.pgm'), size, args.room, rng)
+            yaml_file = os.path.join(folder, 'map.yaml')
+
+            # 航点放在房间内随机位置（OccupancyGrid行序：行 = size - 1 - 图像行）
+            waypoints = {}
+            for k, (row0, row1, col0, col1) in enumerate(interiors):
+                row, col = rng.randrange(row0 + 10, row1 - 10), rng.randrange(col0 + 10, col1 - 10)
+                waypoints[f'room {k}'] = {'x': -10.0 + (col + 0.5) * 0.05,
+                                          'y': -10.0 + (size - 1 - row + 0.5) * 0.05, 'z': 0.0}
+
+            cache = OccupancyMapCache()
+            cache.get(yaml_file)
+            build = lambda occupancy_map: RoomSegmentation(occupancy_map, waypoints)
+            start = time.perf_counter()
+            segmentation = cache.derived(yaml_file, 'rooms', build)
+            segment_time = time.perf_counter() - start
+            start = time.perf_counter()
+            cache.derived(yaml_file, 'rooms', build)
+            hit_time = time.perf_counter() - start
+
+            queries = []
+            for _ in range(args.queries):
+                k = rng.randrange(len(interiors))
+                row0, row1, col0, col1 = interiors[k]
+                row, col = rng.randrange(row0, row1), rng.randrange(col0, col1)
+                queries.append((-10.0 + (col + 0.5) * 0.05, -10.0 + (size - 1 - row + 0.5) * 0.05, f'room {k}'))
+            correct = sum(1 for x, y, name in queries if segmentation.room_at(x, y) == name)
+            lookup_time, _ = _timeit(lambda item: segmentation.room_at(item[0], item[1]), queries, args.repeat)
+
+            print(f"{size:5d}x{size:<5d} │ {len(waypoints):6d} │ {segment_time * 1000:6.0f} ms │ "
+                  f"{hit_time * 1e6:6.0f} µs │ {segmentation.nbytes / 1048576.0:5.1f} MB │ "
+                  f"{correct / len(queries):6.1%} │ {lookup_time / len(queries) * 1e6:6.2f} µs")
+    finally:
+        shutil.rmtree(base, ignore_errors=True)
+
+
+# ============================================
+# robots: 多机器人（每个机器人一个管理器进程 vs 一个进程共用地图缓存）
+# ============================================
+
+# 子进程中的N个机器人线程：各自加载同一地图（航点索引、距离变换、代价矩阵、房间分割），
+# 然后处理自己的房间指令流（查找、吸附、可达性、预计距离、所在房间）
+_ROBOTS_CODE = '''
+import random, threading, time
+from nav_pkg.map_clearance import ClearanceMap
+from nav_pkg.map_resources import MapResources
+from nav_pkg.room_segmentation import RoomSegmentation
+from nav_pkg.travel_costs import TravelCostMatrix
+base, robots, commands, seed = {args!r}
+start = time.perf_counter()
+resources = MapResources(base)
+resources.scan()
+latencies = []
+
+def robot(i):
+    rng = random.Random(seed + i)
+    map_info = resources.available_maps[0]
+    yaml_file, waypoints = map_info['yaml_file'], map_info['rooms']
+    room_index = resources.room_index(map_info)
+    clearance_map = resources.map_cache.derived(
+        yaml_file, 'clearance', lambda occupancy_map: ClearanceMap(occupancy_map, 0.25, 0.1))
+    travel_costs = resources.map_cache.derived(
+        yaml_file, 'travel_costs', lambda occupancy_map: TravelCostMatrix(clearance_map, waypoints))
+    rooms = resources.map_cache.derived(
+        yaml_file, 'rooms', lambda occupancy_map: RoomSegmentation(occupancy_map, waypoints))
+    names = sorted(waypoints)
+    samples = []
+    for _ in range(commands):
+        position = waypoints[rng.choice(names)]
+        command_start = time.perf_counter()
+        found = room_index.lookup(rng.choice(names))
+        if rooms.room_at(position['x'], position['y']) != found.name:
+            clearance_map.snap(found.coords['x'], found.coords['y'])
+            travel_costs.reachable_from(position['x'], position['y'], found.name)
+            travel_costs.estimate_from(position['x'], position['y'], found.name)
+        samples.append(time.perf_counter() - command_start)
+    latencies.extend(samples)
+
+threads = [threading.Thread(target=robot, args=(i,)) for i in range(robots)]
+for thread in threads:
+    thread.start()
+for thread in threads:
+    thread.join()
+latencies.sort()
+print(time.perf_counter() - start, latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99)])
+''' + _REPORT_HWM
+
+
+def _run_robots(base, robots, commands, seed):
+    """
+    运行一个管理器进程
+
+    Returns:
+        (墙钟秒, CPU秒, 峰值RSS kB, 指令延迟中位数, p99)
+    """
+    import resource
+    before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    process = _start_process(_ROBOTS_CODE.format(args=(base, robots, commands, seed)))
+    output = process.communicate()[0].split()
+    after = resource.getrusage(resource.RUSAGE_CHILDREN)
+    cpu = (after.ru_utime - before.ru_utime) + (after.ru_stime - before.ru_stime)
+    return float(output[0]), cpu, int(output[3]), float(output[1]), float(output[2])
+
+
+def bench_robots(args):
+    rng = random.Random(args.seed)
+    base = tempfile.mkdtemp(prefix='nav_robots_bench_')
+    try:
+        folder = os.path.join(base, 'map_floor')
+        write_synthetic_map(folder, rng, rooms=0, width=1, height=1)
+        interiors = write_floorplan_pgm(os.path.join(folder, 'map.pgm'), args.size, 100, rng)
+        # 部分房间有航点（OccupancyGrid行序：行 = size - 1 - 图像行）
+        rooms = []
+        for k, (row0, row1, col0, col1) in enumerate(rng.sample(interiors, min(args.waypoints, len(interiors)))):
+            row, col = rng.randrange(row0 + 10, row1 - 10), rng.randrange(col0 + 10, col1 - 10)
+            rooms.append((f'room {k}', -10.0 + (col + 0.5) * 0.05, -10.0 + (args.size - 1 - row + 0.5) * 0.05))
+        write_waypoints_xml(os.path.join(folder, 'waypoints.xml'), rooms)
+        MapCatalog(base).scan()  # 预先写好地图目录文件，各进程启动时一样直接复用
+
+        # 每个机器人一个进程：依次运行（CPU时间和峰值内存与是否并发无关），前N个之和即N个机器人的开销
+        solo = [_run_robots(base, 1, args.commands, args.seed + i) for i in range(max(args.robots))]
+
+        print(f"地图: {args.size}x{args.size}  航点: {len(rooms)}  每个机器人 {args.commands} 条指令")
+        print(f"{'机器人':>6} │ {'独立进程 CPU':>12} │ {'独立进程 RSS合计':>14} │ {'共用进程 CPU':>12} │ "
+              f"{'共用进程 RSS':>12} │ {'指令延迟 中位/p99':>18}")
+        for robots in args.robots:
+            _, shared_cpu, shared_kb, median, p99 = _run_robots(base, robots, args.commands, args.seed)
+            solo_cpu = sum(run[1] for run in solo[:robots])
+            solo_kb = sum(run[2] for run in solo[:robots])
+            print(f"{robots:6d} │ {solo_cpu:10.1f} s │ {solo_kb / 1024:12.0f} MB │ {shared_cpu:10.1f} s │ "
+                  f"{shared_kb / 1024:10.0f} MB │ {median * 1e6:7.0f} / {p99 * 1e6:6.0f} µs")
+    finally:
+        shutil.rmtree(base, ignore_errors=True)
+
+
+# ============================================
+# route: 多目标路线（说话顺序 vs 求解的最短路线）
+# ============================================
+
+def bench_route(args):
+    import math
+    from nav_pkg.route_planning import solve_route, EXACT_ROUTE_LIMIT
+
+    rng = random.Random(args.seed)
+    print(f"{'站数':>4} │ {'算法':>10} │ {'求解耗时':>10} │ {'说话顺序':>8} │ {'优化后':>8}")
+    for count in range(2, args.stops + 1):
+        spoken_total = solved_total = elapsed = 0.0
+        for _ in range(args.trials):
+            points = [(rng.uniform(0, 30), rng.uniform(0, 30)) for _ in range(count)]
+            costs = [[math.dist(a, b) for b in points] for a in points]
+            start = [math.dist((0.0, 0.0), point) for point in points]
+
+            begin = time.perf_counter()
+            order = solve_route(costs, start)
+            elapsed += time.perf_counter() - begin
+
+            spoken_total += start[0] + sum(costs[i][i + 1] for i in range(count - 1))
+            solved_total += start[order[0]] + sum(costs[a][b] for a, b in zip(order, order[1:]))
+        method = 'Held-Karp' if count <= EXACT_ROUTE_LIMIT else 'NN + 2-opt'
+        print(f"{count:4d} │ {method:>10} │ {elapsed / args.trials * 1000:8.2f}ms │ "
+              f"{spoken_total / args.trials:7.1f}m │ {solved_total / args.trials:7.1f}m")
+
+
+# ============================================
+# 停止指令快速通道
+# ============================================
+
+_STOP_PHRASES = ['停', '停下', '停下来', '快停下来', '停停停', '停止', '别动', '站住', '取消', '取消导航',
+                 '不去了', '不要去了', '算了吧', '马上停止', '机器人停下', 'stop', 'Stop!', 'please stop now']
+_NOT_STOP = ['去停车场', '停车场', '带我去停机坪', '取消室', '别去厨房了先去客厅', '取消去客厅改去卧室']
+
+
+def bench_stop(args):
+    """按桥接节点的处理顺序回放识别结果，测量 识别结果 -> move_base/cancel 和零速度送达订阅者 的延迟"""
+    import threading
+    from nav_pkg.local_topics import LocalTopic
+
+    rng = random.Random(args.seed)
+    matcher = StopCommandMatcher()
+    utterance_filter = UtteranceFilter(2.0)
+    commands = [rng.choice(_FILLERS) + rng.choice(['客厅', '卧室', '厨房', '会议室一', '打印机房'])
+                for _ in range(200)] + _NOT_STOP
+
+    stamps = []
+    forwarded = []
+    # 进程内话题代替 move_base/cancel 和 cmd_vel：计时包含发布和订阅者线程收到消息
+    cancel_topic, cmd_vel_topic = LocalTopic('/move_base/cancel'), LocalTopic('/cmd_vel')
+    stopped = threading.Event()
+
+    def on_cmd_vel(msg):
+        stamps.append(time.perf_counter())
+        stopped.set()
+
+    cancel_topic.subscribe(lambda msg: None, queue_size=1)
+    cmd_vel_topic.subscribe(on_cmd_vel, queue_size=1)
+
+    def on_result(text):
+        # 与 XfyunSpeechRecognizer._on_recognition_result / _stop 相同的顺序
+        if matcher.match(text):
+            cancel_topic.publish('cancel')
+            cmd_vel_topic.publish((0.0, 0.0))
+            return True
+        if utterance_filter.accept(text):
+            forwarded.append(text)
+        return False
+
+    latencies = []
+    false_positive = false_negative = 0
+    for i in range(args.utterances):
+        is_stop = rng.random() < args.stop_rate
+        text = rng.choice(_STOP_PHRASES if is_stop else commands) + ('。' if i % 3 == 0 else '')
+        stamps.clear()
+        stopped.clear()
+        begin = time.perf_counter()
+        if on_result(text):
+            stopped.wait(1.0)
+        if stamps:
+            latencies.append(stamps[0] - begin)
+        false_positive += bool(stamps) and not is_stop
+        false_negative += is_stop and not stamps
+
+    cancel_topic.close()
+    cmd_vel_topic.close()
+    latencies.sort()
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1e6
+
+    print(f"回放: {args.utterances} 条识别结果, 其中停止指令 {len(latencies)} 条")
+    print(f"识别结果 -> 取消+零速度送达: p50 {percentile(0.5):.1f}µs  p99 {percentile(0.99):.1f}µs  "
+          f"最大 {latencies[-1] * 1e6:.1f}µs")
+    print(f"误停: {false_positive}  漏停: {false_negative}  转发房间指令: {len(forwarded)}")
+
+
+# ============================================
+# 链路延迟追踪
+# ============================================
+
+def bench_trace(args):
+    """在同一进程中按 桥接 -> 提取 -> 管理器 的顺序回放，统计各阶段耗时及追踪本身的开销"""
+    from nav_pkg import latency_trace
+    from nav_pkg.room_lookup import RoomIndex
+
+    rng = random.Random(args.seed)
+    names = _synthetic_waypoint_names(200, rng)
+    waypoints = {name: {'x': 0.0, 'y': 0.0, 'z': 0.0} for name in names}
+    matcher = RoomMatcher({name: [name] for name in names})
+    index = RoomIndex(waypoints)
+    utterances = [rng.choice(_FILLERS) + rng.choice(names) for _ in range(args.utterances)]
+
+    def replay(tracing, stats=None, sink=None):
+        for text in utterances:
+            # 语音桥接
+            trace = latency_trace.start_trace() if tracing else None
+            latency_trace.stamp(trace, 'bridged')
+            data = latency_trace.encode(text, trace)
+            # 房间提取
+            text, trace = latency_trace.decode(data)
+            matches = matcher.find_all(text.lower().strip())
+            room = max(matches, key=lambda match: match.end - match.start).room_id
+            latency_trace.stamp(trace, 'extracted')
+            data = latency_trace.encode(room, trace)
+            # 导航管理器
+            room, trace = latency_trace.decode(data)
+            found = index.lookup(room)
+            latency_trace.stamp(trace, 'resolved')
+            latency_trace.stamp(trace, 'goal_sent')
+            if stats is not None:
+                stats.record(trace)
+            if sink is not None:
+                sink.write(trace, 'goal_sent', found.name)
+
+    plain, _ = _timeit(lambda _: replay(False), [None], args.repeat)
+    traced, _ = _timeit(lambda _: replay(True), [None], args.repeat)
+    stats = latency_trace.LatencyStats(args.window)
+    recorded, _ = _timeit(lambda _: replay(True, stats), [None], 1)
+
+    per = 1e6 / len(utterances)
+    print(f"回放: {len(utterances)} 条语句, 航点 {len(names)} 个")
+    print(f"不追踪:             {plain * per:7.1f}µs/条")
+    print(f"追踪 (信封+时间戳): {traced * per:7.1f}µs/条 (+{(traced - plain) * per:.1f}µs)")
+    print(f"追踪 + 滚动统计:    {recorded * per:7.1f}µs/条")
+
+    tmp = tempfile.mkdtemp(prefix='trace_bench_')
+    try:
+        for suffix in ('jsonl', 'csv'):
+            sink = latency_trace.TraceSink(os.path.join(tmp, f'trace.{suffix}'))
+            written, _ = _timeit(lambda _: replay(True, sink=sink), [None], 1)
+            sink.close()
+            with open(sink.path, encoding='utf-8') as f:
+                lines = sum(1 for _ in f)
+            print(f"追踪 + {suffix:5s} 文件:    {written * per:7.1f}µs/条 ({lines} 行)")
+    finally:
+        shutil.rmtree(tmp)
+
+    start = time.perf_counter()
+    summary = stats.diagnostic_values()
+    print(f"诊断汇总 (窗口 {args.window}): {(time.perf_counter() - start) * 1000:.2f}ms")
+    for key, value in summary:
+        if not key.endswith('count'):
+            print(f"  {key:28s} {value}")
+
+
+# ============================================
+# 提取引擎（导入耗时、构建耗时、单句延迟）
+# ============================================
+
+def bench_engine(args):
+    """不启动ROS，直接导入并剖析 nav_pkg.room_extraction"""
+    import subprocess
+
+    # 在新进程中测量导入耗时（本进程已导入过）
+    code = ('import sys, time; sys.path.insert(0, sys.argv[1]); start = time.perf_counter(); '
+            'import nav_pkg.room_extraction; print(time.perf_counter() - start)')
+    imports = [float(subprocess.run([sys.executable, '-c', code, _SRC_DIR], capture_output=True,
+                                    text=True, check=True).stdout) for _ in range(args.repeat)]
+
+    from nav_pkg.room_extraction import RoomExtractor, ROOM_MAPPINGS
+
+    rng = random.Random(args.seed)
+    names = _synthetic_waypoint_names(args.waypoints, rng)
+    start = time.perf_counter()
+    extractor = RoomExtractor()
+    build = time.perf_counter() - start
+    start = time.perf_counter()
+    extractor.update_waypoints(names)
+    vocabulary = time.perf_counter() - start
+
+    aliases = [alias for aliases in ROOM_MAPPINGS.values() for alias in aliases] + names
+    utterances = []
+    for _ in range(args.utterances):
+        kind = rng.random()
+        if kind < 0.7:
+            utterances.append(rng.choice(_FILLERS) + rng.choice(aliases))
+        elif kind < 0.85:
+            utterances.append(rng.choice(_FILLERS) + rng.choice(aliases) + '然后去' + rng.choice(aliases))
+        else:
+            utterances.append(rng.choice(_FILLERS) + ''.join(rng.choice(_CJK_CHARS) for _ in range(4)))
+
+    samples = []
+    for text in utterances:
+        begin = time.perf_counter()
+        stops, _ = extractor.extract_rooms(text)
+        if len(stops) < 2:
+            extractor.extract(text)
+        samples.append(time.perf_counter() - begin)
+    samples.sort()
+
+    print(f"导入 nav_pkg.room_extraction: {min(imports) * 1000:.1f}ms (最佳 / {args.repeat} 次)")
+    print(f"构建内置别名引擎: {build * 1000:.1f}ms   加载 {len(names)} 个航点: {vocabulary * 1000:.1f}ms")
+    print(f"单句提取 ({len(utterances)} 句, 含模糊匹配): "
+          f"p50 {samples[len(samples) // 2] * 1e6:.1f}µs  p99 {samples[int(len(samples) * 0.99)] * 1e6:.1f}µs")
+
+
+# ============================================
+# 融合模式：三进程 + TCP回环 vs 单进程 + 进程内队列
+# ============================================
+
+# 各节点导入并构建的核心对象（不含rospy本身）
+_NODE_STARTUP = {
+    'speech_recognition_node': (
+        'from nav_pkg import latency_trace\n'
+        'from nav_pkg.speech_filters import StopCommandMatcher, UtteranceFilter\n'
+        'StopCommandMatcher(); UtteranceFilter(2.0)\n'),
+    'semantic_room_extractor': (
+        'from nav_pkg import latency_trace\n'
+        'from nav_pkg.room_extraction import RoomExtractor\n'
+        'from nav_pkg.streaming_extraction import StreamingRoomTracker\n'
+        'RoomExtractor()\n'),
+    'voice_nav_manager': (
+        'from nav_pkg import goal_tracker, latency_trace\n'
+        'from nav_pkg.map_catalog import MapCatalog\n'
+        'from nav_pkg.map_clearance import ClearanceMap\n'
+        'from nav_pkg.map_loader import OccupancyMapCache\n'
+        'from nav_pkg.map_watcher import MapWatcher\n'
+        'from nav_pkg.room_lookup import RoomIndex\n'
+        'from nav_pkg.route_planning import solve_route\n'
+        'from nav_pkg.travel_costs import TravelCostMatrix\n'
+        'OccupancyMapCache(); goal_tracker.GoalTracker(lambda goal, token: None, lambda: None)\n'),
+}
+
+_REPORT_RSS = ('import resource\n'
+               'print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)\n')
+
+
+def _start_process(code):
+    import subprocess
+    return subprocess.Popen([sys.executable, '-c', f'import sys; sys.path.insert(0, {_SRC_DIR!r})\n' + code],
+                            stdout=subprocess.PIPE, text=True)
+
+
+def _serialize_string(text):
+    """std_msgs/String的TCPROS格式：总长度 + 字符串长度 + UTF-8"""
+    import struct
+    data = text.encode('utf-8')
+    return struct.pack('<II', len(data) + 4, len(data)) + data
+
+
+def _read_string(sock):
+    import struct
+    header = _recv_exact(sock, 4)
+    body = _recv_exact(sock, struct.unpack('<I', header)[0])
+    return body[4:].decode('utf-8')
+
+
+def _recv_exact(sock, size):
+    buffer = b''
+    while len(buffer) < size:
+        chunk = sock.recv(size - len(buffer))
+        if not chunk:
+            raise EOFError
+        buffer += chunk
+    return buffer
+
+
+def _relay_node(listen, forward):
+    """模拟房间提取节点：收到一条就反序列化、再序列化转发"""
+    import socket
+    conn, _ = listen.accept()
+    conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    out = socket.create_connection(forward)
+    out.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    try:
+        while True:
+            out.sendall(_serialize_string(_read_string(conn)))
+    except EOFError:
+        out.close()
+
+
+def _sink_node(listen, results):
+    """模拟导航管理器：记录 发送时刻 -> 收到时刻（单调时钟，跨进程一致）"""
+    import socket
+    conn, _ = listen.accept()
+    conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    latencies = []
+    try:
+        while True:
+            text = _read_string(conn)
+            latencies.append(time.monotonic() - float(text.split('|', 1)[0]))
+    except EOFError:
+        results.send(latencies)
+
+
+def bench_fused(args):
+    import multiprocessing
+    import socket
+    import threading
+    from nav_pkg.local_topics import LocalTopic
+
+    # 1. 启动耗时和内存（并行启动三个进程 vs 一个进程，均不含rospy）
+    start = time.perf_counter()
+    processes = [_start_process(code + _REPORT_RSS) for code in _NODE_STARTUP.values()]
+    separate_rss = sum(int(process.communicate()[0]) for process in processes)
+    separate_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    process = _start_process(''.join(_NODE_STARTUP.values()) + _REPORT_RSS)
+    fused_rss = int(process.communicate()[0])
+    fused_time = time.perf_counter() - start
+
+    # 2. 每条指令两跳的传递延迟
+    payload = ''.join(random.Random(args.seed).choice(_CJK_CHARS) for _ in range(12))
+
+    def listener():
+        sock = socket.socket()
+        sock.bind(('127.0.0.1', 0))
+        sock.listen(1)
+        return sock
+
+    relay_listen, sink_listen = listener(), listener()
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    context = multiprocessing.get_context('fork')
+    nodes = [context.Process(target=_relay_node, args=(relay_listen, sink_listen.getsockname())),
+             context.Process(target=_sink_node, args=(sink_listen, sender))]
+    for node in nodes:
+        node.start()
+    bridge = socket.create_connection(relay_listen.getsockname())
+    bridge.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    for _ in range(args.commands):
+        bridge.sendall(_serialize_string(f'{time.monotonic()!r}|{payload}'))
+        time.sleep(args.interval)
+    bridge.close()
+    tcp_latencies = sorted(receiver.recv())
+    for node in nodes:
+        node.join()
+
+    text_topic, room_topic = LocalTopic('/speech_recognition/text'), LocalTopic('/semantic_extraction/room')
+    local_latencies = []
+    done = threading.Event()
+    text_topic.subscribe(room_topic.publish)
+
+    def on_room(msg):
+        local_latencies.append(time.monotonic() - msg[0])
+        if len(local_latencies) == args.commands:
+            done.set()
+
+    room_topic.subscribe(on_room)
+    for _ in range(args.commands):
+        text_topic.publish((time.monotonic(), payload))
+        time.sleep(args.interval)
+    done.wait(10.0)
+    text_topic.close()
+    room_topic.close()
+    local_latencies.sort()
+
+    def percentiles(samples):
+        return (f"p50 {samples[len(samples) // 2] * 1e6:7.1f}µs  "
+                f"p99 {samples[int(len(samples) * 0.99)] * 1e6:7.1f}µs")
+
+    print(f"{'':18s} │ {'启动耗时':>8} │ {'内存峰值合计':>8}")
+    print(f"{'三个进程':14s} │ {separate_time * 1000:8.0f}ms │ {separate_rss / 1024.0:9.1f}MB")
+    print(f"{'融合单进程':13s} │ {fused_time * 1000:8.0f}ms │ {fused_rss / 1024.0:9.1f}MB")
+    print(f"指令传递 (桥接 -> 提取 -> 管理器, {args.commands} 条):")
+    print(f"  TCP回环 + 序列化: {percentiles(tcp_latencies)}")
+    print(f"  进程内队列:       {percentiles(local_latencies)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='语音导航性能基准测试')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--repeat', type=int, default=3)
+    subparsers = parser.add_subparsers(dest='command')
+
+    extract_parser = subparsers.add_parser('extract', help='房间别名匹配吞吐量')
+    extract_parser.add_argument('--aliases', type=int, default=10000)
+    extract_parser.add_argument('--utterances', type=int, default=2000)
+    extract_parser.set_defaults(func=bench_extract)
+
+    vocab_parser = subparsers.add_parser('vocab', help='航点词表增量更新耗时')
+    vocab_parser.add_argument('--waypoints', type=int, default=5000)
+    vocab_parser.add_argument('--change', type=float, default=0.1)
+    vocab_parser.add_argument('--utterances', type=int, default=2000)
+    vocab_parser.set_defaults(func=bench_vocab)
+
+    fuzzy_parser = subparsers.add_parser('fuzzy', help='模糊匹配查询延迟')
+    fuzzy_parser.add_argument('--waypoints', type=int, default=2000)
+    fuzzy_parser.add_argument('--utterances', type=int, default=500)
+    fuzzy_parser.set_defaults(func=bench_fuzzy)
+
+    bridge_parser = subparsers.add_parser('bridge', help='语音桥接长时间运行的转发量与CPU')
+    bridge_parser.add_argument('--hours', type=float, default=8)
+    bridge_parser.add_argument('--epochs-per-hour', type=int, default=1)
+    bridge_parser.add_argument('--interval', type=float, default=0.5)
+    bridge_parser.add_argument('--window', type=float, default=2.0)
+    bridge_parser.add_argument('--duplicate-rate', type=float, default=0.3)
+    bridge_parser.set_defaults(func=bench_bridge)
+
+    catalog_parser = subparsers.add_parser('catalog', help='启动时地图扫描耗时')
+    catalog_parser.add_argument('--maps', type=int, default=1000)
+    catalog_parser.add_argument('--rooms', type=int, default=20)
+    catalog_parser.add_argument('--changed', type=int, default=10)
+    catalog_parser.set_defaults(func=bench_catalog)
+
+    maplist_parser = subparsers.add_parser('maplist', help='switch_map.py --list 耗时')
+    maplist_parser.add_argument('--maps', type=int, default=500)
+    maplist_parser.add_argument('--rooms', type=int, default=20)
+    maplist_parser.set_defaults(func=bench_maplist)
+
+    mapstore_parser = subparsers.add_parser('mapstore', help='地图历史增量存储的磁盘占用和读取耗时')
+    mapstore_parser.add_argument('--versions', type=int, default=30)
+    mapstore_parser.add_argument('--size', type=int, default=2000)
+    mapstore_parser.add_argument('--change', type=float, default=0.02, help='每版新探索的栅格比例')
+    mapstore_parser.add_argument('--max-change', type=float, default=0.2)
+    mapstore_parser.set_defaults(func=bench_mapstore)
+
+    tiles_parser = subparsers.add_parser('tiles', help='大地图切换的峰值内存（整张解码 vs 分块）')
+    tiles_parser.add_argument('--size', type=int, default=6000)
+    tiles_parser.add_argument('--tile-size', type=int, default=256)
+    tiles_parser.add_argument('--waypoints', type=int, default=50)
+    tiles_parser.set_defaults(func=bench_tiles)
+
+    waypoints_parser = subparsers.add_parser('waypoints', help='航点文件解析耗时与内存')
+    waypoints_parser.add_argument('--sizes', type=int, nargs='+', default=[500, 5000, 50000])
+    waypoints_parser.add_argument('--repeat', type=int, default=3)
+    waypoints_parser.add_argument('--resident', type=int, default=0, help='常驻对象数（模拟运行中的节点进程）')
+    waypoints_parser.set_defaults(func=bench_waypoints)
+
+    switch_parser = subparsers.add_parser('switch', help='地图切换延迟')
+    switch_parser.add_argument('--size', type=int, default=4000)
+    switch_parser.add_argument('--switches', type=int, default=10)
+    switch_parser.set_defaults(func=bench_switch)
+
+    mapcache_parser = subparsers.add_parser('mapcache', help='多地图往返切换的解码缓存')
+    mapcache_parser.add_argument('--maps', type=int, default=4)
+    mapcache_parser.add_argument('--size', type=int, default=2000)
+    mapcache_parser.add_argument('--switches', type=int, default=50)
+    mapcache_parser.add_argument('--budget', type=float, default=2, help='缓存上限（以地图张数计）')
+    mapcache_parser.set_defaults(func=bench_mapcache)
+
+    lookup_parser = subparsers.add_parser('lookup', help='房间ID到航点的查找')
+    lookup_parser.add_argument('--waypoints', type=int, default=5000)
+    lookup_parser.add_argument('--queries', type=int, default=2000)
+    lookup_parser.set_defaults(func=bench_lookup)
+
+    snap_parser = subparsers.add_parser('snap', help='导航目标吸附')
+    snap_parser.add_argument('--size', type=int, default=2000)
+    snap_parser.add_argument('--goals', type=int, default=1000)
+    snap_parser.add_argument('--radius', type=float, default=0.25)
+    snap_parser.add_argument('--margin', type=float, default=0.1)
+    snap_parser.set_defaults(func=bench_snap)
+
+    costs_parser = subparsers.add_parser('costs', help='房间间行走代价矩阵预计算')
+    costs_parser.add_argument('--size', type=int, default=4000)
+    costs_parser.add_argument('--rooms', type=int, default=50)
+    costs_parser.add_argument('--radius', type=float, default=0.25)
+    costs_parser.add_argument('--margin', type=float, default=0.1)
+    costs_parser.add_argument('--max-nodes', type=int, default=250000)
+    costs_parser.set_defaults(func=bench_costs)
+
+    rooms_parser = subparsers.add_parser('rooms', help='房间分割与按位置查房间')
+    rooms_parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 2000, 4000])
+    rooms_parser.add_argument('--room', type=int, default=100, help='房间边长（像素，0.05m/像素）')
+    rooms_parser.add_argument('--queries', type=int, default=10000)
+    rooms_parser.set_defaults(func=bench_rooms)
+
+    robots_parser = subparsers.add_parser('robots', help='多机器人：独立管理器进程 vs 共用地图缓存的单进程')
+    robots_parser.add_argument('--robots', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32])
+    robots_parser.add_argument('--size', type=int, default=1000)
+    robots_parser.add_argument('--waypoints', type=int, default=20)
+    robots_parser.add_argument('--commands', type=int, default=200)
+    robots_parser.set_defaults(func=bench_robots)
+
+    route_parser = subparsers.add_parser('route', help='多目标路线求解')
+    route_parser.add_argument('--stops', type=int, default=12)
+    route_parser.add_argument('--trials', type=int, default=20)
+    route_parser.set_defaults(func=bench_route)
+
+    stop_parser = subparsers.add_parser('stop', help='停止指令快速通道延迟')
+    stop_parser.add_argument('--utterances', type=int, default=20000)
+    stop_parser.add_argument('--stop-rate', type=float, default=0.2)
+    stop_parser.set_defaults(func=bench_stop)
+
+    trace_parser = subparsers.add_parser('trace', help='链路延迟追踪的开销')
+    trace_parser.add_argument('--utterances', type=int, default=5000)
+    trace_parser.add_argument('--window', type=int, default=1000)
+    trace_parser.set_defaults(func=bench_trace)
+
+    engine_parser = subparsers.add_parser('engine', help='提取引擎的导入/构建/单句延迟')
+    engine_parser.add_argument('--waypoints', type=int, default=500)
+    engine_parser.add_argument('--utterances', type=int, default=5000)
+    engine_parser.set_defaults(func=bench_engine)
+
+    fused_parser = subparsers.add_parser('fused', help='融合单进程模式的启动/内存/传递延迟')
+    fused_parser.add_argument('--commands', type=int, default=500)
+    fused_parser.add_argument('--interval', type=float, default=0.002)
+    fused_parser.set_defaults(func=bench_fused)
+
+    args = parser.parse_args()
+    if not getattr(args, 'func', None):
+        parser.print_help()
+        return 1
+    args.func(args)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+move_base模拟节点 - 用于在没有机器人/仿真的情况下测试语音导航
+提供move_base动作服务器：按固定速度沿直线“移动”到目标，发布反馈和amcl_pose（在节点命名空间下），
+可配置失败概率和不可到达区域，支持抢占和取消
+"""
+
+import math
+import random
+
+import rospy
+import actionlib
+from geometry_msgs.msg import PoseWithCovarianceStamped
+from move_base_msgs.msg import MoveBaseAction, MoveBaseFeedback, MoveBaseResult
+
+
+class MockMoveBase:
+    """move_base动作服务器的替身"""
+
+    def __init__(self):
+        """初始化模拟move_base（需先调用rospy.init_node）"""
+        self.speed = rospy.get_param('~speed', 0.5)                       # 米/秒
+        self.rate_hz = rospy.get_param('~rate', 10.0)
+        self.abort_probability = rospy.get_param('~abort_probability', 0.0)
+        # 目标距离超过该值时直接失败（模拟规划失败），<=0 不限
+        self.max_goal_distance = rospy.get_param('~max_goal_distance', 0.0)
+        self.x = rospy.get_param('~initial_x', 0.0)
+        self.y = rospy.get_param('~initial_y', 0.0)
+
+        self.pose_pub = rospy.Publisher('amcl_pose', PoseWithCovarianceStamped, queue_size=1, latch=True)
+        self.server = actionlib.SimpleActionServer('move_base', MoveBaseAction, self.execute, auto_start=False)
+        self.server.start()
+        self._publish_pose()
+
+        rospy.loginfo("✓ 模拟move_base已启动")
+        rospy.loginfo(f"  速度: {self.speed} m/s  失败概率: {self.abort_probability}")
+
+    def _publish_pose(self):
+        """发布当前位置（代替AMCL）"""
+        msg = PoseWithCovarianceStamped()
+        msg.header.frame_id = 'map'
+        msg.header.stamp = rospy.Time.now()
+        msg.pose.pose.position.x = self.x
+        msg.pose.pose.position.y = self.y
+        msg.pose.pose.orientation.w = 1.0
+        self.pose_pub.publish(msg)
+
+    def execute(self, goal):
+        """
+        执行一个目标（在动作服务器线程中）
+
+        Args:
+            goal: MoveBaseGoal
+        """
+        target = goal.target_pose.pose.position
+        distance = math.hypot(target.x - self.x, target.y - self.y)
+        rospy.loginfo(f"🎯 收到目标 ({target.x:.2f}, {target.y:.2f})，距离 {distance:.2f}m")
+
+        if self.max_goal_distance > 0 and distance > self.max_goal_distance:
+            self.server.set_aborted(MoveBaseResult(), "no valid plan")
+            return
+        fail_at = random.random() * distance if random.random() < self.abort_probability else None
+
+        rate = rospy.Rate(self.rate_hz)
+        step = self.speed / self.rate_hz
+        travelled = 0.0
+        feedback = MoveBaseFeedback()
+        feedback.base_position.header.frame_id = 'map'
+
+        while not rospy.is_shutdown():
+            if self.server.is_preempt_requested():
+                rospy.loginfo("⏹️  目标被抢占/取消")
+                self.server.set_preempted()
+                return
+
+            remaining = math.hypot(target.x - self.x, target.y - self.y)
+            if remaining <= 1e-3:
+                break
+            if fail_at is not None and travelled >= fail_at:
+                self.server.set_aborted(MoveBaseResult(), "simulated failure")
+                return
+
+            move = min(step, remaining)
+            self.x += (target.x - self.x) / remaining * move
+            self.y += (target.y - self.y) / remaining * move
+            travelled += move
+
+            feedback.base_position.header.stamp = rospy.Time.now()
+            feedback.base_position.pose.position.x = self.x
+            feedback.base_position.pose.position.y = self.y
+            feedback.base_position.pose.orientation.w = 1.0
+            self.server.publish_feedback(feedback)
+            self._publish_pose()
+            rate.sleep()
+
+        rospy.loginfo(f"✓ 到达目标 ({self.x:.2f}, {self.y:.2f})")
+        self.server.set_succeeded(MoveBaseResult())
+
+
+def main():
+    try:
+        rospy.init_node('move_base', anonymous=False)
+        MockMoveBase()
+        rospy.spin()
+    except rospy.ROSInterruptException:
+        pass
+
+
+if __name__ == '__main__':
+    main()
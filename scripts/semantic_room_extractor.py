@@ -7,47 +7,80 @@
 
 import rospy
 from std_msgs.msg import String
-import re
+from diagnostic_msgs.msg import DiagnosticArray, DiagnosticStatus, KeyValue
+import json
+import time
+
+from nav_pkg import latency_trace
+from nav_pkg.fuzzy_matcher import lazy_pinyin
+from nav_pkg.room_extraction import RoomExtractor, ROOM_MAPPINGS
+from nav_pkg.streaming_extraction import StreamingRoomTracker
 
 
 class SemanticRoomExtractor:
-    """语义房间词提取器"""
+    """语义房间词提取器（提取逻辑见 nav_pkg.room_extraction）"""
     
-    # 房间类型映射（多种别称）
-    ROOM_MAPPINGS = {
-        'living_room': ['客厅', '起居室', '会客厅', 'living room', 'lounge', '大厅'],
-        'bedroom': ['卧室', '主卧', '次卧', '房间', 'bedroom', 'bed room', '睡眠室'],
-        'kitchen': ['厨房', '灶间', 'kitchen', '做饭的地方'],
-        'bathroom': ['卫生间', '厕所', '洗手间', '浴室', 'bathroom', '洗澡间'],
-        'dining_room': ['餐厅', '饭厅', '吃饭的地方', 'dining room', '餐饮区'],
-        'study': ['书房', '学习室', '办公室', 'study', '工作室', '书籍室'],
-        'balcony': ['阳台', '露台', 'balcony', '室外'],
-        'entrance': ['玄关', '入口', '门厅', 'entrance', '进门处', '大门']
-    }
+    ROOM_MAPPINGS = ROOM_MAPPINGS
     
-    def __init__(self):
-        """初始化语义房间词提取器"""
-        rospy.init_node('semantic_room_extractor', anonymous=True)
+    def __init__(self, topics=rospy):
+        """
+        初始化语义房间词提取器（需先调用rospy.init_node）
         
+        Args:
+            topics: 提供Publisher/Subscriber的对象，默认rospy；融合模式下传入进程内话题
+        
+        话题都是相对名称，在节点的命名空间下解析（多机器人时用 <group ns="robot1"> 启动）
+        """
         # 从全局参数获取配置
         self.room_confidence_threshold = rospy.get_param('/semantic_room_extraction/room_confidence_threshold', 0.5)
         self.display_language = rospy.get_param('/semantic_room_extraction/display_language', 'zh_CN')
         self.fuzzy_matching = rospy.get_param('/semantic_room_extraction/fuzzy_matching', True)
+        self.fuzzy_cache_size = rospy.get_param('/semantic_room_extraction/fuzzy_cache_size', 256)
+        self.streaming = rospy.get_param('/semantic_room_extraction/streaming', True)
+        self.partial_stability = rospy.get_param('/semantic_room_extraction/partial_stability', 2)
+        self.tentative_confidence_threshold = rospy.get_param(
+            '/semantic_room_extraction/tentative_confidence_threshold', 0.7)
+        self.multi_stop = rospy.get_param('/semantic_room_extraction/multi_stop', True)
+        # 链路延迟追踪：识别文本中的追踪信息随房间/路线继续传给导航管理器
+        self.tracing = rospy.get_param('/advanced/tracing', False)
+        self.latency_stats = latency_trace.LatencyStats(rospy.get_param('/advanced/trace_window', 1000))
+        
+        # 提取引擎：启动时一次性编译别名自动机，航点名称随地图加载增量更新
+        self.extractor = RoomExtractor(self.room_confidence_threshold, self.fuzzy_cache_size, self.ROOM_MAPPINGS)
+        self.waypoint_map = None
+        
+        # 流式提取：中间结果只做精确匹配，最终结果走完整流程
+        self.stream_tracker = StreamingRoomTracker(
+            self.extractor.extract_room, self.partial_stability, self.tentative_confidence_threshold)
         
         # 订阅语音识别结果
-        rospy.Subscriber('/speech_recognition/text', String, self.on_speech_recognized)
+        topics.Subscriber('speech_recognition/text', String, self.on_speech_recognized)
+        # 订阅导航管理器当前地图的航点集合（latched）
+        topics.Subscriber('voice_navigation/waypoints', String, self.on_waypoints_updated)
+        # 订阅IAT中间结果（流式模式）
+        if self.streaming:
+            topics.Subscriber('speech_recognition/partial', String, self.on_partial_recognized, queue_size=5)
         
         # 发布提取的房间名称
-        self.room_pub = rospy.Publisher('/semantic_extraction/room', String, queue_size=10)
-        self.status_pub = rospy.Publisher('/semantic_extraction/status', String, queue_size=10)
+        self.room_pub = topics.Publisher('semantic_extraction/room', String, queue_size=10)
+        self.status_pub = topics.Publisher('semantic_extraction/status', String, queue_size=10)
+        # 最终结果否定临时房间时发布取消
+        self.cancel_pub = topics.Publisher('semantic_extraction/cancel', String, queue_size=10)
+        # 一句话中包含多个房间时发布路线（JSON）
+        self.route_pub = topics.Publisher('semantic_extraction/route', String, queue_size=10)
+        self.diagnostics_pub = topics.Publisher('/diagnostics', DiagnosticArray, queue_size=1)
         
         rospy.loginfo("✓ 语义房间词提取节点初始化完成")
         rospy.loginfo(f"  支持房间类型: {', '.join(self.ROOM_MAPPINGS.keys())}")
+        rospy.loginfo(f"  别名数量: {len(self.extractor.matcher)}")
         rospy.loginfo(f"  信心度阈值: {self.room_confidence_threshold}")
         rospy.loginfo(f"  显示语言: {self.display_language}")
-        rospy.loginfo(f"  模糊匹配: {self.fuzzy_matching}")
+        rospy.loginfo(f"  模糊匹配: {self.fuzzy_matching} (拼音: {'启用' if lazy_pinyin else '未安装pypinyin, 按字符'})")
+        rospy.loginfo(f"  流式提取: {self.streaming} (稳定帧数: {self.partial_stability})")
         
-        rospy.spin()
+        diagnostics_interval = rospy.get_param('/advanced/trace_diagnostics_interval', 10.0)
+        if self.tracing and diagnostics_interval > 0:
+            rospy.Timer(rospy.Duration(diagnostics_interval), self._publish_diagnostics)
     
     def on_speech_recognized(self, msg):
         """
@@ -57,29 +90,49 @@ class SemanticRoomExtractor:
             msg: 包含识别文本的String消息
         """
         try:
-            text = msg.data.lower().strip()
+            text, trace = latency_trace.decode(msg.data)
+            if not self.tracing:
+                trace = None
+            text = text.lower().strip()
             rospy.loginfo(f"📝 识别文本: {text}")
             
-            # 提取房间关键词
-            room_name, confidence = self.extract_room(text)
+            # 多个房间: 作为一条路线整体发布，由导航管理器依次执行
+            if self.multi_stop:
+                stops, ordered = self.extractor.extract_rooms(text)
+                if len(stops) >= 2:
+                    self.stream_tracker.on_final(stops[0].room, stops[0].confidence)
+                    self._record_trace(trace)
+                    self._publish_route(text, stops, ordered, trace)
+                    return
             
-            if room_name:
-                # 发布提取的房间名称
-                room_msg = String()
-                room_msg.data = room_name
-                self.room_pub.publish(room_msg)
-                
-                # 发布状态信息
-                status_msg = String()
-                status_msg.data = f"detected:{room_name}:{confidence:.2f}"
-                self.status_pub.publish(status_msg)
+            # 提取房间关键词，精确匹配失败时尝试模糊匹配（同音字/近音字）
+            room_name, confidence = self.extractor.extract(text, self.fuzzy_matching)
+            
+            event = self.stream_tracker.on_final(room_name, confidence)
+            self._record_trace(trace)
+            
+            if event.kind == 'confirmed':
+                # 临时房间已发布，导航已开始，只需确认
+                self._publish_status(f"detected:{room_name}:{confidence:.2f}")
+                rospy.loginfo(f"✓ 确认临时房间: {room_name} (置信度: {confidence:.2f})")
+            elif event.kind == 'cancelled':
+                # 最终结果中没有房间词，撤销临时房间
+                self._publish_cancel(event.previous)
+                self._publish_status("no_room_detected")
+                rospy.logwarn(f"⚠️  未识别到房间词，取消临时房间: {event.previous}")
+            elif room_name:
+                # 发布提取的房间名称（包括对临时房间的纠正）
+                self._publish_room(room_name, trace)
                 
-                rospy.loginfo(f"✓ 提取房间: {room_name} (置信度: {confidence:.2f})")
+                if event.kind == 'corrected':
+                    self._publish_status(f"corrected:{event.previous}:{room_name}:{confidence:.2f}")
+                    rospy.loginfo(f"✓ 纠正房间: {event.previous} -> {room_name} (置信度: {confidence:.2f})")
+                else:
+                    self._publish_status(f"detected:{room_name}:{confidence:.2f}")
+                    rospy.loginfo(f"✓ 提取房间: {room_name} (置信度: {confidence:.2f})")
             else:
                 # 未识别到房间词
-                status_msg = String()
-                status_msg.data = "no_room_detected"
-                self.status_pub.publish(status_msg)
+                self._publish_status("no_room_detected")
                 
                 rospy.logwarn(f"⚠️  未识别到房间词")
         
@@ -89,84 +142,117 @@ class SemanticRoomExtractor:
             status_msg.data = f"error:{str(e)}"
             self.status_pub.publish(status_msg)
     
-    def extract_room(self, text):
+    def on_partial_recognized(self, msg):
         """
-        从文本中提取房间名称
+        处理IAT中间结果，房间稳定后提前发布临时房间
         
         Args:
-            text: 输入文本（已转小写）
-            
-        Returns:
-            (room_name, confidence): 提取的房间名称和置信度
+            msg: 包含中间识别文本的String消息
         """
-        max_confidence = 0.0
-        detected_room = None
-        
-        # 遍历所有房间类型
-        for room_type, aliases in self.ROOM_MAPPINGS.items():
-            for alias in aliases:
-                # 检查别名是否在文本中
-                if alias.lower() in text:
-                    confidence = self._calculate_confidence(text, alias)
-                    
-                    if confidence > max_confidence:
-                        max_confidence = confidence
-                        detected_room = room_type
-                    
-                    rospy.logdebug(f"  匹配 '{alias}' -> {room_type} (置信度: {confidence:.2f})")
-        
-        return detected_room, max_confidence
+        try:
+            event = self.stream_tracker.on_partial(msg.data.lower().strip())
+            if event is None:
+                return
+            
+            self._publish_room(event.room)
+            if event.kind == 'corrected':
+                self._publish_status(f"corrected:{event.previous}:{event.room}:{event.confidence:.2f}")
+                rospy.loginfo(f"✓ 纠正临时房间: {event.previous} -> {event.room}")
+            else:
+                self._publish_status(f"tentative:{event.room}:{event.confidence:.2f}")
+                rospy.loginfo(f"⚡ 临时房间: {event.room} (置信度: {event.confidence:.2f})")
+        
+        except Exception as e:
+            rospy.logerr(f"❌ 流式提取错误: {e}")
     
-    def _calculate_confidence(self, text, keyword):
-        """
-        计算关键词匹配的置信度
+    def _record_trace(self, trace):
+        """记录提取完成的时间戳和本节点的阶段耗时"""
+        if trace is not None:
+            latency_trace.stamp(trace, 'extracted')
+            self.latency_stats.record(trace)
+    
+    def _publish_room(self, room_name, trace=None):
+        """发布提取的房间名称（带追踪信息时为JSON信封）"""
+        room_msg = String()
+        room_msg.data = latency_trace.encode(room_name, trace)
+        self.room_pub.publish(room_msg)
+    
+    def _publish_route(self, text, stops, ordered, trace=None):
+        """发布多目标路线"""
+        route = {
+            'text': text,
+            'ordered': ordered,
+            'rooms': [stop._asdict() for stop in stops],
+        }
+        if trace is not None:
+            route['trace'] = trace
+        route_msg = String()
+        route_msg.data = json.dumps(route, ensure_ascii=False)
+        self.route_pub.publish(route_msg)
         
-        Args:
-            text: 输入文本
-            keyword: 关键词
-            
-        Returns:
-            confidence: 置信度（0-1）
-        """
-        keyword_lower = keyword.lower()
-        text_lower = text.lower()
-        
-        # 基础置信度
-        if keyword_lower == text_lower:
-            return 1.0  # 完全匹配
-        elif keyword_lower in text_lower:
-            # 部分匹配，根据覆盖率计算置信度
-            coverage = len(keyword_lower) / len(text_lower)
-            return min(0.9, coverage * 0.8 + 0.3)
-        else:
-            return 0.0
+        rooms = ','.join(stop.room for stop in stops)
+        self._publish_status(f"route:{rooms}:{'ordered' if ordered else 'unordered'}")
+        rospy.loginfo(f"✓ 提取路线: {' -> '.join(stop.room for stop in stops)} "
+                      f"({'按说话顺序' if ordered else '顺序待优化'})")
+    
+    def _publish_cancel(self, room_name):
+        """发布对临时房间的取消"""
+        cancel_msg = String()
+        cancel_msg.data = room_name
+        self.cancel_pub.publish(cancel_msg)
+    
+    def _publish_status(self, status):
+        """发布状态信息"""
+        status_msg = String()
+        status_msg.data = status
+        self.status_pub.publish(status_msg)
     
-    @staticmethod
-    def get_room_display_name(room_id):
+    def _publish_diagnostics(self, event=None):
+        """在/diagnostics上发布提取阶段耗时的p50/p95/p99"""
+        node_name = 'semantic_room_extractor' + rospy.get_namespace().rstrip('/')
+        status = DiagnosticStatus()
+        status.level = DiagnosticStatus.OK
+        status.name = f'{node_name}: latency'
+        status.hardware_id = node_name
+        status.values = [KeyValue(key, value) for key, value in self.latency_stats.diagnostic_values()]
+        status.message = f"{len(status.values)} values" if status.values else 'no utterances'
+        
+        array = DiagnosticArray()
+        array.header.stamp = rospy.Time.now()
+        array.status = [status]
+        self.diagnostics_pub.publish(array)
+    
+    def on_waypoints_updated(self, msg):
         """
-        获取房间的显示名称（中文）
+        处理当前地图航点集合的更新，增量重建航点名称索引
         
         Args:
-            room_id: 房间ID (如 'living_room')
-            
-        Returns:
-            display_name: 中文显示名称
+            msg: JSON字符串 {"map": 地图名, "waypoints": [航点名, ...]}
         """
-        display_mapping = {
-            'living_room': '客厅',
-            'bedroom': '卧室',
-            'kitchen': '厨房',
-            'bathroom': '卫生间',
-            'dining_room': '餐厅',
-            'study': '书房',
-            'balcony': '阳台',
-            'entrance': '玄关'
-        }
-        return display_mapping.get(room_id, room_id)
+        try:
+            data = json.loads(msg.data)
+            start = time.perf_counter()
+            
+            names = data.get('waypoints', [])
+            added, removed = self.extractor.update_waypoints(names)
+            self.waypoint_map = data.get('map')
+            
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            rospy.loginfo(f"✓ 航点词表已更新: {self.waypoint_map} - {len(names)} 个航点 "
+                          f"(+{added}/-{removed}, {elapsed_ms:.1f} ms)")
+        
+        except Exception as e:
+            rospy.logwarn(f"⚠️  更新航点词表失败: {e}")
 
 
-if __name__ == '__main__':
+def main():
     try:
+        rospy.init_node('semantic_room_extractor', anonymous=True)
         extractor = SemanticRoomExtractor()
+        rospy.spin()
     except rospy.ROSInterruptException:
         pass
+
+
+if __name__ == '__main__':
+    main()
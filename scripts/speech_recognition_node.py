@@ -7,6 +7,9 @@
 
 import rospy
 from std_msgs.msg import String
+from geometry_msgs.msg import Twist
+from actionlib_msgs.msg import GoalID
+from diagnostic_msgs.msg import DiagnosticArray, DiagnosticStatus, KeyValue
 import subprocess
 import os
 import sys
@@ -18,38 +21,86 @@ import time
 import threading
 import tempfile
 
+from nav_pkg import latency_trace
+from nav_pkg.speech_filters import StopCommandMatcher, UtteranceFilter
+
 
 class XfyunSpeechRecognizer:
     """讯飞IAT语音识别 - 使用C++SDK"""
     
-    def __init__(self):
-        rospy.init_node('speech_recognition_node', anonymous=True)
+    def __init__(self, topics=rospy):
+        """
+        初始化语音识别桥接（需先调用rospy.init_node）
+        
+        Args:
+            topics: 提供Publisher/Subscriber的对象，默认rospy；融合模式下传入进程内话题
         
+        话题都是相对名称，在节点的命名空间下解析（多机器人时用 <group ns="robot1"> 启动）
+        """
         # 发布话题
-        self.speech_pub = rospy.Publisher('/speech_recognition/text', String, queue_size=10)
+        self.speech_pub = topics.Publisher('speech_recognition/text', String, queue_size=10)
+        self.partial_pub = topics.Publisher('speech_recognition/partial', String, queue_size=10)
         
         # 参数
         self.language = rospy.get_param('/speech_recognition/language', 'zh_CN')
         self.sample_rate = rospy.get_param('/speech_recognition/sample_rate', 16000)
         self.timeout = rospy.get_param('/speech_recognition/recognition_timeout', 10)
+        self.queue_size = rospy.get_param('/speech_recognition/queue_size', 10)
+        self.duplicate_window = rospy.get_param('/speech_recognition/duplicate_window', 2.0)
+        self.stats_interval = rospy.get_param('/speech_recognition/stats_interval', 5.0)
+        # IAT中间结果话题，留空则不转发中间结果
+        self.partial_topic = rospy.get_param('/speech_recognition/partial_topic', 'xfyun/iat_partial')
+        
+        # 转发/抑制计数
+        self.stats_pub = topics.Publisher('speech_recognition/stats', String, queue_size=1, latch=True)
+        self.utterance_filter = UtteranceFilter(self.duplicate_window)
+        self._filter_lock = threading.Lock()
+        self._last_stats = None
+        
+        # 停止指令快速通道：不经过房间提取和导航管理器，直接取消本机器人的move_base并发布零速度
+        self.stop_keywords = rospy.get_param('/speech_recognition/stop_keywords', True)
+        self.stop_on_partial = rospy.get_param('/speech_recognition/stop_on_partial', False)
+        self.stop_matcher = StopCommandMatcher(rospy.get_param('/speech_recognition/stop_words', None))
+        self.cancel_pub = topics.Publisher('move_base/cancel', GoalID, queue_size=1)
+        self.cmd_vel_pub = topics.Publisher(rospy.get_param('/speech_recognition/cmd_vel_topic', 'cmd_vel'),
+                                            Twist, queue_size=1)
+        self.stop_pub = topics.Publisher('speech_recognition/stop', String, queue_size=1)
+        self.stop_count = 0
+        
+        # 链路延迟追踪：转发的文本带关联ID和时间戳（JSON信封）
+        self.tracing = rospy.get_param('/advanced/tracing', False)
+        self.latency_stats = latency_trace.LatencyStats(rospy.get_param('/advanced/trace_window', 1000))
+        self.diagnostics_pub = topics.Publisher('/diagnostics', DiagnosticArray, queue_size=1)
         
         rospy.loginfo("✓ 讯飞IAT语音识别节点启动")
         rospy.loginfo(f"  语言: {self.language}")
         rospy.loginfo(f"  采样率: {self.sample_rate}Hz")
+        rospy.loginfo(f"  重复抑制窗口: {self.duplicate_window}秒")
         
-        # 检查讯飞SDK编译的二进制
+        # 检查讯飞SDK编译的二进制（只有启动真实的IAT进程时需要；回放工具、
+        # 其它机器上的IAT节点发布的/xfyun/iat照常处理）
         self.iat_binary = self._find_iat_binary()
-        if not self.iat_binary:
-            rospy.logerr("❌ 讯飞IAT二进制程序未找到")
-            rospy.logerr("  需要编译: cd ~/catkin_ws && catkin_make")
-            return
+        if self.iat_binary:
+            rospy.loginfo(f"✓ 讯飞IAT二进制: {self.iat_binary}")
+        else:
+            rospy.logwarn("⚠️  讯飞IAT二进制程序未找到，仍订阅 xfyun/iat")
+            rospy.logwarn("  本机运行IAT需要编译: cd ~/catkin_ws && catkin_make")
         
-        rospy.loginfo(f"✓ 讯飞IAT二进制: {self.iat_binary}")
+        # 讯飞IAT将识别结果发布到 xfyun/iat 话题，只订阅一次（有界队列）
+        rospy.loginfo(f"💡 监听讯飞IAT识别结果: {rospy.resolve_name('xfyun/iat')}")
+        self.iat_sub = topics.Subscriber('xfyun/iat', String, self._on_recognition_result,
+                                         queue_size=self.queue_size)
+        if self.partial_topic:
+            # 中间结果只关心最新的几条
+            self.partial_sub = topics.Subscriber(self.partial_topic, String, self._on_partial_result,
+                                                 queue_size=2)
         
-        # 启动识别线程
-        self.running = True
-        self.thread = threading.Thread(target=self._run_recognition, daemon=True)
-        self.thread.start()
+        # 定期发布转发/抑制计数
+        if self.stats_interval > 0:
+            self.stats_timer = rospy.Timer(rospy.Duration(self.stats_interval), self._publish_stats)
+        diagnostics_interval = rospy.get_param('/advanced/trace_diagnostics_interval', 10.0)
+        if self.tracing and diagnostics_interval > 0:
+            self.diagnostics_timer = rospy.Timer(rospy.Duration(diagnostics_interval), self._publish_diagnostics)
         rospy.loginfo("🎤 准备就绪，请说话...")
     
     def _find_iat_binary(self):
@@ -75,38 +126,81 @@ class XfyunSpeechRecognizer:
         
         return None
     
-    def _run_recognition(self):
-        """运行讯飞IAT识别"""
-        while self.running and not rospy.is_shutdown():
-            try:
-                # 调用讯飞IAT程序
-                rospy.loginfo("🎤 启动讯飞IAT服务...")
-                
-                # 使用子进程启动讯飞IAT
-                # 讯飞IAT会将识别结果发布到 /xfyun/iat 话题
-                # 我们通过订阅该话题获取结果
-                rospy.loginfo("💡 监听讯飞IAT识别结果...")
-                
-                # 订阅讯飞IAT话题
-                rospy.Subscriber('/xfyun/iat', String, self._on_recognition_result)
-                
-                # 保持运行
-                time.sleep(1)
-                
-            except Exception as e:
-                rospy.logerr(f"❌ 错误: {e}")
-                time.sleep(2)
-    
     def _on_recognition_result(self, msg):
-        """处理讯飞IAT的识别结果"""
-        if msg.data.strip():
-            rospy.loginfo(f"✓ 识别结果: {msg.data}")
+        """处理讯飞IAT的识别结果（回放工具注入的结果带有追踪信息，沿用其关联ID）"""
+        text, trace = latency_trace.decode(msg.data)
+        if not self.tracing:
+            trace = None
+        elif trace is None:
+            trace = latency_trace.start_trace()
+        if self.stop_keywords and self.stop_matcher.match(text):
+            self._stop(text)
+            return
+        
+        with self._filter_lock:
+            accepted = self.utterance_filter.accept(text)
+        
+        if accepted:
+            rospy.loginfo(f"✓ 识别结果: {text}")
             # 转发到语音导航系统
-            self.speech_pub.publish(msg)
+            latency_trace.stamp(trace, 'bridged')
+            self.speech_pub.publish(String(data=latency_trace.encode(text, trace)))
+            self.latency_stats.record(trace)
+        elif text.strip():
+            rospy.logdebug(f"  忽略重复识别结果: {text}")
+    
+    def _on_partial_result(self, msg):
+        """转发讯飞IAT的中间识别结果（流式房间提取）"""
+        if self.stop_keywords and self.stop_on_partial and self.stop_matcher.match(msg.data):
+            self._stop(msg.data)
+            return
+        if msg.data.strip():
+            self.partial_pub.publish(msg)
+    
+    def _stop(self, text):
+        """
+        停止指令：先取消move_base所有目标并发布零速度，再通知导航管理器清空队列/路线
+        
+        Args:
+            text: 识别到的停止指令
+        """
+        self.cancel_pub.publish(GoalID())  # 空的GoalID取消全部目标
+        self.cmd_vel_pub.publish(Twist())
+        self.stop_pub.publish(String(data=text))
+        self.stop_count += 1
+        rospy.logwarn(f"⏹️  停止指令: {text}")
+    
+    def _publish_stats(self, event=None):
+        """发布转发/抑制计数（有变化时）"""
+        with self._filter_lock:
+            stats = self.utterance_filter.stats()
+        stats['stopped'] = self.stop_count
+        
+        if stats != self._last_stats:
+            self._last_stats = stats
+            stats_msg = String()
+            stats_msg.data = json.dumps(stats)
+            self.stats_pub.publish(stats_msg)
+
+    def _publish_diagnostics(self, event=None):
+        """在/diagnostics上发布桥接阶段耗时的p50/p95/p99"""
+        node_name = 'speech_recognition_node' + rospy.get_namespace().rstrip('/')
+        status = DiagnosticStatus()
+        status.level = DiagnosticStatus.OK
+        status.name = f'{node_name}: latency'
+        status.hardware_id = node_name
+        status.values = [KeyValue(key, value) for key, value in self.latency_stats.diagnostic_values()]
+        status.message = f"{len(status.values)} values" if status.values else 'no utterances'
+        
+        array = DiagnosticArray()
+        array.header.stamp = rospy.Time.now()
+        array.status = [status]
+        self.diagnostics_pub.publish(array)
 
 
 def main():
     try:
+        rospy.init_node('speech_recognition_node', anonymous=True)
         node = XfyunSpeechRecognizer()
         rospy.spin()
     except KeyboardInterrupt:
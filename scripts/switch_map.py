@@ -7,6 +7,7 @@ Quick map version switching tool
 用法 / Usage:
   1. 列出所有可用地图
      rosrun nav_pkg switch_map.py --list
+     rosrun nav_pkg switch_map.py --list --all      # 不限于最新10个
   
   2. 切换到指定地图
      rosrun nav_pkg switch_map.py map_20250213_120000
@@ -16,83 +17,156 @@ Quick map version switching tool
   
   4. 查看当前地图
      rosrun nav_pkg switch_map.py --current
+  
+  5. 压缩地图历史（关键帧 + 增量，读取时自动还原）
+     rosrun nav_pkg switch_map.py --compact
+  
+  6. 为大地图生成分块文件 map.tiles（不指定地图时处理所有还没有分块文件的地图）
+     rosrun nav_pkg switch_map.py --tile [map_name]
+  
+  7. 多机器人：操作指定命名空间的机器人（管理器的robots参数）
+     rosrun nav_pkg switch_map.py --robot robot1 --latest
+
+语音导航管理器运行时，通过它的服务 (/voice_navigation/list_maps, switch_map, current_map)
+读取内存中的地图目录并切换；管理器未运行时读取地图目录缓存 (.map_catalog.json)，
+只重新解析有变化的文件夹。离线扫描与服务查询并行进行，管理器不在时不必等待超时
 """
 
 import rospy
-import sys
+import rosgraph
+from std_srvs.srv import Trigger
 import os
-from pathlib import Path
+import sys
+import json
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-import xml.etree.ElementTree as ET
+
+from nav_pkg.map_catalog import MapCatalog, map_summary, resolve_maps_path
+from nav_pkg.srv import ListMaps, SwitchMap
+
+
+DEFAULT_MAPS_PATH = 'src/clip_sam_semantic_mapping/results/waypoints'
+LIST_LIMIT = 10
 
 
 class MapSwitcher:
-    def __init__(self):
-        """初始化地图切换工具"""
-        self.base_path = os.path.expanduser(
-            "~/catkin_ws/src/clip_sam_semantic_mapping/results/waypoints"
-        )
+    def __init__(self, service_timeout=2.0, namespace=''):
+        """
+        初始化地图切换工具
+        
+        Args:
+            service_timeout: 服务调用超时（秒）
+            namespace: 机器人命名空间，服务名加上该前缀；空为单机器人的全局服务
+        """
+        self.service_timeout = service_timeout
+        self.namespace = '/' + namespace.strip('/') if namespace.strip('/') else ''
+        self.base_path = resolve_maps_path(
+            self._get_param('/voice_navigation_manager/semantic_maps_path', DEFAULT_MAPS_PATH))
+        self.folder_prefix = self._get_param('/voice_navigation_manager/map_folder_prefix', 'map_')
+        self.waypoints_filename = self._get_param('/voice_navigation_manager/waypoints_filename', 'waypoints.xml')
+        # 离线扫描在后台线程中与服务查询并行
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._offline = self._executor.submit(self._scan_offline)
+    
+    def close(self):
+        """等待离线扫描结束（避免目录文件写到一半时退出）"""
+        self._executor.shutdown(wait=True)
+    
+    @staticmethod
+    def _get_param(name, default):
+        """读取ROS参数（不初始化节点），ROS master不可用时返回默认值"""
+        try:
+            return rospy.get_param(name, default)
+        except Exception:
+            return default
+    
+    def _call(self, service_name, service_class, *args):
+        """
+        调用语音导航管理器的服务（不初始化节点）
+        
+        Returns:
+            服务响应，管理器未运行或调用失败时返回None
+        """
+        service_name = self.namespace + service_name
+        try:
+            # 先查询master：master未运行或服务未注册时立即失败，不必等待超时
+            rosgraph.Master('/switch_map').lookupService(service_name)
+            rospy.wait_for_service(service_name, timeout=self.service_timeout)
+            return rospy.ServiceProxy(service_name, service_class)(*args)
+        except Exception:
+            return None
+    
+    def _scan_offline(self):
+        """读取/更新地图目录缓存"""
+        catalog = MapCatalog(self.base_path, self.folder_prefix, self.waypoints_filename)
+        try:
+            maps = catalog.scan()
+        except OSError:
+            return None, catalog
+        return maps, catalog
     
-    def list_maps(self):
-        """列出所有可用地图"""
-        base = Path(self.base_path)
+    def _offline_maps(self):
+        """
+        等待离线扫描结果
         
-        if not base.exists():
+        Returns:
+            maps: map_info列表（最新的在前），地图目录不存在时返回None
+        """
+        maps, catalog = self._offline.result()
+        if maps is None:
             print(f"❌ 路径不存在: {self.base_path}")
-            return []
+            return None
+        for name, error in catalog.errors:
+            print(f"⚠️  {name}: {error}")
+        scan = catalog.last_scan
+        print(f"⚠️  语音导航管理器未运行，读取地图目录缓存 "
+              f"(复用 {scan['reused']}, 重新解析 {scan['parsed']})")
+        return maps
+    
+    def list_maps(self, limit=LIST_LIMIT):
+        """
+        列出可用地图
         
-        # 查找所有地图文件夹
-        maps = sorted(
-            [d for d in base.iterdir() if d.is_dir() and d.name.startswith("map_")],
-            key=lambda x: x.name,
-            reverse=True  # 最新的在前
-        )
+        Args:
+            limit: 最多显示多少个，0为全部
         
-        if not maps:
+        Returns:
+            显示的地图名列表（最新的在前）
+        """
+        response = self._call('/voice_navigation/list_maps', ListMaps, limit)
+        if response is not None:
+            rows = [{'name': name, 'timestamp': timestamp, 'rooms': rooms, 'size': size}
+                    for name, timestamp, rooms, size in zip(response.names, response.timestamps,
+                                                            response.room_counts, response.sizes)]
+            total, current = response.total, response.current
+        else:
+            maps = self._offline_maps()
+            if maps is None:
+                return []
+            rows = [map_summary(map_info) for map_info in (maps[:limit] if limit > 0 else maps)]
+            total, current = len(maps), None
+        
+        if not rows:
             print(f"❌ 未找到地图文件夹")
             return []
         
-        print(f"\n📊 找到 {len(maps)} 个地图版本:\n")
+        shown = f"，显示最新 {len(rows)} 个 (--all 显示全部)" if len(rows) < total else ""
+        print(f"\n📊 找到 {total} 个地图版本{shown}:\n")
         print("序号 │ 地图版本              │ 房间数 │ 文件大小 │ 生成时间")
         print("─" * 70)
         
-        for i, map_dir in enumerate(maps[:10]):  # 显示最新10个
-            try:
-                # 获取房间数
-                rooms = self._count_rooms(map_dir)
-                
-                # 获取文件大小
-                size = sum(
-                    f.stat().st_size 
-                    for f in map_dir.rglob('*') 
-                    if f.is_file()
-                )
-                size_str = self._format_size(size)
-                
-                # 获取生成时间
-                timestamp = map_dir.name.replace("map_", "")
-                time_str = self._format_timestamp(timestamp)
-                
+        for i, row in enumerate(rows):
+            if row['name'] == current:
+                marker = "▶  "
+            else:
                 marker = "⭐ " if i == 0 else "   "
-                print(f"{marker}{i+1:2d} │ {map_dir.name:20s} │   {rooms:2d}   │ {size_str:>8s} │ {time_str}")
-                
-            except Exception as e:
-                print(f"   {i+1:2d} │ {map_dir.name:20s} │ ❌ 读取失败")
+            print(f"{marker}{i+1:2d} │ {row['name']:20s} │   {row['rooms']:2d}   │ "
+                  f"{self._format_size(row['size']):>8s} │ {self._format_timestamp(row['timestamp'])}")
         
+        if current:
+            print(f"\n▶ 当前地图: {current}")
         print()
-        return [m.name for m in maps]
-    
-    def _count_rooms(self, map_dir):
-        """计算地图中的房间数"""
-        try:
-            waypoints_file = map_dir / "waypoints.xml"
-            if waypoints_file.exists():
-                tree = ET.parse(waypoints_file)
-                root = tree.getroot()
-                return len(root.findall('Waypoint'))
-        except:
-            pass
-        return 0
+        return [row['name'] for row in rows]
     
     def _format_size(self, size_bytes):
         """格式化文件大小"""
@@ -112,109 +186,156 @@ class MapSwitcher:
             return timestamp
     
     def switch_to_map(self, map_name):
-        """切换到指定地图"""
-        map_path = Path(self.base_path) / map_name
+        """
+        切换到指定地图
+        
+        Args:
+            map_name: 地图文件夹名、完整路径或 "latest"
         
-        if not map_path.exists():
+        Returns:
+            True: 切换成功（或管理器离线时已记录为下次启动加载的地图）
+        """
+        print(f"\n🔄 正在通知语音导航管理器...")
+        response = self._call('/voice_navigation/switch_map', SwitchMap, map_name)
+        if response is not None:
+            if not response.success:
+                print(f"❌ {response.message}")
+                print("\n请使用 'rosrun nav_pkg switch_map.py --list' 查看可用地图")
+                return False
+            print(f"✓ 语音导航管理器已切换地图")
+            print(f"\n📍 已切换地图到: {response.map_name}")
+            self._print_rooms(response.rooms)
+            print(f"\n✓ 地图已切换!")
+            return True
+        
+        # 管理器未运行：在离线目录中校验，记录为下次启动时加载的地图
+        maps = self._offline_maps()
+        if not maps:
+            return False
+        requested = map_name.rstrip('/')
+        if requested == 'latest':
+            map_info = maps[0]
+        else:
+            map_info = next((m for m in maps if requested in (m['name'], m['path'])), None)
+        if map_info is None:
             print(f"❌ 地图不存在: {map_name}")
-            print(f"   路径: {map_path}")
+            print(f"   路径: {self.base_path}")
             print("\n请使用 'rosrun nav_pkg switch_map.py --list' 查看可用地图")
             return False
         
-        # 检查必要文件
-        required_files = ["waypoints.xml", "map.yaml", "map.pgm"]
-        for file in required_files:
-            if not (map_path / file).exists():
-                print(f"❌ 缺少必要文件: {file}")
-                return False
-        
-        # 尝试通过 ROS 参数更新
-        try:
-            rospy.init_node('map_switcher', anonymous=True, disable_signals=True)
-            rospy.set_param(
-                '/voice_navigation_manager/semantic_maps_path',
-                str(map_path)
-            )
-            print(f"✅ ROS 参数已更新")
-        except Exception as e:
-            print(f"⚠️  ROS 节点离线，无法通过 ROS 参数更新: {e}")
-        
-        # 🔄 动态重载map_server
-        import subprocess
-        import time
-        yaml_file = map_path / "map.yaml"
         try:
-            print(f"\n🔄 正在重载地图服务器...")
-            
-            # 杀死现有的map_server进程
-            try:
-                subprocess.run(['rosnode', 'kill', '/map_server'], timeout=5, capture_output=True)
-                time.sleep(1)
-            except:
-                pass
-            
-            # 启动新的map_server，加载新的地图
-            subprocess.Popen(['rosrun', 'map_server', 'map_server', str(yaml_file)])
-            time.sleep(2)
-            
-            print(f"✓ 地图服务器已重载")
-            
-        except Exception as e:
-            print(f"⚠️  无法动态重载map_server: {e}")
-        
-        print(f"\n📍 已切换地图到: {map_name}")
-        print(f"   完整路径: {map_path}")
-        
-        # 获取房间信息
-        rooms = self._get_rooms_in_map(map_path)
+            rospy.set_param('/voice_navigation_manager/initial_map', map_info['name'])
+            print(f"✓ 已设置 initial_map，语音导航管理器下次启动时加载: {map_info['name']}")
+        except Exception:
+            print(f"⚠️  ROS master未运行，无法记录；可在 voice_nav_params.yaml 中设置 "
+                  f"voice_navigation_manager/initial_map: {map_info['name']}")
+        
+        print(f"   完整路径: {map_info['path']}")
+        self._print_rooms(list(map_info['rooms']))
+        return True
+    
+    @staticmethod
+    def _print_rooms(rooms):
         if rooms:
             print(f"\n🏠 该地图包含的房间:")
             for room in rooms:
                 print(f"   • {room}")
+    
+    def compact(self):
+        """
+        把未压缩的地图版本转换为关键帧+增量（map.pgm -> map.pgm.delta）
         
-        print(f"\n✓ 地图已切换!")
+        Returns:
+            统计字典，地图目录不存在时返回None
+        """
+        # 只有压缩用到NumPy，列表/切换不必导入
+        from nav_pkg.map_store import MapStore
         
-        return True
-    
-    def _get_rooms_in_map(self, map_dir):
-        """获取地图中的房间列表"""
-        try:
-            waypoints_file = map_dir / "waypoints.xml"
-            tree = ET.parse(waypoints_file)
-            root = tree.getroot()
-            rooms = []
-            for wp in root.findall('Waypoint'):
-                name_elem = wp.find('Name')
-                if name_elem is not None:
-                    rooms.append(name_elem.text)
-            return rooms
-        except:
-            return []
+        if not os.path.isdir(self.base_path):
+            print(f"❌ 路径不存在: {self.base_path}")
+            return None
+        
+        max_change = self._get_param('/voice_navigation_manager/map_store_max_change', 0.2)
+        print(f"\n🗜️  正在压缩地图历史: {self.base_path}")
+        stats = MapStore(self.base_path, self.folder_prefix).compact(max_change)
+        
+        for name, reason in stats['skipped']:
+            print(f"⚠️  跳过 {name}: {reason}")
+        print(f"✓ 新增关键帧 {stats['keyframes']} 个，增量 {stats['deltas']} 个，"
+              f"清理关键帧 {stats['removed_keyframes']} 个")
+        print(f"   地图图像占用: {self._format_size(stats['bytes_before'])} -> "
+              f"{self._format_size(stats['bytes_after'])}")
+        return stats
     
-    def get_latest_map(self):
-        """获取最新的地图"""
-        maps = self.list_maps()
-        if maps:
-            return maps[0]  # 列表已按时间逆序排列
-        return None
+    def tile_maps(self, map_name=None):
+        """
+        由map.pgm/map.yaml生成分块文件map.tiles
+        
+        Args:
+            map_name: 地图文件夹名，None时处理所有还没有（或有过期）分块文件的地图
+        
+        Returns:
+            生成的分块文件数
+        """
+        # 只有分块用到NumPy，列表/切换不必导入
+        from nav_pkg.map_tiles import convert_to_tiles, open_tiled_map
+        
+        maps = self._offline.result()[0]
+        if maps is None:
+            print(f"❌ 路径不存在: {self.base_path}")
+            return 0
+        if map_name is not None:
+            maps = [m for m in maps if m['name'] == map_name.rstrip('/')]
+            if not maps:
+                print(f"❌ 地图不存在: {map_name}")
+                return 0
+        
+        tile_size = self._get_param('/voice_navigation_manager/map_tile_size', 256)
+        converted = 0
+        for map_info in maps:
+            if map_name is None and open_tiled_map(map_info['yaml_file']) is not None:
+                continue
+            try:
+                path, stats = convert_to_tiles(map_info['yaml_file'], tile_size)
+            except Exception as e:
+                print(f"⚠️  {map_info['name']}: {e}")
+                continue
+            converted += 1
+            print(f"✓ {map_info['name']}: {stats['tiles']}个图块 (其中同色 {stats['uniform']}), "
+                  f"{self._format_size(stats['bytes'])}")
+        print(f"\n🧩 已生成 {converted} 个分块文件")
+        return converted
     
     def get_current_map(self):
         """获取当前正在使用的地图"""
-        try:
-            rospy.init_node('map_switcher', anonymous=True, disable_signals=True)
-            current_path = rospy.get_param(
-                '/voice_navigation_manager/semantic_maps_path',
-                'Not set'
-            )
-            print(f"📍 当前地图路径: {current_path}")
-            return current_path
-        except Exception as e:
-            print(f"❌ 无法获取当前地图: {e}")
-            return None
+        response = self._call('/voice_navigation/current_map', Trigger)
+        if response is not None:
+            if not response.success:
+                print(f"⚠️  语音导航管理器尚未加载地图")
+                return None
+            current = json.loads(response.message)
+            print(f"📍 当前地图: {current['name']}")
+            print(f"   完整路径: {current['path']}")
+            self._print_rooms(current['rooms'])
+            return current['path']
+        
+        maps = self._offline_maps()
+        initial_map = self._get_param('/voice_navigation_manager/initial_map', '')
+        if maps:
+            upcoming = next((m for m in maps if m['name'] == initial_map), maps[0])
+            print(f"📍 语音导航管理器下次启动时加载: {upcoming['name']}")
+            return upcoming['path']
+        return None
 
 
 def main():
-    switcher = MapSwitcher()
+    # --robot <命名空间> 可出现在任意位置
+    namespace = ''
+    if '--robot' in sys.argv[1:-1]:
+        i = sys.argv.index('--robot')
+        namespace = sys.argv[i + 1]
+        del sys.argv[i:i + 2]
+    switcher = MapSwitcher(namespace=namespace)
     
     print("\n" + "="*70)
     print("🗺️  地图版本快速切换工具")
@@ -222,31 +343,43 @@ def main():
     
     if len(sys.argv) < 2:
         print("\n用法:")
-        print("  rosrun nav_pkg switch_map.py --list              # 列出所有地图")
+        print("  rosrun nav_pkg switch_map.py --list              # 列出最新的10个地图")
+        print("  rosrun nav_pkg switch_map.py --list --all        # 列出所有地图")
         print("  rosrun nav_pkg switch_map.py --latest            # 切换到最新地图")
         print("  rosrun nav_pkg switch_map.py --current           # 查看当前地图")
+        print("  rosrun nav_pkg switch_map.py --compact           # 压缩地图历史")
+        print("  rosrun nav_pkg switch_map.py --tile [map_name]   # 生成分块地图")
         print("  rosrun nav_pkg switch_map.py <map_name>         # 切换到指定地图")
+        print("  rosrun nav_pkg switch_map.py --robot robot1 ...  # 多机器人：指定命名空间")
         print("\n示例:")
         print("  rosrun nav_pkg switch_map.py --list")
         print("  rosrun nav_pkg switch_map.py map_20250213_120000")
+        switcher.close()
         return
     
     command = sys.argv[1]
     
-    if command == "--list":
-        switcher.list_maps()
-    
-    elif command == "--latest":
-        latest = switcher.get_latest_map()
-        if latest:
-            switcher.switch_to_map(latest)
-    
-    elif command == "--current":
-        switcher.get_current_map()
-    
-    else:
-        # 假设是地图名称
-        switcher.switch_to_map(command)
+    try:
+        if command == "--list":
+            switcher.list_maps(0 if "--all" in sys.argv[2:] else LIST_LIMIT)
+        
+        elif command == "--latest":
+            switcher.switch_to_map("latest")
+        
+        elif command == "--current":
+            switcher.get_current_map()
+        
+        elif command == "--compact":
+            switcher.compact()
+        
+        elif command == "--tile":
+            switcher.tile_maps(sys.argv[2] if len(sys.argv) > 2 else None)
+        
+        else:
+            # 假设是地图名称
+            switcher.switch_to_map(command)
+    finally:
+        switcher.close()
     
     print()
 
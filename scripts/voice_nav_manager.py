@@ -7,25 +7,57 @@
   2. 通过语音命令选择地图
   3. 基于语义房间词进行导航
   4. 发布导航目标到move_base
+  5. 一个进程为多个机器人命名空间服务（robots参数），共用地图目录和缓存
 """
 
 import rospy
+import actionlib
 from std_msgs.msg import String
-from geometry_msgs.msg import PoseStamped
-from nav_msgs.msg import OccupancyGrid
+from std_srvs.srv import Trigger, TriggerResponse
+from geometry_msgs.msg import PoseWithCovarianceStamped
+from nav_msgs.msg import OccupancyGrid, MapMetaData
+from actionlib_msgs.msg import GoalStatus
+from move_base_msgs.msg import MoveBaseAction, MoveBaseGoal
+from diagnostic_msgs.msg import DiagnosticArray, DiagnosticStatus, KeyValue
+from rospy.numpy_msg import numpy_msg
 import os
 import json
+import math
+import queue
+import threading
+import time
 from pathlib import Path
 from datetime import datetime
-import xml.etree.ElementTree as ET
+
+from nav_pkg import goal_tracker, latency_trace
+from nav_pkg.goal_tracker import GoalTracker, NavGoal
+from nav_pkg.map_catalog import map_summary, resolve_maps_path
+from nav_pkg.srv import ListMaps, ListMapsResponse, SwitchMap, SwitchMapResponse
+from nav_pkg.map_clearance import ClearanceMap, TiledClearanceMap, ndimage
+from nav_pkg.map_loader import yaw_to_quaternion
+from nav_pkg.map_resources import MapResources
+from nav_pkg.map_store import server_yaml
+from nav_pkg.map_watcher import MapWatcher
+from nav_pkg.room_segmentation import RoomSegmentation
+from nav_pkg.room_lookup import RoomIndex
+from nav_pkg.route_planning import solve_route
+from nav_pkg.travel_costs import TravelCostMatrix
 
 
 class VoiceNavManager:
     """语音导航管理器"""
     
-    def __init__(self):
-        """初始化语音导航管理器"""
-        rospy.init_node('voice_nav_manager', anonymous=True)
+    def __init__(self, topics=rospy, namespace='', resources=None, trace_sink=None):
+        """
+        初始化语音导航管理器（需先调用rospy.init_node）
+        
+        Args:
+            topics: 提供Publisher/Subscriber的对象，默认rospy；融合模式下传入进程内话题
+            namespace: 机器人命名空间（如 robot1），话题、服务和move_base都加上该前缀；空为全局话题
+            resources: 与其它机器人共用的MapResources，None时自己创建
+            trace_sink: 与其它机器人共用的延迟追踪文件，None时按trace_sink参数创建
+        """
+        self.namespace = '/' + namespace.strip('/') if namespace.strip('/') else ''
         
         # 从全局参数获取配置
         maps_path = rospy.get_param(
@@ -33,52 +65,156 @@ class VoiceNavManager:
             'src/clip_sam_semantic_mapping/results/waypoints'
         )
         
-        # 处理路径：支持相对路径和绝对路径
-        if maps_path.startswith('/'):
-            # 绝对路径
-            self.semantic_maps_base = maps_path
-        elif maps_path.startswith('~'):
-            # 家目录路径
-            self.semantic_maps_base = os.path.expanduser(maps_path)
-        else:
-            # 相对于ROS工作空间的路径
-            ros_workspace = os.environ.get('ROS_WORKSPACE', os.path.expanduser('~/catkin_ws'))
-            self.semantic_maps_base = os.path.join(ros_workspace, maps_path)
+        # 处理路径：支持绝对路径、家目录路径和相对于ROS工作空间的路径
+        self.semantic_maps_base = resolve_maps_path(maps_path)
         
         self.map_discovery_interval = rospy.get_param('/voice_navigation_manager/map_discovery_interval', 10)
         self.navigation_timeout = rospy.get_param('/voice_navigation_manager/navigation_timeout', 60)
         self.goal_tolerance_distance = rospy.get_param('/voice_navigation_manager/goal_tolerance_distance', 0.5)
+        # 新指令到来时: preempt=立即取代当前目标, queue=排队依次执行
+        self.command_policy = rospy.get_param('/voice_navigation_manager/command_policy', 'preempt')
+        self.max_queued_goals = rospy.get_param('/voice_navigation_manager/max_queued_goals', 10)
         self.auto_load_latest_map = rospy.get_param('/voice_navigation_manager/auto_load_latest_map', True)
+        # 启动时加载的地图（文件夹名），为空或不存在时加载最新的
+        self.initial_map = rospy.get_param('/voice_navigation_manager/initial_map', '')
         self.map_folder_prefix = rospy.get_param('/voice_navigation_manager/map_folder_prefix', 'map_')
         self.waypoints_filename = rospy.get_param('/voice_navigation_manager/waypoints_filename', 'waypoints.xml')
         self.log_level = rospy.get_param('/voice_navigation_manager/log_level', 'INFO')
+        self.map_settle_time = rospy.get_param('/voice_navigation_manager/map_settle_time', 2.0)
+        self.auto_update_maps = rospy.get_param('/advanced/auto_update_maps', True)
+        # true=本节点直接发布/map (latched); false=沿用重启map_server的方式
+        self.publish_map = rospy.get_param('/voice_navigation_manager/publish_map', True)
+        self.map_cache_mb = rospy.get_param('/voice_navigation_manager/map_cache_mb', 256)
+        # 分块地图: 有map.tiles时目标吸附只解码目标附近的图块，不解码整张地图
+        self.tiled_maps = rospy.get_param('/voice_navigation_manager/tiled_maps', True)
+        self.tile_cache_mb = rospy.get_param('/voice_navigation_manager/tile_cache_mb', 64)
+        self.diagnostics_interval = rospy.get_param('/voice_navigation_manager/diagnostics_interval', 10.0)
+        # 目标吸附: 航点落在障碍物内或离墙太近时移到最近的安全位置
+        self.snap_goals = rospy.get_param('/voice_navigation_manager/snap_goals', True)
+        self.robot_radius = rospy.get_param('/voice_navigation_manager/robot_radius', 0.25)
+        self.snap_margin = rospy.get_param('/voice_navigation_manager/snap_margin', 0.1)
+        self.snap_max_distance = rospy.get_param('/voice_navigation_manager/snap_max_distance', 1.5)
+        # 行走代价矩阵: 加载地图后在后台计算所有房间之间的最短路径，用于不可达拒绝和预计到达时间
+        self.travel_costs_enabled = rospy.get_param('/voice_navigation_manager/travel_costs', True)
+        self.travel_cost_max_nodes = rospy.get_param('/voice_navigation_manager/travel_cost_max_nodes', 250000)
+        self.nominal_speed = rospy.get_param('/voice_navigation_manager/nominal_speed', 0.3)
+        # 房间分割: 加载地图后在后台把空闲区域划分为房间，状态话题报告当前房间，已在目标房间时不再发送目标
+        self.room_segmentation_enabled = rospy.get_param('/voice_navigation_manager/room_segmentation', True)
+        self.room_door_width = rospy.get_param('/voice_navigation_manager/room_door_width', 0.9)
+        self.room_max_assign_distance = rospy.get_param('/voice_navigation_manager/room_max_assign_distance', 3.0)
+        self.skip_goal_in_current_room = rospy.get_param('/voice_navigation_manager/skip_goal_in_current_room', True)
+        # 链路延迟追踪: 各阶段耗时的滚动统计发布到/diagnostics，可选写入CSV/JSONL文件
+        self.tracing = rospy.get_param('/advanced/tracing', False)
+        self.latency_stats = latency_trace.LatencyStats(rospy.get_param('/advanced/trace_window', 1000))
+        trace_sink_path = rospy.get_param('/advanced/trace_sink', '')
+        self._owns_trace_sink = trace_sink is None and self.tracing and bool(trace_sink_path)
+        self.trace_sink = (latency_trace.TraceSink(trace_sink_path) if self._owns_trace_sink
+                           else trace_sink if self.tracing else None)
+        if (self.snap_goals or self.travel_costs_enabled or self.room_segmentation_enabled) and ndimage is None:
+            rospy.logwarn("⚠️  未安装scipy，导航目标吸附、行走代价矩阵和房间分割已禁用")
+            self.snap_goals = self.travel_costs_enabled = self.room_segmentation_enabled = False
+        
+        # 地图目录和缓存，多个机器人共用一份：
+        # 持久化的地图目录（保存在地图目录下，重启时只解析有变化的文件夹）、
+        # 已解码地图及派生数据的LRU缓存（来回切换时不必重新解码）、航点索引和分块地图
+        self.resources = resources or MapResources(
+            self.semantic_maps_base, self.map_folder_prefix, self.waypoints_filename,
+            int(self.map_cache_mb * 1024 * 1024), int(self.tile_cache_mb * 1024 * 1024))
+        self.map_catalog = self.resources.catalog
+        self.map_cache = self.resources.map_cache
         
         # 订阅房间提取结果
-        rospy.Subscriber('/semantic_extraction/room', String, self.on_room_extracted)
-        rospy.Subscriber('/semantic_extraction/status', String, self.on_extraction_status)
+        topics.Subscriber(self.namespace + '/semantic_extraction/room', String, self.on_room_extracted)
+        topics.Subscriber(self.namespace + '/semantic_extraction/status', String, self.on_extraction_status)
+        # 流式提取的临时房间被最终结果否定时取消导航
+        topics.Subscriber(self.namespace + '/semantic_extraction/cancel', String, self.on_room_cancelled)
+        # 机器人当前位置（用于不可达判断和预计到达时间）
+        topics.Subscriber(self.namespace + '/amcl_pose', PoseWithCovarianceStamped, self.on_robot_pose)
+        # 多目标路线：到达一站后自动前往下一站
+        topics.Subscriber(self.namespace + '/semantic_extraction/route', String, self.on_route_extracted)
+        # 语音桥接节点的停止指令（move_base已被直接取消，这里清空队列和路线）
+        topics.Subscriber(self.namespace + '/speech_recognition/stop', String, self.on_stop_command)
+        
+        # 通过actionlib驱动move_base，跟踪每个目标的结果
+        self.move_base_client = actionlib.SimpleActionClient(self.namespace + '/move_base' if self.namespace
+                                                             else 'move_base', MoveBaseAction)
+        # actionlib在持有内部锁时调用回调，因此发送/取消放到单独的线程中按顺序执行，避免与状态机互锁
+        self._move_base_commands = queue.Queue()
+        self.goal_tracker = GoalTracker(
+            lambda goal, token: self._move_base_commands.put((goal, token)),
+            lambda: self._move_base_commands.put(None),
+            timeout=self.navigation_timeout, tolerance=self.goal_tolerance_distance,
+            policy=self.command_policy, max_queue=self.max_queued_goals)
+        # 目标状态（latched JSON: state/room/x/y/detail/queued）
+        self.goal_state_pub = topics.Publisher(self.namespace + '/voice_navigation/goal_state', String, queue_size=10,
+                                               latch=True)
+        self.status_pub = topics.Publisher(self.namespace + '/voice_navigation/status', String, queue_size=10)
+        self.map_list_pub = topics.Publisher(self.namespace + '/voice_navigation/available_maps', String,
+                                             queue_size=10)
+        # 当前地图的航点集合（latched，供语义提取节点构建动态词表）
+        self.waypoints_pub = topics.Publisher(self.namespace + '/voice_navigation/waypoints', String, queue_size=1,
+                                              latch=True)
+        # 直接发布占用栅格地图（numpy_msg避免逐元素序列化）
+        if self.publish_map:
+            self.map_pub = topics.Publisher(self.namespace + '/map', numpy_msg(OccupancyGrid), queue_size=1,
+                                            latch=True)
+            self.map_metadata_pub = topics.Publisher(self.namespace + '/map_metadata', MapMetaData, queue_size=1,
+                                                     latch=True)
+        self.diagnostics_pub = topics.Publisher('/diagnostics', DiagnosticArray, queue_size=1)
         
-        # 发布导航目标
-        self.nav_goal_pub = rospy.Publisher('/move_base_simple/goal', PoseStamped, queue_size=10)
-        self.status_pub = rospy.Publisher('/voice_navigation/status', String, queue_size=10)
-        self.map_list_pub = rospy.Publisher('/voice_navigation/available_maps', String, queue_size=10)
+        # 也接受外部的地图切换请求（如 switch_map.py）
+        topics.Subscriber(self.namespace + '/voice_navigation/load_map', String, self.on_load_map_request)
         
         # 状态
         self.current_map = None
-        self.available_maps = []
         self.current_waypoints = {}
+        self.room_index = RoomIndex({})
+        self.clearance_map = None
+        self.travel_costs = None
+        self.room_segmentation = None
+        self.current_room = None  # 机器人所在的房间（房间分割就绪后随位置更新）
+        self.robot_position = None
+        self._map_generation = 0  # 每次加载地图加一，后台计算据此丢弃过期结果
         self.extraction_status = "idle"
+        self.map_watcher = None
+        self._map_lock = threading.Lock()  # 串行化地图加载（启动扫描 / 后台发现）
         
-        rospy.loginfo("✓ 语音导航管理器初始化完成")
+        rospy.loginfo(f"✓ 语音导航管理器初始化完成{' (' + self.namespace + ')' if self.namespace else ''}")
         rospy.loginfo(f"  地图路径: {self.semantic_maps_base}")
         rospy.loginfo(f"  导航超时: {self.navigation_timeout}秒")
         rospy.loginfo(f"  目标容差: {self.goal_tolerance_distance}米")
+        rospy.loginfo(f"  指令策略: {self.command_policy}")
         rospy.loginfo(f"  自动加载最新地图: {self.auto_load_latest_map}")
         rospy.loginfo(f"  日志级别: {self.log_level}")
+        if self._owns_trace_sink:
+            rospy.loginfo(f"  延迟追踪文件: {self.trace_sink.path}")
+            rospy.on_shutdown(self.trace_sink.close)
         
-        # 启动时扫描可用地图
+        # 启动时扫描可用地图（共用的地图目录已由其它机器人扫描过时直接加载）
         self._scan_available_maps()
         
-        rospy.spin()
+        # 地图列表/切换/当前地图服务（switch_map.py通过它们读取内存中的地图目录）
+        rospy.Service(self.namespace + '/voice_navigation/list_maps', ListMaps, self.handle_list_maps)
+        rospy.Service(self.namespace + '/voice_navigation/switch_map', SwitchMap, self.handle_switch_map)
+        rospy.Service(self.namespace + '/voice_navigation/current_map', Trigger, self.handle_current_map)
+        
+        # 后台增量发现新地图版本
+        if self.auto_update_maps and self.map_discovery_interval > 0:
+            self._start_map_watcher()
+        
+        # 等待move_base动作服务器（不阻塞启动）
+        threading.Thread(target=self._wait_for_move_base, name='wait_move_base', daemon=True).start()
+        threading.Thread(target=self._move_base_worker, name='move_base_commands', daemon=True).start()
+        # 超时检查
+        rospy.Timer(rospy.Duration(0.5), lambda event: self._handle_goal_events(self.goal_tracker.tick()))
+        
+        if self.diagnostics_interval > 0:
+            rospy.Timer(rospy.Duration(self.diagnostics_interval), lambda event: self._publish_diagnostics())
+    
+    @property
+    def available_maps(self):
+        """地图目录中的map_info列表，最新的在前（多个机器人共用）"""
+        return self.resources.available_maps
     
     def _scan_available_maps(self):
         """扫描并列出所有可用的地图版本"""
@@ -89,142 +225,472 @@ class VoiceNavManager:
                 rospy.logwarn(f"⚠️  航点路径不存在: {self.semantic_maps_base}")
                 return
             
-            # 查找所有地图文件夹 (格式: map_YYYYMMDD_HHMMSS)
-            map_folders = [d for d in waypoints_path.iterdir() 
-                          if d.is_dir() and d.name.startswith(self.map_folder_prefix)]
-            
-            # 按时间戳排序（最新的在前）
-            map_folders.sort(key=lambda x: x.name, reverse=True)
-            
-            self.available_maps = []
-            
-            for map_folder in map_folders:
-                map_info = self._read_map_info(map_folder)
-                if map_info:
-                    self.available_maps.append(map_info)
-            
-            rospy.loginfo(f"✓ 扫描到 {len(self.available_maps)} 个地图版本")
-            for i, map_info in enumerate(self.available_maps[:3]):  # 显示最新的3个
-                rospy.loginfo(f"  {i+1}. {map_info['name']} - {map_info['timestamp']}")
+            if not self.resources.scanned:
+                # 查找所有地图文件夹 (格式: map_YYYYMMDD_HHMMSS)，按时间戳排序（最新的在前）
+                self.resources.scan()
+                
+                for name, error in self.map_catalog.errors:
+                    rospy.logwarn(f"⚠️  读取地图信息失败: {name} - {error}")
+                
+                scan = self.map_catalog.last_scan
+                rospy.loginfo(f"✓ 扫描到 {len(self.available_maps)} 个地图版本 "
+                              f"(缓存 {scan['reused']}, 解析 {scan['parsed']}, 移除 {scan['removed']}"
+                              f"{', 目录文件已重建' if scan['rebuilt'] else ''})")
+                for i, map_info in enumerate(self.available_maps[:3]):  # 显示最新的3个
+                    rospy.loginfo(f"  {i+1}. {map_info['name']} - {map_info['timestamp']}")
             
             # 发布可用地图列表
             if self.available_maps:
                 self._publish_map_list()
-                # 自动选择最新的地图
-                self._load_map(self.available_maps[0]['path'])
+                # 优先加载initial_map指定的地图，否则自动选择最新的地图
+                initial = self._find_map(self.initial_map) if self.initial_map else None
+                if self.initial_map and initial is None:
+                    rospy.logwarn(f"⚠️  initial_map不存在，加载最新地图: {self.initial_map}")
+                self._load_map((initial or self.available_maps[0])['path'])
         
         except Exception as e:
             rospy.logerr(f"❌ 扫描地图失败: {e}")
     
-    def _read_map_info(self, map_folder):
+    def _start_map_watcher(self):
+        """启动地图目录后台监视（inotify优先，否则按map_discovery_interval轮询；多个机器人共用一个）"""
+        try:
+            if not os.path.isdir(self.semantic_maps_base):
+                return
+            
+            self.resources.add_listener(self._on_maps_changed)
+            if self.resources.watcher is not None:
+                self.map_watcher = self.resources.watcher
+                return
+            
+            self.map_watcher = MapWatcher(
+                self.map_catalog,
+                self.resources.on_maps_changed,
+                interval=self.map_discovery_interval,
+                settle_time=self.map_settle_time,
+                on_error=lambda message: rospy.logwarn(f"⚠️  {message}")
+            )
+            self.resources.watcher = self.map_watcher
+            self.map_watcher.start()
+            rospy.on_shutdown(self.map_watcher.stop)
+            
+            rospy.loginfo(f"✓ 地图目录监视已启动 ({self.map_watcher.mode}, 间隔 {self.map_discovery_interval}秒)")
+        
+        except Exception as e:
+            rospy.logwarn(f"⚠️  启动地图目录监视失败: {e}")
+    
+    def _on_maps_changed(self, added, updated, removed):
         """
-        读取地图信息
+        地图目录有变化（在监视线程中调用，不阻塞房间指令回调；available_maps已由MapResources更新）
         
         Args:
-            map_folder: 地图文件夹路径
-            
-        Returns:
-            map_info: 包含地图信息的字典
+            added: 新增的地图文件夹名列表
+            updated: 内容有变化的地图文件夹名列表
+            removed: 被删除的地图文件夹名列表
         """
         try:
-            # 检查必要文件
-            waypoints_file = map_folder / 'waypoints.xml'
-            yaml_file = map_folder / 'map.yaml'
-            pgm_file = map_folder / 'map.pgm'
+            rospy.loginfo(f"🔍 地图目录变化: 新增 {added}, 更新 {updated}, 删除 {removed}")
+            status_msg = String()
+            status_msg.data = f"maps_updated:+{len(added)}/~{len(updated)}/-{len(removed)}"
+            self.status_pub.publish(status_msg)
+            self._publish_map_list()
             
-            if not all([waypoints_file.exists(), yaml_file.exists(), pgm_file.exists()]):
-                return None
-            
-            # 解析时间戳
-            folder_name = map_folder.name  # map_YYYYMMDD_HHMMSS
-            timestamp = folder_name.replace('map_', '')
+            if not self.available_maps:
+                return
             
-            # 解析航点中的房间信息
-            rooms = self._extract_rooms_from_waypoints(waypoints_file)
+            current_name = self.current_map['name'] if self.current_map else None
+            latest = self.available_maps[0]
             
-            return {
-                'name': folder_name,
-                'path': str(map_folder),
-                'timestamp': timestamp,
-                'waypoints_file': str(waypoints_file),
-                'yaml_file': str(yaml_file),
-                'pgm_file': str(pgm_file),
-                'rooms': rooms
-            }
+            if current_name in updated:
+                # 当前地图的文件被重写，重新加载
+                self._load_map(self.current_map['path'])
+            elif current_name is None or current_name in removed:
+                self._load_map(latest['path'])
+            elif self.auto_load_latest_map and latest['name'] in added and latest['name'] > current_name:
+                # 有更新的地图版本
+                self._load_map(latest['path'])
         
         except Exception as e:
-            rospy.logwarn(f"⚠️  读取地图信息失败: {map_folder.name} - {e}")
-            return None
+            rospy.logerr(f"❌ 处理地图目录变化失败: {e}")
     
-    def _extract_rooms_from_waypoints(self, waypoints_file):
+    def _load_map(self, map_path):
         """
-        从XML航点文件中提取房间列表
+        加载指定的地图版本并发布地图（或动态重启map_server）
         
         Args:
-            waypoints_file: 航点XML文件路径
-            
+            map_path: 地图文件夹路径
+        
+        Returns:
+            True: 加载成功
+        """
+        try:
+            with self._map_lock:
+                for map_info in self.available_maps:
+                    if map_info['path'] == map_path:
+                        self.current_map = map_info
+                        self.current_waypoints = map_info['rooms']
+                        # 同一地图版本的航点索引由所有机器人共用
+                        self.room_index = self.resources.room_index(map_info)
+                        
+                        rospy.loginfo(f"✓ 已加载地图: {map_info['name']}"
+                                      f"{' (' + self.namespace + ')' if self.namespace else ''}")
+                        rospy.loginfo(f"  包含房间: {', '.join(self.current_waypoints.keys())}")
+                        
+                        # 发布状态
+                        status_msg = String()
+                        status_msg.data = f"map_loaded:{map_info['name']}"
+                        self.status_pub.publish(status_msg)
+                        
+                        # 发布航点集合，语义提取节点据此更新词表
+                        waypoints_msg = String()
+                        waypoints_msg.data = json.dumps({
+                            'map': map_info['name'],
+                            'waypoints': list(self.current_waypoints.keys())
+                        }, ensure_ascii=False)
+                        self.waypoints_pub.publish(waypoints_msg)
+                        
+                        tiled_map = self._open_tiled_map(map_info['yaml_file'])
+                        if self.publish_map:
+                            # 直接解码并发布新地图，一次publish完成切换
+                            self._publish_occupancy_map(map_info['yaml_file'], tiled_map)
+                        else:
+                            # 🔄 动态重载map_server以加载新的地图YAML文件
+                            self._reload_map_server(map_info['yaml_file'])
+                        
+                        # 距离变换和代价矩阵在后台线程计算，不阻塞回调
+                        self._map_generation += 1
+                        self.clearance_map = None
+                        self.travel_costs = None
+                        self.room_segmentation = None
+                        self.current_room = None
+                        if self.snap_goals or self.travel_costs_enabled:
+                            threading.Thread(
+                                target=self._analyze_map,
+                                args=(map_info['yaml_file'], dict(self.current_waypoints), self._map_generation,
+                                      tiled_map),
+                                name='map_analysis', daemon=True).start()
+                        if self.room_segmentation_enabled:
+                            if tiled_map is None:
+                                threading.Thread(
+                                    target=self._segment_rooms,
+                                    args=(map_info['yaml_file'], dict(self.current_waypoints), self._map_generation),
+                                    name='room_segmentation', daemon=True).start()
+                            else:
+                                # 分割需要整张栅格的连通区域，分块地图上做会抵消分块省下的内存
+                                rospy.logwarn("⚠️  分块地图不做房间分割: 不发布current_room，"
+                                              "skip_goal_in_current_room不生效")
+                        
+                        return True
+        
+        except Exception as e:
+            rospy.logerr(f"❌ 加载地图失败: {e}")
+        return False
+    
+    def _open_tiled_map(self, yaml_file_path):
+        """
+        打开地图的分块文件 (map.tiles)，多个机器人共用同一个映射和图块缓存
+        
+        Args:
+            yaml_file_path: 地图YAML文件的完整路径
+        
         Returns:
-            rooms: 房间列表，每个房间包含坐标信息
+            TiledMap，未启用、没有分块文件或打开失败时返回None
+        """
+        if not self.tiled_maps:
+            return None
+        try:
+            tiled_map = self.resources.tiled_map(yaml_file_path)
+        except Exception as e:
+            rospy.logwarn(f"⚠️  分块地图无法打开，使用完整地图: {e}")
+            return None
+        if tiled_map is not None:
+            rospy.loginfo(f"🧩 使用分块地图: {tiled_map.width}x{tiled_map.height}, "
+                          f"{tiled_map.rows * tiled_map.cols}个图块")
+        return tiled_map
+    
+    def _publish_occupancy_map(self, yaml_file_path, tiled_map=None):
+        """
+        解码map.yaml/map.pgm并发布latched的/map和/map_metadata
+        
+        Args:
+            yaml_file_path: 地图YAML文件的完整路径
+            tiled_map: 分块地图，有则逐块解码到预先分配的OccupancyGrid.data（不经过整张灰度图，不放入地图缓存）
         """
         try:
-            tree = ET.parse(waypoints_file)
-            root = tree.getroot()
+            start = time.perf_counter()
+            if tiled_map is not None:
+                occupancy_map, data = tiled_map, tiled_map.occupancy_data()
+            else:
+                occupancy_map = self.map_cache.get(yaml_file_path)
+                data = occupancy_map.data.reshape(-1)
             
-            rooms = {}
+            info = MapMetaData()
+            info.map_load_time = rospy.Time.now()
+            info.resolution = occupancy_map.resolution
+            info.width = occupancy_map.width
+            info.height = occupancy_map.height
+            info.origin.position.x = occupancy_map.origin[0]
+            info.origin.position.y = occupancy_map.origin[1]
+            (info.origin.orientation.x, info.origin.orientation.y,
+             info.origin.orientation.z, info.origin.orientation.w) = yaw_to_quaternion(occupancy_map.origin[2])
             
-            for waypoint in root.findall('Waypoint'):
-                name_elem = waypoint.find('Name')
-                pos_x_elem = waypoint.find('Pos_x')
-                pos_y_elem = waypoint.find('Pos_y')
-                
-                if name_elem is not None and pos_x_elem is not None and pos_y_elem is not None:
-                    room_name = name_elem.text.lower().strip()
-                    # 注意：Pos_x和Pos_y已经是世界坐标（米），不需要再做像素转换
-                    world_x = float(pos_x_elem.text)
-                    world_y = float(pos_y_elem.text)
-                    
-                    rooms[room_name] = {
-                        'x': world_x,
-                        'y': world_y,
-                        'z': 0.0
-                    }
-                    
-                    rospy.logdebug(f"房间坐标: {room_name} -> ({world_x:.3f}, {world_y:.3f})")
+            grid = numpy_msg(OccupancyGrid)()
+            grid.header.frame_id = "map"
+            grid.header.stamp = info.map_load_time
+            grid.info = info
+            grid.data = data
             
-            return rooms
+            self.map_metadata_pub.publish(info)
+            self.map_pub.publish(grid)
+            
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            rospy.loginfo(f"✓ 已发布地图: {occupancy_map.width}x{occupancy_map.height} "
+                          f"@ {occupancy_map.resolution}m ({elapsed_ms:.1f} ms)")
+            self._publish_diagnostics()
         
         except Exception as e:
-            rospy.logwarn(f"⚠️  解析航点文件失败: {e}")
-            return {}
+            rospy.logerr(f"❌ 发布地图失败: {e}")
     
-    def _load_map(self, map_path):
+    def _analyze_map(self, yaml_file_path, waypoints, generation, tiled_map=None):
         """
-        加载指定的地图版本并动态重启map_server
+        后台计算（或从地图缓存取得）距离变换和行走代价矩阵
         
         Args:
-            map_path: 地图文件夹路径
+            yaml_file_path: 地图YAML文件的完整路径
+            waypoints: 该地图的航点 {房间名: 坐标}
+            generation: 发起计算时的地图加载序号
+            tiled_map: 分块地图，有则吸附时只对目标附近做距离变换，代价矩阵逐块计算（按分块地图共用）
         """
         try:
-            for map_info in self.available_maps:
-                if map_info['path'] == map_path:
-                    self.current_map = map_info
-                    self.current_waypoints = map_info['rooms']
-                    
-                    rospy.loginfo(f"✓ 已加载地图: {map_info['name']}")
-                    rospy.loginfo(f"  包含房间: {', '.join(self.current_waypoints.keys())}")
-                    
-                    # 发布状态
-                    status_msg = String()
-                    status_msg.data = f"map_loaded:{map_info['name']}"
-                    self.status_pub.publish(status_msg)
-                    
-                    # 🔄 动态重载map_server以加载新的地图YAML文件
-                    self._reload_map_server(map_info['yaml_file'])
-                    
-                    break
+            start = time.perf_counter()
+            if tiled_map is not None:
+                clearance_map = self.resources.shared(
+                    (tiled_map, 'clearance', self.robot_radius, self.snap_margin, self.snap_max_distance),
+                    lambda: TiledClearanceMap(tiled_map, self.robot_radius, self.snap_margin,
+                                              self.snap_max_distance))
+            else:
+                name = ('clearance', self.robot_radius, self.snap_margin, self.snap_max_distance)
+                clearance_map = self.map_cache.derived(
+                    yaml_file_path, name,
+                    lambda occupancy_map: ClearanceMap(occupancy_map, self.robot_radius, self.snap_margin,
+                                                       self.snap_max_distance))
+            if generation != self._map_generation:
+                return
+            # 计算完成前的目标不做吸附
+            if self.snap_goals:
+                self.clearance_map = clearance_map
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            rospy.loginfo(f"✓ 距离变换已就绪 (安全距离 {clearance_map.clearance:.2f}m, {elapsed_ms:.1f} ms)")
+            if not clearance_map.has_clear_cells:
+                rospy.logwarn("⚠️  地图中没有满足安全距离的空闲区域，目标将不做吸附")
+                return
+            
+            if not self.travel_costs_enabled:
+                return
+            start = time.perf_counter()
+            # 航点内容参与缓存键：同一地图的航点文件改变后重新计算
+            waypoints_hash = hash(json.dumps(waypoints, sort_keys=True))
+            name = ('travel_costs', self.robot_radius, self.snap_margin, self.snap_max_distance,
+                    self.travel_cost_max_nodes, waypoints_hash)
+            if tiled_map is not None:
+                travel_costs = self.resources.shared(
+                    (tiled_map,) + name,
+                    lambda: TravelCostMatrix(clearance_map, waypoints, self.travel_cost_max_nodes))
+            else:
+                travel_costs = self.map_cache.derived(
+                    yaml_file_path, name,
+                    lambda occupancy_map: TravelCostMatrix(clearance_map, waypoints, self.travel_cost_max_nodes))
+            if generation != self._map_generation:
+                return
+            self.travel_costs = travel_costs
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            rospy.loginfo(f"✓ 行走代价矩阵已就绪: {len(travel_costs.names)}个房间, "
+                          f"栅格 {travel_costs.cell_size:.2f}m, {travel_costs.component_count}个连通区域 ({elapsed_ms:.1f} ms)")
+            self._publish_diagnostics()
         
         except Exception as e:
-            rospy.logerr(f"❌ 加载地图失败: {e}")
+            rospy.logerr(f"❌ 地图分析失败: {e}")
+    
+    def _segment_rooms(self, yaml_file_path, waypoints, generation):
+        """
+        后台计算（或从地图缓存取得）房间标签栅格
+        
+        Args:
+            yaml_file_path: 地图YAML文件的完整路径
+            waypoints: 该地图的航点 {房间名: 坐标}
+            generation: 发起计算时的地图加载序号
+        """
+        try:
+            start = time.perf_counter()
+            waypoints_hash = hash(json.dumps(waypoints, sort_keys=True))
+            name = ('rooms', self.room_door_width, self.room_max_assign_distance, waypoints_hash)
+            segmentation = self.map_cache.derived(
+                yaml_file_path, name,
+                lambda occupancy_map: RoomSegmentation(occupancy_map, waypoints, self.room_door_width,
+                                                       max_distance=self.room_max_assign_distance))
+            if generation != self._map_generation:
+                return
+            self.room_segmentation = segmentation
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            named = sum(1 for area in segmentation.areas().values() if area > 0)
+            rospy.loginfo(f"✓ 房间分割已就绪: {named}/{len(segmentation.names)}个房间有区域 ({elapsed_ms:.1f} ms)")
+            if self.robot_position is not None:
+                self._update_current_room(*self.robot_position)
+        
+        except Exception as e:
+            rospy.logerr(f"❌ 房间分割失败: {e}")
+    
+    def _update_current_room(self, x, y):
+        """按房间标签栅格更新机器人所在的房间，变化时发布 current_room:<房间名|none>"""
+        segmentation = self.room_segmentation
+        if segmentation is None:
+            return
+        room = segmentation.room_at(x, y)
+        if room != self.current_room:
+            self.current_room = room
+            self._publish_status(f"current_room:{room if room is not None else 'none'}")
+    
+    def _snap_goal(self, room_name, coords):
+        """
+        把目标点吸附到最近的安全栅格
+        
+        Args:
+            room_name: 房间名称
+            coords: 坐标字典 {'x': float, 'y': float, 'z': float}
+        
+        Returns:
+            (x, y): 实际发送的目标坐标
+        """
+        clearance_map = self.clearance_map
+        if clearance_map is None:
+            return coords['x'], coords['y']
+        
+        snapped = clearance_map.snap(coords['x'], coords['y'])
+        if snapped is None:
+            rospy.logwarn(f"⚠️  {room_name} 不在当前地图范围内，按原坐标发送")
+            return coords['x'], coords['y']
+        
+        x, y, moved = snapped
+        if math.isinf(moved):
+            rospy.logwarn(f"⚠️  {room_name} 附近 {self.snap_max_distance}m 内没有安全位置，按原坐标发送")
+            return coords['x'], coords['y']
+        if moved > 0:
+            rospy.loginfo(f"  目标吸附: {room_name} 移动 {moved:.2f}m -> ({x:.2f}, {y:.2f})")
+        return x, y
+    
+    def _publish_diagnostics(self):
+        """在/diagnostics上发布地图缓存的命中率和内存占用、当前导航目标，以及各阶段延迟"""
+        stats = self.map_cache.stats()
+        lookups = stats['hits'] + stats['misses']
+        node_name = 'voice_navigation_manager' + self.namespace
+        
+        status = DiagnosticStatus()
+        status.level = DiagnosticStatus.OK
+        status.name = f'{node_name}: map cache'
+        status.hardware_id = node_name
+        status.message = f"{stats['entries']} maps, {stats['resident_bytes'] / 1048576.0:.1f} MB"
+        status.values = [KeyValue(key, str(value)) for key, value in stats.items()]
+        status.values.append(KeyValue('hit_rate', f"{stats['hits'] / lookups:.2f}" if lookups else 'n/a'))
+        status.values += [KeyValue(key, str(value)) for key, value in self.resources.stats().items()]
+        
+        goal = self.goal_tracker.snapshot()
+        goal_status = DiagnosticStatus()
+        goal_status.level = DiagnosticStatus.OK
+        goal_status.name = f'{node_name}: navigation goal'
+        goal_status.hardware_id = node_name
+        goal_status.message = f"{goal['state']}: {goal['room']}" if goal['room'] else goal['state']
+        goal_status.values = [KeyValue(key, str(value)) for key, value in goal.items()]
+        goal_status.values.append(KeyValue('current_room', str(self.current_room)))
+        
+        array = DiagnosticArray()
+        array.header.stamp = rospy.Time.now()
+        array.status = [status, goal_status]
+        if self.tracing:
+            latency_status = DiagnosticStatus()
+            latency_status.level = DiagnosticStatus.OK
+            latency_status.name = f'{node_name}: latency'
+            latency_status.hardware_id = node_name
+            latency_status.values = [KeyValue(key, value) for key, value in self.latency_stats.diagnostic_values()]
+            latency_status.message = (f"{len(latency_status.values)} values" if latency_status.values
+                                      else 'no utterances')
+            array.status.append(latency_status)
+        self.diagnostics_pub.publish(array)
+    
+    def on_load_map_request(self, msg):
+        """
+        处理外部的地图切换请求
+        
+        Args:
+            msg: 地图文件夹名 (map_YYYYMMDD_HHMMSS) 或完整路径
+        """
+        try:
+            requested = msg.data.strip()
+            map_info = self._find_map(requested)
+            if map_info:
+                self._load_map(map_info['path'])
+                return
+            
+            rospy.logwarn(f"⚠️  请求的地图不存在: {requested}")
+            status_msg = String()
+            status_msg.data = f"map_not_found:{requested}"
+            self.status_pub.publish(status_msg)
+        
+        except Exception as e:
+            rospy.logerr(f"❌ 切换地图失败: {e}")
+    
+    def _find_map(self, requested):
+        """
+        按文件夹名或完整路径查找地图，"latest"表示最新的地图
+        
+        Returns:
+            map_info，找不到时返回None
+        """
+        maps = self.available_maps
+        if requested == 'latest':
+            return maps[0] if maps else None
+        requested = requested.rstrip('/')
+        for map_info in maps:
+            if requested in (map_info['name'], map_info['path']):
+                return map_info
+        return None
+    
+    def handle_list_maps(self, request):
+        """list_maps服务：返回内存中的地图目录（不访问文件系统）"""
+        maps = self.available_maps
+        response = ListMapsResponse()
+        response.total = len(maps)
+        response.current = self.current_map['name'] if self.current_map else ''
+        for map_info in (maps[:request.limit] if request.limit > 0 else maps):
+            summary = map_summary(map_info)
+            response.names.append(summary['name'])
+            response.timestamps.append(summary['timestamp'])
+            response.room_counts.append(summary['rooms'])
+            response.sizes.append(summary['size'])
+        return response
+    
+    def handle_switch_map(self, request):
+        """switch_map服务：切换到指定地图，加载完成后返回"""
+        requested = request.map_name.strip()
+        map_info = self._find_map(requested)
+        if map_info is None:
+            self._publish_status(f"map_not_found:{requested}")
+            return SwitchMapResponse(success=False, message=f"地图不存在: {requested}")
+        if not self._load_map(map_info['path']):
+            return SwitchMapResponse(success=False, message=f"加载地图失败: {map_info['name']}",
+                                     map_name=map_info['name'])
+        return SwitchMapResponse(success=True, message=f"已切换到 {map_info['name']}",
+                                 map_name=map_info['name'], rooms=list(map_info['rooms']))
+    
+    def handle_current_map(self, request):
+        """current_map服务：message为当前地图的JSON {name, path, timestamp, rooms}"""
+        current = self.current_map
+        if not current:
+            return TriggerResponse(success=False, message='')
+        return TriggerResponse(success=True, message=json.dumps({
+            'name': current['name'],
+            'path': current['path'],
+            'timestamp': current['timestamp'],
+            'rooms': list(current['rooms']),
+        }, ensure_ascii=False))
     
     def _reload_map_server(self, yaml_file_path):
         """
@@ -241,13 +707,16 @@ class VoiceNavManager:
             
             # 杀死现有的map_server进程
             try:
-                subprocess.run(['rosnode', 'kill', '/map_server'], timeout=5)
+                subprocess.run(['rosnode', 'kill', self.namespace + '/map_server'], timeout=5)
                 rospy.sleep(1)  # 等待进程完全结束
             except Exception as e:
                 rospy.logwarn(f"   无法杀死旧map_server: {e}")
             
-            # 启动新的map_server，加载新的地图
-            subprocess.Popen(['rosrun', 'map_server', 'map_server', yaml_file_path])
+            # 启动新的map_server，加载新的地图（已压缩的地图先还原出PGM）
+            command = ['rosrun', 'map_server', 'map_server', server_yaml(yaml_file_path)]
+            if self.namespace:
+                command.append(f'__ns:={self.namespace}')
+            subprocess.Popen(command)
             rospy.sleep(2)  # 等待新服务器启动
             
             rospy.loginfo(f"✓ 地图服务器已重载，加载了: {yaml_file_path}")
@@ -260,10 +729,13 @@ class VoiceNavManager:
         处理提取的房间信息
         
         Args:
-            msg: 包含房间ID的String消息
+            msg: 包含房间ID的String消息（开启追踪时为JSON信封）
         """
         try:
-            room_id = msg.data.strip()
+            room_id, trace = latency_trace.decode(msg.data)
+            if not self.tracing:
+                trace = None
+            room_id = room_id.strip()
             rospy.loginfo(f"🏠 收到房间指令: {room_id}")
             
             if not self.current_map:
@@ -271,81 +743,345 @@ class VoiceNavManager:
                 status_msg = String()
                 status_msg.data = "no_map_loaded"
                 self.status_pub.publish(status_msg)
+                self._finish_trace(trace, 'no_map_loaded', room_id)
                 return
             
             # 在当前地图中查找房间
             # room_id格式: living_room, bedroom等
             # waypoints中的格式: living room, bedroom等（小写中文或英文）
-            
-            matched_room = None
-            matched_coords = None
-            
-            # 尝试匹配
-            for room_name, coords in self.current_waypoints.items():
-                # 转换room_id为目标格式（用空格代替下划线）
-                room_id_formatted = room_id.replace('_', ' ')
-                
-                if room_id_formatted in room_name or room_name in room_id_formatted:
-                    matched_room = room_name
-                    matched_coords = coords
-                    break
+            # 索引在加载地图时构建: 精确 -> 词/前缀 -> 包含 -> 排序兜底
+            found = self.room_index.lookup(room_id)
+            matched_room = found.name if found else None
+            matched_coords = found.coords if found else None
+            if found and found.stage != 'exact':
+                rospy.loginfo(f"  {room_id} -> {matched_room} ({found.stage})")
+            latency_trace.stamp(trace, 'resolved')
             
             if matched_coords:
-                # 发送导航目标到move_base
-                self._send_navigation_goal(matched_room, matched_coords)
+                # 机器人已在该房间且没有进行中的目标时，不再发送导航目标
+                if self.skip_goal_in_current_room and self.current_room == matched_room:
+                    if self.goal_tracker.snapshot()['state'] not in (goal_tracker.PENDING, goal_tracker.ACTIVE):
+                        rospy.loginfo(f"📍 已在 {matched_room}，不发送导航目标")
+                        self._publish_status(f"already_in_room:{matched_room}")
+                        self._finish_trace(trace, 'already_in_room', matched_room)
+                        return
                 
-                status_msg = String()
-                status_msg.data = f"navigating_to:{matched_room}"
-                self.status_pub.publish(status_msg)
+                # 已知机器人位置时，先用代价矩阵排除不可达的房间
+                travel_costs = self.travel_costs
+                position = self.robot_position
+                if travel_costs is not None and position is not None:
+                    if travel_costs.reachable_from(position[0], position[1], matched_room) is False:
+                        rospy.logwarn(f"⚠️  房间不可达: {matched_room}")
+                        status_msg = String()
+                        status_msg.data = f"room_unreachable:{matched_room}"
+                        self.status_pub.publish(status_msg)
+                        self._finish_trace(trace, 'room_unreachable', matched_room)
+                        return
+                
+                # 发送导航目标到move_base（按指令策略取代当前目标或排队）
+                events = self.goal_tracker.submit(self._make_goal(matched_room, matched_coords, trace))
+                self._handle_goal_events(events)
+                
+                if travel_costs is not None and position is not None:
+                    distance = travel_costs.estimate_from(position[0], position[1], matched_room)
+                    if distance != float('inf'):
+                        status_msg = String()
+                        status_msg.data = f"eta:{matched_room}:{distance:.1f}m:{distance / self.nominal_speed:.0f}s"
+                        self.status_pub.publish(status_msg)
             else:
                 rospy.logwarn(f"⚠️  未在地图中找到房间: {room_id}")
                 status_msg = String()
                 status_msg.data = f"room_not_found:{room_id}"
                 self.status_pub.publish(status_msg)
+                self._finish_trace(trace, 'room_not_found', room_id)
         
         except Exception as e:
             rospy.logerr(f"❌ 房间导航失败: {e}")
     
-    def on_extraction_status(self, msg):
+    def on_robot_pose(self, msg):
+        """记录AMCL估计的机器人位置"""
+        position = msg.pose.pose.position
+        self.robot_position = (position.x, position.y)
+        self._handle_goal_events(self.goal_tracker.on_position(position.x, position.y))
+        self._update_current_room(position.x, position.y)
+    
+    def on_room_cancelled(self, msg):
         """
-        处理语义提取状态
+        取消前往临时房间的导航
         
         Args:
-            msg: 状态消息
+            msg: 包含被取消房间ID的String消息
         """
-        self.extraction_status = msg.data
+        try:
+            rospy.loginfo(f"⏹️  取消临时房间导航: {msg.data}")
+            self._handle_goal_events(self.goal_tracker.cancel_all())
+        
+        except Exception as e:
+            rospy.logerr(f"❌ 取消导航失败: {e}")
     
-    def _send_navigation_goal(self, room_name, coords):
+    def on_stop_command(self, msg):
         """
-        发送导航目标到move_base（由simple_navigation_node处理）
+        处理语音停止指令
         
         Args:
-            room_name: 房间名称
-            coords: 坐标字典 {'x': float, 'y': float, 'z': float}
+            msg: 包含停止指令文本的String消息
         """
         try:
-            goal = PoseStamped()
-            goal.header.frame_id = "map"
-            goal.header.stamp = rospy.Time.now()
+            rospy.loginfo(f"⏹️  语音停止指令: {msg.data}")
+            self._handle_goal_events(self.goal_tracker.cancel_all())
+            self._publish_status("navigation_stopped")
+        
+        except Exception as e:
+            rospy.logerr(f"❌ 停止导航失败: {e}")
+    
+    def on_route_extracted(self, msg):
+        """
+        处理多目标路线：解析房间、确定顺序并前往第一站
+        
+        Args:
+            msg: JSON {"text", "ordered", "rooms": [{"room", "start", "end", "confidence"}]}
+        """
+        try:
+            route = json.loads(msg.data)
+            trace = route.get('trace') if self.tracing else None
+            rospy.loginfo(f"🗺️  收到路线指令: {route.get('text', '')}")
+            
+            if not self.current_map:
+                rospy.logwarn("⚠️  未加载地图，无法导航")
+                self._publish_status("no_map_loaded")
+                self._finish_trace(trace, 'no_map_loaded')
+                return
             
-            # 位置
-            goal.pose.position.x = coords['x']
-            goal.pose.position.y = coords['y']
-            goal.pose.position.z = coords['z']
+            travel_costs = self.travel_costs
+            position = self.robot_position
+            stops = []
+            for stop in route['rooms']:
+                found = self.room_index.lookup(stop['room'])
+                if not found:
+                    rospy.logwarn(f"⚠️  未在地图中找到房间: {stop['room']}")
+                    self._publish_status(f"room_not_found:{stop['room']}")
+                    continue
+                if (travel_costs is not None and position is not None and
+                        travel_costs.reachable_from(position[0], position[1], found.name) is False):
+                    rospy.logwarn(f"⚠️  房间不可达，跳过: {found.name}")
+                    self._publish_status(f"room_unreachable:{found.name}")
+                    continue
+                stops.append((found.name, found.coords))
             
-            # 朝向（四元数，默认朝向前方）
-            goal.pose.orientation.x = 0.0
-            goal.pose.orientation.y = 0.0
-            goal.pose.orientation.z = 0.0
-            goal.pose.orientation.w = 1.0
+            if not route.get('ordered'):
+                # 没有规定顺序：去重后求最短路线
+                stops = list(dict(stops).items())
+                stops = self._optimize_route(stops)
             
-            # 发布导航目标（由simple_navigation_node订阅并处理）
-            self.nav_goal_pub.publish(goal)
+            latency_trace.stamp(trace, 'resolved')
+            if not stops:
+                self._finish_trace(trace, 'room_not_found')
+                return
             
-            rospy.loginfo(f"🎯 发送导航目标: {room_name} ({coords['x']:.2f}, {coords['y']:.2f})")
+            self._publish_status(f"route_planned:{'>'.join(name for name, _ in stops)}")
+            rospy.loginfo(f"✓ 路线: {' -> '.join(name for name, _ in stops)}")
+            # 路线取代当前目标和队列，到达（或放弃）一站后自动前往下一站
+            # 追踪只跟随第一站（语音指令到第一个目标发出的延迟）
+            goals = [self._make_goal(name, coords, trace if i == 0 else None)
+                     for i, (name, coords) in enumerate(stops)]
+            self._handle_goal_events(self.goal_tracker.submit_route(goals))
         
         except Exception as e:
-            rospy.logerr(f"❌ 发送导航目标失败: {e}")
+            rospy.logerr(f"❌ 路线导航失败: {e}")
+    
+    def _optimize_route(self, stops):
+        """
+        按行走代价求最短访问顺序；代价矩阵尚未就绪时用直线距离估计
+        
+        Args:
+            stops: [(房间名, 坐标)]
+        
+        Returns:
+            重新排序后的stops
+        """
+        if len(stops) < 2:
+            return stops
+        
+        travel_costs = self.travel_costs
+        position = self.robot_position
+        names = [name for name, _ in stops]
+        if travel_costs is not None and all(name in travel_costs for name in names):
+            costs = [[travel_costs.cost(a, b) for b in names] for a in names]
+            start_costs = ([travel_costs.estimate_from(position[0], position[1], name) for name in names]
+                           if position is not None else None)
+        else:
+            points = [(coords['x'], coords['y']) for _, coords in stops]
+            costs = [[math.hypot(a[0] - b[0], a[1] - b[1]) for b in points] for a in points]
+            start_costs = ([math.hypot(x - position[0], y - position[1]) for x, y in points]
+                           if position is not None else None)
+        
+        return [stops[i] for i in solve_route(costs, start_costs)]
+    
+    def _wait_for_move_base(self):
+        """后台等待move_base动作服务器"""
+        while not rospy.is_shutdown():
+            if self.move_base_client.wait_for_server(rospy.Duration(5.0)):
+                rospy.loginfo("✓ 已连接move_base动作服务器")
+                return
+            rospy.logwarn("⚠️  等待move_base动作服务器...")
+    
+    def _move_base_worker(self):
+        """按顺序执行状态机发出的发送/取消命令（None表示取消当前目标）"""
+        while not rospy.is_shutdown():
+            try:
+                command = self._move_base_commands.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            try:
+                if command is None:
+                    self.move_base_client.cancel_goal()
+                else:
+                    self._send_move_base_goal(*command)
+            except Exception as e:
+                rospy.logerr(f"❌ move_base命令失败: {e}")
+    
+    def _make_goal(self, room_name, coords, trace=None):
+        """
+        构建导航目标（坐标吸附到与障碍物保持安全距离的位置）
+        
+        Args:
+            room_name: 房间名称
+            coords: 坐标字典 {'x': float, 'y': float, 'z': float[, 'orientation': [x, y, z, w]]}
+            trace: 语音指令的延迟追踪信息
+        
+        Returns:
+            NavGoal
+        """
+        x, y = self._snap_goal(room_name, coords)
+        orientation = coords.get('orientation')
+        return NavGoal(room_name, x, y, coords['z'], trace=trace,
+                       orientation=tuple(orientation) if orientation else None)
+    
+    def _send_move_base_goal(self, nav_goal, token):
+        """
+        通过actionlib发送目标，回调带上token以便状态机忽略过期目标的回报
+        
+        Args:
+            nav_goal: NavGoal
+            token: 状态机分配的目标编号
+        """
+        goal = MoveBaseGoal()
+        goal.target_pose.header.frame_id = "map"
+        goal.target_pose.header.stamp = rospy.Time.now()
+        goal.target_pose.pose.position.x = nav_goal.x
+        goal.target_pose.pose.position.y = nav_goal.y
+        goal.target_pose.pose.position.z = nav_goal.z
+        # 朝向（四元数，航点文件未指定时默认朝向前方）
+        if nav_goal.orientation:
+            (goal.target_pose.pose.orientation.x, goal.target_pose.pose.orientation.y,
+             goal.target_pose.pose.orientation.z, goal.target_pose.pose.orientation.w) = nav_goal.orientation
+        else:
+            goal.target_pose.pose.orientation.w = 1.0
+        
+        self.move_base_client.send_goal(
+            goal,
+            done_cb=lambda state, result: self._on_move_base_done(token, state),
+            active_cb=lambda: self._handle_goal_events(self.goal_tracker.on_active(token)),
+            feedback_cb=lambda feedback: self._handle_goal_events(self.goal_tracker.on_position(
+                feedback.base_position.pose.position.x, feedback.base_position.pose.position.y)))
+        
+        latency_trace.stamp(nav_goal.trace, 'goal_sent')
+        self._finish_trace(nav_goal.trace, 'goal_sent', nav_goal.room)
+        rospy.loginfo(f"🎯 发送导航目标: {nav_goal.room} ({nav_goal.x:.2f}, {nav_goal.y:.2f})")
+    
+    def _finish_trace(self, trace, outcome, room=None):
+        """
+        结束一条延迟追踪：计入阶段耗时统计并写入追踪文件（每条只结束一次）
+        
+        Args:
+            trace: 追踪信息，None时忽略
+            outcome: 结果 (goal_sent / queued / already_in_room / room_not_found / room_unreachable / no_map_loaded)
+            room: 房间名称
+        """
+        if trace is None or 'outcome' in trace:
+            return
+        trace['outcome'] = outcome
+        self.latency_stats.record(trace)
+        if self.trace_sink:
+            try:
+                self.trace_sink.write(trace, outcome, room)
+            except (OSError, ValueError) as e:
+                rospy.logwarn(f"⚠️  写入延迟追踪失败: {e}")
+    
+    def _on_move_base_done(self, token, state):
+        """move_base结束目标：把actionlib的终止状态映射为状态机状态"""
+        if state == GoalStatus.SUCCEEDED:
+            result = goal_tracker.SUCCEEDED
+        elif state in (GoalStatus.PREEMPTED, GoalStatus.RECALLED):
+            result = goal_tracker.PREEMPTED
+        else:
+            result = goal_tracker.ABORTED
+        detail = self.move_base_client.get_goal_status_text() or str(state)
+        self._handle_goal_events(self.goal_tracker.on_done(token, result, detail))
+    
+    def _handle_goal_events(self, events):
+        """
+        发布目标状态变化
+        
+        Args:
+            events: [GoalEvent]
+        """
+        for event in events:
+            goal = event.goal
+            state_msg = String()
+            state_msg.data = json.dumps({
+                'state': event.state,
+                'room': goal.room,
+                'x': round(goal.x, 3),
+                'y': round(goal.y, 3),
+                'route': goal.route,
+                'detail': event.detail,
+                'queued': [queued.room for queued in self.goal_tracker.queue],
+            }, ensure_ascii=False)
+            self.goal_state_pub.publish(state_msg)
+            
+            if event.state == goal_tracker.PENDING:
+                self._publish_status(f"navigating_to:{goal.room}")
+                if goal.route:
+                    self._publish_status(f"route_progress:{goal.room}:{goal.route[0]}/{goal.route[1]}")
+            elif event.state == goal_tracker.QUEUED:
+                rospy.loginfo(f"⏳ 目标排队: {goal.room} (第{event.detail}个)")
+                # 排队等待不计入指令延迟
+                self._finish_trace(goal.trace, 'queued', goal.room)
+                self._publish_status(f"navigation_queued:{goal.room}:{event.detail}")
+            elif event.state == goal_tracker.SUCCEEDED:
+                rospy.loginfo(f"✓ 到达: {goal.room}" + (f" ({event.detail})" if event.detail else ""))
+                self._publish_status(f"navigation_succeeded:{goal.room}")
+                if goal.route:
+                    self._publish_status(f"route_stop_reached:{goal.room}")
+            elif event.state in (goal_tracker.ABORTED, goal_tracker.TIMED_OUT):
+                rospy.logwarn(f"⚠️  导航失败 ({event.state}, {event.detail}): {goal.room}")
+                self._publish_status(f"navigation_{event.state}:{goal.room}")
+                if goal.route:
+                    self._publish_status(f"route_stop_failed:{goal.room}")
+            elif event.state in (goal_tracker.PREEMPTED, goal_tracker.CANCELLED):
+                rospy.loginfo(f"⏹️  目标结束 ({event.state}): {goal.room}")
+                self._publish_status(f"navigation_{event.state}:{goal.room}")
+            
+            # 路线最后一站结束（到达或失败）
+            if (goal.route and goal.route[0] == goal.route[1] and
+                    event.state in (goal_tracker.SUCCEEDED, goal_tracker.ABORTED, goal_tracker.TIMED_OUT)):
+                self._publish_status("route_completed")
+    
+    def _publish_status(self, status):
+        """发布状态信息"""
+        status_msg = String()
+        status_msg.data = status
+        self.status_pub.publish(status_msg)
+    
+    def on_extraction_status(self, msg):
+        """
+        处理语义提取状态
+        
+        Args:
+            msg: 状态消息
+        """
+        self.extraction_status = msg.data
     
     def _publish_map_list(self):
         """发布可用地图列表"""
@@ -362,8 +1098,23 @@ class VoiceNavManager:
             rospy.logwarn(f"⚠️  发布地图列表失败: {e}")
 
 
-if __name__ == '__main__':
+def main():
     try:
-        manager = VoiceNavManager()
+        rospy.init_node('voice_nav_manager', anonymous=True)
+        # 多机器人: 每个命名空间一个管理器（各自的目标状态和指令流），共用地图目录、缓存和追踪文件
+        robots = rospy.get_param('/voice_navigation_manager/robots', [])
+        if robots:
+            managers = [VoiceNavManager(namespace=robots[0])]
+            for namespace in robots[1:]:
+                managers.append(VoiceNavManager(namespace=namespace, resources=managers[0].resources,
+                                                trace_sink=managers[0].trace_sink))
+            rospy.loginfo(f"✓ 共 {len(managers)} 个机器人: {', '.join(robots)}")
+        else:
+            manager = VoiceNavManager()
+        rospy.spin()
     except rospy.ROSInterruptException:
         pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+语音导航融合节点 - 在一个进程中运行 语音识别桥接 + 语义房间提取 + 导航管理器
+三者之间通过进程内队列直接传递消息对象（不序列化、不经过TCPROS回环），
+原有话题仍照常发布，可以用rostopic echo/rosbag观察
+注意：融合模式下管道内部话题只作为输出，外部向这些话题发布的消息不会被处理
+话题在节点的命名空间下解析：<group ns="robot1"> 中启动即为robot1的完整管道
+"""
+
+import resource
+import time
+
+import rospy
+
+from nav_pkg.local_topics import LocalTopic, TeePublisher
+from speech_recognition_node import XfyunSpeechRecognizer
+from semantic_room_extractor import SemanticRoomExtractor
+from voice_nav_manager import VoiceNavManager
+
+
+# 管道内部的话题：桥接 -> 提取 -> 管理器（相对名称，在节点命名空间下解析）
+PIPELINE_TOPICS = (
+    'speech_recognition/text',
+    'speech_recognition/partial',
+    'speech_recognition/stop',
+    'semantic_extraction/room',
+    'semantic_extraction/status',
+    'semantic_extraction/cancel',
+    'semantic_extraction/route',
+)
+
+
+class InProcessTopics:
+    """代替rospy传给各节点：管道内部话题走进程内队列，其它话题照常使用rospy"""
+
+    def __init__(self, names=PIPELINE_TOPICS):
+        # 按解析后的完整名称对应：节点用相对名称，管理器用带命名空间的绝对名称
+        self.local = {}
+        for name in names:
+            resolved = rospy.resolve_name(name)
+            self.local[resolved] = LocalTopic(resolved, on_error=rospy.logerr)
+
+    def Publisher(self, name, data_class, *args, **kwargs):
+        publisher = rospy.Publisher(name, data_class, *args, **kwargs)
+        local = self.local.get(rospy.resolve_name(name))
+        return TeePublisher(publisher, local) if local else publisher
+
+    def Subscriber(self, name, data_class, callback, queue_size=None, **kwargs):
+        local = self.local.get(rospy.resolve_name(name))
+        if local is None:
+            return rospy.Subscriber(name, data_class, callback, queue_size=queue_size, **kwargs)
+        local.subscribe(callback, queue_size or 0)
+        return local
+
+    def close(self):
+        for local in self.local.values():
+            local.close()
+
+
+def main():
+    try:
+        start = time.perf_counter()
+        rospy.init_node('voice_nav_pipeline', anonymous=False)
+        topics = InProcessTopics()
+        rospy.on_shutdown(topics.close)
+
+        # 先创建下游，保证上游发布时订阅者已就绪
+        manager = VoiceNavManager(topics, namespace=rospy.get_namespace())
+        extractor = SemanticRoomExtractor(topics)
+        recognizer = XfyunSpeechRecognizer(topics)
+
+        rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+        rospy.loginfo(f"✓ 融合节点启动完成: {time.perf_counter() - start:.2f}秒, 内存峰值 {rss_mb:.0f} MB")
+        rospy.loginfo(f"  进程内话题: {', '.join(topics.local)}")
+        rospy.spin()
+    except rospy.ROSInterruptException:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+语音导航回放/压力测试工具
+Replay harness and load generator
+
+用法 / Usage:
+  1. 生成合成语料 (burst / noisy / soak)
+     rosrun nav_pkg voice_nav_replay.py generate noisy /tmp/noisy.jsonl --count 500
+
+  2. 直接驱动核心库（无需ROS，桥接过滤 + 房间提取，进程内队列）
+     rosrun nav_pkg voice_nav_replay.py core /tmp/noisy.jsonl --rate 50
+
+  3. 作为模拟IAT向 /xfyun/iat 注入，记录 /semantic_extraction/room 和 /voice_navigation/status
+     rosrun nav_pkg voice_nav_replay.py ros /tmp/noisy.jsonl --speed 2 --partials
+     长时间运行: --repeat 0 (直到Ctrl-C) --report-interval 60
+
+注入的识别结果带关联ID（latency_trace信封），需开启 /advanced/tracing 才能按句统计延迟和准确率
+（mock_iat:=true 的launch自动开启；单独运行时 rosparam set /advanced/tracing true）
+"""
+
+import argparse
+import collections
+import json
+import os
+import random
+import sys
+import threading
+import time
+
+try:
+    import nav_pkg
+except ImportError:  # 未安装时直接使用源码目录
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from nav_pkg import latency_trace
+from nav_pkg.replay import (ReplayRecorder, SCENARIOS, format_report, generate_corpus, load_corpus,
+                            save_corpus, schedule)
+
+
+def _print_report(recorder, dropped=None):
+    report = recorder.report()
+    if dropped is not None:
+        report['queue_dropped'] = dropped
+    for line in format_report(report):
+        print(line)
+    if dropped is not None:
+        print(f"队列丢弃 {dropped}")
+    return report
+
+
+def _inject(plan, send, stop_event, repeat=1, on_round=None):
+    """
+    按计划的时刻调用send(index, utterance)
+
+    Args:
+        plan: [(相对时刻, Utterance)]
+        repeat: 重复次数，0为直到stop_event
+        on_round: 每轮结束后的回调
+    """
+    index = 0
+    rounds = 0
+    span = (plan[-1][0] + 1.0) if plan else 0.0
+    start = time.monotonic()
+    while not stop_event.is_set() and (repeat == 0 or rounds < repeat):
+        for offset, utterance in plan:
+            delay = start + rounds * span + offset - time.monotonic()
+            if delay > 0 and stop_event.wait(delay):
+                return
+            send(index, utterance)
+            index += 1
+        rounds += 1
+        if on_round:
+            on_round(rounds)
+
+
+def _wait_quiet(recorder, timeout):
+    """等待输出不再增加（或超时）"""
+    deadline = time.monotonic() + timeout
+    last = -1
+    while time.monotonic() < deadline:
+        count = len(recorder.outputs) + sum(recorder.statuses.values())
+        if count == last:
+            return
+        last = count
+        time.sleep(min(0.5, timeout))
+
+
+# ============================================
+# generate: 合成语料
+# ============================================
+
+def cmd_generate(args):
+    from nav_pkg.room_extraction import ROOM_MAPPINGS
+
+    rng = random.Random(args.seed)
+    utterances = generate_corpus(args.scenario, args.count, rng, ROOM_MAPPINGS, args.rate)
+    save_corpus(args.output, utterances)
+    rooms = sum(1 for utterance in utterances if utterance.room)
+    print(f"✓ 已生成 {len(utterances)} 句 ({args.scenario}, {utterances[-1].t:.1f}秒, "
+          f"其中含房间 {rooms} 句): {args.output}")
+
+
+# ============================================
+# core: 直接驱动核心库
+# ============================================
+
+def cmd_core(args):
+    from nav_pkg.local_topics import LocalTopic
+    from nav_pkg.waypoints import parse_waypoints
+    from nav_pkg.room_extraction import RoomExtractor
+    from nav_pkg.speech_filters import StopCommandMatcher, UtteranceFilter
+
+    utterances = load_corpus(args.corpus)
+    recorder = ReplayRecorder()
+    extractor = RoomExtractor()
+    if args.waypoints:
+        extractor.update_waypoints(list(parse_waypoints(args.waypoints)))
+    stop_matcher = StopCommandMatcher()
+    utterance_filter = UtteranceFilter(args.duplicate_window)
+
+    # 与融合节点相同：桥接和提取各一个回调线程，中间是有界队列
+    iat_topic = LocalTopic('/xfyun/iat')
+    text_topic = LocalTopic('/speech_recognition/text')
+
+    def bridge(msg):
+        trace_id, text = msg
+        if stop_matcher.match(text):
+            # 与桥接节点的停止快速通道相同：不经过房间提取
+            recorder.on_stop(trace_id)
+            recorder.on_status('navigation_stopped')
+        elif utterance_filter.accept(text):
+            text_topic.publish(msg)
+        else:
+            # 被重复抑制过滤（同一句话在时间窗口内再次出现）
+            recorder.on_status('filtered')
+
+    def extract(msg):
+        trace_id, text = msg
+        text = text.lower().strip()
+        stops, _ = extractor.extract_rooms(text)
+        room = stops[0].room if len(stops) >= 2 else extractor.extract(text)[0]
+        if room:
+            recorder.on_room(trace_id, room)
+            recorder.on_status('route' if len(stops) >= 2 else 'detected')
+        else:
+            recorder.on_status('no_room_detected')
+
+    iat_topic.subscribe(bridge, args.queue_size)
+    text_topic.subscribe(extract, args.queue_size)
+
+    def send(index, utterance):
+        trace_id = f'replay-{index}'
+        recorder.on_injected(trace_id, utterance)
+        iat_topic.publish((trace_id, utterance.text))
+
+    if args.rate == 0:
+        # 不限速：尽可能快地注入
+        for index, utterance in enumerate(utterances * max(1, args.repeat)):
+            send(index, utterance)
+    else:
+        _inject(schedule(utterances, args.rate, args.speed), send, threading.Event(), max(1, args.repeat))
+    _wait_quiet(recorder, args.timeout)
+    iat_topic.close()
+    text_topic.close()
+    report = _print_report(recorder, iat_topic.dropped + text_topic.dropped)
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False))
+
+
+# ============================================
+# ros: 模拟IAT，注入到ROS话题
+# ============================================
+
+def cmd_ros(args):
+    import rospy
+    from std_msgs.msg import String
+    from nav_pkg.speech_filters import StopCommandMatcher
+
+    utterances = load_corpus(args.corpus)
+    rospy.init_node('voice_nav_replay', anonymous=True)
+    recorder = ReplayRecorder()
+    # 停止指令不带关联ID地发布到 speech_recognition/stop（在取消和零速度之后），按注入顺序对应
+    stop_matcher = StopCommandMatcher(rospy.get_param('/speech_recognition/stop_words', None))
+    pending_stops = collections.deque()
+
+    def on_stop(msg):
+        if pending_stops:
+            recorder.on_stop(pending_stops.popleft())
+
+    def on_room(msg):
+        room, trace = latency_trace.decode(msg.data)
+        recorder.on_room(trace['id'] if trace else None, room.strip())
+
+    def on_route(msg):
+        route = json.loads(msg.data)
+        trace = route.get('trace')
+        if route.get('rooms'):
+            recorder.on_room(trace['id'] if trace else None, route['rooms'][0]['room'])
+
+    rospy.Subscriber('semantic_extraction/room', String, on_room, queue_size=1000)
+    rospy.Subscriber('semantic_extraction/route', String, on_route, queue_size=1000)
+    rospy.Subscriber('voice_navigation/status', String, lambda msg: recorder.on_status(msg.data),
+                     queue_size=1000)
+    rospy.Subscriber('speech_recognition/stop', String, on_stop, queue_size=1000)
+    iat_pub = rospy.Publisher('xfyun/iat', String, queue_size=1000)
+    partial_pub = rospy.Publisher(rospy.get_param('/speech_recognition/partial_topic', 'xfyun/iat_partial'),
+                                  String, queue_size=1000)
+
+    # 等待语音桥接节点订阅
+    deadline = time.monotonic() + args.connect_timeout
+    while iat_pub.get_num_connections() == 0 and time.monotonic() < deadline and not rospy.is_shutdown():
+        time.sleep(0.1)
+    if iat_pub.get_num_connections() == 0:
+        rospy.logwarn(f"⚠️  {iat_pub.resolved_name} 没有订阅者（语音识别桥接节点未启动？）")
+    if not rospy.get_param('/advanced/tracing', False):
+        rospy.logwarn("⚠️  /advanced/tracing 未开启，桥接节点不会转发关联ID，无法按句统计延迟和准确率")
+
+    def send(index, utterance):
+        if args.partials:
+            for partial in utterance.partials:
+                partial_pub.publish(String(data=partial))
+                time.sleep(args.partial_interval)
+        trace = latency_trace.start_trace()
+        trace['id'] = f'replay-{index}'
+        recorder.on_injected(trace['id'], utterance, trace['stamps']['iat'])
+        if stop_matcher.match(utterance.text):
+            pending_stops.append(trace['id'])
+        iat_pub.publish(String(data=latency_trace.encode(utterance.text, trace)))
+
+    stop_event = threading.Event()
+    rospy.on_shutdown(stop_event.set)
+    last_report = [time.monotonic()]
+
+    def on_round(rounds):
+        if args.report_interval > 0 and time.monotonic() - last_report[0] >= args.report_interval:
+            last_report[0] = time.monotonic()
+            print(f"--- 第 {rounds} 轮 ---")
+            _print_report(recorder)
+
+    rospy.loginfo(f"🎤 模拟IAT: {len(utterances)} 句 -> {iat_pub.resolved_name}")
+    _inject(schedule(utterances, args.rate, args.speed), send, stop_event, args.repeat, on_round)
+    _wait_quiet(recorder, args.timeout)
+    report = _print_report(recorder)
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False))
+
+
+def _strip_ros_args(argv):
+    """去掉roslaunch附加的 __name:= / __log:= 参数"""
+    return [arg for arg in argv if ':=' not in arg]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='语音导航回放/压力测试')
+    parser.add_argument('--seed', type=int, default=42)
+    subparsers = parser.add_subparsers(dest='command')
+
+    generate_parser = subparsers.add_parser('generate', help='生成合成语料')
+    generate_parser.add_argument('scenario', choices=SCENARIOS)
+    generate_parser.add_argument('output')
+    generate_parser.add_argument('--count', type=int, default=200)
+    generate_parser.add_argument('--rate', type=float, default=2.0, help='平均每秒语句数')
+    generate_parser.set_defaults(func=cmd_generate)
+
+    for name, func, help_text in (('core', cmd_core, '直接驱动核心库（无需ROS）'),
+                                  ('ros', cmd_ros, '作为模拟IAT注入ROS话题')):
+        sub = subparsers.add_parser(name, help=help_text)
+        sub.add_argument('corpus')
+        sub.add_argument('--rate', type=float, default=None,
+                         help='固定速率（句/秒），默认按语料时间；core模式下0为不限速')
+        sub.add_argument('--speed', type=float, default=1.0, help='语料时间的播放倍速')
+        sub.add_argument('--repeat', type=int, default=1, help='重复次数，ros模式下0为直到Ctrl-C')
+        sub.add_argument('--timeout', type=float, default=3.0, help='注入结束后等待输出的时间（秒）')
+        sub.add_argument('--json', action='store_true', help='另外输出JSON格式的统计')
+        sub.set_defaults(func=func)
+        if name == 'core':
+            sub.add_argument('--queue-size', type=int, default=10)
+            sub.add_argument('--duplicate-window', type=float, default=2.0)
+            sub.add_argument('--waypoints', help='waypoints.xml，加入航点名称词表')
+        else:
+            sub.add_argument('--partials', action='store_true', help='先发布中间结果')
+            sub.add_argument('--partial-interval', type=float, default=0.05)
+            sub.add_argument('--connect-timeout', type=float, default=5.0)
+            sub.add_argument('--report-interval', type=float, default=0.0, help='长时间运行时每隔多少秒输出统计')
+
+    args = parser.parse_args(_strip_ros_args(sys.argv)[1:])
+    if not getattr(args, 'func', None):
+        parser.print_help()
+        return
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,13 @@
+# -*- coding: utf-8 -*-
+# 由catkin_python_setup()调用，不要直接运行 python setup.py install
+# 在没有ROS的机器上也可以 pip install -e . 以便导入和基准测试 nav_pkg 核心库
+from setuptools import setup
+
+try:
+    from catkin_pkg.python_setup import generate_distutils_setup
+except ImportError:  # 没有catkin时按普通Python包安装
+    setup_args = dict(name='nav_pkg', version='0.0.0', packages=['nav_pkg'], package_dir={'': 'src'})
+else:
+    setup_args = generate_distutils_setup(packages=['nav_pkg'], package_dir={'': 'src'})
+
+setup(**setup_args)
@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+"""
+nav_pkg - 语音导航的核心逻辑（不依赖ROS）
+房间词提取、地图目录/加载、房间查找、目标吸附、行走代价、路线规划、导航目标状态机、延迟追踪等；
+scripts/下的节点只是在这些模块之上订阅/发布ROS话题
+子模块按需导入（numpy/scipy只在地图相关模块中使用）
+"""
@@ -0,0 +1,263 @@
+# -*- coding: utf-8 -*-
+"""
+房间别名模糊匹配 - 拼音 + 音节倒排索引
+用于精确匹配失败时容错IAT的同音字/近音字误识别（如 "书芳" -> "书房"）
+"""
+
+import functools
+import threading
+from collections import Counter
+from itertools import chain
+
+from .room_matcher import RoomMatch
+
+try:
+    from pypinyin import lazy_pinyin
+except ImportError:  # 未安装pypinyin时退化为按字符比较
+    lazy_pinyin = None
+
+
+# 常见口音/识别混淆的声母韵母归一化（平翘舌、前后鼻音）
+_INITIAL_FOLDS = (('zh', 'z'), ('ch', 'c'), ('sh', 's'))
+_FINAL_FOLDS = (('ang', 'an'), ('eng', 'en'), ('ing', 'in'))
+
+# 模糊命中的置信度上限（低于精确匹配）
+FUZZY_CONFIDENCE = 0.8
+
+
+def _fold_syllable(syllable):
+    """归一化单个拼音音节"""
+    for source, target in _INITIAL_FOLDS:
+        if syllable.startswith(source):
+            syllable = target + syllable[len(source):]
+            break
+    for source, target in _FINAL_FOLDS:
+        if syllable.endswith(source):
+            syllable = syllable[:-len(source)] + target
+            break
+    return syllable
+
+
+@functools.lru_cache(maxsize=None)
+def _char_key(char):
+    """单字的归一化音节（逐字缓存，别名和语句使用同一映射）"""
+    if lazy_pinyin is None:
+        return char
+    syllables = lazy_pinyin(char, errors=lambda chars: list(chars))
+    return _fold_syllable(syllables[0]) if len(syllables) == 1 else char
+
+
+def phonetic_keys(text):
+    """
+    将文本转换为逐字的音节序列
+
+    Args:
+        text: 输入文本（已转小写）
+
+    Returns:
+        keys: 与text等长的音节元组（无pypinyin时为字符本身）
+    """
+    return tuple(_char_key(char) for char in text)
+
+
+def edit_distance(a, b, limit=None):
+    """
+    序列编辑距离（Levenshtein）
+
+    Args:
+        a, b: 序列
+        limit: 距离上限，超过时提前返回 limit + 1
+
+    Returns:
+        distance: 编辑距离
+    """
+    if len(a) < len(b):
+        a, b = b, a
+    if limit is not None and len(a) - len(b) > limit:
+        return limit + 1
+
+    previous = list(range(len(b) + 1))
+    for i, item_a in enumerate(a, 1):
+        current = [i]
+        for j, item_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1,
+                               current[j - 1] + 1,
+                               previous[j - 1] + (item_a != item_b)))
+        if limit is not None and min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+def substring_distance(pattern, text, limit=None):
+    """
+    pattern与text任意子串之间的最小编辑距离（Sellers算法，一次DP）
+
+    Args:
+        pattern: 别名音节序列
+        text: 语句音节序列
+        limit: 距离上限，整行都超过时提前返回 (limit + 1, 0, 0)
+
+    Returns:
+        (distance, start, end): 最小距离及对应子串区间
+    """
+    # 第0行全为0：匹配可以从text任意位置开始；同时记录每个单元格的起点
+    previous = [0] * (len(text) + 1)
+    previous_start = list(range(len(text) + 1))
+    for i, item in enumerate(pattern, 1):
+        current = [i]
+        current_start = [0]
+        for j, text_item in enumerate(text, 1):
+            options = (
+                (previous[j - 1] + (item != text_item), previous_start[j - 1]),
+                (previous[j] + 1, previous_start[j]),
+                (current[j - 1] + 1, current_start[j - 1]),
+            )
+            distance, start = min(options)
+            current.append(distance)
+            current_start.append(start)
+        if limit is not None and min(current) > limit:
+            return limit + 1, 0, 0
+        previous, previous_start = current, current_start
+
+    best_end = min(range(len(text) + 1), key=lambda j: (previous[j], -(j - previous_start[j])))
+    return previous[best_end], previous_start[best_end], best_end
+
+
+class FuzzyRoomIndex:
+    """
+    预计算的房间别名拼音索引
+    音节倒排表做候选过滤（k处编辑至多破坏k个不同音节），只对少量候选做子串编辑距离
+    可增量更新：随地图变化的航点名称只增删有变化的别名及其倒排项
+    """
+
+    def __init__(self, mappings, min_confidence=0.5, min_alias_length=2, max_edit_distance=2):
+        """
+        构建索引
+
+        Args:
+            mappings: {room_id: [alias, ...]} 别名表
+            min_confidence: 接受模糊命中的最低置信度
+            min_alias_length: 参与模糊匹配的最短别名长度（过短的别名误报太多）
+            max_edit_distance: 允许的最大音节编辑距离
+        """
+        self.min_confidence = min_confidence
+        self.min_alias_length = min_alias_length
+        self.max_edit_distance = max_edit_distance
+        self._entries = {}     # entry序号 -> (音节序列, room_id, alias, 至少需要命中的不同音节数)
+        self._entry_ids = {}   # (alias, room_id) -> entry序号
+        self._postings = {}    # 音节 -> {entry序号}
+        self._rooms = {}       # room_id -> (原始别名列表, 参与匹配的别名列表)
+        self._next_id = 0
+        self._lock = threading.Lock()          # 保护索引结构（搜索与更新之间）
+        self._update_lock = threading.Lock()   # 同时只有一个更新
+        self.update(mappings)
+
+    def update(self, mappings):
+        """
+        将索引内容更新为mappings，只增删别名有变化的房间的倒排项
+
+        Args:
+            mappings: {room_id: [alias, ...]} 别名表
+
+        Returns:
+            (added, removed): 新增和删除的别名数量
+        """
+        with self._update_lock:
+            # 别名列表未变的房间直接跳过；新别名的音节在锁外计算（更新的主要开销），不阻塞搜索
+            rooms = self._rooms
+            min_length = self.min_alias_length
+            changes = [(room_id, None, keys, (), ()) for room_id, (_, keys) in rooms.items() if room_id not in mappings]
+            for room_id, aliases in mappings.items():
+                old = rooms.get(room_id)
+                if old is not None and old[0] == aliases:
+                    continue
+                old_keys = old[1] if old is not None else ()
+                keys, new_aliases = [], []
+                for alias in aliases:
+                    alias = alias.lower().strip()
+                    if len(alias) >= min_length and alias not in keys:
+                        keys.append(alias)
+                        if alias not in old_keys:
+                            new_aliases.append((alias, phonetic_keys(alias)))
+                changes.append((room_id, list(aliases), old_keys, keys, new_aliases))
+
+            added = removed = 0
+            entries, entry_ids, postings = self._entries, self._entry_ids, self._postings
+            with self._lock:
+                for room_id, aliases, old_keys, keys, new_aliases in changes:
+                    if aliases is None:
+                        del rooms[room_id]
+                    else:
+                        rooms[room_id] = (aliases, keys)
+
+                    for alias in old_keys:
+                        if alias in keys:
+                            continue
+                        entry_id = entry_ids.pop((alias, room_id))
+                        for key in set(entries.pop(entry_id)[0]):
+                            posting = postings[key]
+                            posting.discard(entry_id)
+                            if not posting:
+                                del postings[key]
+                        removed += 1
+
+                    for alias, syllables in new_aliases:
+                        distinct = set(syllables)
+                        entry_id = self._next_id
+                        self._next_id += 1
+                        entries[entry_id] = (syllables, room_id, alias,
+                                             max(1, len(distinct) - self.max_distance(len(syllables))))
+                        entry_ids[(alias, room_id)] = entry_id
+                        for key in distinct:
+                            posting = postings.get(key)
+                            if posting is None:
+                                postings[key] = {entry_id}
+                            else:
+                                posting.add(entry_id)
+                        added += 1
+        return added, removed
+
+    def max_distance(self, length):
+        """长度为length的别名允许的最大编辑距离（由置信度阈值反推）"""
+        radius = int(length * (1.0 - self.min_confidence / FUZZY_CONFIDENCE) + 1e-9)
+        return min(radius, self.max_edit_distance)
+
+    def search(self, text):
+        """
+        在文本中模糊查找房间别名
+
+        Args:
+            text: 输入文本（已转小写）
+
+        Returns:
+            (RoomMatch, confidence) 或 (None, 0.0)
+        """
+        keys = phonetic_keys(text)
+
+        with self._lock:
+            # 1. 倒排表计数，筛出共享音节足够多的候选
+            counts = Counter(chain.from_iterable(self._postings.get(key, ()) for key in set(keys)))
+            entries = self._entries
+            candidates = [entries[entry_id] for entry_id, count in counts.items() if count >= entries[entry_id][3]]
+
+        # 2. 对候选做子串编辑距离校验
+        best = None
+        best_score = (0.0, 0)
+        for alias_keys, room_id, alias, _ in candidates:
+            radius = self.max_distance(len(alias_keys))
+            distance, start, end = substring_distance(alias_keys, keys, limit=radius)
+            if distance > radius:
+                continue
+
+            confidence = FUZZY_CONFIDENCE * (1.0 - distance / max(len(alias_keys), end - start))
+            # 置信度相同时优先覆盖更长的片段
+            score = (confidence, end - start)
+            if confidence >= self.min_confidence and score > best_score:
+                best_score = score
+                best = (RoomMatch(start, end, room_id, alias), confidence)
+
+        return best if best else (None, 0.0)
+
+    def __len__(self):
+        return len(self._entries)
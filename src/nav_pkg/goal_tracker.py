@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+"""
+导航目标生命周期 - 非阻塞状态机
+跟踪当前目标（等待/执行中/到达/失败/超时/被抢占/取消）及排队的目标，
+通过注入的send/cancel函数驱动move_base，不依赖ROS
+"""
+
+import math
+import threading
+import time
+from collections import deque, namedtuple
+
+
+# route: 路线中的位置 (序号, 总站数)，单个目标为None; trace: 语音指令的延迟追踪信息;
+# orientation: 航点文件中的朝向四元数 (x, y, z, w)，未指定时为None
+NavGoal = namedtuple('NavGoal', ['room', 'x', 'y', 'z', 'route', 'trace', 'orientation'])
+NavGoal.__new__.__defaults__ = (None, None, None)
+
+# state: 目标进入的状态; detail: 补充信息（如失败原因）
+GoalEvent = namedtuple('GoalEvent', ['state', 'goal', 'detail'])
+
+PENDING = 'pending'        # 已发送，move_base尚未接受
+ACTIVE = 'active'          # move_base正在执行
+SUCCEEDED = 'succeeded'    # 到达（move_base报告成功或进入容差范围）
+ABORTED = 'aborted'        # move_base规划/执行失败或拒绝
+TIMED_OUT = 'timed_out'    # 超过navigation_timeout
+PREEMPTED = 'preempted'    # 被新的指令取代
+CANCELLED = 'cancelled'    # 被取消指令终止
+QUEUED = 'queued'          # 进入等待队列
+
+FINAL_STATES = (SUCCEEDED, ABORTED, TIMED_OUT, PREEMPTED, CANCELLED)
+
+POLICIES = ('preempt', 'queue')
+
+
+class GoalTracker:
+    """导航目标状态机"""
+
+    def __init__(self, send, cancel, timeout=60.0, tolerance=0.5, policy='preempt', max_queue=10,
+                 clock=time.monotonic):
+        """
+        Args:
+            send: 发送函数 send(goal, token)，结果需通过 on_active/on_done(token, ...) 回报；
+                  在状态机的锁内调用，不应阻塞或同步回调状态机
+            cancel: 取消当前目标的函数 cancel()，要求同上
+            timeout: 单个目标的超时时间（秒），<=0 时不限
+            tolerance: 到达判定半径（米），机器人进入该范围即视为到达，<=0 时只看move_base结果
+            policy: 'preempt' 新指令立即取代当前目标; 'queue' 新指令排队
+            max_queue: 队列最大长度，超出时丢弃最早的
+            clock: 单调时钟函数
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"未知的指令策略: {policy}")
+        self.send = send
+        self.cancel = cancel
+        self.timeout = timeout
+        self.tolerance = tolerance
+        self.policy = policy
+        self.clock = clock
+
+        self.current = None
+        self.state = None
+        self.started = None
+        self.queue = deque(maxlen=max_queue)
+        self._token = 0
+        self._lock = threading.RLock()
+
+    # ---------- 指令 ----------
+
+    def submit(self, goal, policy=None):
+        """
+        提交一个新目标
+
+        Args:
+            goal: NavGoal
+            policy: 覆盖默认策略
+
+        Returns:
+            [GoalEvent]
+        """
+        with self._lock:
+            if (policy or self.policy) == 'queue' and self.current is not None:
+                self.queue.append(goal)
+                return [GoalEvent(QUEUED, goal, str(len(self.queue)))]
+            events = self._stop_current(PREEMPTED)
+            self.queue.clear()
+            return events + self._dispatch(goal)
+
+    def submit_route(self, goals):
+        """
+        用一条路线替换当前目标和队列，依次执行
+
+        Returns:
+            [GoalEvent]
+        """
+        with self._lock:
+            events = self._stop_current(PREEMPTED)
+            self.queue.clear()
+            if not goals:
+                return events
+            total = len(goals)
+            goals = [goal._replace(route=(i + 1, total)) for i, goal in enumerate(goals)]
+            self.queue.extend(goals[1:])
+            return events + self._dispatch(goals[0])
+
+    def cancel_all(self):
+        """取消当前目标并清空队列"""
+        with self._lock:
+            self.queue.clear()
+            return self._stop_current(CANCELLED)
+
+    # ---------- move_base回报 ----------
+
+    def on_active(self, token):
+        with self._lock:
+            if token != self._token or self.state != PENDING:
+                return []
+            self.state = ACTIVE
+            return [GoalEvent(ACTIVE, self.current, None)]
+
+    def on_done(self, token, state, detail=None):
+        """
+        move_base结束目标
+
+        Args:
+            token: send时给出的编号，过期的回报被忽略
+            state: SUCCEEDED / ABORTED / PREEMPTED
+            detail: 补充信息
+        """
+        with self._lock:
+            if token != self._token or self.current is None:
+                return []
+            if state == PREEMPTED:
+                # 不是本状态机发起的抢占（如外部的/move_base/cancel）：视为取消，不再执行队列
+                self.queue.clear()
+                state = CANCELLED
+            return self._finish(state, detail)
+
+    def on_position(self, x, y):
+        """机器人位置更新：进入容差范围即视为到达，并取消move_base的剩余微调"""
+        with self._lock:
+            if self.current is None or self.tolerance <= 0 or self.state != ACTIVE:
+                return []
+            distance = math.hypot(x - self.current.x, y - self.current.y)
+            if distance > self.tolerance:
+                return []
+            self.cancel()
+            return self._finish(SUCCEEDED, f"within {distance:.2f}m")
+
+    def tick(self):
+        """定时检查超时"""
+        with self._lock:
+            if self.current is None or self.timeout <= 0:
+                return []
+            if self.clock() - self.started < self.timeout:
+                return []
+            self.cancel()
+            return self._finish(TIMED_OUT, f"{self.timeout:g}s")
+
+    # ---------- 内部 ----------
+
+    def _dispatch(self, goal):
+        self._token += 1
+        self.current = goal
+        self.state = PENDING
+        self.started = self.clock()
+        self.send(goal, self._token)
+        return [GoalEvent(PENDING, goal, None)]
+
+    def _stop_current(self, state):
+        if self.current is None:
+            return []
+        self.cancel()
+        goal = self.current
+        self._token += 1  # 让旧目标的迟到回报失效
+        self.current = self.state = self.started = None
+        return [GoalEvent(state, goal, None)]
+
+    def _finish(self, state, detail):
+        """结束当前目标，并开始队列中的下一个"""
+        goal = self.current
+        self._token += 1
+        self.current = self.state = self.started = None
+        events = [GoalEvent(state, goal, detail)]
+        if self.queue:
+            events += self._dispatch(self.queue.popleft())
+        return events
+
+    def snapshot(self):
+        """当前目标和队列（用于状态发布）"""
+        with self._lock:
+            return {
+                'state': self.state or 'idle',
+                'room': self.current.room if self.current else None,
+                'queued': [goal.room for goal in self.queue],
+                'elapsed': round(self.clock() - self.started, 1) if self.started is not None else None,
+            }
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""
+语音导航链路延迟追踪 - 每句话带一个关联ID和各阶段的单调时间戳
+语音桥接 -> 房间提取 -> 导航管理器 之间仍然使用std_msgs/String：
+追踪开启时消息内容为JSON信封 {"data": 原内容, "trace": {...}}，decode同时接受普通文本
+时间戳来自time.monotonic()（系统范围的CLOCK_MONOTONIC），各节点需运行在同一台机器上
+不依赖ROS
+"""
+
+import csv
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+
+
+# 各阶段按顺序：IAT结果到达桥接节点、桥接转发、房间提取完成、房间解析为航点、目标发送到move_base
+STAGES = ('iat', 'bridged', 'extracted', 'resolved', 'goal_sent')
+
+PERCENTILES = (0.5, 0.95, 0.99)
+
+
+def start_trace(stage=STAGES[0], clock=time.monotonic):
+    """
+    开始一条追踪
+
+    Returns:
+        {'id': 关联ID, 'stamps': {阶段: 单调时间(秒)}}
+    """
+    return {'id': uuid.uuid4().hex[:12], 'stamps': {stage: clock()}}
+
+
+def stamp(trace, stage, clock=time.monotonic):
+    """记录阶段时间戳（trace为None时忽略）"""
+    if trace is not None:
+        trace['stamps'][stage] = clock()
+    return trace
+
+
+def encode(data, trace):
+    """
+    把消息内容和追踪信息打包为String的内容
+
+    Args:
+        data: 原消息内容（文本或房间ID）
+        trace: 追踪信息，None时原样返回data
+    """
+    if trace is None:
+        return data
+    return json.dumps({'data': data, 'trace': trace}, ensure_ascii=False)
+
+
+def decode(data):
+    """
+    解包String的内容
+
+    Returns:
+        (data, trace): 普通文本（未开启追踪的节点发出的）返回 (原文, None)
+    """
+    if not data.startswith('{'):
+        return data, None
+    try:
+        envelope = json.loads(data)
+    except ValueError:
+        return data, None
+    if not isinstance(envelope, dict) or 'data' not in envelope or 'trace' not in envelope:
+        return data, None
+    return envelope['data'], envelope['trace']
+
+
+def stage_deltas(trace):
+    """
+    相邻阶段之间的耗时及总耗时（秒）
+
+    Returns:
+        {'iat>bridged': 秒, ..., 'total': 秒}，只包含追踪中已有的阶段
+    """
+    stamps = trace['stamps']
+    present = [stage for stage in STAGES if stage in stamps]
+    deltas = {f'{a}>{b}': stamps[b] - stamps[a] for a, b in zip(present, present[1:])}
+    if len(present) >= 2:
+        deltas['total'] = stamps[present[-1]] - stamps[present[0]]
+    return deltas
+
+
+class LatencyStats:
+    """各阶段耗时的滚动窗口（最近window条），用于p50/p95/p99"""
+
+    def __init__(self, window=1000):
+        self.window = window
+        self._samples = {}
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def record(self, trace):
+        """记录一条追踪的各阶段耗时"""
+        if trace is None:
+            return
+        with self._lock:
+            for key, seconds in stage_deltas(trace).items():
+                self._samples.setdefault(key, deque(maxlen=self.window)).append(seconds)
+                self._counts[key] = self._counts.get(key, 0) + 1
+
+    def summary(self):
+        """
+        Returns:
+            {阶段: {'count': 累计条数, 'p50': 毫秒, 'p95': 毫秒, 'p99': 毫秒}}
+        """
+        with self._lock:
+            snapshot = {key: sorted(samples) for key, samples in self._samples.items()}
+            counts = dict(self._counts)
+        result = {}
+        for key, samples in snapshot.items():
+            entry = {'count': counts[key]}
+            for p in PERCENTILES:
+                # 最近秩法
+                entry[f'p{round(p * 100)}'] = samples[min(len(samples) - 1, int(len(samples) * p))] * 1000.0
+            result[key] = entry
+        return result
+
+    def diagnostic_values(self):
+        """
+        Returns:
+            [(键, 值字符串)]，供节点转为diagnostic_msgs/KeyValue
+        """
+        values = []
+        for key, entry in sorted(self.summary().items(), key=lambda item: _stage_order(item[0])):
+            values.append((f'{key} count', str(entry['count'])))
+            for p in PERCENTILES:
+                name = f'p{round(p * 100)}'
+                values.append((f'{key} {name} ms', f'{entry[name]:.3f}'))
+        return values
+
+
+def _stage_order(key):
+    """诊断输出中按链路顺序排列，total在最后"""
+    if key == 'total':
+        return len(STAGES)
+    return STAGES.index(key.split('>')[0])
+
+
+class TraceSink:
+    """把结束的追踪逐行写入文件：.csv为CSV，其它扩展名为JSONL"""
+
+    FIELDS = ('id', 'outcome', 'room') + STAGES + ('total_ms',)
+
+    def __init__(self, path):
+        """
+        Args:
+            path: 输出文件路径（追加写入）
+        """
+        self.path = os.path.expanduser(path)
+        self.csv = self.path.endswith('.csv')
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        new_file = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        self._file = open(self.path, 'a', encoding='utf-8', newline='')
+        self._writer = csv.writer(self._file) if self.csv else None
+        self._lock = threading.Lock()
+        if self.csv and new_file:
+            self._writer.writerow(self.FIELDS)
+            self._file.flush()
+
+    def write(self, trace, outcome, room=None):
+        """
+        写入一条追踪
+
+        Args:
+            trace: 追踪信息
+            outcome: 结果（goal_sent / queued / room_not_found / ...）
+            room: 房间名称
+        """
+        stamps = trace['stamps']
+        total = stage_deltas(trace).get('total')
+        with self._lock:
+            if self.csv:
+                self._writer.writerow([trace['id'], outcome, room or ''] +
+                                      [f'{stamps[stage]:.6f}' if stage in stamps else '' for stage in STAGES] +
+                                      [f'{total * 1000:.3f}' if total is not None else ''])
+            else:
+                self._file.write(json.dumps({
+                    'id': trace['id'],
+                    'outcome': outcome,
+                    'room': room,
+                    'stamps': stamps,
+                    'total_ms': round(total * 1000, 3) if total is not None else None,
+                }, ensure_ascii=False) + '\n')
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
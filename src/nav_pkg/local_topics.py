@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+进程内话题 - 融合模式下节点之间直接传递消息对象（不序列化、不经过TCPROS回环）
+语义与rospy订阅者一致：每个订阅者一个回调线程，按顺序处理，队列满时丢弃最旧的消息
+不依赖ROS
+"""
+
+import queue
+import sys
+import threading
+import traceback
+
+
+class LocalTopic:
+    """进程内话题"""
+
+    def __init__(self, name, on_error=None):
+        """
+        Args:
+            name: 话题名（仅用于线程名和日志）
+            on_error: 回调 on_error(message)，报告订阅者回调抛出的异常（含调用栈）；
+                      None时写到stderr。与rospy一样，出错的消息被跳过，订阅者线程继续处理后面的消息
+        """
+        self.name = name
+        self.on_error = on_error or (lambda message: sys.stderr.write(message + '\n'))
+        self._subscribers = []
+        self.dropped = 0
+        self.errors = 0
+
+    def subscribe(self, callback, queue_size=10):
+        """
+        添加订阅者，在单独的线程中按顺序调用callback(msg)
+
+        Args:
+            callback: 回调函数
+            queue_size: 队列长度，<=0 不限
+        """
+        pending = queue.Queue(maxsize=max(0, queue_size))
+        thread = threading.Thread(target=self._dispatch, args=(pending, callback),
+                                  name=f'local{self.name}', daemon=True)
+        self._subscribers.append(pending)
+        thread.start()
+
+    def publish(self, msg):
+        """把同一个消息对象投递给所有订阅者"""
+        for pending in self._subscribers:
+            self._put(pending, msg)
+
+    def _put(self, pending, msg):
+        """不阻塞地放入队列，队列满时丢弃最旧的消息"""
+        while True:
+            try:
+                pending.put_nowait(msg)
+                return
+            except queue.Full:
+                try:
+                    pending.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def _dispatch(self, pending, callback):
+        while True:
+            msg = pending.get()
+            if msg is None:
+                return
+            try:
+                callback(msg)
+            except Exception:
+                self.errors += 1
+                self.on_error(f"{self.name} 回调出错:\n{traceback.format_exc().rstrip()}")
+
+    def close(self):
+        """停止所有订阅者线程（不阻塞：订阅者卡在回调里、队列已满时丢弃最旧的消息放入结束标记）"""
+        for pending in self._subscribers:
+            self._put(pending, None)
+        self._subscribers = []
+
+
+class TeePublisher:
+    """先投递到进程内话题，再照常发布到ROS话题（供rostopic echo/rosbag观察）"""
+
+    def __init__(self, publisher, local_topic):
+        """
+        Args:
+            publisher: rospy.Publisher（或任何有publish方法的对象）
+            local_topic: LocalTopic
+        """
+        self.publisher = publisher
+        self.local_topic = local_topic
+
+    def publish(self, msg):
+        self.local_topic.publish(msg)
+        self.publisher.publish(msg)
+
+    def __getattr__(self, name):
+        # get_num_connections / unregister 等转给原发布者
+        return getattr(self.publisher, name)
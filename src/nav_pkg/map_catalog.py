@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-
+"""
+地图目录缓存 - 持久化的地图版本索引
+将每个map_*文件夹解析出的房间表、文件路径和时间戳保存到地图目录旁的目录文件中，
+重启时只重新解析新增或有变化（mtime/大小不同）的文件夹
+"""
+
+import json
+import os
+import tempfile
+
+from .waypoints import parse_waypoints
+
+
+CATALOG_FILENAME = '.map_catalog.json'
+# 2: 航点带朝向，格式错误的航点被跳过
+CATALOG_VERSION = 2
+
+
+def resolve_maps_path(maps_path):
+    """
+    解析地图目录参数：支持绝对路径、~开头的家目录路径和相对于ROS工作空间的路径
+
+    Args:
+        maps_path: semantic_maps_path参数值
+
+    Returns:
+        绝对路径
+    """
+    if maps_path.startswith('/'):
+        return maps_path
+    if maps_path.startswith('~'):
+        return os.path.expanduser(maps_path)
+    ros_workspace = os.environ.get('ROS_WORKSPACE', os.path.expanduser('~/catkin_ws'))
+    return os.path.join(ros_workspace, maps_path)
+
+
+def map_summary(map_info):
+    """
+    地图列表中的一行（不访问文件系统，大小取自目录中记录的三个必要文件）
+
+    Args:
+        map_info: MapCatalog中的地图信息
+
+    Returns:
+        {'name', 'timestamp', 'rooms': 房间数, 'size': 字节数}
+    """
+    return {
+        'name': map_info['name'],
+        'timestamp': map_info['timestamp'],
+        'rooms': len(map_info['rooms']),
+        'size': sum(size for _, size in map_info['signature']),
+    }
+
+
+class MapCatalog:
+    """地图版本目录"""
+
+    def __init__(self, base_path, folder_prefix='map_', waypoints_filename='waypoints.xml',
+                 catalog_path=None):
+        """
+        Args:
+            base_path: 包含所有map_*文件夹的目录
+            folder_prefix: 地图文件夹前缀
+            waypoints_filename: 航点文件名
+            catalog_path: 目录文件路径，默认放在base_path下
+        """
+        self.base_path = base_path
+        self.folder_prefix = folder_prefix
+        self.waypoints_filename = waypoints_filename
+        self.catalog_path = catalog_path or os.path.join(base_path, CATALOG_FILENAME)
+
+        self.entries = {}      # 文件夹名 -> map_info
+        self.errors = []       # [(文件夹名, 错误信息)]，最近一次扫描
+        self.last_scan = {}    # 最近一次扫描的统计
+        self._loaded = False
+
+    def _file_names(self):
+        return (self.waypoints_filename, 'map.yaml', 'map.pgm')
+
+    def signature(self, folder_path):
+        """
+        文件夹签名：三个必要文件的 [mtime_ns, size]
+        map.pgm被增量存储压缩后（见map_store）取 map.pgm.delta 的
+
+        Returns:
+            签名列表，任一文件缺失时返回None
+        """
+        signature = []
+        for filename in self._file_names():
+            path = os.path.join(folder_path, filename)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                if filename != 'map.pgm':
+                    return None
+                try:
+                    stat = os.stat(path + '.delta')
+                except OSError:
+                    return None
+            signature.append([stat.st_mtime_ns, stat.st_size])
+        return signature
+
+    def read_map_info(self, folder_name, signature=None):
+        """
+        解析单个地图文件夹
+
+        Args:
+            folder_name: 文件夹名 (map_YYYYMMDD_HHMMSS)
+            signature: 已计算好的签名，None时重新计算
+
+        Returns:
+            map_info: 包含地图信息的字典，文件不全时返回None
+        """
+        folder_path = os.path.join(self.base_path, folder_name)
+        if signature is None:
+            signature = self.signature(folder_path)
+        if signature is None:
+            return None
+
+        waypoints_file, yaml_file, pgm_file = (os.path.join(folder_path, name) for name in self._file_names())
+
+        waypoint_errors = []
+        try:
+            rooms = parse_waypoints(waypoints_file, waypoint_errors)
+        except Exception as e:
+            self.errors.append((folder_name, f"解析航点文件失败: {e}"))
+            rooms = {}
+        self.errors.extend((folder_name, f"跳过航点 {error}") for error in waypoint_errors)
+
+        return {
+            'name': folder_name,
+            'path': folder_path,
+            'timestamp': folder_name[len(self.folder_prefix):],
+            'waypoints_file': waypoints_file,
+            'yaml_file': yaml_file,
+            'pgm_file': pgm_file,
+            'rooms': rooms,
+            'signature': signature,
+        }
+
+    def load(self):
+        """
+        读取目录文件；文件不存在、损坏或版本不符时从空目录开始（随后的scan会重建）
+
+        Returns:
+            True: 读取成功
+        """
+        self._loaded = True
+        self.entries = {}
+        try:
+            with open(self.catalog_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') != CATALOG_VERSION or data.get('base_path') != self.base_path:
+                return False
+            entries = data['maps']
+            if not isinstance(entries, dict):
+                return False
+            self.entries = entries
+            return True
+        except (OSError, ValueError, KeyError, AttributeError):
+            return False
+
+    def save(self):
+        """原子写入目录文件（先写临时文件再重命名）"""
+        data = {
+            'version': CATALOG_VERSION,
+            'base_path': self.base_path,
+            'maps': self.entries,
+        }
+        directory = os.path.dirname(self.catalog_path) or '.'
+        fd, tmp_path = tempfile.mkstemp(prefix='.map_catalog.', dir=directory)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                # json.dumps走C编码器，比流式的json.dump快一个数量级
+                f.write(json.dumps(data, ensure_ascii=False, separators=(',', ':')))
+            os.replace(tmp_path, self.catalog_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def scan(self):
+        """
+        扫描地图目录，只重新解析新增或有变化的文件夹
+
+        Returns:
+            maps: map_info列表，最新的在前
+        """
+        self.errors = []
+        catalog_valid = self.load() if not self._loaded else True
+
+        folder_names = []
+        with os.scandir(self.base_path) as it:
+            for entry in it:
+                if entry.name.startswith(self.folder_prefix) and entry.is_dir():
+                    folder_names.append(entry.name)
+
+        reused = parsed = 0
+        entries = {}
+        for folder_name in folder_names:
+            signature = self.signature(os.path.join(self.base_path, folder_name))
+            if signature is None:
+                continue
+
+            cached = self.entries.get(folder_name)
+            if isinstance(cached, dict) and cached.get('signature') == signature:
+                entries[folder_name] = cached
+                reused += 1
+                continue
+
+            map_info = self.read_map_info(folder_name, signature)
+            if map_info:
+                entries[folder_name] = map_info
+                parsed += 1
+
+        removed = len(set(self.entries) - set(entries))
+        changed = parsed > 0 or removed > 0 or not catalog_valid
+        self.entries = entries
+
+        saved = False
+        if changed:
+            try:
+                self.save()
+                saved = True
+            except OSError as e:
+                self.errors.append((CATALOG_FILENAME, f"无法写入目录文件: {e}"))
+
+        self.last_scan = {
+            'reused': reused,
+            'parsed': parsed,
+            'removed': removed,
+            'rebuilt': not catalog_valid,
+            'saved': saved,
+        }
+        return self.maps()
+
+    def refresh(self, folder_names):
+        """
+        只重新检查指定的文件夹，不做全量扫描
+
+        Args:
+            folder_names: 可能新增/修改/删除的文件夹名
+
+        Returns:
+            (added, updated, removed): 各自的文件夹名列表
+        """
+        self.errors = []
+        added, updated, removed = [], [], []
+
+        for folder_name in folder_names:
+            folder_path = os.path.join(self.base_path, folder_name)
+            if not os.path.isdir(folder_path):
+                if self.entries.pop(folder_name, None) is not None:
+                    removed.append(folder_name)
+                continue
+
+            signature = self.signature(folder_path)
+            cached = self.entries.get(folder_name)
+            if signature is None:
+                # 必要文件缺失（被删除或尚未写完）视为不可用
+                if cached is not None:
+                    del self.entries[folder_name]
+                    removed.append(folder_name)
+                continue
+            if isinstance(cached, dict) and cached.get('signature') == signature:
+                continue
+
+            map_info = self.read_map_info(folder_name, signature)
+            if map_info:
+                self.entries[folder_name] = map_info
+                (updated if cached is not None else added).append(folder_name)
+
+        if added or updated or removed:
+            try:
+                self.save()
+            except OSError as e:
+                self.errors.append((CATALOG_FILENAME, f"无法写入目录文件: {e}"))
+
+        return added, updated, removed
+
+    def maps(self):
+        """返回map_info列表，按文件夹名（时间戳）排序，最新的在前"""
+        return [self.entries[name] for name in sorted(self.entries, reverse=True)]
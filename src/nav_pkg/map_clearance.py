@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+"""
+导航目标吸附 - 把落在家具里或贴墙的航点移到最近的可通行位置
+加载地图时对空闲区域做一次欧氏距离变换，之后每次查询都是O(1)的数组索引；
+分块地图（map_tiles）只在查询时对目标附近的窗口做距离变换，不解码整张地图
+"""
+
+import math
+
+import numpy as np
+
+try:
+    from scipy import ndimage
+except ImportError:  # 没有scipy时不做吸附，直接使用原始航点
+    ndimage = None
+
+
+class _MapFrame:
+    """栅格与世界坐标的换算"""
+
+    def __init__(self, occupancy_map, robot_radius, margin):
+        if ndimage is None:
+            raise ImportError('目标吸附需要scipy (python3-scipy)')
+
+        self.resolution = occupancy_map.resolution
+        self.origin = occupancy_map.origin
+        self.width = occupancy_map.width
+        self.height = occupancy_map.height
+        self.clearance = robot_radius + margin
+        self._cos = math.cos(self.origin[2])
+        self._sin = math.sin(self.origin[2])
+
+    def world_to_cell(self, x, y):
+        """世界坐标 -> (row, col)；超出地图返回None"""
+        dx, dy = x - self.origin[0], y - self.origin[1]
+        col = int(math.floor((self._cos * dx + self._sin * dy) / self.resolution))
+        row = int(math.floor((-self._sin * dx + self._cos * dy) / self.resolution))
+        if 0 <= row < self.height and 0 <= col < self.width:
+            return row, col
+        return None
+
+    def cell_to_world(self, row, col):
+        """栅格中心的世界坐标"""
+        u, v = (col + 0.5) * self.resolution, (row + 0.5) * self.resolution
+        return (float(self.origin[0] + self._cos * u - self._sin * v),
+                float(self.origin[1] + self._sin * u + self._cos * v))
+
+
+def _downsample_any(mask, factor):
+    """按factor x factor块降采样，块内任一栅格为True即为True"""
+    height, width = mask.shape
+    rows, cols = -(-height // factor), -(-width // factor)
+    padded = np.zeros((rows * factor, cols * factor), dtype=bool)
+    padded[:height, :width] = mask
+    return padded.reshape(rows, factor, cols, factor).any(axis=(1, 3))
+
+
+class ClearanceMap(_MapFrame):
+    """单个地图的距离变换结果"""
+
+    def __init__(self, occupancy_map, robot_radius=0.25, margin=0.1, search_radius=math.inf):
+        """
+        Args:
+            occupancy_map: map_loader.OccupancyMap
+            robot_radius: 机器人半径（米），与costmap的robot_radius一致
+            margin: 额外的安全余量（米）
+            search_radius: 最大吸附距离（米），更远的安全位置视为找不到
+        """
+        super().__init__(occupancy_map, robot_radius, margin)
+        self.search_radius = search_radius
+
+        # 只有确定空闲(0)的栅格可通行，未知和占用都视为障碍；地图边界外也视为障碍
+        free = occupancy_map.data == 0
+        free[0, :] = free[-1, :] = free[:, 0] = free[:, -1] = False
+        distance = ndimage.distance_transform_edt(free) * self.resolution
+        clear = distance >= self.clearance
+        self.has_clear_cells = bool(clear.any())
+
+        self._clear = clear
+
+        # 对“非安全区”再做一次距离变换，得到每个栅格最近的安全栅格下标（移动距离由下标算出，不保存）
+        # 下标按地图尺寸存为uint16/uint32，常驻内存每栅格5字节（int32下标+float32距离时为12字节）
+        index_dtype = np.uint16 if max(clear.shape) <= 1 << 16 else np.uint32
+        self._nearest = ndimage.distance_transform_edt(
+            ~clear, return_distances=False, return_indices=True).astype(index_dtype)
+
+    @property
+    def nbytes(self):
+        """常驻内存（计入地图缓存上限）"""
+        return self._nearest.nbytes + self._clear.nbytes
+
+    @property
+    def clear_mask(self):
+        """满足安全距离的栅格 (height, width) bool数组"""
+        return self._clear
+
+    def coarse_clear_mask(self, factor):
+        """
+        降采样的安全区域：factor x factor块内任一栅格安全即为True（窄门不会被合并掉）
+
+        Returns:
+            bool数组 (ceil(height / factor), ceil(width / factor))
+        """
+        return _downsample_any(self.clear_mask, factor)
+
+    def snap(self, x, y):
+        """
+        把目标点移到search_radius内最近的、与障碍物保持clearance距离的栅格
+
+        Args:
+            x, y: 目标点世界坐标
+
+        Returns:
+            (x, y, moved): 吸附后的坐标及移动距离（米）；已经安全时原样返回、moved为0；
+            最近的安全栅格超出search_radius时原样返回、moved为inf；
+            目标在地图外或地图中没有安全区域时返回None
+        """
+        cell = self.world_to_cell(x, y)
+        if cell is None or not self.has_clear_cells:
+            return None
+        row, col = cell
+        if self._clear[row, col]:
+            return x, y, 0.0
+        snapped_row, snapped_col = int(self._nearest[0, row, col]), int(self._nearest[1, row, col])
+        snapped_x, snapped_y = self.cell_to_world(snapped_row, snapped_col)
+        moved = math.hypot(snapped_x - x, snapped_y - y)
+        if moved > self.search_radius:
+            return x, y, math.inf
+        return snapped_x, snapped_y, moved
+
+
+class TiledClearanceMap(_MapFrame):
+    """
+    分块地图上的目标吸附：每次查询只取目标附近的窗口做距离变换
+
+    窗口向外多取clearance宽的一圈，圈内栅格的安全距离与整张地图上的计算结果相同
+    """
+
+    def __init__(self, tiled_map, robot_radius=0.25, margin=0.1, search_radius=1.5):
+        """
+        Args:
+            tiled_map: map_tiles.TiledMap
+            robot_radius: 机器人半径（米）
+            margin: 额外的安全余量（米）
+            search_radius: 吸附的搜索半径（米），更远的安全位置视为找不到
+        """
+        super().__init__(tiled_map, robot_radius, margin)
+        self.tiled_map = tiled_map
+        # 不解码整张地图就无法得知；查询时窗口内没有安全栅格则返回无穷远
+        self.has_clear_cells = True
+        self._halo = int(math.ceil(self.clearance / self.resolution)) + 1
+        self.search_radius = search_radius
+        self._search = int(math.ceil(search_radius / self.resolution))
+
+    @property
+    def nbytes(self):
+        """常驻内存：已解码的图块"""
+        return self.tiled_map.nbytes
+
+    def _clear_window(self, row0, row1, col0, col1):
+        """
+        窗口内满足安全距离的栅格（窗口四周各多取halo宽后再裁掉）
+
+        Returns:
+            bool数组 (row1 - row0, col1 - col0)
+        """
+        halo = self._halo
+        window = self.tiled_map.window(row0 - halo, row1 + halo, col0 - halo, col1 + halo)
+        free = window == 0
+        if not free.any():
+            return np.zeros((row1 - row0, col1 - col0), dtype=bool)
+        # 与ClearanceMap一致：地图最外一圈视为障碍（地图外在窗口中已填为未知）
+        for row in (0, self.height - 1):
+            if row0 - halo <= row < row1 + halo:
+                free[row - row0 + halo, :] = False
+        for col in (0, self.width - 1):
+            if col0 - halo <= col < col1 + halo:
+                free[:, col - col0 + halo] = False
+        distance = ndimage.distance_transform_edt(free) * self.resolution
+        return (distance >= self.clearance)[halo:halo + row1 - row0, halo:halo + col1 - col0]
+
+    def snap(self, x, y):
+        """
+        把目标点移到search_radius内最近的、与障碍物保持clearance距离的栅格
+
+        Returns:
+            (x, y, moved)：同ClearanceMap.snap；搜索半径内没有安全栅格时原样返回、moved为inf；
+            目标在地图外时返回None
+        """
+        cell = self.world_to_cell(x, y)
+        if cell is None:
+            return None
+        row, col = cell
+        reach = self._search
+        clear = self._clear_window(row - reach, row + reach + 1, col - reach, col + reach + 1)
+        if clear[reach, reach]:
+            return x, y, 0.0
+        rows, cols = np.nonzero(clear)
+        if rows.size == 0:
+            return x, y, math.inf
+        nearest = int(np.argmin((rows - reach) ** 2 + (cols - reach) ** 2))
+        snapped_x, snapped_y = self.cell_to_world(row - reach + rows[nearest], col - reach + cols[nearest])
+        moved = math.hypot(snapped_x - x, snapped_y - y)
+        # 搜索窗口是正方形，角上的栅格超出搜索半径
+        if moved > self.search_radius:
+            return x, y, math.inf
+        return snapped_x, snapped_y, moved
+
+    def coarse_clear_mask(self, factor):
+        """
+        降采样的安全区域，按块流式计算（每次只解码一块及其周围一圈）
+
+        Returns:
+            bool数组 (ceil(height / factor), ceil(width / factor))
+        """
+        coarse = np.zeros((-(-self.height // factor), -(-self.width // factor)), dtype=bool)
+        # 块边长取factor的整数倍，降采样的块不会跨越两次计算
+        step = factor * max(1, self.tiled_map.tile_size // factor)
+        for row0 in range(0, self.height, step):
+            row1 = min(row0 + step, self.height)
+            for col0 in range(0, self.width, step):
+                col1 = min(col0 + step, self.width)
+                clear = self._clear_window(row0, row1, col0, col1)
+                if clear.any():
+                    block = _downsample_any(clear, factor)
+                    coarse[row0 // factor:row0 // factor + block.shape[0],
+                           col0 // factor:col0 // factor + block.shape[1]] = block
+        return coarse
@@ -0,0 +1,384 @@
+# -*- coding: utf-8 -*-
+"""
+地图文件解码 - 读取map.yaml/map.pgm并转换为OccupancyGrid数据
+与map_server的解码规则一致（trinary/scale/raw三种模式），不依赖ROS
+"""
+
+import math
+import mmap
+import os
+import threading
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+import yaml
+
+
+# data: int8数组 (height, width)，第0行是地图最下方一行（与OccupancyGrid一致）
+OccupancyMap = namedtuple('OccupancyMap', ['data', 'resolution', 'origin', 'width', 'height', 'yaml_file'])
+
+# 增量存储（map_store）压缩后，map.pgm被替换为 map.pgm + DELTA_SUFFIX
+DELTA_SUFFIX = '.delta'
+
+
+class MapFormatError(ValueError):
+    """地图文件格式错误"""
+
+
+def load_map_yaml(yaml_file):
+    """
+    读取地图YAML
+
+    Args:
+        yaml_file: map.yaml路径
+
+    Returns:
+        meta: {'image', 'resolution', 'origin', 'negate', 'occupied_thresh', 'free_thresh', 'mode'}
+    """
+    with open(yaml_file, 'r') as f:
+        meta = yaml.safe_load(f) or {}
+
+    for key in ('image', 'resolution', 'origin'):
+        if key not in meta:
+            raise MapFormatError(f"{yaml_file} 缺少字段: {key}")
+
+    image = os.path.expanduser(str(meta['image']))
+    if not os.path.isabs(image):
+        image = os.path.join(os.path.dirname(os.path.abspath(yaml_file)), image)
+
+    origin = [float(value) for value in meta['origin']]
+    if len(origin) != 3:
+        raise MapFormatError(f"{yaml_file} origin 应为 [x, y, yaw]")
+
+    return {
+        'image': image,
+        'resolution': float(meta['resolution']),
+        'origin': origin,
+        'negate': int(meta.get('negate', 0)),
+        'occupied_thresh': float(meta.get('occupied_thresh', 0.65)),
+        'free_thresh': float(meta.get('free_thresh', 0.196)),
+        'mode': str(meta.get('mode', 'trinary')),
+    }
+
+
+def _read_token(data, offset):
+    """读取PGM头中的下一个token（跳过空白和#注释）"""
+    length = len(data)
+    while offset < length:
+        char = data[offset:offset + 1]
+        if char == b'#':
+            while offset < length and data[offset:offset + 1] not in (b'\n', b'\r'):
+                offset += 1
+        elif char.isspace():
+            offset += 1
+        else:
+            break
+    start = offset
+    while offset < length and not data[offset:offset + 1].isspace():
+        offset += 1
+    if start == offset:
+        raise MapFormatError("PGM文件头不完整")
+    return data[start:offset], offset
+
+
+def parse_pgm_header(data):
+    """
+    解析PGM文件头
+
+    Returns:
+        (magic, width, height, maxval, payload_offset)
+    """
+    magic, offset = _read_token(data, 0)
+    if magic not in (b'P2', b'P5'):
+        raise MapFormatError(f"不支持的PGM格式: {magic!r}")
+    width, offset = _read_token(data, offset)
+    height, offset = _read_token(data, offset)
+    maxval, offset = _read_token(data, offset)
+    # 头部之后恰好一个空白字符
+    return magic, int(width), int(height), int(maxval), offset + 1
+
+
+def read_pgm(pgm_file):
+    """
+    读取PGM图像；二进制P5通过内存映射直接得到NumPy视图，不经过中间拷贝
+
+    Args:
+        pgm_file: map.pgm路径
+
+    Returns:
+        (image, maxval): image为 (height, width) 数组，第0行是图像最上方一行
+    """
+    with open(pgm_file, 'rb') as f:
+        # 空文件无法映射（mmap会抛ValueError），如clip_sam刚创建还未写入的map.pgm
+        if os.fstat(f.fileno()).st_size == 0:
+            raise MapFormatError(f"{pgm_file} 是空文件")
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    magic, width, height, maxval, offset = parse_pgm_header(data)
+    if magic == b'P5':
+        dtype = np.uint8 if maxval < 256 else np.dtype('>u2')
+        count = width * height
+        if offset + count * np.dtype(dtype).itemsize > len(data):
+            raise MapFormatError(f"{pgm_file} 像素数量不足")
+        # 数组持有mmap的引用，数组释放后映射随之释放
+        image = np.frombuffer(data, dtype=dtype, count=count, offset=offset)
+    else:
+        image = np.array(data[offset:].split()[:width * height], dtype=np.int64)
+        if image.size != width * height:
+            raise MapFormatError(f"{pgm_file} 像素数量不足")
+    return image.reshape(height, width), maxval
+
+
+def read_map_image(pgm_file):
+    """
+    读取地图图像；图像已被增量存储压缩（只剩.delta文件）时由关键帧和增量还原
+
+    Args:
+        pgm_file: map.pgm路径
+
+    Returns:
+        (image, maxval): 同read_pgm
+    """
+    try:
+        return read_pgm(pgm_file)
+    except FileNotFoundError:
+        # map_store依赖本模块，在这里才导入
+        from .map_store import read_delta_image
+        return read_delta_image(pgm_file)
+
+
+def occupancy_lookup_table(maxval, meta):
+    """
+    按map_server规则构建 灰度值 -> 占用值 的查找表
+
+    Args:
+        maxval: 灰度最大值
+        meta: load_map_yaml返回的配置
+
+    Returns:
+        lut: 长度为maxval+1的int8数组
+    """
+    values = np.arange(maxval + 1)
+    if meta['mode'] == 'raw':
+        return values.astype(np.int8)
+
+    # 占用概率: 白色(maxval)为空闲，黑色(0)为占用；negate时反过来
+    occupancy = values / float(maxval)
+    if not meta['negate']:
+        occupancy = 1.0 - occupancy
+
+    if meta['mode'] == 'scale':
+        # 1..99 线性映射，与map_server一致（截断取整）
+        ratio = (occupancy - meta['free_thresh']) / (meta['occupied_thresh'] - meta['free_thresh'])
+        lut = (1.0 + 98.0 * np.clip(ratio, 0.0, 1.0)).astype(np.int8)
+    else:
+        lut = np.full(values.shape, -1, dtype=np.int8)
+    lut[occupancy > meta['occupied_thresh']] = 100
+    lut[occupancy < meta['free_thresh']] = 0
+    return lut
+
+
+def decode_occupancy(image, maxval, meta, out=None):
+    """
+    按map_server规则把灰度图转换为占用值（查表，一次遍历）
+
+    Args:
+        image: (height, width) 灰度数组，第0行为图像最上方
+        maxval: 灰度最大值
+        meta: load_map_yaml返回的配置
+        out: 可选的int8输出数组
+
+    Returns:
+        data: int8数组 (height, width)，第0行为地图最下方（已上下翻转）
+    """
+    # map_server: 第j行图像写入 OccupancyGrid 的 height-j-1 行
+    flipped = image[::-1]
+    if out is None:
+        out = np.empty(flipped.shape, dtype=np.int8)
+    lut = occupancy_lookup_table(maxval, meta)
+    np.take(lut, flipped, out=out, mode='clip')
+    return out
+
+
+def load_occupancy_map(yaml_file):
+    """
+    读取并解码一个地图
+
+    Args:
+        yaml_file: map.yaml路径
+
+    Returns:
+        OccupancyMap
+    """
+    meta = load_map_yaml(yaml_file)
+    image, maxval = read_map_image(meta['image'])
+    data = decode_occupancy(image, maxval, meta)
+    height, width = data.shape
+    return OccupancyMap(data, meta['resolution'], meta['origin'], width, height, yaml_file)
+
+
+def file_signature(path):
+    """
+    文件的 (mtime_ns, 大小)，图像被map_store压缩后取增量文件的
+
+    Raises:
+        OSError: 文件不存在
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        # 已压缩的图像以增量文件为准（关键帧写入后不再改动）
+        stat = os.stat(path + DELTA_SUFFIX)
+    return stat.st_mtime_ns, stat.st_size
+
+
+class OccupancyMapCache:
+    """按内存大小限制的已解码地图LRU缓存"""
+
+    def __init__(self, max_bytes=256 * 1024 * 1024, loader=load_occupancy_map):
+        """
+        Args:
+            max_bytes: 缓存的栅格数据总字节数上限
+            loader: 解码函数 yaml_file -> OccupancyMap
+        """
+        self.max_bytes = max_bytes
+        self.loader = loader
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.resident_bytes = 0
+        self._entries = OrderedDict()  # (yaml路径, yaml签名, pgm签名) -> OccupancyMap
+        self._images = {}              # yaml路径 -> (yaml签名, pgm路径)，命中时免去重新解析YAML
+        self._derived = {}             # 缓存键 -> {名称: 由地图计算出的对象（如距离变换）}
+        self._flights = {}             # 正在解码/计算的键 -> threading.Lock，同一对象只计算一次
+        self._lock = threading.Lock()
+
+    def _key(self, yaml_file):
+        """键包含yaml和pgm的 mtime/大小，文件被改写后自动失效"""
+        path = os.path.abspath(yaml_file)
+        yaml_signature = file_signature(path)
+        known = self._images.get(path)
+        if known is not None and known[0] == yaml_signature:
+            image = known[1]
+        else:
+            image = load_map_yaml(path)['image']
+            self._images[path] = (yaml_signature, image)
+        return path, yaml_signature, file_signature(image)
+
+    def get(self, yaml_file):
+        """
+        取得解码后的地图，未命中时解码并放入缓存
+
+        Args:
+            yaml_file: map.yaml路径
+
+        Returns:
+            OccupancyMap
+        """
+        return self._get(self._key(yaml_file), yaml_file)
+
+    def _lookup(self, key):
+        """已缓存的地图（调用时持有self._lock）"""
+        occupancy_map = self._entries.get(key)
+        if occupancy_map is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return occupancy_map
+
+    def _get(self, key, yaml_file):
+        with self._lock:
+            occupancy_map = self._lookup(key)
+            if occupancy_map is not None:
+                return occupancy_map
+            flight = self._flights.setdefault(key, threading.Lock())
+
+        # 多个线程（机器人）同时请求同一地图时只解码一次
+        with flight:
+            with self._lock:
+                occupancy_map = self._lookup(key)
+                if occupancy_map is not None:
+                    return occupancy_map
+                self.misses += 1
+            try:
+                occupancy_map = self.loader(yaml_file)
+                with self._lock:
+                    if key not in self._entries:
+                        # 同一文件的旧版本不再需要
+                        for stale in [k for k in self._entries if k[0] == key[0]]:
+                            self._remove(stale)
+                        self._entries[key] = occupancy_map
+                        self._derived[key] = {}
+                        self.resident_bytes += occupancy_map.data.nbytes
+                        self._evict()
+            finally:
+                with self._lock:
+                    self._flights.pop(key, None)
+        return occupancy_map
+
+    def derived(self, yaml_file, name, build):
+        """
+        取得由地图计算出的对象，与地图一起缓存、一起淘汰
+
+        Args:
+            yaml_file: map.yaml路径
+            name: 对象名（参数不同应使用不同的名称）
+            build: 计算函数 OccupancyMap -> 对象，对象的nbytes属性计入缓存上限
+
+        Returns:
+            build的结果（同时请求的其它线程等待并取得同一结果）
+        """
+        key = self._key(yaml_file)
+        occupancy_map = self._get(key, yaml_file)
+        with self._lock:
+            derived = self._derived.get(key)
+            if derived is not None and name in derived:
+                return derived[name]
+            flight = self._flights.setdefault((key, name), threading.Lock())
+
+        with flight:
+            with self._lock:
+                derived = self._derived.get(key)
+                if derived is not None and name in derived:
+                    return derived[name]
+            try:
+                value = build(occupancy_map)
+                with self._lock:
+                    derived = self._derived.get(key)
+                    if derived is not None and name not in derived:
+                        derived[name] = value
+                        self.resident_bytes += getattr(value, 'nbytes', 0)
+                        self._entries.move_to_end(key)
+                        self._evict()
+            finally:
+                with self._lock:
+                    self._flights.pop((key, name), None)
+        return value
+
+    def _evict(self):
+        """超出上限时淘汰最久未使用的（至少保留最近的一项）"""
+        while self.resident_bytes > self.max_bytes and len(self._entries) > 1:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _remove(self, key):
+        occupancy_map = self._entries.pop(key)
+        self.resident_bytes -= occupancy_map.data.nbytes
+        for value in self._derived.pop(key, {}).values():
+            self.resident_bytes -= getattr(value, 'nbytes', 0)
+
+    def stats(self):
+        """命中/未命中/常驻字节统计"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'resident_bytes': self.resident_bytes,
+                'max_bytes': self.max_bytes,
+            }
+
+
+def yaw_to_quaternion(yaw):
+    """绕z轴旋转的四元数 (x, y, z, w)"""
+    return 0.0, 0.0, math.sin(yaw / 2.0), math.cos(yaw / 2.0)
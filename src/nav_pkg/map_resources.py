@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+共享地图资源 - 一个进程为多个机器人命名空间服务时，所有机器人共用一份：
+地图目录（航点文件只解析一次）、已解码地图及其派生数据（距离变换、代价矩阵、房间分割）、
+航点查找索引和分块地图
+多个机器人同时切换到同一地图时，每个对象只由一个线程计算，其余线程等待并取得同一结果
+"""
+
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from .map_catalog import MapCatalog
+from .map_loader import OccupancyMapCache, file_signature, load_map_yaml
+from .map_tiles import open_tiled_map, tiles_path
+from .room_lookup import RoomIndex
+
+
+class MapResources:
+    """多个机器人共用的地图目录和缓存"""
+
+    def __init__(self, base_path, folder_prefix='map_', waypoints_filename='waypoints.xml',
+                 map_cache_bytes=256 * 1024 * 1024, tile_cache_bytes=64 * 1024 * 1024, max_shared=64):
+        """
+        Args:
+            base_path: 包含所有map_*文件夹的目录
+            folder_prefix: 地图文件夹前缀
+            waypoints_filename: 航点文件名
+            map_cache_bytes: 已解码地图（含派生数据）的缓存上限
+            tile_cache_bytes: 每个分块地图的图块缓存上限
+            max_shared: 航点索引、分块地图等按条数限制的缓存上限
+        """
+        self.catalog = MapCatalog(base_path, folder_prefix, waypoints_filename)
+        self.map_cache = OccupancyMapCache(map_cache_bytes)
+        self.tile_cache_bytes = tile_cache_bytes
+        self.max_shared = max_shared
+        self.available_maps = []  # 最近一次扫描/变化后的map_info列表，最新的在前
+        self.scanned = False
+        self.watcher = None       # MapWatcher，由第一个启动监视的机器人创建
+        self.hits = 0
+        self.misses = 0
+
+        self._listeners = []
+        self._shared = OrderedDict()  # 键 -> 对象
+        self._flights = {}            # 正在计算的键 -> threading.Lock
+        self._lock = threading.Lock()
+
+    def scan(self):
+        """
+        扫描地图目录（多个机器人共用一次扫描）
+
+        Returns:
+            maps: map_info列表，最新的在前
+        """
+        self.available_maps = self.catalog.scan()
+        self.scanned = True
+        return self.available_maps
+
+    def add_listener(self, callback):
+        """
+        注册地图目录变化的回调
+
+        Args:
+            callback: callback(added, updated, removed)
+        """
+        self._listeners.append(callback)
+
+    def on_maps_changed(self, added, updated, removed):
+        """MapWatcher的回调：更新地图列表后通知每个机器人"""
+        self.available_maps = self.catalog.maps()
+        for callback in list(self._listeners):
+            callback(added, updated, removed)
+
+    def shared(self, key, build):
+        """
+        取得共享对象，未命中时计算；同一键同时只有一个线程在计算
+
+        Args:
+            key: 可哈希的缓存键（应包含文件签名，文件改变后自动失效）
+            build: 无参数的计算函数
+
+        Returns:
+            build的结果
+        """
+        with self._lock:
+            if key in self._shared:
+                self._shared.move_to_end(key)
+                self.hits += 1
+                return self._shared[key]
+            flight = self._flights.setdefault(key, threading.Lock())
+
+        with flight:
+            with self._lock:
+                # 等待期间已由其它线程算好
+                if key in self._shared:
+                    self._shared.move_to_end(key)
+                    self.hits += 1
+                    return self._shared[key]
+                self.misses += 1
+            try:
+                value = build()
+                with self._lock:
+                    self._shared[key] = value
+                    while len(self._shared) > self.max_shared:
+                        self._shared.popitem(last=False)
+            finally:
+                with self._lock:
+                    self._flights.pop(key, None)
+        return value
+
+    def room_index(self, map_info):
+        """
+        地图的航点查找索引（同一地图版本的所有机器人共用）
+
+        Args:
+            map_info: MapCatalog中的地图信息
+
+        Returns:
+            RoomIndex
+        """
+        key = ('room_index', map_info['path'], json.dumps(map_info['signature']))
+        return self.shared(key, lambda: RoomIndex(map_info['rooms']))
+
+    def tiled_map(self, yaml_file):
+        """
+        打开地图的分块文件（同一文件只映射一次）
+
+        Args:
+            yaml_file: map.yaml路径
+
+        Returns:
+            TiledMap；没有分块文件或它比map.pgm旧时返回None
+        """
+        path = os.path.abspath(yaml_file)
+        image = load_map_yaml(path)['image']
+        try:
+            tiles_signature = file_signature(tiles_path(image))
+        except OSError:
+            return None
+        key = ('tiled_map', path, file_signature(path), file_signature(image), tiles_signature)
+        return self.shared(key, lambda: open_tiled_map(path, self.tile_cache_bytes))
+
+    def stats(self):
+        """共享对象的命中/未命中统计"""
+        with self._lock:
+            return {
+                'shared_entries': len(self._shared),
+                'shared_hits': self.hits,
+                'shared_misses': self.misses,
+            }
@@ -0,0 +1,348 @@
+# -*- coding: utf-8 -*-
+"""
+地图增量存储 - 相邻的地图版本只保存与关键帧不同的栅格
+压缩后地图文件夹中的map.pgm被替换为map.pgm.delta（变化栅格的位置和新灰度值，zlib压缩），
+关键帧PGM保存在地图目录下的.map_store/中；读取时由关键帧加增量还原，与原文件逐字节一致
+map.yaml和航点文件保持不变；未压缩的文件夹照常读取，clip_sam新生成的地图可随时再次压缩
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import time
+import zlib
+
+import numpy as np
+import yaml
+
+from .map_loader import DELTA_SUFFIX, MapFormatError, load_map_yaml, parse_pgm_header, read_pgm
+
+
+STORE_DIRNAME = '.map_store'
+_MAGIC = b'NAVDELTA1\n'
+
+
+def delta_path(pgm_file):
+    """图像对应的增量文件路径"""
+    return pgm_file + DELTA_SUFFIX
+
+
+def _store_dir(pgm_file):
+    """地图文件夹所在目录下的.map_store/"""
+    return os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(pgm_file))), STORE_DIRNAME)
+
+
+def is_compacted(pgm_file):
+    """图像是否只以增量形式存在"""
+    return not os.path.exists(pgm_file) and os.path.exists(delta_path(pgm_file))
+
+
+def _read_delta(delta_file):
+    """
+    Returns:
+        (header, payload): header为文件头字典，payload为压缩后的变化栅格
+    """
+    with open(delta_file, 'rb') as f:
+        data = f.read()
+    if not data.startswith(_MAGIC):
+        raise MapFormatError(f"{delta_file} 不是地图增量文件")
+    end = data.find(b'\n', len(_MAGIC))
+    if end < 0:
+        raise MapFormatError(f"{delta_file} 文件头不完整")
+    return json.loads(data[len(_MAGIC):end]), data[end + 1:]
+
+
+def read_delta_header(pgm_file):
+    """
+    只读取增量文件头（不读取变化栅格）
+
+    Args:
+        pgm_file: 原map.pgm路径
+
+    Returns:
+        文件头字典，'crc'为还原后图像像素的zlib.crc32
+    """
+    delta_file = delta_path(pgm_file)
+    with open(delta_file, 'rb') as f:
+        if f.read(len(_MAGIC)) != _MAGIC:
+            raise MapFormatError(f"{delta_file} 不是地图增量文件")
+        line = f.readline()
+    if not line.endswith(b'\n'):
+        raise MapFormatError(f"{delta_file} 文件头不完整")
+    return json.loads(line)
+
+
+def _encode_changes(keyframe, pixels):
+    """
+    Args:
+        keyframe, pixels: 同样大小的一维uint8数组
+
+    Returns:
+        (changed, payload): 变化的栅格数和压缩数据（位置间隔uint32 + 新灰度值uint8）
+    """
+    indices = np.flatnonzero(keyframe != pixels)
+    # 变化集中在新探索的区域，位置取差分后大多是1，压缩率很高
+    gaps = np.diff(indices, prepend=0).astype('<u4')
+    return indices.size, zlib.compress(gaps.tobytes() + pixels[indices].tobytes(), 6)
+
+
+def _decode_changes(payload, changed):
+    raw = zlib.decompress(payload)
+    if len(raw) != changed * 5:
+        raise MapFormatError("增量数据长度不符")
+    indices = np.cumsum(np.frombuffer(raw, dtype='<u4', count=changed), dtype=np.int64)
+    values = np.frombuffer(raw, dtype=np.uint8, count=changed, offset=changed * 4)
+    return indices, values
+
+
+def _restore(pgm_file):
+    """
+    Returns:
+        (header, image, maxval): image为还原后的 (height, width) 数组
+    """
+    header, payload = _read_delta(delta_path(pgm_file))
+    keyframe, maxval = read_pgm(os.path.join(_store_dir(pgm_file), header['keyframe']))
+    if keyframe.shape != (header['height'], header['width']):
+        raise MapFormatError(f"{pgm_file} 关键帧 {header['keyframe']} 尺寸不符")
+
+    if header['changed']:
+        image = keyframe.copy()
+        indices, values = _decode_changes(payload, header['changed'])
+        image.reshape(-1)[indices] = values
+    else:
+        # 关键帧本身：直接使用内存映射的只读视图
+        image = keyframe
+    if zlib.crc32(image) != header['crc']:
+        raise MapFormatError(f"{pgm_file} 还原后校验失败（关键帧被改动？）")
+    return header, image, maxval
+
+
+def read_delta_image(pgm_file):
+    """
+    由关键帧和增量还原被压缩的地图图像
+
+    Args:
+        pgm_file: 原map.pgm路径（文件本身已不存在）
+
+    Returns:
+        (image, maxval): 同map_loader.read_pgm
+    """
+    _, image, maxval = _restore(pgm_file)
+    return image, maxval
+
+
+def _write_atomic(path, chunks):
+    """先写同目录下的隐藏临时文件再重命名（地图目录监视忽略.开头的文件）"""
+    fd, tmp_path = tempfile.mkstemp(prefix='.' + os.path.basename(path) + '.', dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for chunk in chunks:
+                f.write(chunk)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def materialize(pgm_file, output):
+    """
+    把被压缩的图像还原为PGM文件
+
+    Args:
+        pgm_file: 原map.pgm路径
+        output: 输出的PGM路径
+    """
+    header, image, _ = _restore(pgm_file)
+    _write_atomic(output, (header['header'].encode('latin-1'), image.tobytes()))
+
+
+def server_yaml(yaml_file, output_dir=None):
+    """
+    给需要真实PGM文件的程序（map_server）使用的地图YAML
+
+    Args:
+        yaml_file: map.yaml路径
+        output_dir: 还原文件的目录，默认为临时目录下的 nav_pkg_maps/<地图文件夹名>
+
+    Returns:
+        图像未被压缩时返回yaml_file本身；否则还原出PGM，返回指向它的YAML副本路径
+    """
+    image = load_map_yaml(yaml_file)['image']
+    if not is_compacted(image):
+        return yaml_file
+
+    folder_name = os.path.basename(os.path.dirname(os.path.abspath(yaml_file)))
+    output_dir = output_dir or os.path.join(tempfile.gettempdir(), 'nav_pkg_maps', folder_name)
+    os.makedirs(output_dir, exist_ok=True)
+    output_image = os.path.join(output_dir, os.path.basename(image))
+    materialize(image, output_image)
+
+    with open(yaml_file, 'r') as f:
+        meta = yaml.safe_load(f)
+    meta['image'] = output_image
+    output_yaml = os.path.join(output_dir, os.path.basename(yaml_file))
+    _write_atomic(output_yaml, (yaml.safe_dump(meta, default_flow_style=None).encode('utf-8'),))
+    return output_yaml
+
+
+class MapStore:
+    """地图目录的增量存储：压缩、空间统计"""
+
+    def __init__(self, base_path, folder_prefix='map_', image_filename='map.pgm'):
+        """
+        Args:
+            base_path: 包含所有map_*文件夹的目录
+            folder_prefix: 地图文件夹前缀
+            image_filename: 地图图像文件名
+        """
+        self.base_path = base_path
+        self.folder_prefix = folder_prefix
+        self.image_filename = image_filename
+        self.store_path = os.path.join(base_path, STORE_DIRNAME)
+
+    def folders(self):
+        """地图文件夹名，按时间戳从旧到新"""
+        with os.scandir(self.base_path) as it:
+            return sorted(entry.name for entry in it
+                          if entry.name.startswith(self.folder_prefix) and entry.is_dir())
+
+    def _image_path(self, folder_name):
+        return os.path.join(self.base_path, folder_name, self.image_filename)
+
+    def disk_usage(self):
+        """
+        Returns:
+            {'images': 未压缩的PGM字节数, 'deltas': 增量文件字节数, 'keyframes': 关键帧字节数, 'total'}
+        """
+        usage = {'images': 0, 'deltas': 0, 'keyframes': 0}
+        for folder_name in self.folders():
+            image = self._image_path(folder_name)
+            for key, path in (('images', image), ('deltas', delta_path(image))):
+                try:
+                    usage[key] += os.stat(path).st_size
+                except OSError:
+                    pass
+        if os.path.isdir(self.store_path):
+            with os.scandir(self.store_path) as it:
+                usage['keyframes'] = sum(entry.stat().st_size for entry in it
+                                         if entry.is_file() and not entry.name.startswith('.'))
+        usage['total'] = usage['images'] + usage['deltas'] + usage['keyframes']
+        return usage
+
+    def _write_delta(self, image, keyframe_name, pgm_header, pixels, changed, payload):
+        header = {
+            'keyframe': keyframe_name,
+            'header': pgm_header.decode('latin-1'),
+            'width': pixels.shape[1],
+            'height': pixels.shape[0],
+            'changed': changed,
+            'crc': zlib.crc32(pixels),
+        }
+        _write_atomic(delta_path(image), (_MAGIC, json.dumps(header).encode('utf-8'), b'\n', payload))
+
+    def _add_keyframe(self, folder_name, image, pixels):
+        """
+        把图像放入.map_store/（尽量用硬链接，不复制数据）
+
+        关键帧写入后不再改动；文件名带内容校验和，同一文件夹的图像被重新生成时不会覆盖
+        仍被其他增量引用的旧关键帧
+        """
+        os.makedirs(self.store_path, exist_ok=True)
+        keyframe_name = f"{folder_name}_{zlib.crc32(pixels):08x}.pgm"
+        keyframe_path = os.path.join(self.store_path, keyframe_name)
+        if os.path.exists(keyframe_path):
+            return keyframe_name
+        try:
+            os.link(image, keyframe_path)
+        except OSError:
+            shutil.copyfile(image, keyframe_path)
+        return keyframe_name
+
+    def compact(self, max_change=0.2, min_age=10.0):
+        """
+        把未压缩的地图版本转换为关键帧+增量
+
+        按时间顺序处理：与最近的关键帧相比变化的栅格不超过max_change时只保存增量，
+        否则（或尺寸/灰度范围不同）该版本成为新的关键帧；不再被引用的关键帧随后删除
+
+        Args:
+            max_change: 保存为增量的最大变化比例
+            min_age: 跳过最近min_age秒内修改过的图像（可能还在写入）
+
+        Returns:
+            统计字典：{'keyframes', 'deltas', 'skipped': [(文件夹名, 原因)], 'removed_keyframes',
+                       'bytes_before', 'bytes_after'}
+        """
+        bytes_before = self.disk_usage()['total']
+        stats = {'keyframes': 0, 'deltas': 0, 'skipped': [], 'removed_keyframes': 0}
+        referenced = set()
+        keyframe_name = None
+        keyframe = None       # (header尺寸和maxval, 一维像素)，用到时才读取
+        now = time.time()
+
+        for folder_name in self.folders():
+            image = self._image_path(folder_name)
+            if not os.path.exists(image):
+                if os.path.exists(delta_path(image)):
+                    # 已压缩：后续版本继续与它的关键帧比较
+                    name = _read_delta(delta_path(image))[0]['keyframe']
+                    referenced.add(name)
+                    if name != keyframe_name:
+                        keyframe_name, keyframe = name, None
+                continue
+
+            try:
+                if now - os.stat(image).st_mtime < min_age:
+                    stats['skipped'].append((folder_name, "刚刚写入"))
+                    continue
+                with open(image, 'rb') as f:
+                    data = f.read()
+                magic, width, height, maxval, offset = parse_pgm_header(data)
+            except (OSError, MapFormatError) as e:
+                stats['skipped'].append((folder_name, str(e)))
+                continue
+            if magic != b'P5' or maxval > 255 or len(data) != offset + width * height:
+                stats['skipped'].append((folder_name, "只压缩8位二进制PGM"))
+                continue
+            pixels = np.frombuffer(data, dtype=np.uint8, offset=offset).reshape(height, width)
+
+            if keyframe_name is not None and keyframe is None:
+                try:
+                    stored, stored_maxval = read_pgm(os.path.join(self.store_path, keyframe_name))
+                    keyframe = ((stored.shape, stored_maxval), stored.reshape(-1))
+                except (OSError, MapFormatError):
+                    keyframe_name = None
+
+            if keyframe is not None and keyframe[0] == ((height, width), maxval):
+                changed, payload = _encode_changes(keyframe[1], pixels.reshape(-1))
+                as_delta = changed <= max_change * pixels.size
+            else:
+                as_delta = False
+
+            if not as_delta:
+                keyframe_name = self._add_keyframe(folder_name, image, pixels)
+                keyframe = (((height, width), maxval), pixels.reshape(-1))
+                changed, payload = 0, zlib.compress(b'')
+                stats['keyframes'] += 1
+            else:
+                stats['deltas'] += 1
+            referenced.add(keyframe_name)
+
+            self._write_delta(image, keyframe_name, data[:offset], pixels, changed, payload)
+            restored = _restore(image)
+            if restored[2] != maxval or not np.array_equal(restored[1], pixels):
+                os.unlink(delta_path(image))
+                raise MapFormatError(f"{folder_name} 增量校验失败，已保留原图像")
+            os.unlink(image)
+
+        if os.path.isdir(self.store_path):
+            for name in os.listdir(self.store_path):
+                if name.endswith('.pgm') and name not in referenced:
+                    os.unlink(os.path.join(self.store_path, name))
+                    stats['removed_keyframes'] += 1
+
+        stats['bytes_before'] = bytes_before
+        stats['bytes_after'] = self.disk_usage()['total']
+        return stats
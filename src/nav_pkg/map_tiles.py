@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+"""
+分块地图 - 把map.pgm切成固定大小的zlib压缩图块，文件头带索引，按需解压
+仓库级地图边长上万像素，整张解码既占内存又慢；目标吸附、局部查询只解码用到的几个图块，
+需要完整OccupancyGrid时再逐块拼出（不经过整张灰度图）
+map.tiles与map.pgm放在同一文件夹，由 switch_map.py --tile 从现有的map.pgm/map.yaml生成；
+文件头记录源图像像素的crc32，map.pgm被map_store压缩后与增量文件头中的crc比较判断是否过期
+"""
+
+import json
+import mmap
+import os
+import tempfile
+import threading
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+from .map_loader import MapFormatError, OccupancyMap, load_map_yaml, occupancy_lookup_table, read_map_image
+from .map_store import read_delta_header
+
+
+TILES_SUFFIX = '.tiles'
+DEFAULT_TILE_SIZE = 256
+_MAGIC = b'NAVTILES1\n'
+# 每个图块的索引项：数据偏移、压缩后长度（0表示整块同一灰度）、同色图块的灰度值
+_INDEX_DTYPE = np.dtype([('offset', '<u8'), ('length', '<u4'), ('fill', 'u1')])
+
+
+def tiles_path(pgm_file):
+    """图像对应的分块文件路径（map.pgm -> map.tiles）"""
+    return os.path.splitext(pgm_file)[0] + TILES_SUFFIX
+
+
+def convert_to_tiles(yaml_file, tile_size=DEFAULT_TILE_SIZE):
+    """
+    由map.yaml/map.pgm生成分块文件（图像已被map_store压缩时同样可用）
+
+    图块按OccupancyGrid的行序存放（第0行是地图最下方），保存原始灰度，读取时按YAML的阈值解码
+
+    Args:
+        yaml_file: map.yaml路径
+        tile_size: 图块边长（像素）
+
+    Returns:
+        (path, stats): 分块文件路径和 {'tiles', 'uniform', 'bytes'}
+    """
+    meta = load_map_yaml(yaml_file)
+    image, maxval = read_map_image(meta['image'])
+    if maxval > 255:
+        raise MapFormatError(f"{meta['image']} 只支持8位灰度图")
+    flipped = image[::-1]
+    height, width = flipped.shape
+    rows, cols = -(-height // tile_size), -(-width // tile_size)
+    index = np.zeros(rows * cols, dtype=_INDEX_DTYPE)
+
+    header = json.dumps({'width': width, 'height': height, 'tile_size': tile_size, 'maxval': maxval,
+                         'crc': zlib.crc32(np.ascontiguousarray(image))})
+    prefix = _MAGIC + header.encode('utf-8') + b'\n'
+    path = tiles_path(meta['image'])
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(prefix='.' + os.path.basename(path) + '.', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(prefix)
+            f.write(index.tobytes())
+            offset = 0
+            for i in range(rows * cols):
+                tile_row, tile_col = divmod(i, cols)
+                block = np.ascontiguousarray(
+                    flipped[tile_row * tile_size:(tile_row + 1) * tile_size,
+                            tile_col * tile_size:(tile_col + 1) * tile_size], dtype=np.uint8)
+                first = block.flat[0]
+                if (block == first).all():
+                    index[i]['fill'] = first
+                    continue
+                payload = zlib.compress(block, 6)
+                index[i] = (offset, len(payload), 0)
+                f.write(payload)
+                offset += len(payload)
+            f.seek(len(prefix))
+            f.write(index.tobytes())
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+    uniform = int((index['length'] == 0).sum())
+    return path, {'tiles': rows * cols, 'uniform': uniform, 'bytes': os.path.getsize(path)}
+
+
+def open_tiled_map(yaml_file, cache_bytes=64 * 1024 * 1024):
+    """
+    打开地图的分块文件
+
+    Args:
+        yaml_file: map.yaml路径
+        cache_bytes: 已解码图块的缓存上限
+
+    Returns:
+        TiledMap；没有分块文件或它已过期（地图被重新生成）时返回None
+    """
+    meta = load_map_yaml(yaml_file)
+    path = tiles_path(meta['image'])
+    try:
+        tiles_mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+    try:
+        image_mtime = os.stat(meta['image']).st_mtime_ns
+    except OSError:
+        image_mtime = None
+    if image_mtime is not None:
+        return None if image_mtime > tiles_mtime else TiledMap(yaml_file, meta, cache_bytes)
+
+    # 图像已被map_store压缩，没有mtime可比：比较分块文件和增量文件记录的像素crc
+    # （压缩前地图可能已被重新生成，分块文件随之过期）
+    try:
+        crc = read_delta_header(meta['image'])['crc']
+    except (OSError, MapFormatError, KeyError):
+        return None
+    tiled_map = TiledMap(yaml_file, meta, cache_bytes)
+    return tiled_map if tiled_map.source_crc == crc else None
+
+
+class TiledMap:
+    """分块地图：按需解压、解码图块，解码结果放在按字节数限制的LRU中"""
+
+    def __init__(self, yaml_file, meta=None, cache_bytes=64 * 1024 * 1024):
+        """
+        Args:
+            yaml_file: map.yaml路径
+            meta: 已读取的load_map_yaml结果
+            cache_bytes: 已解码图块的缓存上限
+        """
+        meta = meta or load_map_yaml(yaml_file)
+        self.yaml_file = yaml_file
+        self.resolution = meta['resolution']
+        self.origin = meta['origin']
+
+        path = tiles_path(meta['image'])
+        with open(path, 'rb') as f:
+            # 只映射不读取：用到的图块才会被读入
+            self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._data[:len(_MAGIC)] != _MAGIC:
+            raise MapFormatError(f"{path} 不是分块地图文件")
+        end = self._data.find(b'\n', len(_MAGIC))
+        header = json.loads(self._data[len(_MAGIC):end])
+        self.width, self.height = header['width'], header['height']
+        self.tile_size = header['tile_size']
+        self.source_crc = header.get('crc')  # 源图像像素的crc32，旧版分块文件没有
+        self.rows, self.cols = -(-self.height // self.tile_size), -(-self.width // self.tile_size)
+        self._index = np.frombuffer(self._data, dtype=_INDEX_DTYPE, count=self.rows * self.cols, offset=end + 1)
+        self._payload_offset = end + 1 + self._index.nbytes
+        self._lut = occupancy_lookup_table(header['maxval'], meta)
+
+        self.max_tiles = max(1, cache_bytes // (self.tile_size * self.tile_size))
+        self.decoded = 0    # 解压过的图块数
+        self._tiles = OrderedDict()  # (tile_row, tile_col) -> int8图块
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self):
+        """缓存中已解码图块的字节数（同色图块不占实际内存）"""
+        with self._lock:
+            return sum(tile.nbytes for tile in self._tiles.values() if tile.base is None)
+
+    def _tile_shape(self, tile_row, tile_col):
+        return (min(self.tile_size, self.height - tile_row * self.tile_size),
+                min(self.tile_size, self.width - tile_col * self.tile_size))
+
+    def _decode(self, tile_row, tile_col):
+        entry = self._index[tile_row * self.cols + tile_col]
+        shape = self._tile_shape(tile_row, tile_col)
+        if entry['length'] == 0:
+            # 同色图块：广播视图，不分配内存
+            return np.broadcast_to(self._lut[entry['fill']], shape)
+        start = self._payload_offset + int(entry['offset'])
+        raw = zlib.decompress(self._data[start:start + int(entry['length'])])
+        self.decoded += 1
+        return self._lut[np.frombuffer(raw, dtype=np.uint8).reshape(shape)]
+
+    def tile(self, tile_row, tile_col):
+        """
+        取得解码后的图块
+
+        Returns:
+            int8只读数组，OccupancyGrid行序
+        """
+        key = (tile_row, tile_col)
+        with self._lock:
+            tile = self._tiles.get(key)
+            if tile is not None:
+                self._tiles.move_to_end(key)
+                return tile
+        tile = self._decode(tile_row, tile_col)
+        with self._lock:
+            self._tiles[key] = tile
+            while len(self._tiles) > self.max_tiles:
+                self._tiles.popitem(last=False)
+        return tile
+
+    def window(self, row0, row1, col0, col1, fill=-1):
+        """
+        取出一个矩形区域的占用值，超出地图的部分填fill
+
+        Args:
+            row0, row1, col0, col1: 栅格行/列范围（左闭右开，OccupancyGrid行序）
+
+        Returns:
+            int8数组 (row1 - row0, col1 - col0)
+        """
+        out = np.full((row1 - row0, col1 - col0), fill, dtype=np.int8)
+        size = self.tile_size
+        for tile_row in range(max(0, row0) // size, min(self.height, row1) // size + 1):
+            r0, r1 = max(row0, tile_row * size), min(row1, (tile_row + 1) * size, self.height)
+            if r0 >= r1:
+                continue
+            for tile_col in range(max(0, col0) // size, min(self.width, col1) // size + 1):
+                c0, c1 = max(col0, tile_col * size), min(col1, (tile_col + 1) * size, self.width)
+                if c0 >= c1:
+                    continue
+                tile = self.tile(tile_row, tile_col)
+                out[r0 - row0:r1 - row0, c0 - col0:c1 - col0] = \
+                    tile[r0 - tile_row * size:r1 - tile_row * size, c0 - tile_col * size:c1 - tile_col * size]
+        return out
+
+    def read_all(self, out=None):
+        """
+        逐块拼出完整的占用栅格（不经过图块缓存，不挤掉局部查询用到的图块）
+
+        Args:
+            out: 可选的 (height, width) int8输出数组
+
+        Returns:
+            int8数组 (height, width)，与map_loader.decode_occupancy的结果相同
+        """
+        if out is None:
+            out = np.empty((self.height, self.width), dtype=np.int8)
+        size = self.tile_size
+        for tile_row in range(self.rows):
+            for tile_col in range(self.cols):
+                out[tile_row * size:(tile_row + 1) * size,
+                    tile_col * size:(tile_col + 1) * size] = self._decode(tile_row, tile_col)
+        return out
+
+    def occupancy_data(self):
+        """
+        逐块解码到一个预先分配的一维缓冲区，直接用作OccupancyGrid.data（行序与/map一致）
+
+        Returns:
+            int8数组 (height * width,)
+        """
+        data = np.empty(self.height * self.width, dtype=np.int8)
+        self.read_all(data.reshape(self.height, self.width))
+        return data
+
+    def as_occupancy_map(self):
+        """完整地图（用于发布/map）"""
+        return OccupancyMap(self.read_all(), self.resolution, self.origin, self.width, self.height, self.yaml_file)
+
+    def close(self):
+        with self._lock:
+            self._tiles.clear()
+        self._index = None
+        self._data.close()
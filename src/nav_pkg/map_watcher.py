@@ -0,0 +1,277 @@
+# -*- coding: utf-8 -*-
+"""
+地图目录后台监视 - 增量发现新增/删除/更新的地图版本
+Linux上使用inotify，不可用时退化为目录mtime轮询；
+文件夹的三个必要文件在稳定时间内保持不变后才上报，避免切换到写了一半的地图
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import threading
+import time
+
+
+# inotify 事件掩码（见 <sys/inotify.h>）
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+_WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+               IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+class _Inotify:
+    """最小的inotify封装（ctypes调用libc）"""
+
+    def __init__(self):
+        libc_name = ctypes.util.find_library('c')
+        if not libc_name:
+            raise OSError('找不到libc')
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self._libc, 'inotify_init1'):
+            raise OSError('libc不支持inotify')
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1失败')
+        self.watches = {}  # wd -> 路径
+
+    def add_watch(self, path):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), _WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f'inotify_add_watch失败: {path}')
+        self.watches[wd] = path
+        return wd
+
+    def read_events(self):
+        """
+        读取所有待处理事件
+
+        Returns:
+            [(所在目录路径, 名称, 掩码)]
+        """
+        events = []
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset + _EVENT_HEADER.size <= len(data):
+                wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b'\0').decode('utf-8', 'replace')
+                offset += length
+                events.append((self.watches.get(wd), name, mask))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+class MapWatcher:
+    """地图目录后台监视线程"""
+
+    def __init__(self, catalog, on_change, interval=10.0, settle_time=2.0, use_inotify=True,
+                 on_error=None, clock=time.monotonic):
+        """
+        Args:
+            catalog: MapCatalog，已完成首次scan
+            on_change: 回调 on_change(added, updated, removed)，在监视线程中调用
+            interval: 轮询间隔（秒）；使用inotify时为兜底的全目录检查间隔
+            settle_time: 文件保持不变多久才认为写入完成（秒）
+            use_inotify: 是否尝试使用inotify
+            on_error: 回调 on_error(message)，报告监视线程中的错误
+            clock: 单调时钟函数
+        """
+        self.catalog = catalog
+        self.on_change = on_change
+        self.interval = interval
+        self.settle_time = settle_time
+        self.clock = clock
+
+        self.base_path = catalog.base_path
+        self.prefix = catalog.folder_prefix
+        self.on_error = on_error or (lambda message: None)
+
+        self._dir_mtimes = {}   # 文件夹名 -> 目录mtime_ns（轮询用）
+        self._base_mtime = None
+        self._pending = {}      # 文件夹名 -> (签名, 签名首次出现的时间)
+        self._polls = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+        self._inotify = None
+        if use_inotify:
+            try:
+                self._inotify = _Inotify()
+                self._inotify.add_watch(self.base_path)
+            except (OSError, AttributeError) as e:
+                self.on_error(f"inotify不可用，改为轮询: {e}")
+                self._inotify = None
+
+        self._snapshot_dirs()
+
+    @property
+    def mode(self):
+        return 'inotify' if self._inotify else 'polling'
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='map_watcher', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=2.0)
+        if self._inotify:
+            self._inotify.close()
+            self._inotify = None
+
+    def _map_folders(self):
+        with os.scandir(self.base_path) as it:
+            return [entry.name for entry in it if entry.name.startswith(self.prefix) and entry.is_dir()]
+
+    def _snapshot_dirs(self):
+        """记录目录mtime基线，并为inotify添加各地图文件夹的监视"""
+        self._base_mtime = os.stat(self.base_path).st_mtime_ns
+        for name in self._map_folders():
+            self._watch_folder(name)
+
+    def _watch_folder(self, name):
+        path = os.path.join(self.base_path, name)
+        try:
+            self._dir_mtimes[name] = os.stat(path).st_mtime_ns
+            if self._inotify:
+                self._inotify.add_watch(path)
+        except OSError:
+            pass
+
+    # 每隔多少次轮询核对一次文件签名（原地改写文件不会改变目录mtime）
+    SIGNATURE_SWEEP_EVERY = 6
+
+    def _poll_dirs(self):
+        """
+        轮询：base目录mtime变化说明有文件夹增删；
+        每个文件夹只stat目录本身，mtime变化才需要检查其中的文件
+        """
+        dirty = set()
+        self._polls += 1
+        if self._polls % self.SIGNATURE_SWEEP_EVERY == 0:
+            for name, entry in list(self.catalog.entries.items()):
+                if self.catalog.signature(os.path.join(self.base_path, name)) != entry.get('signature'):
+                    dirty.add(name)
+
+        base_mtime = os.stat(self.base_path).st_mtime_ns
+        if base_mtime != self._base_mtime:
+            self._base_mtime = base_mtime
+            current = set(self._map_folders())
+            known = set(self._dir_mtimes)
+            dirty |= current ^ known
+            for name in current - known:
+                self._watch_folder(name)
+            for name in known - current:
+                self._dir_mtimes.pop(name, None)
+
+        for name, mtime in list(self._dir_mtimes.items()):
+            try:
+                new_mtime = os.stat(os.path.join(self.base_path, name)).st_mtime_ns
+            except OSError:
+                dirty.add(name)
+                self._dir_mtimes.pop(name, None)
+                continue
+            if new_mtime != mtime:
+                self._dir_mtimes[name] = new_mtime
+                dirty.add(name)
+        return dirty
+
+    def _inotify_dirty(self):
+        """从inotify事件得到有变化的文件夹"""
+        dirty = set()
+        for directory, name, mask in self._inotify.read_events():
+            if directory == self.base_path:
+                if name.startswith(self.prefix):
+                    dirty.add(name)
+                    if mask & (IN_CREATE | IN_MOVED_TO) and mask & IN_ISDIR:
+                        self._watch_folder(name)
+            elif directory is not None and not name.startswith('.'):
+                dirty.add(os.path.basename(directory))
+        return dirty
+
+    def _settle(self, dirty):
+        """
+        更新待定文件夹的签名，返回已稳定的文件夹
+
+        签名在settle_time内保持不变（或文件夹已删除）才视为稳定
+        """
+        now = self.clock()
+        for name in dirty:
+            self._pending.setdefault(name, (None, now))
+
+        stable = []
+        for name, (signature, since) in list(self._pending.items()):
+            path = os.path.join(self.base_path, name)
+            if not os.path.isdir(path):
+                stable.append(name)
+                continue
+            current = self.catalog.signature(path)
+            if current != signature or name in dirty:
+                self._pending[name] = (current, now)
+            elif now - since >= self.settle_time:
+                stable.append(name)
+
+        for name in stable:
+            del self._pending[name]
+        return stable
+
+    def check(self, dirty=None):
+        """
+        执行一次检查（监视线程中调用，也可以手动调用）
+
+        Args:
+            dirty: 已知有变化的文件夹；None时轮询目录mtime
+        """
+        if dirty is None:
+            dirty = self._poll_dirs()
+        stable = self._settle(dirty)
+        if not stable:
+            return [], [], []
+
+        added, updated, removed = self.catalog.refresh(stable)
+        if added or updated or removed:
+            self.on_change(added, updated, removed)
+        return added, updated, removed
+
+    def _run(self):
+        last_poll = self.clock()
+        while not self._stop.is_set():
+            # 有待定文件夹时缩短等待，以便及时确认写入完成
+            timeout = min(self.interval, self.settle_time / 2) if self._pending else self.interval
+            try:
+                if self._inotify:
+                    readable, _, _ = select.select([self._inotify.fd], [], [], timeout)
+                    dirty = self._inotify_dirty() if readable else set()
+                    # 兜底：定期做一次目录mtime轮询，防止inotify队列溢出漏掉事件
+                    if self.clock() - last_poll >= self.interval:
+                        dirty |= self._poll_dirs()
+                        last_poll = self.clock()
+                    self.check(dirty)
+                else:
+                    if self._stop.wait(timeout):
+                        break
+                    self.check()
+            except Exception as e:
+                self.on_error(f"地图目录检查失败: {e}")
+                self._stop.wait(self.interval)
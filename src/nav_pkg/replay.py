@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+"""
+语音导航回放与压力测试 - 语料读写、合成语料、注入节奏、结果统计
+语料为JSONL，每行一句: {"t": 相对时间(秒), "text": 识别文本, "room": 期望的房间ID或null,
+                        "speaker": 说话人, "partials": [中间结果, ...]}
+不依赖ROS，回放工具 scripts/voice_nav_replay.py 用它驱动ROS话题或直接驱动核心库
+"""
+
+import json
+import threading
+import time
+from collections import Counter, namedtuple
+
+
+Utterance = namedtuple('Utterance', ['t', 'text', 'room', 'speaker', 'partials'])
+Utterance.__new__.__defaults__ = (None, 'user', ())
+
+SCENARIOS = ('burst', 'noisy', 'soak')
+
+_FILLERS = ('去', '请去', '我要去', '带我去', '麻烦到', '去一下', '帮我导航到', '现在去')
+_CHATTER = ('今天天气不错', '你吃饭了吗', '等一下', '嗯', '这个怎么弄', '我看不清楚',
+            '他刚才说什么', '把灯打开', '几点了', '好的好的')
+# 停止指令（桥接节点的快速通道直接取消导航，不产生房间）
+_STOPS = ('停', '停下来', '快停下', '取消导航', '别走了', 'stop')
+# 语音识别常见的同音/近音错字
+_HOMOPHONES = {'客厅': '客听', '卧室': '握室', '厨房': '除房', '书房': '输房', '阳台': '羊台', '餐厅': '参厅'}
+
+
+def load_corpus(path):
+    """
+    读取JSONL语料（空行和#开头的行忽略）
+
+    Returns:
+        [Utterance]，按时间排序
+    """
+    utterances = []
+    with open(path, encoding='utf-8') as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            try:
+                item = json.loads(line)
+                utterances.append(Utterance(float(item.get('t', 0.0)), item['text'], item.get('room'),
+                                            item.get('speaker', 'user'), tuple(item.get('partials', ()))))
+            except (ValueError, KeyError, TypeError) as e:
+                raise ValueError(f"{path}:{number}: {e}")
+    utterances.sort(key=lambda utterance: utterance.t)
+    return utterances
+
+
+def save_corpus(path, utterances):
+    """写入JSONL语料"""
+    with open(path, 'w', encoding='utf-8') as f:
+        for utterance in utterances:
+            item = utterance._asdict()
+            item['partials'] = list(utterance.partials)
+            f.write(json.dumps(item, ensure_ascii=False) + '\n')
+
+
+def generate_corpus(scenario, count, rng, room_mappings, rate=2.0):
+    """
+    生成合成语料
+
+    Args:
+        scenario: 'burst' 短时间内连续下达指令，每组以停止指令结束; 'noisy' 多人说话、闲聊、
+                  同音错字、重复和停止指令; 'soak' 长时间匀速运行
+        count: 语句数
+        rng: random.Random
+        room_mappings: {房间ID: [别名]}
+        rate: 平均每秒语句数（burst为突发内的速率）
+
+    Returns:
+        [Utterance]
+    """
+    if scenario not in SCENARIOS:
+        raise ValueError(f"未知的场景: {scenario}")
+    rooms = sorted(room_mappings)
+    utterances = []
+    t = 0.0
+    for i in range(count):
+        room = rng.choice(rooms)
+        alias = rng.choice(room_mappings[room])
+        text = rng.choice(_FILLERS) + alias
+        speaker = 'user'
+
+        if scenario == 'burst':
+            # 每10句一组突发，组间停顿2秒；每组最后一句叫停
+            t += 1.0 / rate if i % 10 else 2.0
+            if i % 10 == 9:
+                text, room = rng.choice(_STOPS), None
+        elif scenario == 'soak':
+            t += 1.0 / rate
+        else:
+            t += rng.expovariate(rate)
+            kind = rng.random()
+            if kind < 0.3:
+                text, room, speaker = rng.choice(_CHATTER), None, rng.choice(('guest', 'child'))
+            elif kind < 0.45 and alias in _HOMOPHONES:
+                text = rng.choice(_FILLERS) + _HOMOPHONES[alias]
+            elif kind < 0.55 and utterances:
+                # 同一句话在0.3秒后被识别两次（应被桥接节点的重复抑制过滤）
+                previous = utterances[-1]
+                text, room, speaker = previous.text, None, previous.speaker
+                t = previous.t + 0.3
+            elif kind < 0.6:
+                text, room = rng.choice(_STOPS), None
+
+        partials = tuple(text[:end] for end in range(2, len(text), 2))
+        utterances.append(Utterance(round(t, 3), text, room, speaker, partials))
+    return utterances
+
+
+def schedule(utterances, rate=None, speed=1.0):
+    """
+    计算每句话的注入时刻
+
+    Args:
+        utterances: [Utterance]
+        rate: 固定速率（句/秒），None时使用语料中的时间
+        speed: 语料时间的播放倍速
+
+    Returns:
+        [(相对时刻秒, Utterance)]
+    """
+    if rate:
+        return [(i / float(rate), utterance) for i, utterance in enumerate(utterances)]
+    start = utterances[0].t if utterances else 0.0
+    return [((utterance.t - start) / speed, utterance) for utterance in utterances]
+
+
+class ReplayRecorder:
+    """记录注入的语句和收到的输出，按关联ID对应后统计"""
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self._lock = threading.Lock()
+        self.injected = {}       # id -> (Utterance, 注入时刻)
+        self.outputs = {}        # id -> (房间, 收到时刻)
+        self.stops = {}          # id -> 取消导航的时刻（停止指令快速通道）
+        self.unmatched = 0       # 没有关联ID或ID未知的输出
+        self.duplicates = 0      # 同一ID的重复输出
+        self.statuses = Counter()
+        self.started = None
+        self.finished = None
+
+    def on_injected(self, trace_id, utterance, when=None):
+        with self._lock:
+            when = self.clock() if when is None else when
+            if self.started is None:
+                self.started = when
+            self.injected[trace_id] = (utterance, when)
+
+    def on_room(self, trace_id, room, when=None):
+        with self._lock:
+            when = self.clock() if when is None else when
+            if trace_id not in self.injected:
+                self.unmatched += 1
+            elif trace_id in self.outputs:
+                self.duplicates += 1
+            else:
+                self.outputs[trace_id] = (room, when)
+                self.finished = when
+
+    def on_stop(self, trace_id, when=None):
+        """记录停止指令触发的取消导航"""
+        with self._lock:
+            when = self.clock() if when is None else when
+            if trace_id in self.injected and trace_id not in self.stops:
+                self.stops[trace_id] = when
+
+    def on_status(self, status):
+        """记录状态话题（按冒号前的类型计数）"""
+        with self._lock:
+            self.statuses[status.split(':', 1)[0]] += 1
+
+    def report(self):
+        """
+        Returns:
+            统计字典：注入/输出/丢失数、吞吐量、延迟分位数（毫秒）、准确率
+        """
+        with self._lock:
+            injected = dict(self.injected)
+            outputs = dict(self.outputs)
+            stops = dict(self.stops)
+            statuses = dict(self.statuses)
+            unmatched, duplicates = self.unmatched, self.duplicates
+            started, finished = self.started, self.finished
+
+        expected = {key: value for key, value in injected.items() if value[0].room is not None}
+        correct = sum(1 for key, (utterance, _) in expected.items()
+                      if key in outputs and outputs[key][0] == utterance.room)
+        dropped = sum(1 for key in expected if key not in outputs)
+        false_rooms = sum(1 for key, (utterance, _) in injected.items()
+                          if utterance.room is None and key in outputs)
+        latencies = sorted((outputs[key][1] - when) * 1000.0 for key, (_, when) in injected.items() if key in outputs)
+        stop_latencies = sorted((stops[key] - when) * 1000.0 for key, (_, when) in injected.items() if key in stops)
+        duration = (finished - started) if started is not None and finished is not None else 0.0
+
+        def summary(values):
+            def percentile(p):
+                return round(values[min(len(values) - 1, int(len(values) * p))], 3) if values else None
+            return {'p50': percentile(0.5), 'p95': percentile(0.95), 'p99': percentile(0.99),
+                    'max': round(values[-1], 3) if values else None}
+
+        return {
+            'injected': len(injected),
+            'outputs': len(outputs),
+            'expected_rooms': len(expected),
+            'correct': correct,
+            'accuracy': round(correct / len(expected), 4) if expected else None,
+            'dropped': dropped,
+            'false_rooms': false_rooms,
+            'unmatched_outputs': unmatched,
+            'duplicate_outputs': duplicates,
+            'throughput': round(len(outputs) / duration, 2) if duration > 0 else None,
+            'latency_ms': summary(latencies),
+            'stops': len(stops),
+            'stop_latency_ms': summary(stop_latencies),
+            'statuses': statuses,
+        }
+
+
+def format_report(report):
+    """把统计字典格式化为文本行"""
+    latency = report['latency_ms']
+    lines = [
+        f"注入 {report['injected']} 句, 输出房间 {report['outputs']} 个"
+        f" (吞吐量 {report['throughput'] or 0:.1f} 句/秒)",
+        f"准确率 {report['accuracy'] * 100:.1f}% ({report['correct']}/{report['expected_rooms']})"
+        if report['accuracy'] is not None else "准确率 n/a (语料中没有期望房间)",
+        f"丢失 {report['dropped']}  误报房间 {report['false_rooms']}  "
+        f"无法关联 {report['unmatched_outputs']}  重复输出 {report['duplicate_outputs']}",
+    ]
+    if latency['p50'] is not None:
+        lines.append(f"延迟 p50 {latency['p50']:.2f}ms  p95 {latency['p95']:.2f}ms  "
+                     f"p99 {latency['p99']:.2f}ms  最大 {latency['max']:.2f}ms")
+    stop_latency = report.get('stop_latency_ms') or {}
+    if stop_latency.get('p50') is not None:
+        lines.append(f"停止指令 {report['stops']} 条, 识别结果 -> 取消导航 p50 {stop_latency['p50']:.2f}ms  "
+                     f"p99 {stop_latency['p99']:.2f}ms  最大 {stop_latency['max']:.2f}ms")
+    if report['statuses']:
+        lines.append('状态: ' + ', '.join(f"{key}={value}" for key, value in sorted(report['statuses'].items())))
+    return lines
@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+"""
+房间词提取引擎 - 从语音识别文本中提取房间ID（单个房间或多目标路线）
+内置房间类型别名 + 当前地图航点名称，精确匹配失败时按拼音模糊匹配
+不依赖ROS，由语义房间提取节点和基准测试使用
+"""
+
+import functools
+
+from .room_matcher import RoomMatcher, AliasIndex
+from .fuzzy_matcher import FuzzyRoomIndex
+from .route_planning import select_stops, has_order_markers
+
+
+# 房间类型映射（多种别称）
+ROOM_MAPPINGS = {
+    'living_room': ['客厅', '起居室', '会客厅', 'living room', 'lounge', '大厅'],
+    'bedroom': ['卧室', '主卧', '次卧', '房间', 'bedroom', 'bed room', '睡眠室'],
+    'kitchen': ['厨房', '灶间', 'kitchen', '做饭的地方'],
+    'bathroom': ['卫生间', '厕所', '洗手间', '浴室', 'bathroom', '洗澡间'],
+    'dining_room': ['餐厅', '饭厅', '吃饭的地方', 'dining room', '餐饮区'],
+    'study': ['书房', '学习室', '办公室', 'study', '工作室', '书籍室'],
+    'balcony': ['阳台', '露台', 'balcony', '室外'],
+    'entrance': ['玄关', '入口', '门厅', 'entrance', '进门处', '大门']
+}
+
+# 房间类型的中文显示名称
+DISPLAY_NAMES = {
+    'living_room': '客厅',
+    'bedroom': '卧室',
+    'kitchen': '厨房',
+    'bathroom': '卫生间',
+    'dining_room': '餐厅',
+    'study': '书房',
+    'balcony': '阳台',
+    'entrance': '玄关'
+}
+
+
+def waypoint_aliases(name):
+    """
+    生成航点名称的匹配别名
+
+    Args:
+        name: 航点名称 (如 'kitchen 2', '王总办公室')
+
+    Returns:
+        aliases: 别名列表
+    """
+    name = name.lower().strip()
+    return [name, name.replace('_', ' '), name.replace(' ', '').replace('_', '')]
+
+
+def calculate_confidence(text, match):
+    """
+    根据命中区间计算置信度
+
+    Args:
+        text: 输入文本
+        match: RoomMatch命中
+
+    Returns:
+        confidence: 置信度（0-1）
+    """
+    span = match.end - match.start
+
+    if span == 0 or not text:
+        return 0.0
+    if span == len(text):
+        return 1.0  # 完全匹配
+
+    # 部分匹配，根据覆盖率计算置信度
+    coverage = span / len(text)
+    return min(0.9, coverage * 0.8 + 0.3)
+
+
+def get_room_display_name(room_id):
+    """
+    获取房间的显示名称（中文）
+
+    Args:
+        room_id: 房间ID (如 'living_room')
+
+    Returns:
+        display_name: 中文显示名称
+    """
+    return DISPLAY_NAMES.get(room_id, room_id)
+
+
+class RoomExtractor:
+    """房间词提取：内置别名自动机 + 当前地图的航点名称索引"""
+
+    def __init__(self, confidence_threshold=0.5, fuzzy_cache_size=256, room_mappings=None):
+        """
+        Args:
+            confidence_threshold: 模糊匹配的最低置信度
+            fuzzy_cache_size: 模糊匹配结果的LRU缓存大小（按语句）
+            room_mappings: {房间ID: [别名]}，None时使用ROOM_MAPPINGS
+        """
+        self.room_mappings = ROOM_MAPPINGS if room_mappings is None else room_mappings
+        self.confidence_threshold = confidence_threshold
+
+        # 启动时一次性编译别名自动机
+        self.matcher = RoomMatcher(self.room_mappings)
+        # 当前地图的航点名称索引（随地图加载增量更新）
+        self.waypoint_index = AliasIndex()
+        self._waypoint_aliases = {}  # 航点名称 -> 别名列表（上次更新时生成，不变的航点直接复用）
+
+        # 模糊匹配索引（仅在精确匹配失败时使用）及最近语句的结果缓存
+        self.fuzzy_index = FuzzyRoomIndex(self.room_mappings, confidence_threshold)
+        self.waypoint_fuzzy_index = FuzzyRoomIndex({}, confidence_threshold)
+        self._fuzzy_extract_cached = functools.lru_cache(maxsize=fuzzy_cache_size)(self._fuzzy_extract)
+
+    def update_waypoints(self, names):
+        """
+        用当前地图的航点名称增量更新词表
+
+        Args:
+            names: 航点名称列表
+
+        Returns:
+            (added, removed): 新增和移除的别名数
+        """
+        previous = self._waypoint_aliases
+        mappings = {name: previous.get(name) or waypoint_aliases(name) for name in names}
+        self._waypoint_aliases = mappings
+        added, removed = self.waypoint_index.update(mappings)
+        # 模糊索引同样只增删有变化的别名（不整体重建）
+        fuzzy_added, fuzzy_removed = self.waypoint_fuzzy_index.update(mappings)
+        if added or removed or fuzzy_added or fuzzy_removed:
+            self._fuzzy_extract_cached.cache_clear()
+        return added, removed
+
+    def extract(self, text, fuzzy=True):
+        """
+        提取单个房间：先精确匹配，失败时模糊匹配
+
+        Args:
+            text: 输入文本（已转小写）
+            fuzzy: 是否允许模糊匹配
+
+        Returns:
+            (room_name, confidence)
+        """
+        room_name, confidence = self.extract_room(text)
+        if not room_name and fuzzy:
+            room_name, confidence = self.fuzzy_extract(text)
+        return room_name, confidence
+
+    def extract_room(self, text):
+        """
+        从文本中提取房间名称（精确匹配）
+
+        Args:
+            text: 输入文本（已转小写）
+
+        Returns:
+            (room_name, confidence): 提取的房间名称和置信度
+        """
+        max_confidence = 0.0
+        best_span = 0
+        detected_room = None
+
+        # 单次扫描得到所有命中，按命中区间计算置信度
+        for match, confidence in self.extract_matches(text):
+            span = match.end - match.start
+            # 置信度相同时优先更长的别名，其次更靠前的位置
+            if confidence > max_confidence or (confidence == max_confidence and span > best_span):
+                max_confidence = confidence
+                best_span = span
+                detected_room = match.room_id
+
+        return detected_room, max_confidence
+
+    def extract_rooms(self, text):
+        """
+        从文本中提取所有房间（多目标指令）
+
+        Args:
+            text: 输入文本（已转小写）
+
+        Returns:
+            (stops, ordered): RouteStop列表（按文本位置），以及是否由"先/再/然后"等词规定了顺序
+        """
+        stops = select_stops(self.extract_matches(text))
+        return stops, has_order_markers(text, stops)
+
+    def extract_matches(self, text):
+        """
+        返回文本中所有别名命中及其置信度
+
+        Args:
+            text: 输入文本（已转小写）
+
+        Returns:
+            [(RoomMatch, confidence), ...]: 按文本位置排序
+        """
+        # 航点名称排在前面：同一位置命中时优先具体航点（稳定排序）
+        matches = sorted(self.waypoint_index.find_all(text) + self.matcher.find_all(text),
+                         key=lambda match: match.end)
+        return [(match, calculate_confidence(text, match)) for match in matches]
+
+    def fuzzy_extract(self, text):
+        """
+        模糊提取房间名称（带LRU缓存）
+
+        Args:
+            text: 输入文本（已转小写）
+
+        Returns:
+            (room_name, confidence): 提取的房间名称和置信度
+        """
+        return self._fuzzy_extract_cached(text)
+
+    def _fuzzy_extract(self, text):
+        """在航点名称和内置别名中模糊查找，返回置信度最高的结果"""
+        best_room, best_confidence = None, 0.0
+
+        for index in (self.waypoint_fuzzy_index, self.fuzzy_index):
+            match, confidence = index.search(text)
+            if match and confidence > best_confidence:
+                best_room, best_confidence = match.room_id, confidence
+
+        return best_room, best_confidence
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+当前地图的房间查找索引 - 把提取到的房间ID解析为航点
+每次加载地图时构建一次：精确匹配 -> 词/前缀匹配 -> 包含匹配 -> 排序兜底，
+同一输入总是得到同一结果（与航点文件中的顺序无关）
+"""
+
+import bisect
+from collections import namedtuple
+
+from .room_matcher import RoomMatcher
+
+
+# stage: exact / prefix / contained / fallback
+RoomLookup = namedtuple('RoomLookup', ['name', 'coords', 'stage'])
+
+
+def normalize_room_name(name):
+    """统一大小写、下划线/连字符和多余空白: 'Living_Room' -> 'living room'"""
+    return ' '.join(name.lower().replace('_', ' ').replace('-', ' ').split())
+
+
+def _rank(query, name):
+    """候选排序键：长度最接近查询的优先，其次按名称排序"""
+    return abs(len(name) - len(query)), name
+
+
+class RoomIndex:
+    """航点名称查找索引"""
+
+    def __init__(self, waypoints, memo_size=1024):
+        """
+        Args:
+            waypoints: {航点名: 坐标}，即map_info['rooms']
+            memo_size: 兜底查询结果的缓存条数
+        """
+        self.waypoints = waypoints
+        self.memo_size = memo_size
+
+        # 归一化名 -> 原始航点名；归一化后重名时取排序靠前的，保证确定性
+        self._exact = {}
+        for name in sorted(waypoints):
+            self._exact.setdefault(normalize_room_name(name), name)
+
+        # 每个词开头的后缀，按字典序排列，二分查找前缀: 'room' 可命中 'living room'
+        suffixes = set()
+        for key in self._exact:
+            tokens = key.split(' ')
+            for i in range(len(tokens)):
+                suffixes.add((' '.join(tokens[i:]), key))
+        self._suffixes = sorted(suffixes)
+        self._suffix_keys = [suffix for suffix, _ in self._suffixes]
+
+        # 查询中包含的航点名（如 'living room 2' 中的 'living room'）
+        self._matcher = RoomMatcher({key: [key] for key in self._exact})
+
+        self._memo = {}
+
+    def __len__(self):
+        return len(self._exact)
+
+    def lookup(self, room_id):
+        """
+        查找房间
+
+        Args:
+            room_id: 房间ID，如 living_room
+
+        Returns:
+            RoomLookup，未找到时返回None
+        """
+        query = normalize_room_name(room_id)
+        if not query:
+            return None
+
+        key = self._exact.get(query)
+        if key is not None:
+            return self._result(key, 'exact')
+
+        found = self._memo.get(query)
+        if found is None and query not in self._memo:
+            found = self._search(query)
+            if len(self._memo) >= self.memo_size:
+                self._memo.clear()
+            self._memo[query] = found
+        return found
+
+    def _result(self, name, stage):
+        return RoomLookup(name, self.waypoints[name], stage)
+
+    def _search(self, query):
+        # 1. 查询是某个航点中一个词的前缀
+        best = None
+        index = bisect.bisect_left(self._suffix_keys, query)
+        while index < len(self._suffixes) and self._suffix_keys[index].startswith(query):
+            key = self._suffixes[index][1]
+            if best is None or _rank(query, key) < _rank(query, best):
+                best = key
+            index += 1
+        if best is not None:
+            return self._result(self._exact[best], 'prefix')
+
+        # 2. 查询中包含完整的航点名，取最长（最具体）的
+        matches = self._matcher.find_all(query)
+        if matches:
+            key = min((match.room_id for match in matches), key=lambda key: (-len(key), key))
+            return self._result(self._exact[key], 'contained')
+
+        # 3. 兜底：查询出现在航点名中间（如 'bed' -> 'master bedroom'）
+        candidates = [key for key in self._exact if query in key]
+        if candidates:
+            key = min(candidates, key=lambda key: _rank(query, key))
+            return self._result(self._exact[key], 'fallback')
+        return None
@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+"""
+房间别名多模式匹配器 - 基于Aho-Corasick自动机
+启动时将别名表一次性编译为自动机，单次扫描文本即可返回所有命中及其位置
+"""
+
+import threading
+from collections import deque, namedtuple
+
+
+# 单个命中: [start, end) 为在文本中的区间
+RoomMatch = namedtuple('RoomMatch', ['start', 'end', 'room_id', 'alias'])
+
+
+class RoomMatcher:
+    """房间别名多模式匹配器"""
+
+    def __init__(self, mappings):
+        """
+        编译别名表
+
+        Args:
+            mappings: {room_id: [alias, ...]} 别名表
+        """
+        # 预先转小写，匹配时不再重复处理
+        self.patterns = []
+        seen = set()
+        for room_id, aliases in mappings.items():
+            for alias in aliases:
+                key = alias.lower().strip()
+                if key and (key, room_id) not in seen:
+                    seen.add((key, room_id))
+                    self.patterns.append((key, room_id))
+
+        self._build()
+
+    def _build(self):
+        """构建goto/fail/output表"""
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+
+        # 1. 构建字典树
+        for index, (key, _) in enumerate(self.patterns):
+            state = 0
+            for char in key:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                state = next_state
+            self._output[state].append(index)
+
+        # 2. 广度优先计算失败指针，并合并后缀的输出
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail = self._goto[fail].get(char, 0)
+                if fail == next_state:
+                    fail = 0
+                self._fail[next_state] = fail
+                if self._output[fail]:
+                    self._output[next_state] = self._output[next_state] + self._output[fail]
+
+    def find_all(self, text):
+        """
+        单次扫描返回文本中所有别名命中
+
+        Args:
+            text: 输入文本（已转小写）
+
+        Returns:
+            matches: RoomMatch列表，按结束位置排序
+        """
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        patterns = self.patterns
+
+        matches = []
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for index in output[state]:
+                key, room_id = patterns[index]
+                matches.append(RoomMatch(position + 1 - len(key), position + 1, room_id, key))
+
+        return matches
+
+    def __len__(self):
+        return len(self.patterns)
+
+
+class AliasIndex:
+    """
+    可增量更新的别名索引（按长度分桶的哈希表）
+    用于随地图变化的航点名称：更新只处理别名有变化的房间，不重建整个自动机
+    """
+
+    def __init__(self):
+        self._buckets = {}  # 长度 -> {别名: room_id}
+        self._aliases = {}  # 别名 -> [room_id, ...]，多个房间有同一别名时第一个生效
+        self._rooms = {}    # room_id -> (原始别名列表, 归一化后的别名列表)
+        self._lock = threading.Lock()
+
+    def update(self, mappings):
+        """
+        将索引内容更新为mappings，只增删有变化的别名
+
+        Args:
+            mappings: {room_id: [alias, ...]}
+
+        Returns:
+            (added, removed): 新增和删除的别名数量
+        """
+        added = removed = 0
+        with self._lock:
+            rooms, owners_of, buckets = self._rooms, self._aliases, self._buckets
+            # 别名列表未变的房间直接跳过（地图切换时绝大多数航点不变）
+            changed = [(room_id, None) for room_id in rooms if room_id not in mappings]
+            for room_id, aliases in mappings.items():
+                old = rooms.get(room_id)
+                if old is None or old[0] != aliases:
+                    changed.append((room_id, aliases))
+
+            for room_id, aliases in changed:
+                old_keys = rooms.pop(room_id, (None, ()))[1]
+                new_keys = []
+                if aliases is not None:
+                    for alias in aliases:
+                        key = alias.lower().strip()
+                        if key and key not in new_keys:
+                            new_keys.append(key)
+                    rooms[room_id] = (list(aliases), new_keys)
+
+                for key in old_keys:
+                    if key in new_keys:
+                        continue
+                    owners = owners_of[key]
+                    owners.remove(room_id)
+                    bucket = buckets[len(key)]
+                    if owners:
+                        bucket[key] = owners[0]
+                        continue
+                    del owners_of[key]
+                    del bucket[key]
+                    if not bucket:
+                        del buckets[len(key)]
+                    removed += 1
+
+                for key in new_keys:
+                    if key in old_keys:
+                        continue
+                    owners = owners_of.get(key)
+                    if owners is not None:
+                        owners.append(room_id)
+                        continue
+                    owners_of[key] = [room_id]
+                    bucket = buckets.get(len(key))
+                    if bucket is None:
+                        buckets[len(key)] = {key: room_id}
+                    else:
+                        bucket[key] = room_id
+                    added += 1
+        return added, removed
+
+    def find_all(self, text):
+        """
+        返回文本中所有别名命中
+
+        Args:
+            text: 输入文本（已转小写）
+
+        Returns:
+            matches: RoomMatch列表，按结束位置排序
+        """
+        matches = []
+        with self._lock:
+            lengths = [length for length in self._buckets if length <= len(text)]
+            for end in range(1, len(text) + 1):
+                for length in lengths:
+                    if length <= end:
+                        room_id = self._buckets[length].get(text[end - length:end])
+                        if room_id is not None:
+                            matches.append(RoomMatch(end - length, end, room_id, text[end - length:end]))
+        return matches
+
+    def __len__(self):
+        return len(self._aliases)
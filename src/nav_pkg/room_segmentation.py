@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+"""
+房间分割 - 把占用栅格的空闲区域划分为房间，并以航点命名
+加载地图时计算一次标签栅格，之后“机器人在哪个房间”是O(1)的数组索引：
+1. 距离变换：离墙超过半个门宽的空闲栅格构成各房间的核心，门洞处被切断
+2. 区域生长（分水岭式）：以核心为种子，在空闲区域内逐层向外扩展，相邻房间在门洞处相遇
+3. 命名：含有航点的区域取航点名（含多个航点时按最近航点再划分），
+   没有航点的区域（走廊等）归入max_distance内最近的航点，否则不命名
+"""
+
+import math
+
+import numpy as np
+
+try:
+    from scipy import ndimage
+except ImportError:  # 没有scipy时不做房间分割
+    ndimage = None
+
+
+class RoomSegmentation:
+    """单个地图的房间标签栅格"""
+
+    def __init__(self, occupancy_map, waypoints, door_width=0.9, min_area=1.0, max_distance=3.0):
+        """
+        Args:
+            occupancy_map: map_loader.OccupancyMap
+            waypoints: {房间名: {'x', 'y', 'z'}}
+            door_width: 门宽（米），比它窄的通道视为房间分界
+            min_area: 房间核心的最小面积（平方米），更小的视为家具间的缝隙
+            max_distance: 没有航点的区域归入最近航点的最大距离（米）
+        """
+        if ndimage is None:
+            raise ImportError('房间分割需要scipy (python3-scipy)')
+
+        self.resolution = occupancy_map.resolution
+        self.origin = occupancy_map.origin
+        self.width = occupancy_map.width
+        self.height = occupancy_map.height
+        self._cos = math.cos(self.origin[2])
+        self._sin = math.sin(self.origin[2])
+        self.names = sorted(waypoints)
+
+        free = occupancy_map.data == 0
+        regions = self._segment(free, door_width, min_area, int(math.ceil(max_distance / self.resolution)))
+        # labels: 0为不属于任何房间，i+1为self.names[i]
+        self.labels = self._name_regions(regions, waypoints, max_distance)
+
+    @property
+    def nbytes(self):
+        """常驻内存（计入地图缓存上限）"""
+        return self.labels.nbytes
+
+    def _segment(self, free, door_width, min_area, max_steps):
+        """
+        Args:
+            max_steps: 从核心向外生长的最大栅格数，更远的空闲栅格（窄长的通道）不属于任何区域
+
+        Returns:
+            int32区域编号栅格，0为非空闲或离核心太远的空闲区域
+        """
+        distance = ndimage.distance_transform_edt(free)
+        cores, count = ndimage.label(distance * self.resolution > door_width / 2.0)
+        if count:
+            # 去掉面积过小的核心
+            areas = np.bincount(cores.ravel(), minlength=count + 1) * self.resolution ** 2
+            small = areas < min_area
+            small[0] = False
+            cores[small[cores]] = 0
+
+        # 以核心为种子在空闲区域内逐层生长，两侧的房间在门洞相遇
+        # （不用watershed_ift：贴墙的栅格代价相同，标签会沿墙根穿过门洞）
+        # 只在空闲区域的外接矩形内计算（建图得到的地图四周常有大片未知区域），
+        # 每层只处理上一层新加入的栅格，总开销与区域面积成正比，与生长层数无关
+        regions = np.zeros(free.shape, dtype=np.int32)
+        found = ndimage.find_objects(free.view(np.int8))
+        if not found:
+            return regions
+        box = found[0]
+        # 四周补一圈非空闲栅格，邻居下标不会越界
+        window = np.pad(cores[box].astype(np.int32), 1)
+        passable = np.pad(free[box], 1)
+        width = window.shape[1]
+        flat, passable = window.ravel(), passable.ravel()
+        offsets = (-width - 1, -width, -width + 1, -1, 1, width - 1, width, width + 1)
+
+        # 核心内部的栅格四周都已有标签，从核心边缘开始
+        seeded = window > 0
+        frontier = np.flatnonzero(seeded & ~ndimage.binary_erosion(seeded, np.ones((3, 3), dtype=bool)))
+        reached = np.zeros(flat.size, dtype=bool)
+        for _ in range(max_steps):
+            targets, values = [], []
+            for offset in offsets:
+                neighbours = frontier + offset
+                open_cells = passable[neighbours] & (flat[neighbours] == 0)
+                targets.append(neighbours[open_cells])
+                values.append(flat[frontier[open_cells]])
+            targets = np.concatenate(targets)
+            if not targets.size:
+                break
+            # 同一栅格被多个区域同时到达时取编号最大的（与3x3灰度膨胀一致）
+            np.maximum.at(flat, targets, np.concatenate(values))
+            # 去重得到下一层（比np.unique排序快）
+            reached[targets] = True
+            frontier = np.flatnonzero(reached)
+            reached[frontier] = False
+        regions[box] = window[1:-1, 1:-1]
+        return regions
+
+    def _name_regions(self, regions, waypoints, max_distance):
+        """把区域编号换成航点下标+1"""
+        region_count = int(regions.max())
+        labels = np.zeros(regions.shape, dtype=np.uint16 if len(self.names) < 65535 else np.uint32)
+        if not self.names or region_count == 0:
+            return labels
+
+        # 航点所在的区域（航点落在家具或墙上时取max_distance内最近的区域）
+        cells = np.array([self._cell(waypoints[name]['x'], waypoints[name]['y']) for name in self.names],
+                         dtype=float)
+        reach = int(math.ceil(max_distance / self.resolution))
+        region_of = np.array([self._region_near(regions, int(row), int(col), reach) for row, col in cells],
+                             dtype=np.int64)
+
+        # 各区域的重心，用于没有航点的区域
+        rows, cols = np.nonzero(regions)
+        ids = regions[rows, cols]
+        counts = np.bincount(ids, minlength=region_count + 1)
+        centroid_row = np.bincount(ids, weights=rows, minlength=region_count + 1) / np.maximum(counts, 1)
+        centroid_col = np.bincount(ids, weights=cols, minlength=region_count + 1) / np.maximum(counts, 1)
+
+        # 区域 -> 航点下标+1（只含一个航点的区域直接命名）
+        owner = np.zeros(region_count + 1, dtype=labels.dtype)
+        shared = []
+        for region in range(1, region_count + 1):
+            inside = np.flatnonzero(region_of == region)
+            if len(inside) == 1:
+                owner[region] = inside[0] + 1
+            elif len(inside) > 1:
+                shared.append((region, inside))
+            elif counts[region]:
+                gaps = np.hypot(cells[:, 0] - centroid_row[region], cells[:, 1] - centroid_col[region])
+                nearest = int(np.argmin(gaps))
+                if gaps[nearest] * self.resolution <= max_distance:
+                    owner[region] = nearest + 1
+        labels[...] = owner[regions]
+
+        # 含多个航点的区域（开放式客餐厅等）按最近航点再划分
+        objects = ndimage.find_objects(regions) if shared else []
+        for region, inside in shared:
+            self._split_region(regions, labels, region, objects[region - 1], cells[inside].astype(np.int64), inside)
+        return labels
+
+    def _split_region(self, regions, labels, region, box, seed_cells, inside):
+        """
+        区域内每个栅格归入最近的航点：在外接矩形上对航点种子做一次距离变换取最近种子，
+        内存与区域面积成正比，与航点数无关
+
+        Args:
+            box: 区域的外接矩形 (行切片, 列切片)
+            seed_cells: 区域内各航点的 (row, col)，可能在矩形甚至地图之外（航点落在墙上时）
+            inside: 各航点的下标
+        """
+        rows, cols = box
+        # 种子图覆盖区域矩形和所有航点
+        row0, row1 = min(rows.start, seed_cells[:, 0].min()), max(rows.stop, seed_cells[:, 0].max() + 1)
+        col0, col1 = min(cols.start, seed_cells[:, 1].min()), max(cols.stop, seed_cells[:, 1].max() + 1)
+        seeds = np.zeros((row1 - row0, col1 - col0), dtype=labels.dtype)
+        seeds[seed_cells[:, 0] - row0, seed_cells[:, 1] - col0] = inside + 1
+        nearest_rows, nearest_cols = ndimage.distance_transform_edt(
+            seeds == 0, return_distances=False, return_indices=True)
+
+        window = (slice(rows.start - row0, rows.stop - row0), slice(cols.start - col0, cols.stop - col0))
+        mask = regions[box] == region
+        labels[box][mask] = seeds[nearest_rows[window][mask], nearest_cols[window][mask]]
+
+    def _region_near(self, regions, row, col, reach):
+        """(row, col) 附近reach个栅格内最近的区域编号，没有则为0"""
+        row0, col0 = max(0, row - reach), max(0, col - reach)
+        window = regions[row0:max(0, row + reach + 1), col0:max(0, col + reach + 1)]
+        rows, cols = np.nonzero(window)
+        if rows.size == 0:
+            return 0
+        nearest = int(np.argmin((rows + row0 - row) ** 2 + (cols + col0 - col) ** 2))
+        return int(window[rows[nearest], cols[nearest]])
+
+    def _cell(self, x, y):
+        """世界坐标 -> (row, col)，不检查范围"""
+        dx, dy = x - self.origin[0], y - self.origin[1]
+        col = int(math.floor((self._cos * dx + self._sin * dy) / self.resolution))
+        row = int(math.floor((-self._sin * dx + self._cos * dy) / self.resolution))
+        return row, col
+
+    def room_at(self, x, y):
+        """
+        所在的房间
+
+        Args:
+            x, y: 世界坐标
+
+        Returns:
+            房间名，不在任何房间内（或在地图外）时返回None
+        """
+        row, col = self._cell(x, y)
+        if 0 <= row < self.height and 0 <= col < self.width:
+            label = self.labels[row, col]
+            if label:
+                return self.names[label - 1]
+        return None
+
+    def areas(self):
+        """各房间的面积（平方米）"""
+        counts = np.bincount(self.labels.ravel(), minlength=len(self.names) + 1)
+        return {name: float(counts[i + 1]) * self.resolution ** 2 for i, name in enumerate(self.names)}
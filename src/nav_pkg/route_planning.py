@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""
+多目标路线 - 从一句话中提取多个房间，并确定访问顺序
+"先去厨房再去卧室然后回客厅" 按说话顺序执行；"去厨房和卧室" 按行走代价求最短路线
+"""
+
+import itertools
+import math
+from collections import namedtuple
+
+
+# 路线中的一站: [start, end) 为房间词在文本中的区间
+RouteStop = namedtuple('RouteStop', ['room', 'start', 'end', 'confidence'])
+
+# 表示先后顺序的词，出现时按说话顺序执行
+ORDER_MARKERS = ('先', '再', '然后', '接着', '之后', '随后', '最后', '完了',
+                 'first', 'then', 'after that', 'afterwards', 'finally')
+
+# 精确求解（Held-Karp）的最大站数，更多时用最近邻 + 2-opt
+EXACT_ROUTE_LIMIT = 10
+
+
+def select_stops(matches):
+    """
+    从所有别名命中中选出互不重叠的房间词
+
+    Args:
+        matches: [(RoomMatch, confidence)]，按命中结束位置排序（航点名称在前）
+
+    Returns:
+        [RouteStop]，按文本位置排列；相邻的同一房间合并
+    """
+    stops = []
+    for match, confidence in matches:
+        stop = RouteStop(match.room_id, match.start, match.end, confidence)
+        # 与上一站重叠时保留更长的（'主卧室' 优先于 '卧室'）
+        while stops and stop.start < stops[-1].end:
+            previous = stops[-1]
+            if previous.end - previous.start >= stop.end - stop.start:
+                stop = None
+                break
+            stops.pop()
+        if stop is None:
+            continue
+        if stops and stops[-1].room == stop.room:
+            continue
+        stops.append(stop)
+    return stops
+
+
+def has_order_markers(text, stops):
+    """房间词之前或之间是否出现表示先后顺序的词"""
+    if not stops:
+        return False
+    region = text[:stops[-1].start]
+    return any(marker in region for marker in ORDER_MARKERS)
+
+
+def _route_cost(order, costs, start_costs):
+    total = start_costs[order[0]] if start_costs is not None else 0.0
+    for a, b in zip(order, order[1:]):
+        total += costs[a][b]
+    return total
+
+
+def _held_karp(costs, start_costs):
+    """精确求解开放路线（不回到起点），O(2^n * n^2)"""
+    count = len(costs)
+    full = (1 << count) - 1
+    # best[mask][last] = (代价, 上一站)
+    best = [[(math.inf, -1)] * count for _ in range(1 << count)]
+    for i in range(count):
+        best[1 << i][i] = (start_costs[i] if start_costs is not None else 0.0, -1)
+
+    for mask in range(1, full + 1):
+        for last in range(count):
+            cost, _ = best[mask][last]
+            if cost == math.inf or not mask & (1 << last):
+                continue
+            for nxt in range(count):
+                if mask & (1 << nxt):
+                    continue
+                candidate = cost + costs[last][nxt]
+                if candidate < best[mask | (1 << nxt)][nxt][0]:
+                    best[mask | (1 << nxt)][nxt] = (candidate, last)
+
+    last = min(range(count), key=lambda i: best[full][i][0])
+    if best[full][last][0] == math.inf:
+        return list(range(count))
+    order, mask = [], full
+    while last != -1:
+        order.append(last)
+        last, mask = best[mask][last][1], mask & ~(1 << last)
+    return order[::-1]
+
+
+def _nearest_neighbour_2opt(costs, start_costs):
+    """最近邻构造 + 2-opt改进（站数较多时）"""
+    count = len(costs)
+    remaining = set(range(count))
+    if start_costs is not None:
+        current = min(remaining, key=lambda i: (start_costs[i], i))
+    else:
+        current = 0
+    order = [current]
+    remaining.discard(current)
+    while remaining:
+        current = min(remaining, key=lambda i: (costs[current][i], i))
+        order.append(current)
+        remaining.discard(current)
+
+    improved = True
+    while improved:
+        improved = False
+        for i, j in itertools.combinations(range(count), 2):
+            candidate = order[:i] + order[i:j + 1][::-1] + order[j + 1:]
+            if _route_cost(candidate, costs, start_costs) < _route_cost(order, costs, start_costs) - 1e-9:
+                order, improved = candidate, True
+    return order
+
+
+def solve_route(costs, start_costs=None):
+    """
+    求访问所有站点的最短开放路线
+
+    Args:
+        costs: n x n 站点间代价（可为嵌套列表或numpy数组）
+        start_costs: 长度n，从当前位置到各站点的代价；None时起点不限
+
+    Returns:
+        order: 站点下标的访问顺序
+    """
+    count = len(costs)
+    if count <= 1:
+        return list(range(count))
+    costs = [[float(value) for value in row] for row in costs]
+    if start_costs is not None:
+        start_costs = [float(value) for value in start_costs]
+    if count <= EXACT_ROUTE_LIMIT:
+        return _held_karp(costs, start_costs)
+    return _nearest_neighbour_2opt(costs, start_costs)
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+语音识别结果过滤 - 时间窗口内的重复语句抑制、停止指令识别
+不依赖ROS，供语音识别桥接节点和基准测试使用
+"""
+
+import re
+import time
+
+
+class UtteranceFilter:
+    """重复语句过滤器：同一语句在时间窗口内只转发一次"""
+
+    # 比较前去掉的首尾标点（IAT结果常带句号）
+    _STRIP_CHARS = ' \t\r\n。，！？、.,!?'
+
+    def __init__(self, duplicate_window=2.0, clock=time.monotonic):
+        """
+        Args:
+            duplicate_window: 重复判定时间窗口（秒），<=0 时不过滤
+            clock: 单调时钟函数
+        """
+        self.duplicate_window = duplicate_window
+        self.clock = clock
+        self.forwarded = 0
+        self.suppressed = 0
+        self._last_seen = {}  # 归一化语句 -> 最近一次转发时间
+
+    def accept(self, text):
+        """
+        判断语句是否应当转发，并更新计数
+
+        Args:
+            text: 识别文本
+
+        Returns:
+            True: 转发; False: 空语句或窗口内重复
+        """
+        key = text.strip(self._STRIP_CHARS).lower()
+        if not key:
+            return False
+
+        now = self.clock()
+        self._expire(now)
+
+        if self.duplicate_window > 0 and key in self._last_seen:
+            self.suppressed += 1
+            return False
+
+        self._last_seen[key] = now
+        self.forwarded += 1
+        return True
+
+    def _expire(self, now):
+        """丢弃窗口外的记录，保证内存占用有界"""
+        # dict按插入顺序排列，最早的记录在前
+        while self._last_seen:
+            key, seen = next(iter(self._last_seen.items()))
+            if now - seen < self.duplicate_window:
+                break
+            del self._last_seen[key]
+
+    def stats(self):
+        """返回转发/抑制计数"""
+        return {
+            'forwarded': self.forwarded,
+            'suppressed': self.suppressed,
+            'tracked': len(self._last_seen),
+        }
+
+
+class StopCommandMatcher:
+    """停止/取消指令识别：整句只由停止词（及少量语气词）构成时才算，避免误伤 "去停车场" 之类的句子"""
+
+    STOP_WORDS = ('停', '停下', '停下来', '停止', '停车', '站住', '别动', '别走了', '不要动',
+                  '取消', '取消导航', '不去了', '不要去了', '算了',
+                  'stop', 'halt', 'cancel', 'abort', 'freeze')
+    PREFIXES = ('请', '快', '马上', '立刻', '赶紧', '你', '机器人', 'please')
+    SUFFIXES = ('吧', '啊', '了', '一下', '下', '吗', 'now', 'please')
+
+    def __init__(self, stop_words=None):
+        """
+        Args:
+            stop_words: 停止词列表，None时使用STOP_WORDS
+        """
+        words = sorted(stop_words or self.STOP_WORDS, key=len, reverse=True)
+
+        def alternation(items):
+            return '|'.join(re.escape(item) for item in sorted(items, key=len, reverse=True))
+
+        # 启动时编译一次；允许 前缀* 停止词 (停止词|后缀)* 的组合，如 "快停下来吧"、"停停停"
+        self._pattern = re.compile(
+            rf'(?:(?:{alternation(self.PREFIXES)})\s*)*'
+            rf'(?:{alternation(words)})'
+            rf'(?:\s*(?:{alternation(words)}|{alternation(self.SUFFIXES)}))*')
+
+    def match(self, text):
+        """
+        判断语句是否为停止指令
+
+        Args:
+            text: 识别文本
+
+        Returns:
+            True: 停止指令
+        """
+        key = text.strip(UtteranceFilter._STRIP_CHARS).lower()
+        return bool(key) and self._pattern.fullmatch(key) is not None
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+流式房间提取 - 基于IAT中间结果提前给出房间
+同一高置信度房间在连续N个中间结果中保持稳定时发出临时结果，
+最终结果到达后确认、纠正或取消
+"""
+
+import threading
+import time
+from collections import namedtuple
+
+
+# kind: tentative / confirmed / corrected / cancelled / final / none
+StreamEvent = namedtuple('StreamEvent', ['kind', 'room', 'confidence', 'previous'])
+
+
+class StreamingRoomTracker:
+    """单路语音的流式房间跟踪器"""
+
+    def __init__(self, extract, stability=2, min_confidence=0.7, partial_timeout=3.0,
+                 clock=time.monotonic):
+        """
+        Args:
+            extract: 提取函数 text -> (room, confidence)，用于中间结果
+            stability: 同一房间需要连续出现的中间结果数
+            min_confidence: 发出临时结果的最低置信度
+            partial_timeout: 超过该时间没有新的中间结果则视为新一句话（秒）
+            clock: 单调时钟函数
+        """
+        self.extract = extract
+        self.stability = max(1, stability)
+        self.min_confidence = min_confidence
+        self.partial_timeout = partial_timeout
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._candidate = None     # 当前连续出现的房间
+        self._streak = 0
+        self._tentative = None     # 已发出的临时房间
+        self._last_partial = None
+
+    def on_partial(self, text):
+        """
+        处理一条中间结果
+
+        Args:
+            text: 中间识别文本（已转小写）
+
+        Returns:
+            StreamEvent 或 None
+        """
+        room, confidence = self.extract(text)
+
+        with self._lock:
+            now = self.clock()
+            if self._last_partial is not None and now - self._last_partial > self.partial_timeout:
+                self._reset()
+            self._last_partial = now
+
+            if not room or confidence < self.min_confidence:
+                self._candidate, self._streak = None, 0
+                return None
+
+            if room == self._candidate:
+                self._streak += 1
+            else:
+                self._candidate, self._streak = room, 1
+
+            if self._streak < self.stability or room == self._tentative:
+                return None
+
+            previous, self._tentative = self._tentative, room
+            kind = 'corrected' if previous else 'tentative'
+            return StreamEvent(kind, room, confidence, previous)
+
+    def on_final(self, room, confidence):
+        """
+        处理最终结果（房间由调用方按完整流程提取，可含模糊匹配）
+
+        Args:
+            room: 最终结果提取到的房间，None表示未识别到
+            confidence: 置信度
+
+        Returns:
+            StreamEvent
+        """
+        with self._lock:
+            tentative = self._tentative
+            self._reset()
+
+        if tentative is None:
+            return StreamEvent('final' if room else 'none', room, confidence, None)
+        if room == tentative:
+            return StreamEvent('confirmed', room, confidence, None)
+        if room:
+            return StreamEvent('corrected', room, confidence, tentative)
+        return StreamEvent('cancelled', None, 0.0, tentative)
@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""
+航点间行走代价矩阵 - 加载地图后在栅格上预先计算所有房间之间的最短路径长度
+用于：不可达房间的即时拒绝、状态话题中的预计到达时间、多目标请求的排序
+"""
+
+import math
+import time
+
+import numpy as np
+
+try:
+    from scipy import ndimage
+    from scipy.sparse import csr_matrix
+    from scipy.sparse.csgraph import dijkstra
+except ImportError:  # 没有scipy时不计算代价矩阵
+    ndimage = None
+
+
+# 8邻域中“向后”的4个方向 (drow, dcol, 步长)，另外4个由对称边补全
+_NEIGHBOURS = ((0, 1, 1.0), (1, 0, 1.0), (1, 1, math.sqrt(2.0)), (1, -1, math.sqrt(2.0)))
+
+# 每次Dijkstra同时计算的源点数，限制 源点数 x 节点数 的距离数组大小
+_SOURCE_BATCH = 8
+
+
+class TravelCostMatrix:
+    """房间间的栅格最短路径长度（米）"""
+
+    def __init__(self, clearance_map, waypoints, max_nodes=250000):
+        """
+        Args:
+            clearance_map: map_clearance.ClearanceMap或TiledClearanceMap，可通行区域为满足安全距离的栅格
+            waypoints: {房间名: {'x', 'y', 'z'}}
+            max_nodes: 粗栅格的最大节点数，地图更大时按整数倍降采样
+        """
+        if ndimage is None:
+            raise ImportError('代价矩阵需要scipy (python3-scipy)')
+
+        start = time.perf_counter()
+        self.clearance_map = clearance_map
+        self.names = sorted(waypoints)
+        self._index = {name: i for i, name in enumerate(self.names)}
+
+        # 1. 降采样：粗栅格中任一细栅格安全即视为可通行，窄门不会被合并掉
+        height, width = clearance_map.height, clearance_map.width
+        self.factor = max(1, int(math.ceil(math.sqrt(height * width / float(max_nodes)))))
+        self.cell_size = clearance_map.resolution * self.factor
+        self.passable = clearance_map.coarse_clear_mask(self.factor)
+
+        # 2. 连通域：不同连通域之间直接判定不可达，O(1)
+        self.labels, self.component_count = ndimage.label(self.passable, structure=np.ones((3, 3), dtype=int))
+
+        # 3. 房间所在的粗栅格（先吸附到安全栅格）
+        self.cells = []
+        for name in self.names:
+            coords = waypoints[name]
+            self.cells.append(self.coarse_cell(coords['x'], coords['y']))
+
+        self.costs = self._shortest_paths()
+        self.elapsed = time.perf_counter() - start
+
+    @property
+    def nbytes(self):
+        """常驻内存（计入地图缓存上限）"""
+        return self.passable.nbytes + self.labels.nbytes + self.costs.nbytes
+
+    def coarse_cell(self, x, y):
+        """
+        世界坐标 -> 可通行的粗栅格 (row, col)
+
+        Returns:
+            (row, col)，在地图外或附近没有可通行区域时返回None
+        """
+        snapped = self.clearance_map.snap(x, y)
+        if snapped is None or math.isinf(snapped[2]):
+            return None
+        cell = self.clearance_map.world_to_cell(snapped[0], snapped[1])
+        if cell is None:
+            return None
+        return cell[0] // self.factor, cell[1] // self.factor
+
+    def component(self, cell):
+        """粗栅格所在连通域编号，0表示不可通行"""
+        return 0 if cell is None else int(self.labels[cell])
+
+    def _shortest_paths(self):
+        """在可通行粗栅格构成的8邻域图上，从每个房间运行Dijkstra"""
+        count = len(self.names)
+        costs = np.full((count, count), np.inf)
+        np.fill_diagonal(costs, 0.0)
+        if count < 2:
+            return costs
+
+        # 节点编号：只为可通行栅格编号
+        node_ids = np.full(self.passable.shape, -1, dtype=np.int64)
+        node_ids[self.passable] = np.arange(int(self.passable.sum()))
+        node_count = int(self.passable.sum())
+
+        sources, targets, weights = [], [], []
+        height, width = node_ids.shape
+        for drow, dcol, step in _NEIGHBOURS:
+            a = node_ids[0:height - drow, max(0, -dcol):width - max(0, dcol)]
+            b = node_ids[drow:height, max(0, dcol):width - max(0, -dcol)]
+            both = (a >= 0) & (b >= 0)
+            a, b = a[both], b[both]
+            sources += [a, b]
+            targets += [b, a]
+            weights += [np.full(a.size, step)] * 2
+        graph = csr_matrix((np.concatenate(weights), (np.concatenate(sources), np.concatenate(targets))),
+                           shape=(node_count, node_count))
+
+        room_nodes = np.array([node_ids[cell] if cell is not None else -1 for cell in self.cells])
+        room_components = np.array([self.component(cell) for cell in self.cells])
+
+        # 只需要从每个连通域中除最后一个房间以外的房间出发（矩阵对称）
+        pending = []
+        for label in set(room_components.tolist()) - {0}:
+            members = np.flatnonzero(room_components == label)
+            pending.extend(members[:-1].tolist())
+
+        for offset in range(0, len(pending), _SOURCE_BATCH):
+            batch = pending[offset:offset + _SOURCE_BATCH]
+            distances = dijkstra(graph, directed=True, indices=room_nodes[batch])
+            for row, i in zip(distances, batch):
+                same = room_components == room_components[i]
+                costs[i, same] = row[room_nodes[same]] * self.cell_size
+                costs[same, i] = costs[i, same]
+        return costs
+
+    def __contains__(self, name):
+        return name in self._index
+
+    def cost(self, a, b):
+        """两个房间之间的最短路径长度（米），不可达为inf"""
+        return float(self.costs[self._index[a], self._index[b]])
+
+    def reachable_from(self, x, y, name):
+        """
+        从给定位置能否到达房间（同一连通域），O(1)
+
+        Returns:
+            True/False；房间不在矩阵中，或房间/当前位置不在任何连通域内（地图外、附近没有可通行区域）
+            时无法判断，返回None；只有两者都在已知连通域内且不同时才返回False
+        """
+        i = self._index.get(name)
+        if i is None:
+            return None
+        target = self.component(self.cells[i])
+        current = self.component(self.coarse_cell(x, y))
+        if target == 0 or current == 0:
+            return None
+        return current == target
+
+    def estimate_from(self, x, y, name):
+        """
+        估计从给定位置到房间的路径长度：
+        到同一连通域内直线最近的房间的距离 + 该房间到目标的最短路径
+
+        Returns:
+            长度（米），不可达为inf
+        """
+        target = self._index[name]
+        component = self.component(self.coarse_cell(x, y))
+        if component == 0 or component != self.component(self.cells[target]):
+            return math.inf
+
+        center = (self.factor - 1) / 2.0
+        nearest, nearest_distance = target, math.inf
+        for i, cell in enumerate(self.cells):
+            if self.component(cell) != component:
+                continue
+            cx, cy = self.clearance_map.cell_to_world(cell[0] * self.factor + center, cell[1] * self.factor + center)
+            distance = math.hypot(cx - x, cy - y)
+            if distance < nearest_distance:
+                nearest, nearest_distance = i, distance
+        return nearest_distance + float(self.costs[nearest, target])
@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+"""
+航点文件读取 - 流式解析waterplus格式的waypoints.xml
+<Waterplus><Waypoint><Name/><Pos_x/><Pos_y/><Pos_z/><Ori_x/><Ori_y/><Ori_z/><Ori_w/></Waypoint>...</Waterplus>
+分块增量解析，处理完的航点立即从树上清除，内存占用与航点数无关；坐标和朝向做类型校验
+整文件读取（parse_waypoints/count_waypoints）期间暂停分代GC：解析产生大量短命对象，
+常驻对象多的节点进程里每次GC都要扫描整个堆
+不依赖ROS，由地图目录、导航管理器和switch_map.py共用
+"""
+
+import contextlib
+import functools
+import gc
+import math
+from math import isfinite
+import xml.etree.ElementTree as ET
+from collections import namedtuple
+
+
+# orientation: 归一化的四元数 (x, y, z, w)，文件中没有朝向时为None
+Waypoint = namedtuple('Waypoint', ['name', 'x', 'y', 'orientation'])
+
+_ORIENTATION_TAGS = ('Ori_x', 'Ori_y', 'Ori_z', 'Ori_w')
+IDENTITY_ORIENTATION = (0.0, 0.0, 0.0, 1.0)
+
+
+class WaypointError(ValueError):
+    """航点格式错误（缺少字段、坐标不是有限数值等）"""
+
+
+def _number(elem, tag):
+    text = elem.findtext(tag)
+    if text is None:
+        raise WaypointError(f"缺少 <{tag}>")
+    try:
+        value = float(text)
+    except ValueError:
+        raise WaypointError(f"<{tag}> 不是数值: {text.strip()!r}")
+    if not isfinite(value):
+        raise WaypointError(f"<{tag}> 不是有限数值: {text.strip()!r}")
+    return value
+
+
+def _read_waypoint(elem):
+    """把<Waypoint>元素转换为Waypoint，格式错误时抛出WaypointError"""
+    name = (elem.findtext('Name') or '').strip()
+    if not name:
+        raise WaypointError("缺少 <Name>")
+
+    findtext = elem.findtext
+    try:
+        # 注意：Pos_x和Pos_y已经是世界坐标（米），不需要再做像素转换
+        x = float(findtext('Pos_x'))
+        y = float(findtext('Pos_y'))
+        ori_w = findtext('Ori_w')
+        quaternion = None
+        if ori_w is not None:
+            quaternion = (float(findtext('Ori_x')), float(findtext('Ori_y')), float(findtext('Ori_z')), float(ori_w))
+    except (TypeError, ValueError):
+        pass
+    else:
+        if isfinite(x) and isfinite(y) and (quaternion is None or all(map(isfinite, quaternion))):
+            return Waypoint(name, x, y, _normalize(quaternion))
+
+    # 慢路径：逐个字段检查，给出具体的错误
+    for tag in ('Pos_x', 'Pos_y') + (_ORIENTATION_TAGS if findtext('Ori_w') is not None else ()):
+        _number(elem, tag)
+    raise WaypointError("坐标无效")
+
+
+def _normalize(quaternion):
+    """归一化四元数，全零（未指定朝向）时返回None"""
+    if quaternion is None:
+        return None
+    qx, qy, qz, qw = quaternion
+    norm = math.sqrt(qx * qx + qy * qy + qz * qz + qw * qw)
+    if norm < 1e-6:
+        return None
+    return quaternion if abs(norm - 1.0) < 1e-9 else (qx / norm, qy / norm, qz / norm, qw / norm)
+
+
+@contextlib.contextmanager
+def _gc_paused():
+    """暂停分代GC（航点元素之间没有循环引用，解析期间不会积累垃圾）"""
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _error_message(index, elem, error):
+    return f"第{index}个航点 {(elem.findtext('Name') or '').strip()!r}: {error}"
+
+
+def _iter_waypoint_elements(waypoints_file, chunk_size=64 * 1024):
+    """
+    流式遍历根节点下的<Waypoint>元素，产出的元素均已解析完整，产出后即从树上摘除
+
+    与iterparse一样分块feed增量解析，但不订阅事件：iterparse每个XML元素都要经过一次Python层的
+    事件生成器，航点文件每个航点有9个元素，这部分开销比ET.parse整树解析还慢。这里让C实现的
+    TreeBuilder直接建树，每块数据解析完后只处理根节点下已经完整的航点（最后一个可能还没解析完），
+    树上始终只挂着一块数据（64KB）以内的航点
+    """
+    builder = ET.TreeBuilder()
+    # 预先压入一个包装元素，文件的根节点成为它的子元素，这样解析过程中就能拿到根节点
+    document = builder.start('document', {})
+    parser = ET.XMLParser(target=builder)
+
+    with open(waypoints_file, 'rb') as f:
+        for chunk in iter(functools.partial(f.read, chunk_size), b''):
+            parser.feed(chunk)
+            if not len(document):
+                continue
+            root = document[0]
+            complete = root[:-1]
+            del root[:-1]
+            for elem in complete:
+                if elem.tag == 'Waypoint':
+                    yield elem
+
+    builder.end('document')
+    parser.close()
+    for root in document:
+        for elem in root:
+            if elem.tag == 'Waypoint':
+                yield elem
+
+
+def iter_waypoints(waypoints_file, errors=None):
+    """
+    逐个读取航点（流式，已处理的航点立即释放）
+
+    Args:
+        waypoints_file: 航点XML文件路径
+        errors: 列表时跳过格式错误的航点并把错误信息追加进去；None时遇到错误直接抛出
+
+    Yields:
+        Waypoint
+
+    Raises:
+        WaypointError: 航点格式错误（errors为None时）
+        ET.ParseError: XML语法错误
+    """
+    for index, elem in enumerate(_iter_waypoint_elements(waypoints_file), 1):
+        try:
+            yield _read_waypoint(elem)
+        except WaypointError as e:
+            if errors is None:
+                raise WaypointError(_error_message(index, elem, e))
+            errors.append(_error_message(index, elem, e))
+
+
+def count_waypoints(waypoints_file):
+    """
+    统计航点数（流式，不提取字段）
+
+    Args:
+        waypoints_file: 航点XML文件路径
+
+    Returns:
+        count: <Waypoint>元素个数
+    """
+    with _gc_paused():
+        return sum(1 for _ in _iter_waypoint_elements(waypoints_file))
+
+
+def parse_waypoints(waypoints_file, errors=None):
+    """
+    从XML航点文件中提取房间列表
+
+    Args:
+        waypoints_file: 航点XML文件路径
+        errors: 列表时跳过格式错误的航点并把错误信息追加进去；None时遇到错误直接抛出
+
+    Returns:
+        rooms: {房间名: {'x': float, 'y': float, 'z': float[, 'orientation': [x, y, z, w]]}}
+               朝向未指定或为默认朝向时不带orientation
+    """
+    rooms = {}
+    with _gc_paused():
+        for index, elem in enumerate(_iter_waypoint_elements(waypoints_file), 1):
+            # 快路径：字段齐全且为有限数值（绝大多数航点），只调用findtext，不构造Waypoint
+            findtext = elem.findtext
+            try:
+                name = findtext('Name').strip()
+                x = float(findtext('Pos_x'))
+                y = float(findtext('Pos_y'))
+                ori_w = findtext('Ori_w')
+                quaternion = None
+                if ori_w is not None:
+                    quaternion = (float(findtext('Ori_x')), float(findtext('Ori_y')), float(findtext('Ori_z')),
+                                  float(ori_w))
+            except (AttributeError, TypeError, ValueError):
+                name = None
+            if name and isfinite(x) and isfinite(y) and (
+                    quaternion is None or quaternion == IDENTITY_ORIENTATION or all(map(isfinite, quaternion))):
+                room = {'x': x, 'y': y, 'z': 0.0}
+                if quaternion is not None and quaternion != IDENTITY_ORIENTATION:
+                    quaternion = _normalize(quaternion)
+                    if quaternion and quaternion != IDENTITY_ORIENTATION:
+                        room['orientation'] = list(quaternion)
+                rooms[name.lower()] = room
+                continue
+
+            # 慢路径：逐个字段检查，给出具体的错误
+            try:
+                _read_waypoint(elem)
+            except WaypointError as e:
+                if errors is None:
+                    raise WaypointError(_error_message(index, elem, e))
+                errors.append(_error_message(index, elem, e))
+    return rooms
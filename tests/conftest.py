@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+测试公共部分 - nav_pkg的纯Python模块不依赖ROS，直接从src/导入
+计时断言只在启用pytest-benchmark时检查（--benchmark-disable时只验证正确性）
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+_SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+if _SRC_DIR not in sys.path:
+    sys.path.insert(0, _SRC_DIR)
+
+
+def assert_median_below(benchmark, seconds):
+    """单次调用的中位耗时低于seconds（秒）"""
+    if benchmark.disabled or benchmark.stats is None:
+        return
+    median = benchmark.stats.stats.median
+    assert median < seconds, f"中位耗时 {median * 1000:.2f} ms 超过 {seconds * 1000:.2f} ms"
+
+
+def write_pgm(path, image, maxval=255):
+    """把 (height, width) uint8数组写成二进制P5 PGM"""
+    height, width = image.shape
+    with open(path, 'wb') as f:
+        f.write(f"P5\n{width} {height}\n{maxval}\n".encode('ascii'))
+        f.write(np.ascontiguousarray(image, dtype=np.uint8).tobytes())
+
+
+def write_map(folder, image, resolution=0.05, origin=(0.0, 0.0, 0.0)):
+    """在folder下写map.yaml + map.pgm，返回yaml路径"""
+    os.makedirs(folder, exist_ok=True)
+    write_pgm(os.path.join(folder, 'map.pgm'), image)
+    yaml_file = os.path.join(folder, 'map.yaml')
+    with open(yaml_file, 'w') as f:
+        f.write("image: map.pgm\n"
+                f"resolution: {resolution}\n"
+                f"origin: [{origin[0]}, {origin[1]}, {origin[2]}]\n"
+                "negate: 0\noccupied_thresh: 0.65\nfree_thresh: 0.196\n")
+    return yaml_file
+
+
+def write_waypoints_xml(path, rooms):
+    """
+    写waterplus格式的航点文件
+
+    Args:
+        rooms: [(名称, x, y)] 或 [(名称, x, y, (qx, qy, qz, qw))]
+    """
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n<Waterplus>\n')
+        for room in rooms:
+            name, x, y = room[:3]
+            qx, qy, qz, qw = room[3] if len(room) > 3 else (0.0, 0.0, 0.0, 1.0)
+            f.write(f"  <Waypoint>\n    <Name>{name}</Name>\n"
+                    f"    <Pos_x>{x}</Pos_x>\n    <Pos_y>{y}</Pos_y>\n    <Pos_z>0</Pos_z>\n"
+                    f"    <Ori_x>{qx}</Ori_x>\n    <Ori_y>{qy}</Ori_y>\n"
+                    f"    <Ori_z>{qz}</Ori_z>\n    <Ori_w>{qw}</Ori_w>\n  </Waypoint>\n")
+        f.write('</Waterplus>\n')
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(0)
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+import pytest
+from conftest import assert_median_below
+
+from nav_pkg import fuzzy_matcher
+from nav_pkg.fuzzy_matcher import FuzzyRoomIndex, edit_distance, substring_distance
+from nav_pkg.room_extraction import ROOM_MAPPINGS, RoomExtractor
+
+
+def test_edit_distance():
+    assert edit_distance('kitten', 'sitting') == 3
+    assert edit_distance('', 'abc') == 3
+    assert edit_distance('abc', 'abc') == 0
+    # 超过limit时只保证返回值大于limit
+    assert edit_distance('abcdef', 'uvwxyz', limit=2) > 2
+
+
+def test_substring_distance():
+    distance, start, end = substring_distance(list('abc'), list('xxabcxx'))
+    assert (distance, start, end) == (0, 2, 5)
+
+
+@pytest.mark.skipif(fuzzy_matcher.lazy_pinyin is None, reason='需要pypinyin')
+def test_homophone_match():
+    index = FuzzyRoomIndex(ROOM_MAPPINGS)
+    match, confidence = index.search('带我去书芳')
+    assert match.room_id == 'study'
+    assert confidence >= 0.5
+    assert index.search('今天天气不错') == (None, 0.0)
+
+
+def test_fuzzy_search_benchmark(benchmark):
+    index = FuzzyRoomIndex(ROOM_MAPPINGS)
+    texts = ['请带我去书芳', '我想去厨防看看', '今天天气不错', '去客厅'] * 25
+
+    results = benchmark(lambda: [index.search(text) for text in texts])
+    assert results[2] == (None, 0.0)
+    assert results[3][0].room_id == 'living_room'
+    # 100句，每句远低于1ms
+    assert_median_below(benchmark, 0.1)
+
+
+@pytest.mark.skipif(fuzzy_matcher.lazy_pinyin is None, reason='需要pypinyin')
+def test_incremental_update_matches_rebuild():
+    first = {'王总办公室': ['王总办公室'], '三号会议室': ['三号会议室'], '仓库 2': ['仓库 2', '仓库2']}
+    second = {'王总办公室': ['王总办公室'], '仓库 2': ['仓库 2', '仓库2'], '李工实验室': ['李工实验室']}
+    index = FuzzyRoomIndex(first)
+    assert index.update(first) == (0, 0)
+    assert index.update(second) == (1, 1)
+    rebuilt = FuzzyRoomIndex(second)
+    assert len(index) == len(rebuilt) == 4
+    for text in ('去王总办公事', '去三号会议室', '带我去李工实验是', '去仓库二'):
+        assert index.search(text) == rebuilt.search(text), text
+
+
+def test_extractor_waypoint_update():
+    extractor = RoomExtractor()
+    assert extractor.update_waypoints(['王总办公室', '仓库 2']) == (3, 0)
+    assert extractor.extract('去仓库2')[0] == '仓库 2'
+    assert extractor.update_waypoints(['王总办公室', '仓库 2']) == (0, 0)
+    assert extractor.update_waypoints(['王总办公室']) == (0, 2)
+    assert extractor.extract('去仓库2', fuzzy=False) == (None, 0.0)
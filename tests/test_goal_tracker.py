@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from nav_pkg.goal_tracker import (ABORTED, ACTIVE, CANCELLED, PENDING, PREEMPTED, QUEUED, SUCCEEDED, TIMED_OUT,
+                                  GoalTracker, NavGoal)
+
+
+class FakeMoveBase:
+    """记录send/cancel调用的move_base替身"""
+
+    def __init__(self):
+        self.sent = []       # [(goal, token)]
+        self.cancels = 0
+
+    def send(self, goal, token):
+        self.sent.append((goal, token))
+
+    def cancel(self):
+        self.cancels += 1
+
+    @property
+    def token(self):
+        return self.sent[-1][1]
+
+
+@pytest.fixture
+def clock():
+    return [100.0]
+
+
+def _tracker(clock, **kwargs):
+    move_base = FakeMoveBase()
+    tracker = GoalTracker(move_base.send, move_base.cancel, clock=lambda: clock[0], **kwargs)
+    return tracker, move_base
+
+
+def _states(events):
+    return [(event.state, event.goal.room) for event in events]
+
+
+KITCHEN = NavGoal('kitchen', 1.0, 2.0, 0.0)
+BEDROOM = NavGoal('bedroom', 5.0, 5.0, 0.0)
+
+
+def test_success_within_tolerance(clock):
+    tracker, move_base = _tracker(clock, timeout=60.0, tolerance=0.5)
+    assert _states(tracker.submit(KITCHEN)) == [(PENDING, 'kitchen')]
+    # 接受之前的位置更新不算到达
+    assert tracker.on_position(1.0, 2.0) == []
+    assert _states(tracker.on_active(move_base.token)) == [(ACTIVE, 'kitchen')]
+
+    clock[0] += 12.5
+    assert tracker.snapshot() == {'state': ACTIVE, 'room': 'kitchen', 'queued': [], 'elapsed': 12.5}
+    assert tracker.on_position(1.6, 2.0) == []
+    events = tracker.on_position(1.3, 2.4)
+    assert _states(events) == [(SUCCEEDED, 'kitchen')]
+    assert events[0].detail == 'within 0.50m'
+    # 进入容差后取消move_base的剩余微调
+    assert move_base.cancels == 1
+    assert tracker.snapshot()['state'] == 'idle'
+
+
+def test_move_base_result_and_timeout(clock):
+    tracker, move_base = _tracker(clock, timeout=30.0, tolerance=0.0)
+    tracker.submit(KITCHEN)
+    tracker.on_active(move_base.token)
+    assert _states(tracker.on_done(move_base.token, SUCCEEDED)) == [(SUCCEEDED, 'kitchen')]
+
+    tracker.submit(BEDROOM)
+    clock[0] += 29.9
+    assert tracker.tick() == []
+    clock[0] += 0.1
+    events = tracker.tick()
+    assert _states(events) == [(TIMED_OUT, 'bedroom')] and events[0].detail == '30s'
+    assert move_base.cancels == 1
+
+
+def test_goal_replacement_preempts(clock):
+    tracker, move_base = _tracker(clock)
+    tracker.submit(KITCHEN)
+    tracker.on_active(move_base.token)
+    events = tracker.submit(BEDROOM)
+    assert _states(events) == [(PREEMPTED, 'kitchen'), (PENDING, 'bedroom')]
+    assert move_base.cancels == 1
+    assert [goal.room for goal, _ in move_base.sent] == ['kitchen', 'bedroom']
+    assert tracker.snapshot()['room'] == 'bedroom'
+
+
+def test_queue_policy_runs_goals_in_order(clock):
+    tracker, move_base = _tracker(clock, policy='queue', tolerance=0.0)
+    tracker.submit(KITCHEN)
+    assert _states(tracker.submit(BEDROOM)) == [(QUEUED, 'bedroom')]
+    events = tracker.on_done(move_base.token, ABORTED, 'no path')
+    assert _states(events) == [(ABORTED, 'kitchen'), (PENDING, 'bedroom')]
+
+
+def test_stale_token_is_ignored(clock):
+    tracker, move_base = _tracker(clock, tolerance=0.0)
+    tracker.submit(KITCHEN)
+    stale = move_base.token
+    tracker.submit(BEDROOM)
+    # 被取代的目标迟到的回报不影响新目标
+    assert tracker.on_active(stale) == []
+    assert tracker.on_done(stale, ABORTED) == []
+    assert tracker.snapshot()['state'] == PENDING and tracker.snapshot()['room'] == 'bedroom'
+
+    assert _states(tracker.on_active(move_base.token)) == [(ACTIVE, 'bedroom')]
+    # 外部取消（move_base报告PREEMPTED）视为取消
+    assert _states(tracker.on_done(move_base.token, PREEMPTED)) == [(CANCELLED, 'bedroom')]
+    assert tracker.on_done(move_base.token, SUCCEEDED) == []
+
+
+def test_route_numbers_stops(clock):
+    tracker, move_base = _tracker(clock, tolerance=0.0)
+    tracker.submit_route([KITCHEN, BEDROOM])
+    assert move_base.sent[-1][0].route == (1, 2)
+    tracker.on_done(move_base.token, SUCCEEDED)
+    assert move_base.sent[-1][0].route == (2, 2)
+    assert _states(tracker.cancel_all()) == [(CANCELLED, 'bedroom')]
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+import threading
+
+from nav_pkg.local_topics import LocalTopic, TeePublisher
+
+
+def test_callback_error_does_not_stop_subscriber():
+    errors, received, done = [], [], threading.Event()
+
+    def callback(msg):
+        if msg == 'bad':
+            raise ValueError('boom')
+        received.append(msg)
+        if msg == 'last':
+            done.set()
+
+    topic = LocalTopic('/test', on_error=errors.append)
+    topic.subscribe(callback, queue_size=0)
+    for msg in ('first', 'bad', 'last'):
+        topic.publish(msg)
+    assert done.wait(5.0)
+    topic.close()
+
+    assert received == ['first', 'last']
+    assert topic.errors == 1
+    assert 'ValueError: boom' in errors[0] and 'Traceback' in errors[0]
+
+
+def test_queue_drops_oldest_and_tee():
+    topic = LocalTopic('/test')
+    blocker, received, done = threading.Event(), [], threading.Event()
+
+    def callback(msg):
+        blocker.wait(5.0)
+        received.append(msg)
+        if msg == 4:
+            done.set()
+
+    topic.subscribe(callback, queue_size=2)
+
+    class Recorder:
+        def __init__(self):
+            self.published = []
+
+        def publish(self, msg):
+            self.published.append(msg)
+
+    ros = Recorder()
+    tee = TeePublisher(ros, topic)
+    for msg in range(5):
+        tee.publish(msg)
+    blocker.set()
+    assert done.wait(5.0)
+    topic.close()
+    assert ros.published == [0, 1, 2, 3, 4]
+    # 第一条可能已被取出正在处理，其余只保留最新的两条
+    assert received[-2:] == [3, 4] and topic.dropped >= 2
+
+
+def test_close_does_not_block_on_full_queue():
+    topic = LocalTopic('/test')
+    blocker, started = threading.Event(), threading.Event()
+
+    def callback(msg):
+        started.set()
+        blocker.wait(5.0)
+
+    topic.subscribe(callback, queue_size=1)
+    topic.publish('busy')
+    assert started.wait(5.0)
+    topic.publish('queued')
+    closer = threading.Thread(target=topic.close)
+    closer.start()
+    closer.join(1.0)
+    blocker.set()
+    assert not closer.is_alive()
+    assert topic.dropped == 1
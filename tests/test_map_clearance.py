@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+import math
+
+import numpy as np
+import pytest
+from conftest import write_map
+
+pytest.importorskip('scipy')
+
+from nav_pkg.map_clearance import ClearanceMap, TiledClearanceMap  # noqa: E402
+from nav_pkg.map_loader import OccupancyMap  # noqa: E402
+from nav_pkg.map_tiles import convert_to_tiles, open_tiled_map  # noqa: E402
+
+
+@pytest.fixture
+def occupancy_map():
+    # 10m x 5m，分辨率0.1m；x=2..4m处有一大块家具，x=8m处有一根柱子
+    data = np.zeros((50, 100), dtype=np.int8)
+    data[[0, -1], :] = 100
+    data[:, [0, -1]] = 100
+    data[5:45, 20:40] = 100
+    data[24:26, 79:81] = 100
+    return OccupancyMap(data, 0.1, [0.0, 0.0, 0.0], 100, 50, 'test.yaml')
+
+
+def test_snap(occupancy_map):
+    clearance_map = ClearanceMap(occupancy_map, 0.25, 0.1)
+    assert clearance_map.snap(6.0, 2.5) == (6.0, 2.5, 0.0)
+    x, y, moved = clearance_map.snap(8.0, 2.5)
+    assert 0.0 < moved < 0.6 and clearance_map.snap(x, y)[2] == 0.0
+    # 家具中央离安全区域约1米
+    assert 0.9 < clearance_map.snap(3.0, 2.5)[2] < 1.6
+    assert clearance_map.snap(-1.0, 2.5) is None
+    # 每栅格: 两个uint16下标 + bool安全标记
+    assert clearance_map.nbytes == 5 * 50 * 100
+
+
+def test_snap_max_distance(occupancy_map):
+    clearance_map = ClearanceMap(occupancy_map, 0.25, 0.1, search_radius=0.6)
+    assert clearance_map.snap(8.0, 2.5)[2] < 0.6
+    assert clearance_map.snap(3.0, 2.5) == (3.0, 2.5, math.inf)
+
+
+def test_tiled_snap_matches_search_radius(tmp_path, occupancy_map):
+    # 同一张地图的分块版本：正方形搜索窗口角上的栅格也不超过搜索半径
+    image = np.where(occupancy_map.data[::-1] == 100, 0, 254).astype(np.uint8)
+    yaml_file = write_map(str(tmp_path / 'map_a'), image, resolution=0.1)
+    convert_to_tiles(yaml_file, tile_size=32)
+    tiled = TiledClearanceMap(open_tiled_map(yaml_file), 0.25, 0.1, search_radius=0.6)
+    full = ClearanceMap(occupancy_map, 0.25, 0.1, search_radius=0.6)
+    for x in np.arange(0.05, 10.0, 0.1):
+        for y in np.arange(0.05, 5.0, 0.1):
+            moved = tiled.snap(x, y)[2]
+            assert moved <= 0.6 or math.isinf(moved)
+            assert math.isinf(moved) == math.isinf(full.snap(x, y)[2])
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+import os
+
+import numpy as np
+import pytest
+from conftest import assert_median_below, write_map
+
+from nav_pkg.map_loader import MapFormatError, OccupancyMapCache, load_map_yaml, load_occupancy_map, read_pgm
+
+
+def test_decode_trinary(tmp_path):
+    image = np.array([[0, 254], [205, 50]], dtype=np.uint8)
+    yaml_file = write_map(str(tmp_path / 'map_a'), image, resolution=0.1, origin=(1.0, 2.0, 0.0))
+    occupancy_map = load_occupancy_map(yaml_file)
+    # 第0行是地图最下方（图像翻转），黑色占用、白色空闲、灰色未知
+    assert occupancy_map.data.tolist() == [[-1, 100], [100, 0]]
+    assert (occupancy_map.width, occupancy_map.height) == (2, 2)
+    assert occupancy_map.origin == [1.0, 2.0, 0.0]
+
+
+def test_ascii_pgm(tmp_path):
+    path = tmp_path / 'map.pgm'
+    path.write_bytes(b'P2\n# comment\n3 1\n255\n0 128\n255\n')
+    image, maxval = read_pgm(str(path))
+    assert maxval == 255 and image.tolist() == [[0, 128, 255]]
+
+
+def test_invalid_files(tmp_path):
+    path = tmp_path / 'map.pgm'
+    path.write_bytes(b'P5\n4 4\n255\n' + bytes(8))
+    with pytest.raises(MapFormatError):
+        read_pgm(str(path))
+    path.write_bytes(b'')
+    with pytest.raises(MapFormatError):
+        read_pgm(str(path))
+    yaml_file = tmp_path / 'map.yaml'
+    yaml_file.write_text('image: map.pgm\nresolution: 0.05\n')
+    with pytest.raises(MapFormatError):
+        load_map_yaml(str(yaml_file))
+
+
+def test_cache_invalidates_on_change(tmp_path):
+    folder = str(tmp_path / 'map_a')
+    yaml_file = write_map(folder, np.full((4, 4), 254, dtype=np.uint8))
+    cache = OccupancyMapCache()
+    first = cache.get(yaml_file)
+    assert cache.get(yaml_file) is first and cache.hits == 1
+
+    write_map(folder, np.zeros((4, 6), dtype=np.uint8))
+    os.utime(os.path.join(folder, 'map.pgm'), ns=(1, 1))
+    second = cache.get(yaml_file)
+    assert second is not first and second.width == 6 and (second.data == 100).all()
+
+
+def test_load_benchmark(benchmark, tmp_path, rng):
+    image = rng.choice(np.array([0, 205, 254], dtype=np.uint8), size=(2000, 2000))
+    yaml_file = write_map(str(tmp_path / 'map_big'), image)
+
+    occupancy_map = benchmark(load_occupancy_map, yaml_file)
+    expected = np.where(image == 0, 100, np.where(image == 254, 0, -1))[::-1]
+    assert np.array_equal(occupancy_map.data, expected)
+    assert_median_below(benchmark, 0.5)
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+import os
+
+import numpy as np
+from conftest import write_map, write_pgm
+
+from nav_pkg.map_loader import read_map_image
+from nav_pkg.map_store import MapStore, is_compacted, materialize
+from nav_pkg.map_tiles import convert_to_tiles, open_tiled_map
+
+
+def _write_versions(base, images):
+    """按时间顺序写入地图版本，返回各版本map.pgm路径和原始字节"""
+    paths, originals = [], []
+    for i, image in enumerate(images):
+        yaml_file = write_map(str(base / f'map_2024010{i + 1}_000000'), image)
+        pgm_file = os.path.join(os.path.dirname(yaml_file), 'map.pgm')
+        with open(pgm_file, 'rb') as f:
+            originals.append(f.read())
+        paths.append(pgm_file)
+    return paths, originals
+
+
+def test_compact_round_trip(tmp_path, rng):
+    base = rng.choice(np.array([0, 205, 254], dtype=np.uint8), size=(120, 80))
+    small = base.copy()
+    small[10:20, 10:20] = 0
+    large = rng.choice(np.array([0, 205, 254], dtype=np.uint8), size=(120, 80))
+    large_small = large.copy()
+    large_small[50:55, 30:40] = 254
+    paths, originals = _write_versions(tmp_path, [base, small, large, large_small])
+
+    store = MapStore(str(tmp_path))
+    before = store.disk_usage()
+    stats = store.compact(min_age=0)
+    # 变化大的版本成为新的关键帧，其余只保存增量
+    assert (stats['keyframes'], stats['deltas'], stats['skipped']) == (2, 2, [])
+    assert all(is_compacted(path) for path in paths)
+
+    usage = store.disk_usage()
+    assert usage['images'] == 0 and usage['total'] < before['total']
+    assert stats['bytes_before'] == before['total'] and stats['bytes_after'] == usage['total']
+
+    for path, original, image in zip(paths, originals, [base, small, large, large_small]):
+        restored, maxval = read_map_image(path)
+        assert maxval == 255 and np.array_equal(restored, image)
+        output = str(tmp_path / 'restored.pgm')
+        materialize(path, output)
+        with open(output, 'rb') as f:
+            assert f.read() == original
+
+    # 再次压缩没有可处理的版本
+    again = store.compact(min_age=0)
+    assert (again['keyframes'], again['deltas'], again['removed_keyframes']) == (0, 0, 0)
+
+
+def test_tiles_checked_against_compacted_image(tmp_path):
+    image = np.full((64, 64), 254, dtype=np.uint8)
+    paths, _ = _write_versions(tmp_path, [image, image, image])
+    yaml_files = [os.path.join(os.path.dirname(path), 'map.yaml') for path in paths]
+    for yaml_file in yaml_files[1:]:
+        convert_to_tiles(yaml_file, tile_size=32)
+
+    # 第三个版本分块后被重新生成（mtime早于分块文件，只有像素校验能发现）
+    changed = image.copy()
+    changed[10:20, 10:20] = 0
+    write_pgm(paths[2], changed)
+    for path in paths:
+        os.utime(path, ns=(1, 1))
+
+    MapStore(str(tmp_path)).compact(min_age=0)
+    assert all(is_compacted(path) for path in paths)
+    # 图像未变的版本继续使用分块文件，已变的版本被判为过期
+    assert open_tiled_map(yaml_files[1]) is not None
+    assert open_tiled_map(yaml_files[2]) is None
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+import os
+
+import numpy as np
+from conftest import write_map, write_pgm
+
+from nav_pkg.map_store import MapStore
+from nav_pkg.map_tiles import convert_to_tiles, open_tiled_map
+
+
+def test_tiles_match_image(tmp_path, rng):
+    image = rng.choice(np.array([0, 205, 254], dtype=np.uint8), size=(300, 200))
+    yaml_file = write_map(str(tmp_path / 'map_a'), image)
+    convert_to_tiles(yaml_file, tile_size=64)
+
+    tiled_map = open_tiled_map(yaml_file)
+    expected = np.where(image == 0, 100, np.where(image == 254, 0, -1))[::-1]
+    assert np.array_equal(tiled_map.window(0, 300, 0, 200), expected)
+    # 发布/map用的一维缓冲区，行序与OccupancyGrid.data一致
+    data = tiled_map.occupancy_data()
+    assert data.dtype == np.int8 and np.array_equal(data, expected.reshape(-1))
+
+
+def test_stale_tiles_after_compaction(tmp_path):
+    image = np.full((64, 64), 254, dtype=np.uint8)
+    keyframe = write_map(str(tmp_path / 'map_20240101_000000'), image)
+    yaml_file = write_map(str(tmp_path / 'map_20240102_000000'), image)
+    convert_to_tiles(yaml_file, tile_size=32)
+    pgm_file = os.path.join(os.path.dirname(yaml_file), 'map.pgm')
+    assert open_tiled_map(keyframe) is None and open_tiled_map(yaml_file) is not None
+
+    # 分块后重新生成的地图，mtime早于分块文件，随后被压缩（map.pgm被删除）
+    image[10:20, 10:20] = 0
+    write_pgm(pgm_file, image)
+    os.utime(pgm_file, ns=(1, 1))
+    os.utime(os.path.join(os.path.dirname(keyframe), 'map.pgm'), ns=(1, 1))
+    MapStore(str(tmp_path)).compact(min_age=0)
+    assert not os.path.exists(pgm_file)
+    assert open_tiled_map(yaml_file) is None
+
+    # 由压缩后的图像重新分块
+    convert_to_tiles(yaml_file, tile_size=32)
+    tiled_map = open_tiled_map(yaml_file)
+    assert tiled_map is not None and (tiled_map.window(44, 54, 10, 20) == 100).all()
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+import argparse
+import json
+import os
+import random
+import sys
+
+import pytest
+
+from nav_pkg.replay import ReplayRecorder, Utterance, generate_corpus, load_corpus, save_corpus
+from nav_pkg.room_extraction import ROOM_MAPPINGS
+from nav_pkg.speech_filters import StopCommandMatcher
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts'))
+import voice_nav_replay  # noqa: E402
+
+
+def _replay_core(corpus, capsys, rate=50.0, duplicate_window=0.2):
+    """按固定速率把语料注入核心库（桥接过滤 + 房间提取），返回统计字典"""
+    args = argparse.Namespace(corpus=str(corpus), rate=rate, speed=1.0, repeat=1, timeout=1.0, json=True,
+                              queue_size=10, duplicate_window=duplicate_window, waypoints=None)
+    voice_nav_replay.cmd_core(args)
+    return json.loads(capsys.readouterr().out.strip().splitlines()[-1])
+
+
+def test_recorder_report():
+    clock = [0.0]
+    recorder = ReplayRecorder(clock=lambda: clock[0])
+    recorder.on_injected('a', Utterance(0.0, '去厨房', 'kitchen'))
+    recorder.on_injected('b', Utterance(0.1, '你好', None))
+    recorder.on_injected('c', Utterance(0.2, '去卧室', 'bedroom'))
+    clock[0] = 0.005
+    recorder.on_room('a', 'kitchen')
+    recorder.on_room('a', 'kitchen')
+    recorder.on_room('x', 'kitchen')
+    report = recorder.report()
+    assert (report['accuracy'], report['dropped'], report['duplicate_outputs'], report['unmatched_outputs']) == \
+        (0.5, 1, 1, 1)
+    assert report['latency_ms']['max'] == 5.0
+    assert report['stops'] == 0
+
+
+def test_recorder_stop_latency():
+    clock = [0.0]
+    recorder = ReplayRecorder(clock=lambda: clock[0])
+    recorder.on_injected('s', Utterance(0.0, '停下来', None))
+    clock[0] = 0.003
+    recorder.on_stop('s')
+    report = recorder.report()
+    assert report['stops'] == 1 and report['stop_latency_ms']['max'] == 3.0
+
+
+def test_corpus_round_trip(tmp_path):
+    utterances = generate_corpus('noisy', 50, random.Random(1), ROOM_MAPPINGS)
+    save_corpus(tmp_path / 'noisy.jsonl', utterances)
+    assert load_corpus(tmp_path / 'noisy.jsonl') == utterances
+
+
+@pytest.mark.parametrize('scenario, min_accuracy', [('burst', 1.0), ('noisy', 0.95)])
+def test_core_replay_latency_and_accuracy(tmp_path, capsys, scenario, min_accuracy):
+    utterances = generate_corpus(scenario, 200, random.Random(42), ROOM_MAPPINGS)
+    # 以50句/秒注入，重复抑制窗口（0.2秒）覆盖前后十句；
+    # 去掉十句之内恰好重复的正常指令，它们在真实时间里也会被抑制
+    kept = []
+    for utterance in utterances:
+        if utterance.room is None or utterance.text not in [u.text for u in kept[-10:]]:
+            kept.append(utterance)
+    corpus = tmp_path / f'{scenario}.jsonl'
+    save_corpus(corpus, kept)
+
+    report = _replay_core(corpus, capsys)
+    assert report['dropped'] == 0 and report['queue_dropped'] == 0
+    assert report['false_rooms'] == 0
+    assert report['accuracy'] >= min_accuracy
+    # 识别结果到房间输出（两级进程内队列 + 过滤 + 提取）
+    assert report['latency_ms']['p99'] < 20.0
+    # 停止指令不经过重复抑制，每句都应触发取消
+    matcher = StopCommandMatcher()
+    assert report['stops'] == sum(1 for u in kept if matcher.match(u.text)) > 0
+    assert report['stop_latency_ms']['p99'] < 20.0
+
+
+def test_sample_corpus_replay(capsys):
+    corpus = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                          'config', 'replay_sample.jsonl')
+    report = _replay_core(corpus, capsys)
+    assert report['stops'] == 2 and report['false_rooms'] == 0
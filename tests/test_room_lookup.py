@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+from conftest import assert_median_below
+
+from nav_pkg.room_lookup import RoomIndex, normalize_room_name
+
+
+WAYPOINTS = {
+    'Living_Room': {'x': 1.0, 'y': 2.0, 'z': 0.0},
+    'master bedroom': {'x': 3.0, 'y': 4.0, 'z': 0.0},
+    'bedroom': {'x': 5.0, 'y': 6.0, 'z': 0.0},
+    'kitchen': {'x': 7.0, 'y': 8.0, 'z': 0.0},
+    'study-room': {'x': 9.0, 'y': 1.0, 'z': 0.0},
+}
+
+
+def test_normalize_room_name():
+    assert normalize_room_name('  Living_Room ') == 'living room'
+    assert normalize_room_name('study-room') == 'study room'
+
+
+def test_lookup_stages():
+    index = RoomIndex(WAYPOINTS)
+    assert index.lookup('living room') == ('Living_Room', WAYPOINTS['Living_Room'], 'exact')
+    assert index.lookup('KITCHEN').stage == 'exact'
+    # 'bed' 是 'bedroom' 的前缀，长度更接近的优先
+    assert index.lookup('bed')[:1] == ('bedroom',)
+    assert index.lookup('bed').stage == 'prefix'
+    assert index.lookup('living room 2')[::2] == ('Living_Room', 'contained')
+    assert index.lookup('droom')[::2] == ('bedroom', 'fallback')
+    assert index.lookup('garage') is None
+    assert index.lookup('') is None
+
+
+def test_lookup_is_order_independent():
+    reversed_index = RoomIndex(dict(reversed(list(WAYPOINTS.items()))))
+    index = RoomIndex(WAYPOINTS)
+    for query in ('room', 'bed', 'droom', 'study', 'the kitchen please'):
+        assert index.lookup(query) == reversed_index.lookup(query)
+
+
+def test_lookup_benchmark(benchmark):
+    waypoints = {f'room {i}': {'x': float(i), 'y': 0.0, 'z': 0.0} for i in range(5000)}
+    waypoints.update(WAYPOINTS)
+    index = RoomIndex(waypoints)
+    queries = ['kitchen', 'room 4321', 'master', 'droom', 'living room 2'] * 20
+
+    results = benchmark(lambda: [index.lookup(query) for query in queries])
+    assert [result.name for result in results[:5]] == \
+        ['kitchen', 'room 4321', 'master bedroom', 'bedroom', 'Living_Room']
+    # 100次查找（含记忆化的兜底查询）
+    assert_median_below(benchmark, 0.01)
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+import tracemalloc
+
+import numpy as np
+import pytest
+
+ndimage = pytest.importorskip('scipy.ndimage')
+
+from nav_pkg.map_loader import OccupancyMap  # noqa: E402
+from nav_pkg.room_segmentation import RoomSegmentation  # noqa: E402
+
+
+RESOLUTION = 0.05
+
+
+def _map(data):
+    height, width = data.shape
+    return OccupancyMap(data, RESOLUTION, [0.0, 0.0, 0.0], width, height, 'test.yaml')
+
+
+def _world(row, col):
+    return (col + 0.5) * RESOLUTION, (row + 0.5) * RESOLUTION
+
+
+def _waypoint(row, col):
+    x, y = _world(row, col)
+    return {'x': x, 'y': y, 'z': 0.0}
+
+
+def _floor_plan():
+    """两个5m x 5m的房间，中间的墙上有一扇0.8m的门；四周留一圈未知区域"""
+    data = np.full((140, 240), -1, dtype=np.int8)
+    data[10:130, 10:230] = 100
+    data[12:112, 12:112] = 0
+    data[12:112, 114:214] = 0
+    data[52:68, 112:114] = 0  # 门
+    return data
+
+
+def _reference_growth(free, cores, max_steps):
+    """原来的实现：整张地图逐层3x3灰度膨胀"""
+    regions = cores.astype(np.int32)
+    for _ in range(max_steps):
+        grown = ndimage.grey_dilation(regions, size=(3, 3))
+        frontier = free & (regions == 0) & (grown > 0)
+        if not frontier.any():
+            break
+        regions[frontier] = grown[frontier]
+    return regions
+
+
+def test_rooms_split_at_door():
+    waypoints = {'kitchen': _waypoint(60, 40), 'bedroom': _waypoint(30, 200)}
+    segmentation = RoomSegmentation(_map(_floor_plan()), waypoints)
+    assert segmentation.room_at(*_world(100, 100)) == 'kitchen'
+    assert segmentation.room_at(*_world(15, 120)) == 'bedroom'
+    assert segmentation.room_at(*_world(60, 112)) in ('kitchen', 'bedroom')
+    assert segmentation.room_at(*_world(5, 5)) is None
+    assert segmentation.room_at(-1.0, -1.0) is None
+    areas = segmentation.areas()
+    assert areas['kitchen'] == pytest.approx(25.0, rel=0.05)
+    assert areas['bedroom'] == pytest.approx(25.0, rel=0.05)
+
+
+def test_growth_matches_dilation(rng):
+    # 随机障碍物 + 大片未知边框，结果与逐层膨胀完全一致
+    data = np.full((300, 400), -1, dtype=np.int8)
+    inner = np.where(rng.random((200, 300)) < 0.08, 100, 0).astype(np.int8)
+    inner[::40, :] = 100
+    inner[:, ::50] = 100
+    data[50:250, 60:360] = inner
+    free = data == 0
+    segmentation = RoomSegmentation.__new__(RoomSegmentation)
+    segmentation.resolution = RESOLUTION
+    distance = ndimage.distance_transform_edt(free)
+    cores, _ = ndimage.label(distance * RESOLUTION > 0.9 / 2.0)
+    for max_steps in (3, 60):
+        expected = _reference_growth(free, cores, max_steps)
+        assert np.array_equal(segmentation._segment(free, 0.9, 0.0, max_steps), expected)
+
+
+def test_shared_region_split_by_nearest_waypoint(rng):
+    data = np.zeros((200, 300), dtype=np.int8)
+    data[[0, -1], :] = 100
+    data[:, [0, -1]] = 100
+    cells = [(int(row), int(col)) for row, col in zip(rng.integers(5, 195, 12), rng.integers(5, 295, 12))]
+    waypoints = {f'spot {i:02d}': _waypoint(row, col) for i, (row, col) in enumerate(cells)}
+    segmentation = RoomSegmentation(_map(data), waypoints)
+
+    names = sorted(waypoints)
+    targets = np.array([cells[int(name.split()[1])] for name in names])
+    for row, col in zip(rng.integers(1, 199, 500), rng.integers(1, 299, 500)):
+        gaps = (targets[:, 0] - row) ** 2 + (targets[:, 1] - col) ** 2
+        nearest = {names[i] for i in np.flatnonzero(gaps == gaps.min())}
+        assert segmentation.room_at(*_world(row, col)) in nearest
+
+
+def test_shared_region_memory_is_independent_of_waypoints(rng):
+    # 开放区域内200个航点：按栅格x航点的距离矩阵需要约1.6GB
+    data = np.zeros((1000, 1000), dtype=np.int8)
+    data[[0, -1], :] = 100
+    data[:, [0, -1]] = 100
+    waypoints = {f'spot {i}': _waypoint(int(row), int(col))
+                 for i, (row, col) in enumerate(zip(rng.integers(10, 990, 200), rng.integers(10, 990, 200)))}
+    tracemalloc.start()
+    try:
+        segmentation = RoomSegmentation(_map(data), waypoints)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert len({name for name, area in segmentation.areas().items() if area > 0}) == len(waypoints)
+    assert peak < 150 * 1024 * 1024
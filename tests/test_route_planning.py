@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+import itertools
+
+import numpy as np
+from conftest import assert_median_below
+
+from nav_pkg.room_matcher import RoomMatch
+from nav_pkg.route_planning import has_order_markers, select_stops, solve_route
+
+
+def _cost(order, costs, start_costs):
+    total = start_costs[order[0]]
+    for a, b in zip(order, order[1:]):
+        total += costs[a][b]
+    return total
+
+
+def _random_instance(rng, count):
+    points = rng.uniform(0.0, 20.0, size=(count + 1, 2))
+    distances = np.hypot(*(points[:, None, :] - points[None, :, :]).transpose(2, 0, 1))
+    return distances[1:, 1:], distances[0, 1:]
+
+
+def test_select_stops_prefers_longer_overlap():
+    matches = [(RoomMatch(1, 3, 'bedroom', '卧室'), 1.0),
+               (RoomMatch(0, 3, 'master_bedroom', '主卧室'), 1.0),
+               (RoomMatch(5, 7, 'kitchen', '厨房'), 1.0)]
+    stops = select_stops(matches)
+    assert [stop.room for stop in stops] == ['master_bedroom', 'kitchen']
+
+
+def test_order_markers():
+    stops = select_stops([(RoomMatch(2, 4, 'kitchen', '厨房'), 1.0),
+                          (RoomMatch(6, 8, 'bedroom', '卧室'), 1.0)])
+    assert has_order_markers('先去厨房再去卧室', stops)
+    assert not has_order_markers('去厨房和卧室', stops)
+
+
+def test_solve_route_is_optimal(rng):
+    for count in range(2, 8):
+        costs, start_costs = _random_instance(rng, count)
+        order = solve_route(costs, start_costs)
+        assert sorted(order) == list(range(count))
+        best = min(_cost(p, costs, start_costs) for p in itertools.permutations(range(count)))
+        assert abs(_cost(order, costs, start_costs) - best) < 1e-9
+
+
+def test_held_karp_benchmark(benchmark, rng):
+    costs, start_costs = _random_instance(rng, 10)
+    order = benchmark(solve_route, costs, start_costs)
+    assert sorted(order) == list(range(10))
+    assert_median_below(benchmark, 2.0)
+
+
+def test_large_route_benchmark(benchmark, rng):
+    costs, start_costs = _random_instance(rng, 30)
+    order = benchmark(solve_route, costs, start_costs)
+    assert sorted(order) == list(range(30))
+    # 2-opt后不比最近邻差
+    greedy, remaining = [], set(range(30))
+    current = min(remaining, key=lambda i: (start_costs[i], i))
+    while remaining:
+        greedy.append(current)
+        remaining.discard(current)
+        if remaining:
+            current = min(remaining, key=lambda i: (costs[greedy[-1]][i], i))
+    assert _cost(order, costs, start_costs) <= _cost(greedy, costs, start_costs) + 1e-9
+    assert_median_below(benchmark, 2.0)
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+import os
+import random
+import sys
+import time
+
+import pytest
+
+rospy = pytest.importorskip('rospy')
+pytest.importorskip('std_msgs')
+pytest.importorskip('geometry_msgs')
+pytest.importorskip('actionlib_msgs')
+pytest.importorskip('diagnostic_msgs')
+
+from actionlib_msgs.msg import GoalID  # noqa: E402
+from geometry_msgs.msg import Twist  # noqa: E402
+from std_msgs.msg import String  # noqa: E402
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts'))
+import speech_recognition_node  # noqa: E402
+
+_STOPS = ['停', '停下来', '快停下吧', '取消导航', '别走了', 'stop', '停止。']
+_COMMANDS = ['去厨房', '带我去客厅', '我要去卧室', '帮我导航到书房', '去停车场']
+
+
+class _RecordingTopics:
+    """代替rospy的Publisher/Subscriber：记录每次发布的 (时刻, 话题, 消息)"""
+
+    def __init__(self):
+        self.published = []
+
+    def Publisher(self, name, msg_type, **kwargs):
+        published = self.published
+
+        class Publisher:
+            def publish(self, msg):
+                published.append((time.perf_counter(), name, msg))
+        return Publisher()
+
+    def Subscriber(self, name, msg_type, callback, **kwargs):
+        return None
+
+
+@pytest.fixture
+def bridge(monkeypatch):
+    params = {'/speech_recognition/stats_interval': 0, '/advanced/tracing': True}
+    monkeypatch.setattr(rospy, 'get_param', lambda name, default=None: params.get(name, default))
+    topics = _RecordingTopics()
+    return speech_recognition_node.XfyunSpeechRecognizer(topics), topics
+
+
+def test_stop_fast_path_latency(bridge):
+    node, topics = bridge
+    rng = random.Random(7)
+    latencies = []
+    for i in range(500):
+        is_stop = i % 5 == 0
+        text = rng.choice(_STOPS if is_stop else _COMMANDS)
+        topics.published.clear()
+        begin = time.perf_counter()
+        node._on_recognition_result(String(data=text))
+        names = [name for _, name, _ in topics.published]
+        if not is_stop:
+            assert 'move_base/cancel' not in names
+            continue
+        # 先取消全部目标，再发布零速度，最后通知导航管理器
+        assert names == ['move_base/cancel', 'cmd_vel', 'speech_recognition/stop']
+        (_, _, cancel), (stamp, _, twist) = topics.published[:2]
+        assert cancel == GoalID() and twist == Twist()
+        latencies.append((stamp - begin) * 1000.0)
+
+    latencies.sort()
+    assert node.stop_count == len(latencies) == 100
+    # 识别结果 -> move_base/cancel + 零速度
+    assert latencies[int(len(latencies) * 0.99)] < 20.0
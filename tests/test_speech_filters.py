@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+import random
+import threading
+import time
+
+from nav_pkg.local_topics import LocalTopic
+from nav_pkg.speech_filters import StopCommandMatcher, UtteranceFilter
+
+
+_PHRASES = [filler + room for filler in ('请去', '我要去', '带我去', '去一下')
+            for room in ('厨房', '客厅', '卧室', '书房', '阳台')]
+
+
+def test_duplicate_suppression():
+    clock = [0.0]
+    utterance_filter = UtteranceFilter(2.0, clock=lambda: clock[0])
+    assert utterance_filter.accept('去厨房。')
+    assert not utterance_filter.accept('去厨房')
+    assert not utterance_filter.accept('  ')
+    clock[0] = 2.5
+    assert utterance_filter.accept('去厨房')
+    assert utterance_filter.stats() == {'forwarded': 2, 'suppressed': 1, 'tracked': 1}
+
+
+def test_stop_commands():
+    matcher = StopCommandMatcher()
+    for text in ('停', '快停下来吧', '停停停', 'Stop now!', '取消导航。'):
+        assert matcher.match(text), text
+    for text in ('去停车场', '停车场在哪', '', '别停'):
+        assert not matcher.match(text), text
+
+
+def test_single_subscription_forwards_each_result_once():
+    # 桥接只订阅一次IAT话题：每条结果回调一次，重复上报在窗口内被抑制
+    iat = LocalTopic('/xfyun/iat')
+    clock = [0.0]
+    utterance_filter = UtteranceFilter(2.0, clock=lambda: clock[0])
+    calls, done = [], threading.Event()
+
+    def on_result(msg):
+        stamp, text = msg
+        if text == 'END':
+            done.set()
+            return
+        clock[0] = stamp
+        calls.append(utterance_filter.accept(text))
+
+    iat.subscribe(on_result, queue_size=0)
+    for second in range(600):
+        # 每秒一条新语句，紧跟一条重复上报
+        text = _PHRASES[second % len(_PHRASES)]
+        iat.publish((float(second), text))
+        iat.publish((second + 0.1, text))
+    iat.publish((600.0, 'END'))
+    assert done.wait(5.0)
+    iat.close()
+    assert len(calls) == 1200
+    assert utterance_filter.forwarded == 600 and utterance_filter.suppressed == 600
+
+
+def test_bridge_cpu_stays_flat():
+    """
+    模拟8小时运行（每0.5秒一条结果，30%重复上报）：
+    每条结果的CPU时间、跟踪条目数不随运行时间增长
+    """
+    rng = random.Random(0)
+    clock = [0.0]
+    utterance_filter = UtteranceFilter(2.0, clock=lambda: clock[0])
+    per_hour, tracked = [], []
+    last_text = None
+    for hour in range(8):
+        forwarded_before = utterance_filter.forwarded
+        start = time.process_time()
+        for _ in range(7200):
+            clock[0] += 0.5
+            text = last_text if last_text is not None and rng.random() < 0.3 else rng.choice(_PHRASES)
+            last_text = text
+            utterance_filter.accept(text)
+        per_hour.append((time.process_time() - start) / 7200)
+        tracked.append(len(utterance_filter._last_seen))
+        # 每条结果至多转发一次（旧实现第t秒转发约t次）
+        assert utterance_filter.forwarded - forwarded_before <= 7200
+
+    assert max(tracked) <= 4
+    early, late = sorted(per_hour[:3])[1], sorted(per_hour[-3:])[1]
+    assert late < early * 3, f"每条CPU从 {early * 1e6:.2f} µs 增长到 {late * 1e6:.2f} µs"
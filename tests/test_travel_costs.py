@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+import math
+
+import numpy as np
+import pytest
+
+pytest.importorskip('scipy')
+
+from nav_pkg.map_clearance import ClearanceMap  # noqa: E402
+from nav_pkg.map_loader import OccupancyMap  # noqa: E402
+from nav_pkg.travel_costs import TravelCostMatrix  # noqa: E402
+
+
+@pytest.fixture
+def travel_costs():
+    # 10m x 5m，x=5m处一堵墙把地图分成左右两个互不连通的区域；分辨率0.1m，原点(0, 0)
+    data = np.zeros((50, 100), dtype=np.int8)
+    data[[0, -1], :] = 100
+    data[:, [0, -1]] = 100
+    data[:, 48:52] = 100
+    occupancy_map = OccupancyMap(data, 0.1, [0.0, 0.0, 0.0], 100, 50, 'test.yaml')
+    waypoints = {'left': {'x': 2.0, 'y': 2.5, 'z': 0.0},
+                 'left corner': {'x': 4.0, 'y': 1.0, 'z': 0.0},
+                 'right': {'x': 8.0, 'y': 2.5, 'z': 0.0}}
+    return TravelCostMatrix(ClearanceMap(occupancy_map, 0.25, 0.1), waypoints)
+
+
+def test_costs(travel_costs):
+    assert travel_costs.cost('left', 'left') == 0.0
+    assert travel_costs.cost('left', 'left corner') == pytest.approx(math.hypot(2.0, 1.5), rel=0.15)
+    assert math.isinf(travel_costs.cost('left', 'right'))
+
+
+def test_reachable_from(travel_costs):
+    assert travel_costs.reachable_from(1.5, 2.0, 'left corner') is True
+    assert travel_costs.reachable_from(1.5, 2.0, 'right') is False
+    # 机器人在地图外：所在连通域未知，不能判定为不可达
+    assert travel_costs.reachable_from(-20.0, -20.0, 'right') is None
+    assert travel_costs.reachable_from(1.5, 2.0, 'garage') is None
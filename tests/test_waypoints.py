@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+import math
+
+import pytest
+from conftest import assert_median_below, write_waypoints_xml
+
+from nav_pkg.waypoints import WaypointError, count_waypoints, iter_waypoints, parse_waypoints
+
+
+def test_parse_waypoints(tmp_path):
+    path = tmp_path / 'waypoints.xml'
+    write_waypoints_xml(path, [('Kitchen', 1.5, -2.0), ('bedroom', 3.0, 4.0, (0.0, 0.0, 2.0, 0.0))])
+    rooms = parse_waypoints(str(path))
+    assert rooms['kitchen'] == {'x': 1.5, 'y': -2.0, 'z': 0.0}
+    # 朝向归一化，默认朝向不带orientation
+    assert rooms['bedroom']['orientation'] == [0.0, 0.0, 1.0, 0.0]
+    assert count_waypoints(str(path)) == 2
+
+
+def test_malformed_waypoint(tmp_path):
+    path = tmp_path / 'waypoints.xml'
+    write_waypoints_xml(path, [('ok', 1.0, 2.0), ('bad', 'nan', 2.0), ('worse', 'abc', 1.0)])
+    with pytest.raises(WaypointError):
+        parse_waypoints(str(path))
+
+    errors = []
+    assert list(parse_waypoints(str(path), errors)) == ['ok']
+    assert len(errors) == 2 and "'bad'" in errors[0] and 'Pos_x' in errors[1]
+
+
+def test_waypoints_across_chunks(tmp_path):
+    # 航点跨越多个64KB分块时一个不丢
+    path = tmp_path / 'waypoints.xml'
+    write_waypoints_xml(path, [(f'room {i}', i * 0.5, -i, (0.0, 0.0, math.sin(i), math.cos(i)))
+                               for i in range(3000)])
+    waypoints = list(iter_waypoints(str(path)))
+    assert len(waypoints) == 3000 == count_waypoints(str(path))
+    assert waypoints[1234].name == 'room 1234' and waypoints[1234].x == 617.0
+
+
+def test_parse_benchmark(benchmark, tmp_path):
+    path = tmp_path / 'waypoints.xml'
+    write_waypoints_xml(path, [(f'room {i}', float(i), float(-i)) for i in range(10000)])
+
+    rooms = benchmark(parse_waypoints, str(path))
+    assert len(rooms) == 10000
+    assert rooms['room 9999'] == {'x': 9999.0, 'y': -9999.0, 'z': 0.0}
+    assert_median_below(benchmark, 1.0)